@@ -0,0 +1,894 @@
+"""
+Batched Combat Simulation — N independent worlds stepped in one NumPy tick.
+
+Holds the state of many grind worlds (player, mobs, DoT slots, cooldowns)
+in structure-of-arrays buffers with a leading world axis, so the per-tick
+work is a handful of masked array operations instead of a Python loop per
+object. One process can drive hundreds of worlds; see BatchWoWSimEnv in
+sim/batch_vec_env.py for the SB3 VecEnv front-end.
+
+Scope: the core grind loop of CombatSimulation — movement, targeting,
+mob aggro/leash/chase/melee, the untalented Priest rotation (Smite, Heal,
+Flash Heal, SW:Pain, PW:Shield, Mind Blast, Renew, Holy Fire, Devouring
+Plague), looting gold, eat/drink, regen, XP and level-ups. Gear, talents,
+buffs, vendors, quests and 3D terrain stay in CombatSimulation/WoWSimEnv.
+Formulas and constants are shared with the scalar engine; only the RNG
+stream differs (one PCG64 generator draws for all worlds at once).
+
+Usage:
+    bsim = BatchCombatSimulation(num_envs=256, num_mobs=24, seed=0)
+    bsim.apply_actions(actions)   # np.ndarray(num_envs,) of WoWSimEnv action ids
+    bsim.tick()
+"""
+
+import math
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sim.creature_db import CreatureDB
+
+from sim.combat_sim import CombatSimulation
+from sim.constants import (
+    XP_TABLE, MAX_LEVEL, CLASS_PRIEST, base_xp_gain, get_best_rank,
+    FAMILY_SMITE, FAMILY_HEAL, FAMILY_FLASH_HEAL, FAMILY_SW_PAIN,
+    FAMILY_PW_SHIELD, FAMILY_MIND_BLAST, FAMILY_RENEW, FAMILY_HOLY_FIRE,
+    FAMILY_DEVOURING_PLAGUE,
+)
+from sim.formulas import (
+    spell_mana_cost, spell_direct_value, spell_dot_per_tick, spell_hot_per_tick,
+    spell_shield_absorb, MELEE_OUTCOMES, MELEE_CRIT, MELEE_CRUSHING,
+    mob_melee_tables, resolve_melee_rolls, spell_miss_chances,
+)
+from sim.models import SPELLS, Player
+from sim.stat_tables import default_stat_tables
+
+# Level axis of the per-level lookup tables (index 0 unused)
+_LEVELS = MAX_LEVEL + 1
+# Mob levels can exceed the player cap (elites up to 83)
+_MOB_LEVELS = 84
+# Melee outcome indices (formulas.resolve_melee_rolls)
+_O_CRIT = MELEE_OUTCOMES.index(MELEE_CRIT)
+_O_CRUSHING = MELEE_OUTCOMES.index(MELEE_CRUSHING)
+
+# ─── Spell table ─────────────────────────────────────────────────────
+# Supported families, in spell-table order. Index = row in the tables.
+BATCH_FAMILIES = (
+    FAMILY_SMITE, FAMILY_HEAL, FAMILY_FLASH_HEAL, FAMILY_SW_PAIN,
+    FAMILY_PW_SHIELD, FAMILY_MIND_BLAST, FAMILY_RENEW, FAMILY_HOLY_FIRE,
+    FAMILY_DEVOURING_PLAGUE,
+)
+_FAM_IDX = {fam: i for i, fam in enumerate(BATCH_FAMILIES)}
+_F_SMITE = _FAM_IDX[FAMILY_SMITE]
+_F_HEAL = _FAM_IDX[FAMILY_HEAL]
+_F_FLASH_HEAL = _FAM_IDX[FAMILY_FLASH_HEAL]
+_F_SW_PAIN = _FAM_IDX[FAMILY_SW_PAIN]
+_F_PW_SHIELD = _FAM_IDX[FAMILY_PW_SHIELD]
+_F_MIND_BLAST = _FAM_IDX[FAMILY_MIND_BLAST]
+_F_RENEW = _FAM_IDX[FAMILY_RENEW]
+_F_HOLY_FIRE = _FAM_IDX[FAMILY_HOLY_FIRE]
+_F_DEVOURING_PLAGUE = _FAM_IDX[FAMILY_DEVOURING_PLAGUE]
+
+_OFFENSIVE = np.zeros(len(BATCH_FAMILIES), dtype=bool)
+_OFFENSIVE[[_F_SMITE, _F_SW_PAIN, _F_MIND_BLAST, _F_HOLY_FIRE,
+            _F_DEVOURING_PLAGUE]] = True
+
+# WoWSimEnv action id -> spell-table row (same ids as WoWSimEnv._FAMILY_ACTION)
+ACTION_FAMILY = {
+    5: _F_SMITE, 6: _F_HEAL, 9: _F_SW_PAIN, 10: _F_PW_SHIELD,
+    12: _F_MIND_BLAST, 13: _F_RENEW, 14: _F_HOLY_FIRE,
+    18: _F_FLASH_HEAL, 19: _F_DEVOURING_PLAGUE,
+}
+
+# DoT slots on the mob table (CombatSimulation: dot_*, dot2_*, dot3_*)
+DOT_SW_PAIN = 0
+DOT_HOLY_FIRE = 1
+DOT_DEVOURING_PLAGUE = 2
+NUM_DOT_SLOTS = 3
+_DOT_RESET_INTERVAL = 6    # CombatSimulation resets every DoT timer to 6 ticks
+
+# Non-spell actions handled by the batch engine (others are masked out)
+ACTION_NOOP = 0
+ACTION_MOVE_FORWARD = 1
+ACTION_TURN_LEFT = 2
+ACTION_TURN_RIGHT = 3
+ACTION_TARGET_NEAREST = 4
+ACTION_LOOT = 7
+ACTION_EAT_DRINK = 17
+NUM_ACTIONS = 30
+
+
+def _build_spell_table(class_id: int) -> dict:
+    """Precompute best rank + effect values for every (family, level).
+
+    Spell power is always 0 in the batch engine (no gear), so every value
+    is a constant of the rank and can be looked up by level.
+    """
+    nf = len(BATCH_FAMILIES)
+    shape = (nf, _LEVELS)
+    t = {
+        'spell_id': np.zeros(shape, dtype=np.int32),
+        'mana_cost': np.zeros(shape, dtype=np.int32),
+        'cast_ticks': np.zeros(shape, dtype=np.int32),
+        'gcd_ticks': np.zeros(shape, dtype=np.int32),
+        'cooldown_ticks': np.zeros(shape, dtype=np.int32),
+        'range': np.zeros(shape, dtype=np.float32),
+        'min_value': np.zeros(shape, dtype=np.int32),
+        'max_value': np.zeros(shape, dtype=np.int32),
+        'dot_per_tick': np.zeros(shape, dtype=np.int32),
+        'dot_ticks': np.zeros(shape, dtype=np.int32),
+        'dot_interval': np.zeros(shape, dtype=np.int32),
+        'hot_per_tick': np.zeros(shape, dtype=np.int32),
+        'hot_ticks': np.zeros(shape, dtype=np.int32),
+        'hot_interval': np.zeros(shape, dtype=np.int32),
+        'shield_absorb': np.zeros(shape, dtype=np.int32),
+        'shield_duration': np.zeros(shape, dtype=np.int32),
+    }
+    for f, fam in enumerate(BATCH_FAMILIES):
+        for lvl in range(1, _LEVELS):
+            sid = get_best_rank(fam, lvl)
+            spell = SPELLS.get(sid) if sid else None
+            if spell is None:
+                continue
+            t['spell_id'][f, lvl] = sid
+            t['mana_cost'][f, lvl] = spell_mana_cost(sid, lvl, class_id)
+            t['cast_ticks'][f, lvl] = spell.cast_ticks
+            t['gcd_ticks'][f, lvl] = spell.gcd_ticks
+            t['cooldown_ticks'][f, lvl] = spell.cooldown_ticks
+            t['range'][f, lvl] = spell.spell_range
+            lo, hi = spell_direct_value(sid, 0)
+            t['min_value'][f, lvl] = lo
+            t['max_value'][f, lvl] = hi
+            t['dot_per_tick'][f, lvl] = spell_dot_per_tick(sid, 0)
+            t['dot_ticks'][f, lvl] = spell.dot_ticks
+            t['dot_interval'][f, lvl] = spell.dot_interval
+            t['hot_per_tick'][f, lvl] = spell_hot_per_tick(sid, 0)
+            t['hot_ticks'][f, lvl] = spell.hot_ticks
+            t['hot_interval'][f, lvl] = spell.hot_interval
+            t['shield_absorb'][f, lvl] = spell_shield_absorb(sid, 0)
+            t['shield_duration'][f, lvl] = spell.shield_duration
+    return t
+
+
+def _build_player_table(class_id: int) -> dict:
+    """Naked-character derived stats per level (CombatSimulation.recalculate_stats
+    with no gear, buffs or talents)."""
+    d = default_stat_tables().derive(class_id, np.arange(1, _LEVELS))
+    columns = {
+        'max_hp': (d['max_hp'], np.int32),
+        'max_mana': (d['max_mana'], np.int32),
+        'spell_crit': (d['spell_crit'], np.float64),
+        'spell_hit': (d['hit_spell'], np.float64),
+        'dodge': (d['dodge'], np.float64),
+        'parry': (d['parry'], np.float64),
+        'armor': (d['agility'] * 2, np.int32),
+        'spirit_regen': (d['mana_regen'], np.float64),
+    }
+    t = {}
+    for key, (values, dtype) in columns.items():
+        t[key] = np.zeros(_LEVELS, dtype=dtype)
+        t[key][1:] = values
+    return t
+
+
+def _build_xp_table() -> np.ndarray:
+    """base_xp_gain(player_level, mob_level) as a dense (80+1, 84) table."""
+    tbl = np.zeros((_LEVELS, _MOB_LEVELS), dtype=np.int32)
+    for pl in range(1, _LEVELS):
+        for ml in range(1, _MOB_LEVELS):
+            tbl[pl, ml] = base_xp_gain(pl, ml)
+    return tbl
+
+
+# ─── Batched Combat Simulation ───────────────────────────────────────
+
+class BatchCombatSimulation:
+    """
+    N independent grind worlds in structure-of-arrays NumPy buffers.
+
+    Every world shares the same spawn layout (M mob slots); levels, HP and
+    all combat state are per world. Arrays are indexed [world] for player
+    state, [world, mob] for the mob table and [world, mob, slot] for DoTs.
+
+    Tick-based: 1 tick = 0.5 seconds, same constants as CombatSimulation.
+    """
+
+    TICK_DURATION = CombatSimulation.TICK_DURATION
+    MOVE_SPEED = CombatSimulation.MOVE_SPEED
+    TURN_AMOUNT = CombatSimulation.TURN_AMOUNT
+    SCAN_RANGE = CombatSimulation.SCAN_RANGE
+    TARGET_RANGE = CombatSimulation.TARGET_RANGE
+    LOOT_RANGE = CombatSimulation.LOOT_RANGE
+    MOB_LEASH_RANGE = CombatSimulation.MOB_LEASH_RANGE
+    OOC_DELAY_TICKS = CombatSimulation.OOC_DELAY_TICKS
+    HP_REGEN_PER_TICK = CombatSimulation.HP_REGEN_PER_TICK
+    MANA_REGEN_PCT_PER_TICK = CombatSimulation.MANA_REGEN_PCT_PER_TICK
+    RESPAWN_TICKS = CombatSimulation.RESPAWN_TICKS
+    MOB_SPEED = CombatSimulation.MOB_SPEED
+
+    MELEE_RANGE = 5.0          # mob swing range (CombatSimulation.tick)
+    CHASE_STOP = 2.0           # mobs stop closing in at this distance
+    WEAKENED_SOUL_TICKS = 30   # PW:Shield lockout (15s)
+    SPAWN_RADIUS = 80.0        # synthetic layout: max spawn distance from player
+
+    def __init__(self, num_envs: int, num_mobs: int = 24,
+                 seed: Optional[int] = None,
+                 creature_db: 'CreatureDB | None' = None,
+                 class_id: int = CLASS_PRIEST):
+        self.num_envs = num_envs
+        self.class_id = class_id
+        self.rng = np.random.default_rng(seed)
+        self._spells = _build_spell_table(class_id)
+        self._pstats = _build_player_table(class_id)
+        self._xp = _build_xp_table()
+        self._xp_thresholds = np.asarray(XP_TABLE, dtype=np.int64)
+
+        self._build_layout(num_mobs, creature_db)
+        self._alloc()
+        self.reset()
+
+    # ─── Layout ──────────────────────────────────────────────────────
+
+    def _build_layout(self, num_mobs: int, creature_db):
+        """Pick M spawn slots shared by all worlds.
+
+        With a CreatureDB: the M attackable spawns nearest the player start.
+        Without: a seeded ring of level 1-3 beasts around the start position.
+        """
+        start = Player(class_id=self.class_id)
+        self.start_x, self.start_y, self.start_z = start.x, start.y, start.z
+        self.start_orientation = start.orientation
+
+        rows = []  # (x, y, z, min_lvl, max_lvl, hp_mod, dmg_mod, unit_class,
+        #           attack_ticks, detect, min_gold, max_gold)
+        if creature_db is not None:
+            spawns = []
+            for spawn_list in creature_db.spatial_index.values():
+                for sp in spawn_list:
+                    if sp.map_id != 0:
+                        continue
+                    d = math.hypot(sp.x - start.x, sp.y - start.y)
+                    spawns.append((d, sp))
+            spawns.sort(key=lambda e: e[0])
+            for _, sp in spawns[:num_mobs]:
+                t = creature_db.templates[sp.entry]
+                rows.append((sp.x, sp.y, sp.z, t.min_level, t.max_level,
+                             t.health_modifier, t.damage_modifier, t.unit_class,
+                             t.attack_speed_ticks, t.detection_range,
+                             t.min_gold, t.max_gold))
+        if not rows:
+            layout_rng = np.random.default_rng(12345)
+            for i in range(num_mobs):
+                ang = 2.0 * math.pi * i / max(1, num_mobs) + layout_rng.uniform(-0.2, 0.2)
+                r = layout_rng.uniform(20.0, self.SPAWN_RADIUS)
+                lo = 1 + min(2, int(r // 30))
+                rows.append((start.x + r * math.cos(ang), start.y + r * math.sin(ang),
+                             start.z, lo, lo + 1, 1.0, 1.0, 1, 4, 10.0, 0, 5))
+
+        cols = list(zip(*rows))
+        self.num_mobs = len(rows)
+        self.spawn_x = np.asarray(cols[0], dtype=np.float64)
+        self.spawn_y = np.asarray(cols[1], dtype=np.float64)
+        self.spawn_z = np.asarray(cols[2], dtype=np.float64)
+        self.mob_min_level = np.asarray(cols[3], dtype=np.int32)
+        self.mob_max_level = np.asarray(cols[4], dtype=np.int32)
+        self.mob_attack_ticks = np.asarray(cols[8], dtype=np.int32)
+        self.mob_detect = np.asarray(cols[9], dtype=np.float64)
+        self.mob_min_gold = np.asarray(cols[10], dtype=np.int32)
+        self.mob_max_gold = np.maximum(self.mob_min_gold,
+                                       np.asarray(cols[11], dtype=np.int32))
+
+        # Per-slot stat tables over mob level (CreatureDB.get_mob_stats, precomputed)
+        from sim.creature_db import CreatureDB
+        m = self.num_mobs
+        self._mob_hp_tbl = np.zeros((m, _MOB_LEVELS), dtype=np.int32)
+        self._mob_min_dmg_tbl = np.zeros((m, _MOB_LEVELS), dtype=np.int32)
+        self._mob_max_dmg_tbl = np.zeros((m, _MOB_LEVELS), dtype=np.int32)
+        for i, row in enumerate(rows):
+            hp_mod, dmg_mod, unit_class = row[5], row[6], row[7]
+            for lvl in range(1, _MOB_LEVELS):
+                hp = max(1, int(CreatureDB.get_base_hp(lvl, unit_class) * hp_mod))
+                bmin, bmax = CreatureDB.get_base_damage(lvl, unit_class)
+                dmin = max(1, int(bmin * dmg_mod))
+                self._mob_hp_tbl[i, lvl] = hp
+                self._mob_min_dmg_tbl[i, lvl] = dmin
+                self._mob_max_dmg_tbl[i, lvl] = max(dmin, int(bmax * dmg_mod))
+
+    # ─── Buffers ─────────────────────────────────────────────────────
+
+    def _alloc(self):
+        n, m, nf = self.num_envs, self.num_mobs, len(BATCH_FAMILIES)
+        # Player (one row per world)
+        self.hp = np.zeros(n, dtype=np.int64)
+        self.max_hp = np.zeros(n, dtype=np.int64)
+        self.mana = np.zeros(n, dtype=np.int64)
+        self.max_mana = np.zeros(n, dtype=np.int64)
+        self.level = np.ones(n, dtype=np.int64)
+        self.xp = np.zeros(n, dtype=np.int64)
+        self.x = np.zeros(n, dtype=np.float64)
+        self.y = np.zeros(n, dtype=np.float64)
+        self.orientation = np.zeros(n, dtype=np.float64)
+        self.in_combat = np.zeros(n, dtype=bool)
+        self.combat_timer = np.zeros(n, dtype=np.int64)
+        self.is_eating = np.zeros(n, dtype=bool)
+        self.cast_remaining = np.zeros(n, dtype=np.int64)
+        self.cast_family = np.full(n, -1, dtype=np.int64)
+        self.cast_level = np.zeros(n, dtype=np.int64)
+        self.gcd_remaining = np.zeros(n, dtype=np.int64)
+        self.cooldowns = np.zeros((n, nf), dtype=np.int64)
+        self.shield_absorb = np.zeros(n, dtype=np.int64)
+        self.shield_remaining = np.zeros(n, dtype=np.int64)
+        self.shield_cooldown = np.zeros(n, dtype=np.int64)
+        self.hot_remaining = np.zeros(n, dtype=np.int64)
+        self.hot_timer = np.zeros(n, dtype=np.int64)
+        self.hot_heal_per_tick = np.zeros(n, dtype=np.int64)
+        self.hp_regen_acc = np.zeros(n, dtype=np.float64)
+        self.mana_regen_acc = np.zeros(n, dtype=np.float64)
+        self.target = np.full(n, -1, dtype=np.int64)
+        # Per-episode counters (consumed by the VecEnv)
+        self.kills = np.zeros(n, dtype=np.int64)
+        self.damage_dealt = np.zeros(n, dtype=np.int64)
+        self.xp_gained = np.zeros(n, dtype=np.int64)
+        self.loot_copper = np.zeros(n, dtype=np.int64)
+        self.levels_gained = np.zeros(n, dtype=np.int64)
+        # Mob table (world x slot)
+        self.mob_alive = np.zeros((n, m), dtype=bool)
+        self.mob_hp = np.zeros((n, m), dtype=np.int64)
+        self.mob_max_hp = np.zeros((n, m), dtype=np.int64)
+        self.mob_level = np.ones((n, m), dtype=np.int64)
+        self.mob_x = np.zeros((n, m), dtype=np.float64)
+        self.mob_y = np.zeros((n, m), dtype=np.float64)
+        self.mob_in_combat = np.zeros((n, m), dtype=bool)
+        self.mob_attack_timer = np.zeros((n, m), dtype=np.int64)
+        self.mob_respawn_timer = np.zeros((n, m), dtype=np.int64)
+        self.mob_looted = np.zeros((n, m), dtype=bool)
+        # DoT slots (world x slot x dot)
+        self.dot_remaining = np.zeros((n, m, NUM_DOT_SLOTS), dtype=np.int64)
+        self.dot_timer = np.zeros((n, m, NUM_DOT_SLOTS), dtype=np.int64)
+        self.dot_damage = np.zeros((n, m, NUM_DOT_SLOTS), dtype=np.int64)
+        self.tick_count = 0
+
+    # ─── Reset ───────────────────────────────────────────────────────
+
+    def reset(self, worlds=None) -> None:
+        """Reset the given worlds (index array or bool mask; None = all)."""
+        if worlds is None:
+            w = np.arange(self.num_envs)
+        else:
+            w = np.asarray(worlds)
+            if w.dtype == bool:
+                w = np.nonzero(w)[0]
+        if w.size == 0:
+            return
+        ps = self._pstats
+        self.level[w] = 1
+        self.xp[w] = 0
+        self.max_hp[w] = ps['max_hp'][1]
+        self.hp[w] = ps['max_hp'][1]
+        self.max_mana[w] = ps['max_mana'][1]
+        self.mana[w] = ps['max_mana'][1]
+        self.x[w] = self.start_x
+        self.y[w] = self.start_y
+        self.orientation[w] = self.start_orientation
+        for arr in (self.in_combat, self.is_eating):
+            arr[w] = False
+        for arr in (self.combat_timer, self.cast_remaining, self.cast_level,
+                    self.gcd_remaining, self.shield_absorb, self.shield_remaining,
+                    self.shield_cooldown, self.hot_remaining, self.hot_timer,
+                    self.hot_heal_per_tick, self.kills, self.damage_dealt,
+                    self.xp_gained, self.loot_copper, self.levels_gained):
+            arr[w] = 0
+        self.hp_regen_acc[w] = 0.0
+        self.mana_regen_acc[w] = 0.0
+        self.cast_family[w] = -1
+        self.target[w] = -1
+        self.cooldowns[w] = 0
+
+        wm = np.zeros((self.num_envs, self.num_mobs), dtype=bool)
+        wm[w] = True
+        self._respawn(wm)
+
+    def _respawn(self, mask: np.ndarray) -> None:
+        """Respawn mob slots in `mask` (world x slot) at their spawn point."""
+        if not mask.any():
+            return
+        wi, mi = np.nonzero(mask)
+        lvl = self.rng.integers(self.mob_min_level[mi], self.mob_max_level[mi] + 1)
+        hp = self._mob_hp_tbl[mi, lvl]
+        self.mob_level[wi, mi] = lvl
+        self.mob_hp[wi, mi] = hp
+        self.mob_max_hp[wi, mi] = hp
+        self.mob_alive[wi, mi] = True
+        self.mob_in_combat[wi, mi] = False
+        self.mob_looted[wi, mi] = False
+        self.mob_x[wi, mi] = self.spawn_x[mi]
+        self.mob_y[wi, mi] = self.spawn_y[mi]
+        self.mob_attack_timer[wi, mi] = 0
+        self.mob_respawn_timer[wi, mi] = 0
+        self.dot_remaining[wi, mi] = 0
+        self.dot_timer[wi, mi] = 0
+        self.dot_damage[wi, mi] = 0
+
+    # ─── Geometry helpers ────────────────────────────────────────────
+
+    def mob_distances(self) -> np.ndarray:
+        """Player → mob distance for every (world, slot)."""
+        dx = self.mob_x - self.x[:, None]
+        dy = self.mob_y - self.y[:, None]
+        return np.sqrt(dx * dx + dy * dy)
+
+    def _target_rows(self):
+        """(has_target, safe_index) — safe_index is 0 where no target."""
+        has = self.target >= 0
+        return has, np.where(has, self.target, 0)
+
+    def target_alive(self) -> np.ndarray:
+        has, t = self._target_rows()
+        return has & self.mob_alive[np.arange(self.num_envs), t]
+
+    # ─── Actions ─────────────────────────────────────────────────────
+
+    def apply_actions(self, actions: np.ndarray) -> None:
+        """Apply one WoWSimEnv action id per world (invalid actions are no-ops)."""
+        a = np.asarray(actions, dtype=np.int64)
+        free = self.cast_remaining <= 0
+
+        mv = free & (a == ACTION_MOVE_FORWARD)
+        if mv.any():
+            self.is_eating[mv] = False
+            self.x[mv] += np.cos(self.orientation[mv]) * self.MOVE_SPEED
+            self.y[mv] += np.sin(self.orientation[mv]) * self.MOVE_SPEED
+
+        for act, sign in ((ACTION_TURN_LEFT, 1.0), (ACTION_TURN_RIGHT, -1.0)):
+            tr = free & (a == act)
+            if tr.any():
+                self.is_eating[tr] = False
+                o = self.orientation[tr] + sign * self.TURN_AMOUNT
+                o = np.where(o > math.pi, o - 2 * math.pi, o)
+                o = np.where(o < -math.pi, o + 2 * math.pi, o)
+                self.orientation[tr] = o
+
+        tg = free & (a == ACTION_TARGET_NEAREST)
+        if tg.any():
+            self._do_target_nearest(tg)
+
+        lt = a == ACTION_LOOT
+        if lt.any():
+            self._do_loot(lt)
+
+        ed = a == ACTION_EAT_DRINK
+        if ed.any():
+            ok = (ed & ~self.in_combat & free & ~self.is_eating
+                  & ((self.hp < self.max_hp) | (self.mana < self.max_mana)))
+            self.is_eating[ok] = True
+
+        cast = free & (self.gcd_remaining <= 0)
+        if cast.any():
+            for act, f in ACTION_FAMILY.items():
+                sel = cast & (a == act)
+                if sel.any():
+                    self._start_cast(np.nonzero(sel)[0], f)
+
+    def _do_target_nearest(self, sel: np.ndarray) -> None:
+        d = np.where(self.mob_alive, self.mob_distances(), np.inf)
+        best = np.argmin(d, axis=1)
+        best_d = d[np.arange(self.num_envs), best]
+        self.target[sel] = np.where(best_d[sel] < self.TARGET_RANGE, best[sel], -1)
+
+    def _do_loot(self, sel: np.ndarray) -> None:
+        d = np.where(~self.mob_alive & ~self.mob_looted, self.mob_distances(), np.inf)
+        best = np.argmin(d, axis=1)
+        rows = np.arange(self.num_envs)
+        ok = sel & (d[rows, best] < self.LOOT_RANGE)
+        if not ok.any():
+            return
+        w = np.nonzero(ok)[0]
+        mi = best[w]
+        self.mob_looted[w, mi] = True
+        self.loot_copper[w] += self.rng.integers(self.mob_min_gold[mi],
+                                                 self.mob_max_gold[mi] + 1)
+
+    def spell_ready(self, f: int) -> np.ndarray:
+        """Per-world castability of spell-table row `f` (CombatSimulation._start_cast)."""
+        sp = self._spells
+        lvl = self.level
+        ok = sp['spell_id'][f, lvl] > 0
+        ok &= self.cast_remaining <= 0
+        ok &= self.gcd_remaining <= 0
+        ok &= self.mana >= sp['mana_cost'][f, lvl]
+        ok &= self.cooldowns[:, f] <= 0
+        if _OFFENSIVE[f]:
+            has, t = self._target_rows()
+            rows = np.arange(self.num_envs)
+            dx = self.mob_x[rows, t] - self.x
+            dy = self.mob_y[rows, t] - self.y
+            in_range = np.sqrt(dx * dx + dy * dy) <= sp['range'][f, lvl]
+            ok &= has & self.mob_alive[rows, t] & in_range
+            if f == _F_DEVOURING_PLAGUE:
+                ok &= ~(has & (self.dot_remaining[rows, t, DOT_DEVOURING_PLAGUE] > 0))
+        elif f == _F_PW_SHIELD:
+            ok &= (self.shield_remaining <= 0) & (self.shield_cooldown <= 0)
+        elif f == _F_RENEW:
+            ok &= self.hot_remaining <= 0
+        return ok
+
+    def _start_cast(self, w: np.ndarray, f: int) -> None:
+        ready = self.spell_ready(f)[w]
+        w = w[ready]
+        if w.size == 0:
+            return
+        sp = self._spells
+        lvl = self.level[w]
+        self.is_eating[w] = False
+        self.mana[w] -= sp['mana_cost'][f, lvl]
+        self.gcd_remaining[w] = sp['gcd_ticks'][f, lvl]
+        cd = sp['cooldown_ticks'][f, lvl]
+        self.cooldowns[w, f] = np.where(cd > 0, cd, self.cooldowns[w, f])
+        ct = sp['cast_ticks'][f, lvl]
+        timed = ct > 0
+        if timed.any():
+            wt = w[timed]
+            self.cast_remaining[wt] = ct[timed]
+            self.cast_family[wt] = f
+            self.cast_level[wt] = lvl[timed]
+        if (~timed).any():
+            wi = w[~timed]
+            self._apply_spell(wi, f, self.level[wi])
+
+    # ─── Spell effects ───────────────────────────────────────────────
+
+    def _roll_offensive(self, w: np.ndarray, t: np.ndarray):
+        """Two-roll spell table (formulas.resolve_spell_hit), vectorized.
+
+        Returns (hit, crit) bool arrays aligned with `w`.
+        """
+        pl = self.level[w]
+        miss = spell_miss_chances(pl, self.mob_level[w, t], self._pstats['spell_hit'][pl])
+        hit = self.rng.random(w.size) * 100.0 >= miss
+        crit = hit & (self.rng.random(w.size) * 100.0 < self._pstats['spell_crit'][pl])
+        return hit, crit
+
+    def _apply_spell(self, w: np.ndarray, f: int, lvl: np.ndarray) -> None:
+        """Apply spell-table row `f` for worlds `w` at caster levels `lvl`."""
+        sp = self._spells
+        if _OFFENSIVE[f]:
+            has, t_all = self._target_rows()
+            t = t_all[w]
+            alive = has[w] & self.mob_alive[w, t]
+            w, t, lvl = w[alive], t[alive], lvl[alive]
+            if w.size == 0:
+                return
+            hit, crit = self._roll_offensive(w, t)
+            w, t, lvl, crit = w[hit], t[hit], lvl[hit], crit[hit]
+            if w.size == 0:
+                return
+            if f in (_F_SMITE, _F_MIND_BLAST, _F_HOLY_FIRE):
+                dmg = self.rng.integers(sp['min_value'][f, lvl], sp['max_value'][f, lvl] + 1)
+                dmg = np.where(crit, (dmg * 1.5).astype(np.int64), dmg)
+                self._damage_mobs(w, t, dmg)
+            slot = {_F_SW_PAIN: DOT_SW_PAIN, _F_HOLY_FIRE: DOT_HOLY_FIRE,
+                    _F_DEVOURING_PLAGUE: DOT_DEVOURING_PLAGUE}.get(f)
+            if slot is not None:
+                # Holy Fire's direct hit may have killed the mob
+                keep = self.mob_alive[w, t] if f == _F_HOLY_FIRE else np.ones(w.size, bool)
+                w, t, lvl = w[keep], t[keep], lvl[keep]
+                self.dot_remaining[w, t, slot] = sp['dot_ticks'][f, lvl]
+                self.dot_timer[w, t, slot] = sp['dot_interval'][f, lvl]
+                self.dot_damage[w, t, slot] = sp['dot_per_tick'][f, lvl]
+        elif f in (_F_HEAL, _F_FLASH_HEAL):
+            heal = self.rng.integers(sp['min_value'][f, lvl], sp['max_value'][f, lvl] + 1)
+            crit = self.rng.random(w.size) * 100.0 < self._pstats['spell_crit'][self.level[w]]
+            heal = np.where(crit, (heal * 1.5).astype(np.int64), heal)
+            self.hp[w] = np.minimum(self.max_hp[w], self.hp[w] + heal)
+        elif f == _F_PW_SHIELD:
+            self.shield_absorb[w] = sp['shield_absorb'][f, lvl]
+            self.shield_remaining[w] = sp['shield_duration'][f, lvl]
+            self.shield_cooldown[w] = self.WEAKENED_SOUL_TICKS
+        elif f == _F_RENEW:
+            self.hot_remaining[w] = sp['hot_ticks'][f, lvl]
+            self.hot_timer[w] = sp['hot_interval'][f, lvl]
+            self.hot_heal_per_tick[w] = sp['hot_per_tick'][f, lvl]
+
+    # ─── Damage / death ──────────────────────────────────────────────
+
+    def _damage_mobs(self, w: np.ndarray, t: np.ndarray, dmg: np.ndarray) -> None:
+        """Apply damage to mob slots (w, t); (w, t) pairs must be unique."""
+        old = self.mob_hp[w, t]
+        new = np.maximum(0, old - dmg)
+        self.mob_hp[w, t] = new
+        np.add.at(self.damage_dealt, w, old - new)
+        self.mob_in_combat[w, t] = True
+        dead = new <= 0
+        if dead.any():
+            self._kill(w[dead], t[dead])
+
+    def _kill(self, w: np.ndarray, t: np.ndarray) -> None:
+        self.mob_alive[w, t] = False
+        self.mob_in_combat[w, t] = False
+        self.mob_respawn_timer[w, t] = self.RESPAWN_TICKS
+        self.dot_remaining[w, t] = 0
+        np.add.at(self.kills, w, 1)
+        gain = self._xp[self.level[w], np.minimum(self.mob_level[w, t], _MOB_LEVELS - 1)]
+        np.add.at(self.xp_gained, w, gain)
+        np.add.at(self.xp, w, gain)
+        self._check_level_up(np.unique(w))
+
+    def _check_level_up(self, w: np.ndarray) -> None:
+        new_lvl = np.searchsorted(self._xp_thresholds, self.xp[w], side='right') - 1
+        new_lvl = np.clip(new_lvl, self.level[w], MAX_LEVEL)
+        up = new_lvl > self.level[w]
+        if not up.any():
+            return
+        wu, lu = w[up], new_lvl[up]
+        self.levels_gained[wu] += lu - self.level[wu]
+        self.level[wu] = lu
+        # Full heal on level-up (CombatSimulation._apply_level_stats)
+        self.max_hp[wu] = self._pstats['max_hp'][lu]
+        self.max_mana[wu] = self._pstats['max_mana'][lu]
+        self.hp[wu] = self.max_hp[wu]
+        self.mana[wu] = self.max_mana[wu]
+
+    # ─── Tick ────────────────────────────────────────────────────────
+
+    def tick(self) -> None:
+        """Advance every world by one tick (0.5 seconds)."""
+        self.tick_count += 1
+        # --- Cast completion ---
+        casting = self.cast_remaining > 0
+        self.cast_remaining[casting] -= 1
+        done = casting & (self.cast_remaining <= 0)
+        if done.any():
+            for f in np.unique(self.cast_family[done]):
+                w = np.nonzero(done & (self.cast_family == f))[0]
+                self._apply_spell(w, int(f), self.cast_level[w])
+            self.cast_family[done] = -1
+
+        # --- GCD ---
+        self.gcd_remaining[self.gcd_remaining > 0] -= 1
+
+        # --- Dead mobs: respawn timers ---
+        dead = ~self.mob_alive & (self.mob_respawn_timer > 0)
+        self.mob_respawn_timer[dead] -= 1
+        self._respawn(dead & (self.mob_respawn_timer <= 0))
+
+        # --- Aggro ---
+        dist = self.mob_distances()
+        aggro = self.mob_alive & ~self.mob_in_combat & (dist <= self.mob_detect)
+        if aggro.any():
+            self.mob_in_combat |= aggro
+            pulled = aggro.any(axis=1)
+            self.in_combat |= pulled
+            self.is_eating &= ~pulled
+
+        # --- Leash: evade back to spawn ---
+        fighting = self.mob_alive & self.mob_in_combat
+        sdx = self.mob_x - self.spawn_x
+        sdy = self.mob_y - self.spawn_y
+        evade = fighting & (np.sqrt(sdx * sdx + sdy * sdy) > self.MOB_LEASH_RANGE)
+        if evade.any():
+            wi, mi = np.nonzero(evade)
+            self.mob_in_combat[wi, mi] = False
+            self.mob_hp[wi, mi] = self.mob_max_hp[wi, mi]
+            self.mob_x[wi, mi] = self.spawn_x[mi]
+            self.mob_y[wi, mi] = self.spawn_y[mi]
+            self.mob_attack_timer[wi, mi] = 0
+            self.dot_remaining[wi, mi] = 0
+            fighting &= ~evade
+
+        # --- Chase ---
+        chase = fighting & (dist > self.CHASE_STOP)
+        if chase.any():
+            safe = np.where(dist > 0, dist, 1.0)
+            move = np.minimum(self.MOB_SPEED, dist - 1.5)
+            ux = (self.x[:, None] - self.mob_x) / safe
+            uy = (self.y[:, None] - self.mob_y) / safe
+            self.mob_x = np.where(chase, self.mob_x + ux * move, self.mob_x)
+            self.mob_y = np.where(chase, self.mob_y + uy * move, self.mob_y)
+            dist = self.mob_distances()
+
+        # --- Melee (single-roll attack table) ---
+        swing = fighting & (dist <= self.MELEE_RANGE)
+        self.mob_attack_timer[swing] -= 1
+        swing &= self.mob_attack_timer <= 0
+        if swing.any():
+            self._mob_melee(swing)
+
+        # --- DoT ticks ---
+        active = self.dot_remaining > 0
+        active &= self.mob_alive[:, :, None]
+        if active.any():
+            self.dot_remaining[active] -= 1
+            self.dot_timer[active] -= 1
+            fire = active & (self.dot_timer <= 0)
+            if fire.any():
+                self.dot_timer[fire] = _DOT_RESET_INTERVAL
+                dmg = np.where(fire, self.dot_damage, 0)
+                heal = dmg[:, :, DOT_DEVOURING_PLAGUE].sum(axis=1)
+                wi, mi = np.nonzero(fire.any(axis=2))
+                self._damage_mobs(wi, mi, dmg[wi, mi].sum(axis=1))
+                self.hp = np.minimum(self.max_hp, self.hp + heal)
+
+        # --- Combat end ---
+        still = (self.mob_alive & self.mob_in_combat).any(axis=1)
+        self.in_combat &= still
+
+        # --- Shield decay ---
+        sh = self.shield_remaining > 0
+        self.shield_remaining[sh] -= 1
+        self.shield_absorb[sh & (self.shield_remaining <= 0)] = 0
+        self.shield_cooldown[self.shield_cooldown > 0] -= 1
+
+        # --- Spell cooldowns ---
+        np.maximum(self.cooldowns - 1, 0, out=self.cooldowns)
+
+        # --- HoT (Renew) ---
+        hot = self.hot_remaining > 0
+        if hot.any():
+            self.hot_remaining[hot] -= 1
+            self.hot_timer[hot] -= 1
+            ht = hot & (self.hot_timer <= 0)
+            self.hp[ht] = np.minimum(self.max_hp[ht], self.hp[ht] + self.hot_heal_per_tick[ht])
+            self.hot_timer[ht] = _DOT_RESET_INTERVAL
+            self.hot_heal_per_tick[hot & (self.hot_remaining <= 0)] = 0
+
+        # --- Regen ---
+        self.combat_timer += 1
+        ooc = ~self.in_combat & (self.combat_timer >= self.OOC_DELAY_TICKS)
+        self.hp_regen_acc[ooc] += self.HP_REGEN_PER_TICK
+        heal = np.floor(self.hp_regen_acc).astype(np.int64)
+        heal[~ooc] = 0
+        self.hp = np.minimum(self.max_hp, self.hp + heal)
+        self.hp_regen_acc -= heal
+
+        idle = self.cast_remaining <= 0
+        self.mana_regen_acc[idle] += self._pstats['spirit_regen'][self.level[idle]]
+        floor = self.max_mana * self.MANA_REGEN_PCT_PER_TICK
+        self.mana_regen_acc = np.where(idle & (self.mana_regen_acc < floor),
+                                       floor, self.mana_regen_acc)
+        regen = np.floor(self.mana_regen_acc).astype(np.int64)
+        self.mana = np.minimum(self.max_mana, self.mana + regen)
+        self.mana_regen_acc -= regen
+
+        # --- Eat/Drink (2.5% HP + Mana per tick) ---
+        self.is_eating &= ~self.in_combat
+        if self.is_eating.any():
+            e = self.is_eating
+            self.hp[e] = np.minimum(self.max_hp[e], self.hp[e]
+                                    + np.maximum(1, (self.max_hp[e] * 0.025).astype(np.int64)))
+            self.mana[e] = np.minimum(self.max_mana[e], self.mana[e]
+                                      + np.maximum(1, (self.max_mana[e] * 0.025).astype(np.int64)))
+            self.is_eating &= ~((self.hp >= self.max_hp) & (self.mana >= self.max_mana))
+
+    def _mob_melee(self, swing: np.ndarray) -> None:
+        wi, mi = np.nonzero(swing)
+        ml = self.mob_level[wi, mi]
+        pl = self.level[wi]
+        tables = mob_melee_tables(ml, pl, self._pstats['dodge'][pl],
+                                  self._pstats['parry'][pl])   # block = 0 (no shield)
+        outcome = resolve_melee_rolls(tables, self.rng.random(wi.size) * 100.0)
+        base = self.rng.integers(self._mob_min_dmg_tbl[mi, ml],
+                                 self._mob_max_dmg_tbl[mi, ml] + 1)
+        dmg = np.where(outcome < _O_CRIT, 0,
+              np.where(outcome == _O_CRIT, (base * 2.0).astype(np.int64),
+              np.where(outcome == _O_CRUSHING, (base * 1.5).astype(np.int64), base)))
+        self.mob_attack_timer[wi, mi] = self.mob_attack_ticks[mi]
+        self.combat_timer[wi] = 0
+
+        landed = dmg > 0
+        if not landed.any():
+            return
+        wl = wi[landed]
+        armor = self._pstats['armor'][self.level[wl]]
+        lvl = ml[landed].astype(np.float64)
+        eff = lvl + np.where(lvl > 59, 4.5 * (lvl - 59), 0.0)
+        dr = 0.1 * armor / (8.5 * eff + 40)
+        mit = np.minimum(dr / (1 + dr), 0.75)
+        hit = np.where(armor > 0,
+                       np.maximum(1, (dmg[landed] * (1 - mit)).astype(np.int64)),
+                       dmg[landed])
+        total = np.zeros(self.num_envs, dtype=np.int64)
+        np.add.at(total, wl, hit)
+        absorbed = np.minimum(self.shield_absorb, total)
+        self.shield_absorb -= absorbed
+        self.shield_remaining[(absorbed > 0) & (self.shield_absorb <= 0)] = 0
+        self.hp = np.maximum(0, self.hp - (total - absorbed))
+        self.is_eating[np.unique(wl)] = False
+
+    # ─── Masks / observations ────────────────────────────────────────
+
+    def action_masks(self) -> np.ndarray:
+        """(num_envs, 30) bool mask, same semantics as WoWSimEnv.action_masks."""
+        n = self.num_envs
+        mask = np.zeros((n, NUM_ACTIONS), dtype=bool)
+        free = (self.cast_remaining <= 0) & ~self.is_eating
+        mask[:, ACTION_NOOP] = True
+        mask[:, ACTION_MOVE_FORWARD] = free
+        mask[:, ACTION_TURN_LEFT] = free
+        mask[:, ACTION_TURN_RIGHT] = free
+
+        dist = self.mob_distances()
+        mask[:, ACTION_TARGET_NEAREST] = free & (self.mob_alive & (dist <= self.TARGET_RANGE)).any(axis=1)
+        lootable = ~self.mob_alive & ~self.mob_looted & (dist <= self.LOOT_RANGE)
+        mask[:, ACTION_LOOT] = free & ~self.in_combat & lootable.any(axis=1)
+        mask[:, ACTION_EAT_DRINK] = (free & ~self.in_combat
+                                     & ((self.hp < self.max_hp) | (self.mana < self.max_mana)))
+
+        rows = np.arange(n)
+        has, t = self._target_rows()
+        for act, f in ACTION_FAMILY.items():
+            ok = free & self.spell_ready(f)
+            if f == _F_SW_PAIN:
+                ok &= ~(has & (self.dot_remaining[rows, t, DOT_SW_PAIN] > 0))
+            mask[:, act] = ok
+        return mask
+
+    def nearby_mob_features(self) -> np.ndarray:
+        """(num_envs, 4) — mob_count, closest_dist, closest_angle, attackers
+        (WoWSimEnv._compute_nearby_mob_features)."""
+        dx = self.mob_x - self.x[:, None]
+        dy = self.mob_y - self.y[:, None]
+        dist = np.sqrt(dx * dx + dy * dy)
+        near = self.mob_alive & (dist <= self.SCAN_RANGE)
+        count = near.sum(axis=1)
+        attackers = (near & self.mob_in_combat).sum(axis=1)
+        d = np.where(near, dist, np.inf)
+        best = np.argmin(d, axis=1)
+        rows = np.arange(self.num_envs)
+        bd = d[rows, best]
+        has = bd < 40.0
+        rel = np.arctan2(dy[rows, best], dx[rows, best]) - self.orientation
+        rel = (rel + np.pi) % (2 * np.pi) - np.pi
+        out = np.zeros((self.num_envs, 4), dtype=np.float32)
+        out[:, 0] = np.minimum(count, 10) / 10.0
+        out[:, 1] = np.where(has, bd, 40.0) / 40.0
+        out[:, 2] = np.where(has, rel, 0.0) / np.pi
+        out[:, 3] = np.minimum(attackers, 5) / 5.0
+        return out
+
+    def build_obs(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """(num_envs, 52) float32 observation in the WoWSimEnv._build_obs layout.
+
+        Dims for systems the batch engine does not model (buffs, talents,
+        gear stats, vendors, quests) stay 0.
+        """
+        n = self.num_envs
+        if out is None:
+            out = np.zeros((n, 52), dtype=np.float32)
+        else:
+            out[:] = 0.0
+        rows = np.arange(n)
+        has, t = self._target_rows()
+        t_alive = has & self.mob_alive[rows, t]
+        tdx = self.mob_x[rows, t] - self.x
+        tdy = self.mob_y[rows, t] - self.y
+        tdist = np.sqrt(tdx * tdx + tdy * tdy)
+        rel = np.arctan2(tdy, tdx) - self.orientation
+        rel = (rel + np.pi) % (2 * np.pi) - np.pi
+
+        out[:, 0] = self.hp / np.maximum(1, self.max_hp)
+        out[:, 1] = self.mana / np.maximum(1, self.max_mana)
+        out[:, 2] = np.where(t_alive, self.mob_hp[rows, t] / 100.0, 0.0)
+        out[:, 3] = t_alive
+        out[:, 4] = self.in_combat
+        out[:, 5] = np.where(t_alive, np.minimum(tdist, 40.0) / 40.0, 0.0)
+        out[:, 6] = np.where(t_alive, rel / np.pi, 0.0)
+        out[:, 7] = self.cast_remaining > 0
+        nm = self.nearby_mob_features()
+        out[:, 8] = nm[:, 0]
+        out[:, 9] = Player.__dataclass_fields__['free_slots'].default / 20.0
+        out[:, 10:13] = nm[:, 1:4]
+        out[:, 13] = np.where(t_alive, self.mob_level[rows, t], 0) / 10.0
+        out[:, 14] = self.level / 10.0
+        out[:, 15] = self.shield_remaining > 0
+        out[:, 16] = t_alive & (self.dot_remaining[rows, t, DOT_SW_PAIN] > 0)
+        out[:, 17] = self.hot_remaining > 0
+        out[:, 20] = self.cooldowns[:, _F_MIND_BLAST] <= 0
+        out[:, 21] = t_alive & (self.dot_remaining[rows, t, DOT_HOLY_FIRE] > 0)
+        out[:, 22] = self.is_eating
+        out[:, 23] = t_alive & (self.dot_remaining[rows, t, DOT_DEVOURING_PLAGUE] > 0)
+        out[:, 34] = self._pstats['spell_crit'][self.level] / 50.0
+        out[:, 36] = self._pstats['armor'][self.level] / 2000.0
+        out[:, 39] = self._pstats['dodge'][self.level] / 50.0
+        out[:, 40] = self._pstats['spell_hit'][self.level] / 50.0
+        return out
@@ -0,0 +1,198 @@
+"""
+Native SB3 VecEnv over BatchCombatSimulation — hundreds of worlds per process.
+
+Same observation (Box(52,)) and action (Discrete(30)) spaces as WoWSimEnv,
+so policies transfer between the two. Actions the batch engine does not
+model (sell, quests, buffs, talent spells) are always masked out.
+
+Rewards follow the WoWSimEnv shaping terms that exist in the batch engine:
+step/idle penalty, eat/drink shaping, damage, target approach, XP,
+level-ups, looted copper and death. Finished worlds auto-reset and report
+"terminal_observation" + "episode_stats" in their info dict.
+
+Usage:
+    from sb3_contrib import MaskablePPO
+    env = BatchWoWSimEnv(num_envs=256, seed=0)
+    model = MaskablePPO("MlpPolicy", env)   # masks via env_method("action_masks")
+"""
+
+from typing import Any, Optional, Sequence, TYPE_CHECKING
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from sim.batch_sim import BatchCombatSimulation, NUM_ACTIONS, ACTION_NOOP
+
+if TYPE_CHECKING:
+    from sim.creature_db import CreatureDB
+
+
+class BatchWoWSimEnv(VecEnv):
+    """SB3 VecEnv stepping all worlds of one BatchCombatSimulation per call."""
+
+    STALL_STEPS = 3_000       # truncate after this many steps without kill XP
+
+    def __init__(self, num_envs: int = 64, num_mobs: int = 24,
+                 seed: Optional[int] = None,
+                 creature_db: 'CreatureDB | None' = None):
+        observation_space = spaces.Box(
+            low=-1.0, high=float('inf'), shape=(52,), dtype=np.float32)
+        action_space = spaces.Discrete(NUM_ACTIONS)
+        self.render_mode = None
+        super().__init__(num_envs, observation_space, action_space)
+        self.sim = BatchCombatSimulation(num_envs, num_mobs=num_mobs,
+                                         seed=seed, creature_db=creature_db)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+        self._obs = np.zeros((num_envs, 52), dtype=np.float32)
+        self._ep_reward = np.zeros(num_envs, dtype=np.float64)
+        self._ep_len = np.zeros(num_envs, dtype=np.int64)
+        self._idle = np.zeros(num_envs, dtype=np.int64)
+        self._since_kill_xp = np.zeros(num_envs, dtype=np.int64)
+        self._prev_target_hp = np.full(num_envs, -1, dtype=np.int64)
+        self._prev_target_dist = np.full(num_envs, np.nan, dtype=np.float64)
+        self._prev_xp = np.zeros(num_envs, dtype=np.int64)
+        self._prev_copper = np.zeros(num_envs, dtype=np.int64)
+        self._prev_levels = np.zeros(num_envs, dtype=np.int64)
+
+    # ─── VecEnv API ──────────────────────────────────────────────────
+
+    def reset(self):
+        self.sim.reset()
+        self._clear_episode(np.ones(self.num_envs, dtype=bool))
+        self._reset_seeds()
+        self._reset_options()
+        return self.sim.build_obs(self._obs).copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        sim = self.sim
+        actions = self._actions
+        sim.apply_actions(actions)
+        sim.tick()
+        self._ep_len += 1
+
+        reward = np.full(self.num_envs, -0.0005)
+
+        # Idle penalty (noop while not casting/eating)
+        casting = sim.cast_remaining > 0
+        idle = (actions == ACTION_NOOP) & ~casting & ~sim.is_eating
+        reward[idle] -= 0.01
+        self._idle += idle
+
+        # Eat/drink shaping
+        hp_pct = sim.hp / np.maximum(1, sim.max_hp)
+        mana_pct = sim.mana / np.maximum(1, sim.max_mana)
+        reward += np.where(sim.is_eating, 0.003 * ((1 - hp_pct) + (1 - mana_pct)), 0.0)
+
+        # Damage on current target + approach shaping
+        rows = np.arange(self.num_envs)
+        t_alive = sim.target_alive()
+        t = np.where(sim.target >= 0, sim.target, 0)
+        t_hp = np.where(t_alive, sim.mob_hp[rows, t], 0)
+        dmg = np.where(t_alive & (self._prev_target_hp > 0),
+                       self._prev_target_hp - t_hp, 0)
+        reward += np.where(dmg > 0, np.minimum(dmg * 0.03, 1.0), 0.0)
+        t_dist = np.hypot(sim.mob_x[rows, t] - sim.x, sim.mob_y[rows, t] - sim.y)
+        prev = self._prev_target_dist
+        approach = t_alive & ~np.isnan(prev) & (prev < 9000)
+        reward += np.where(approach, np.clip((prev - t_dist) * 0.03, -0.1, 0.15), 0.0)
+        self._prev_target_dist = np.where(t_alive, t_dist, np.nan)
+        self._prev_target_hp = np.where(t_alive, t_hp, -1)
+
+        # XP, level-ups, copper
+        xp = sim.xp_gained - self._prev_xp
+        self._prev_xp = sim.xp_gained.copy()
+        reward += xp * 0.5
+        self._since_kill_xp = np.where(xp > 0, 0, self._since_kill_xp + 1)
+        levels = sim.levels_gained - self._prev_levels
+        self._prev_levels = sim.levels_gained.copy()
+        reward += 15.0 * levels
+        copper = sim.loot_copper - self._prev_copper
+        self._prev_copper = sim.loot_copper.copy()
+        reward += np.minimum(copper * 0.01, 1.0)
+
+        terminated = sim.hp <= 0
+        reward[terminated] = -15.0
+        truncated = ~terminated & (self._since_kill_xp >= self.STALL_STEPS)
+        self._ep_reward += reward
+
+        obs = sim.build_obs(self._obs)
+        dones = terminated | truncated
+        infos: list[dict] = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.nonzero(dones)[0]:
+                infos[i] = {
+                    "terminal_observation": obs[i].copy(),
+                    "TimeLimit.truncated": bool(truncated[i]),
+                    "episode_stats": self._episode_stats(i),
+                }
+            sim.reset(dones)
+            self._clear_episode(dones)
+            obs = sim.build_obs(self._obs)
+        return obs.copy(), reward.astype(np.float32), dones, infos
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices=None) -> list[Any]:
+        idx = self._get_indices(indices)
+        if attr_name == "action_masks":
+            return [self.action_masks] * len(list(idx))
+        value = getattr(self, attr_name)
+        return [value for _ in idx]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None,
+                   **method_kwargs) -> list[Any]:
+        idx = list(self._get_indices(indices))
+        if method_name == "action_masks":
+            masks = self.sim.action_masks()
+            return [masks[i] for i in idx]
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in idx]
+
+    def env_is_wrapped(self, wrapper_class: type[gym.Wrapper], indices=None) -> list[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    def seed(self, seed: Optional[int] = None) -> Sequence[None | int]:
+        if seed is not None:
+            self.sim.rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    # ─── Helpers ─────────────────────────────────────────────────────
+
+    def action_masks(self) -> np.ndarray:
+        """(num_envs, 30) bool mask for MaskablePPO."""
+        return self.sim.action_masks()
+
+    def _clear_episode(self, worlds: np.ndarray) -> None:
+        self._ep_reward[worlds] = 0.0
+        self._ep_len[worlds] = 0
+        self._idle[worlds] = 0
+        self._since_kill_xp[worlds] = 0
+        self._prev_target_hp[worlds] = -1
+        self._prev_target_dist[worlds] = np.nan
+        self._prev_xp[worlds] = 0
+        self._prev_copper[worlds] = 0
+        self._prev_levels[worlds] = 0
+
+    def _episode_stats(self, i: int) -> dict:
+        sim = self.sim
+        return {
+            "reward": float(self._ep_reward[i]),
+            "length": int(self._ep_len[i]),
+            "kills": int(sim.kills[i]),
+            "xp": int(sim.xp_gained[i]),
+            "loot": int(sim.loot_copper[i]),
+            "damage_dealt": int(sim.damage_dealt[i]),
+            "death": 1 if sim.hp[i] <= 0 else 0,
+            "idle_ratio": float(self._idle[i] / max(1, self._ep_len[i])),
+            "levels_gained": int(sim.levels_gained[i]),
+            "final_level": int(sim.level[i]),
+        }
@@ -11,11 +11,16 @@ Currently only Priest has spell implementations.
 Tick-based: 1 tick = 0.5 seconds (matches WoWEnv decision interval).
 """
 
+import copy
+import dataclasses
 import math
 import os
 import random
+from collections import OrderedDict
 from typing import Optional, TYPE_CHECKING
 
+import numpy as np
+
 if TYPE_CHECKING:
     from sim.terrain import SimTerrain
     from sim.creature_db import CreatureDB
@@ -35,17 +40,6 @@ from sim.constants import (
     CLASS_PRIEST, CLASS_WARRIOR, CLASS_PALADIN, CLASS_HUNTER, CLASS_ROGUE,
     CLASS_DEATH_KNIGHT, CLASS_SHAMAN, CLASS_MAGE, CLASS_WARLOCK, CLASS_DRUID,
     CLASS_NAMES, CLASS_POWER_TYPE, POWER_MANA,
-    ITEM_MOD_MANA, ITEM_MOD_HEALTH, ITEM_MOD_AGILITY, ITEM_MOD_STRENGTH,
-    ITEM_MOD_INTELLECT, ITEM_MOD_SPIRIT, ITEM_MOD_STAMINA,
-    ITEM_MOD_DEFENSE_SKILL_RATING, ITEM_MOD_DODGE_RATING, ITEM_MOD_PARRY_RATING,
-    ITEM_MOD_BLOCK_RATING, ITEM_MOD_HIT_MELEE_RATING, ITEM_MOD_HIT_RANGED_RATING,
-    ITEM_MOD_HIT_SPELL_RATING, ITEM_MOD_CRIT_MELEE_RATING, ITEM_MOD_CRIT_RANGED_RATING,
-    ITEM_MOD_CRIT_SPELL_RATING, ITEM_MOD_HASTE_MELEE_RATING, ITEM_MOD_HASTE_RANGED_RATING,
-    ITEM_MOD_HASTE_SPELL_RATING, ITEM_MOD_HIT_RATING, ITEM_MOD_CRIT_RATING,
-    ITEM_MOD_RESILIENCE_RATING, ITEM_MOD_HASTE_RATING, ITEM_MOD_EXPERTISE_RATING,
-    ITEM_MOD_ATTACK_POWER, ITEM_MOD_RANGED_ATTACK_POWER, ITEM_MOD_SPELL_HEALING_DONE,
-    ITEM_MOD_SPELL_DAMAGE_DONE, ITEM_MOD_MANA_REGENERATION, ITEM_MOD_ARMOR_PENETRATION_RATING,
-    ITEM_MOD_SPELL_POWER, ITEM_MOD_HEALTH_REGEN, ITEM_MOD_BLOCK_VALUE,
     class_aware_score, CLASS_STAT_WEIGHTS,
     EQUIPMENT_SLOT_HEAD, EQUIPMENT_SLOT_NECK, EQUIPMENT_SLOT_SHOULDERS,
     EQUIPMENT_SLOT_BODY, EQUIPMENT_SLOT_CHEST, EQUIPMENT_SLOT_WAIST,
@@ -62,13 +56,12 @@ from sim.constants import (
     SP_COEFF_HOLY_FIRE, SP_COEFF_HOLY_FIRE_DOT_TICK,
     SP_COEFF_MIND_FLAY_TICK, SP_COEFF_VAMPIRIC_TOUCH_TICK,
     SPELL_LEVEL_REQ, SPELL_MANA_PCT,
-    get_best_rank, FAMILY_SMITE, FAMILY_HEAL, FAMILY_FLASH_HEAL,
+    BEST_RANK_BY_LEVEL, FAMILY_SMITE, FAMILY_HEAL, FAMILY_FLASH_HEAL,
     FAMILY_SW_PAIN, FAMILY_PW_SHIELD, FAMILY_MIND_BLAST,
     FAMILY_RENEW, FAMILY_HOLY_FIRE, FAMILY_INNER_FIRE, FAMILY_FORTITUDE,
     FAMILY_DEVOURING_PLAGUE, FAMILY_PSYCHIC_SCREAM, FAMILY_SHADOW_PROTECTION,
     FAMILY_DIVINE_SPIRIT, FAMILY_FEAR_WARD, FAMILY_HOLY_NOVA, FAMILY_DISPEL_MAGIC,
     FAMILY_MIND_FLAY, FAMILY_VAMPIRIC_TOUCH, FAMILY_DISPERSION,
-    SP_COEFF_HOLY_NOVA_HEAL,
     ALL_RANKED_SPELL_IDS,
 )
 
@@ -80,8 +73,7 @@ from sim.formulas import (
     renew_total_heal, holy_fire_damage, holy_fire_dot_total,
     sw_pain_total, pw_shield_absorb, inner_fire_values,
     fortitude_hp_bonus, fortitude_stamina_bonus,
-    spell_direct_value, spell_dot_per_tick, spell_hot_per_tick,
-    spell_shield_absorb, spell_buff_value,
+    spell_dot_per_tick,
     spell_crit_chance, melee_crit_chance, ranged_crit_chance,
     melee_haste_pct, ranged_haste_pct, spell_haste_pct,
     dodge_chance, parry_chance, block_chance,
@@ -100,10 +92,57 @@ from sim.models import (
     EquippedItem, EquippedBag, SpellDef, SPELLS,
     MobTemplate,
     InventoryItem, VendorNPC, QuestNPC, VENDOR_DATA,
-    INVENTORY_SLOTS, Player, Mob,
+    INVENTORY_SLOTS, Player, Mob, MobTable, SimSnapshot,
+    GEAR_STAT_FIELDS, item_stat_row,
 )
 
-from sim.talent_data import get_talent_for_level, TALENT_DEFS
+from sim.talent_data import get_talent_for_level, TALENT_DEFS, TalentMods
+
+from sim.spell_effects import SPELL_PROGRAMS, WEAKENED_SOUL_TICKS
+
+
+# AzerothCore CSV exports loaded when no creature/loot DB is passed in
+DATA_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', 'data'))
+
+
+# Player fields holding containers. Items inside them are replaced, never
+# mutated in place, so copying the containers copies the player state.
+_PLAYER_CONTAINERS = tuple(f.name for f in dataclasses.fields(Player)
+                           if f.default_factory is not dataclasses.MISSING)
+
+
+# recalculate_stats() inputs that changed. Buff-only changes skip the
+# rating-derived stats (crit, haste, hit, avoidance, ...), which depend only
+# on gear, level and talents.
+STATS_DIRTY_GEAR = 1
+STATS_DIRTY_LEVEL = 2
+STATS_DIRTY_BUFFS = 4
+STATS_DIRTY_TALENTS = 8
+STATS_DIRTY_ALL = 15
+
+
+def _copy_player(p: Player) -> Player:
+    """Copy of ``p`` with its own containers (items are shared)."""
+    q = copy.copy(p)
+    for name in _PLAYER_CONTAINERS:
+        setattr(q, name, copy.copy(getattr(p, name)))
+    return q
+
+
+def _cast_action(family: int, doc: str, talent: str = None):
+    """A do_cast_* method: start casting the best known rank of ``family``."""
+    ranks = BEST_RANK_BY_LEVEL[family]
+    top = len(ranks) - 1
+
+    def do_cast(self) -> bool:
+        if talent is not None and self._get_talent_points(talent) < 1:
+            return False
+        sid = ranks[min(self.player.level, top)]
+        return self._start_cast(sid) if sid else False
+
+    do_cast.__doc__ = doc
+    return do_cast
 
 
 # ─── Combat Simulation ───────────────────────────────────────────────
@@ -138,6 +177,7 @@ class CombatSimulation:
     # Chunk management (for creature_db mode)
     CHUNK_SIZE = 100.0        # world-units per chunk (must match creature_db.CHUNK_SIZE)
     CHUNK_RADIUS = 2          # activate 5×5 = 25 chunks around player
+    CHUNK_CACHE_SIZE = 50     # deactivated chunks kept with mob state (LRU, 2 windows)
 
     QUEST_NPC_RANGE = 6.0     # max interaction range for quest NPCs
 
@@ -152,10 +192,7 @@ class CombatSimulation:
         self.terrain = terrain
         self.env3d = env3d        # WoW3DEnvironment for area/zone lookups
         # Auto-discover data/ directory for DB fallback loading
-        _data_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            '..', 'data')
-        _data_dir = os.path.normpath(_data_dir)
+        _data_dir = DATA_DIR
         # Auto-load creature_db from data/ directory if not provided
         if creature_db is None:
             from sim.creature_db import CreatureDB
@@ -176,6 +213,7 @@ class CombatSimulation:
         if self.terrain:
             self.player.z = self.terrain.get_height(self.player.x, self.player.y)
         self.mobs: list[Mob] = []
+        self.mob_table = MobTable()  # SoA state behind every Mob in self.mobs
         self.vendors: list[VendorNPC] = []
         self.quest_npcs: list[QuestNPC] = []
         self.target: Optional[Mob] = None
@@ -195,10 +233,21 @@ class CombatSimulation:
         self._active_chunks: set[tuple] = set()
         self._chunk_mobs: dict[tuple, list[Mob]] = {}
         self._chunk_vendors: dict[tuple, list[VendorNPC]] = {}
+        # LRU of deactivated chunks: key -> (mobs, vendors, tick deactivated).
+        # Their mobs are parked in _mob_cache so HP/respawn state survives.
+        self._chunk_cache: OrderedDict[tuple, tuple] = OrderedDict()
+        self._mob_cache = MobTable()
+        # (entry, level) -> MobTemplate; read-only, shared across mobs and resets
+        self._mob_templates: dict[tuple[int, int], MobTemplate] = {}
         # Quest state
         self.active_quests: dict = {}     # quest_id -> QuestProgress
         self.completed_quests: set = set()
         self.quests_completed: int = 0    # total quests completed this episode
+        self._reset_template: Optional[SimSnapshot] = None   # start world, see reset()
+        self._reset_plan: list[tuple] = []
+        # Per-tick player state summed over the last fast_forward() call
+        self.ff_idle_ticks: int = 0       # ticks ending neither casting nor eating
+        self.ff_eat_missing: float = 0.0  # sum of missing HP%+mana% on eating ticks
         self._spawn_vendors()
         self._spawn_quest_npcs()
         self._update_chunks()
@@ -405,7 +454,25 @@ class CombatSimulation:
         return best
 
     def reset(self) -> None:
-        """Reset player and mobs to initial state."""
+        """Reset player and mobs to initial state.
+
+        The first call builds the start world and keeps a snapshot of it;
+        later calls restore that snapshot and only re-roll mob levels,
+        drawing from self.rng in the same order a full rebuild would.
+        """
+        if self._reset_template is None:
+            self._build_start_world()
+            self._reset_template = self.snapshot()
+            self._reset_plan = self._reroll_plan() if self.creature_db else []
+        else:
+            rng_state = self.rng.getstate()
+            self.restore(self._reset_template)
+            self.rng.setstate(rng_state)
+            self._reroll_mob_levels()
+        self._update_exploration()
+
+    def _build_start_world(self) -> None:
+        """Fresh player, NPCs and chunk window at the spawn point."""
         self.player = Player(class_id=self.class_id)
         if self.terrain:
             self.player.z = self.terrain.get_height(self.player.x, self.player.y)
@@ -421,15 +488,15 @@ class CombatSimulation:
         self._new_areas = 0
         self._new_zones = 0
         self._new_maps = 0
-        # Clear terrain height cache to bound memory across episodes
-        if self.terrain:
-            self.terrain.clear_height_cache()
         # Reset chunk state
         self._player_chunk = None
         self._active_chunks.clear()
         self._chunk_mobs.clear()
         self._chunk_vendors.clear()
+        self._chunk_cache.clear()
+        self._mob_cache = MobTable()
         self.mobs.clear()
+        self.mob_table = MobTable()
         self._spawn_vendors()
         self._spawn_quest_npcs()
         # Reset quest state
@@ -437,130 +504,159 @@ class CombatSimulation:
         self.completed_quests.clear()
         self.quests_completed = 0
         self._update_chunks()
-        self._update_exploration()
         self.recalculate_stats()
 
+    def _reroll_plan(self) -> list[tuple]:
+        """(db template, min level, max level, level) per start-world mob."""
+        templates = self.creature_db.templates
+        plan = []
+        for mob in self.mobs:
+            tmpl = templates[mob.template.entry]
+            plan.append((tmpl, tmpl.min_level, tmpl.max_level, mob.level))
+        return plan
+
+    def _reroll_mob_levels(self) -> None:
+        """Roll a fresh level for every start-world mob, in spawn order."""
+        if not self._reset_plan:
+            return
+        randint = self.rng.randint
+        levels = [randint(lo, hi) for _, lo, hi, _ in self._reset_plan]
+        t = self.mob_table
+        mobs = self.mobs
+        for i, (tmpl, _, _, start) in enumerate(self._reset_plan):
+            level = levels[i]
+            if level != start:
+                mob = mobs[i]
+                mob.template = mob_template = self._mob_template(tmpl, level)
+                slot = mob._slot
+                t.level[slot] = level
+                t.hp[slot] = t.max_hp[slot] = mob_template.base_hp
+
+    # ─── Snapshot / Restore ─────────────────────────────────────────
+
+    def snapshot(self) -> SimSnapshot:
+        """Picklable copy of the episode state: player, mobs, RNG, chunks, quests.
+
+        Databases, terrain and templates are not included; restore() into
+        any simulation built with the same data.
+        """
+        return SimSnapshot(
+            player=_copy_player(self.player),
+            mobs=self.mob_table.state(),
+            parked=self._mob_cache.state(),
+            mob_order=[m.uid for m in self.mobs],
+            target_uid=self.target.uid if self.target is not None else None,
+            rng_state=self.rng.getstate(),
+            map_id=self.map_id,
+            tick_count=self.tick_count,
+            damage_dealt=self.damage_dealt,
+            kills=self.kills,
+            next_uid=self._next_uid,
+            visited=(set(self.visited_areas), set(self.visited_zones),
+                     set(self.visited_maps)),
+            new_counts=(self._new_areas, self._new_zones, self._new_maps),
+            vendors=list(self.vendors),
+            quest_npcs=list(self.quest_npcs),
+            player_chunk=self._player_chunk,
+            active_chunks=frozenset(self._active_chunks),
+            chunk_mobs={key: [m.uid for m in mobs]
+                        for key, mobs in self._chunk_mobs.items()},
+            chunk_vendors={key: list(v) for key, v in self._chunk_vendors.items()},
+            chunk_cache=[(key, [m.uid for m in mobs], list(vendors), tick)
+                         for key, (mobs, vendors, tick) in self._chunk_cache.items()],
+            active_quests={qid: dataclasses.replace(prog, counts=list(prog.counts))
+                           for qid, prog in self.active_quests.items()},
+            completed_quests=frozenset(self.completed_quests),
+            quests_completed=self.quests_completed,
+        )
+
+    def restore(self, snap: SimSnapshot) -> None:
+        """Rehydrate a snapshot() in place (the snapshot stays reusable).
+
+        Mob handles are rebuilt, so Mob objects held from before the call
+        no longer belong to the simulation; look them up again by uid.
+        """
+        self.player = _copy_player(snap.player)
+        self.mob_table = MobTable.from_state(snap.mobs)
+        self._mob_cache = MobTable.from_state(snap.parked)
+        by_uid = {m.uid: m for m in self.mob_table.mobs + self._mob_cache.mobs
+                  if m is not None}
+        self.mobs[:] = [by_uid[uid] for uid in snap.mob_order]
+        self.target = by_uid.get(snap.target_uid)
+        self.rng.setstate(snap.rng_state)
+        self.map_id = snap.map_id
+        self.tick_count = snap.tick_count
+        self.damage_dealt = snap.damage_dealt
+        self.kills = snap.kills
+        self._next_uid = snap.next_uid
+        self.visited_areas = set(snap.visited[0])
+        self.visited_zones = set(snap.visited[1])
+        self.visited_maps = set(snap.visited[2])
+        self._new_areas, self._new_zones, self._new_maps = snap.new_counts
+        self.vendors[:] = snap.vendors
+        self.quest_npcs[:] = snap.quest_npcs
+        self._player_chunk = snap.player_chunk
+        self._active_chunks = set(snap.active_chunks)
+        self._chunk_mobs = {key: [by_uid[uid] for uid in uids]
+                            for key, uids in snap.chunk_mobs.items()}
+        self._chunk_vendors = {key: list(v) for key, v in snap.chunk_vendors.items()}
+        self._chunk_cache = OrderedDict(
+            (key, ([by_uid[uid] for uid in uids], list(vendors), tick))
+            for key, uids, vendors, tick in snap.chunk_cache)
+        self.active_quests = {qid: dataclasses.replace(prog, counts=list(prog.counts))
+                              for qid, prog in snap.active_quests.items()}
+        self.completed_quests = set(snap.completed_quests)
+        self.quests_completed = snap.quests_completed
+
     # ─── Equipment & Stat System ────────────────────────────────────
 
     def recalculate_gear_stats(self):
-        """Sum all stats from equipped items into player gear_* fields."""
+        """Sync the player gear_* fields with the equipped items.
+
+        Each slot's item is cached with its stat row (item_stat_row); only
+        slots whose item changed since the last call are subtracted/added,
+        and only the gear fields they touch are written. Items are
+        replaced on change, never mutated in place, so identity is the
+        change test.
+        """
         p = self.player
-        # Reset all gear stats
-        p.gear_strength = 0
-        p.gear_agility = 0
-        p.gear_stamina = 0
-        p.gear_intellect = 0
-        p.gear_spirit = 0
-        p.gear_armor = 0
-        p.gear_bonus_hp = 0
-        p.gear_bonus_mana = 0
-        p.gear_attack_power = 0
-        p.gear_ranged_ap = 0
-        p.gear_spell_power = 0
-        p.gear_hit_rating = 0
-        p.gear_crit_rating = 0
-        p.gear_haste_rating = 0
-        p.gear_expertise_rating = 0
-        p.gear_armor_pen_rating = 0
-        p.gear_spell_pen = 0
-        p.gear_defense_rating = 0
-        p.gear_dodge_rating = 0
-        p.gear_parry_rating = 0
-        p.gear_block_rating = 0
-        p.gear_block_value = 0
-        p.gear_resilience_rating = 0
-        p.gear_mp5 = 0
-        p.gear_hp5 = 0
-
-        for item in p.equipment.values():
-            p.gear_armor += item.armor
-            for st, sv in item.stats.items():
-                if st == ITEM_MOD_STRENGTH:
-                    p.gear_strength += sv
-                elif st == ITEM_MOD_AGILITY:
-                    p.gear_agility += sv
-                elif st == ITEM_MOD_STAMINA:
-                    p.gear_stamina += sv
-                elif st == ITEM_MOD_INTELLECT:
-                    p.gear_intellect += sv
-                elif st == ITEM_MOD_SPIRIT:
-                    p.gear_spirit += sv
-                elif st == ITEM_MOD_HEALTH:
-                    p.gear_bonus_hp += sv
-                elif st == ITEM_MOD_MANA:
-                    p.gear_bonus_mana += sv
-                # Offensive
-                elif st == ITEM_MOD_ATTACK_POWER:
-                    p.gear_attack_power += sv
-                elif st == ITEM_MOD_RANGED_ATTACK_POWER:
-                    p.gear_ranged_ap += sv
-                elif st == ITEM_MOD_SPELL_POWER:
-                    p.gear_spell_power += sv
-                elif st == ITEM_MOD_SPELL_DAMAGE_DONE:
-                    p.gear_spell_power += sv
-                elif st == ITEM_MOD_SPELL_HEALING_DONE:
-                    p.gear_spell_power += sv
-                # Hit (combined and per-type)
-                elif st == ITEM_MOD_HIT_RATING:
-                    p.gear_hit_rating += sv
-                elif st == ITEM_MOD_HIT_MELEE_RATING:
-                    p.gear_hit_rating += sv
-                elif st == ITEM_MOD_HIT_RANGED_RATING:
-                    p.gear_hit_rating += sv
-                elif st == ITEM_MOD_HIT_SPELL_RATING:
-                    p.gear_hit_rating += sv
-                # Crit (combined and per-type)
-                elif st == ITEM_MOD_CRIT_RATING:
-                    p.gear_crit_rating += sv
-                elif st == ITEM_MOD_CRIT_MELEE_RATING:
-                    p.gear_crit_rating += sv
-                elif st == ITEM_MOD_CRIT_RANGED_RATING:
-                    p.gear_crit_rating += sv
-                elif st == ITEM_MOD_CRIT_SPELL_RATING:
-                    p.gear_crit_rating += sv
-                # Haste (combined and per-type)
-                elif st == ITEM_MOD_HASTE_RATING:
-                    p.gear_haste_rating += sv
-                elif st == ITEM_MOD_HASTE_MELEE_RATING:
-                    p.gear_haste_rating += sv
-                elif st == ITEM_MOD_HASTE_RANGED_RATING:
-                    p.gear_haste_rating += sv
-                elif st == ITEM_MOD_HASTE_SPELL_RATING:
-                    p.gear_haste_rating += sv
-                # Defensive ratings
-                elif st == ITEM_MOD_DEFENSE_SKILL_RATING:
-                    p.gear_defense_rating += sv
-                elif st == ITEM_MOD_DODGE_RATING:
-                    p.gear_dodge_rating += sv
-                elif st == ITEM_MOD_PARRY_RATING:
-                    p.gear_parry_rating += sv
-                elif st == ITEM_MOD_BLOCK_RATING:
-                    p.gear_block_rating += sv
-                elif st == ITEM_MOD_BLOCK_VALUE:
-                    p.gear_block_value += sv
-                elif st == ITEM_MOD_RESILIENCE_RATING:
-                    p.gear_resilience_rating += sv
-                # Other
-                elif st == ITEM_MOD_EXPERTISE_RATING:
-                    p.gear_expertise_rating += sv
-                elif st == ITEM_MOD_ARMOR_PENETRATION_RATING:
-                    p.gear_armor_pen_rating += sv
-                elif st == ITEM_MOD_SPELL_PENETRATION:
-                    p.gear_spell_pen += sv
-                elif st == ITEM_MOD_MANA_REGENERATION:
-                    p.gear_mp5 += sv
-                elif st == ITEM_MOD_HEALTH_REGEN:
-                    p.gear_hp5 += sv
-
-    def recalculate_stats(self):
+        rows = p.gear_rows
+        equipment = p.equipment
+        totals = p.gear_totals
+        touched = set()
+        for slot in [s for s in rows if s not in equipment]:
+            for i, v in rows.pop(slot)[1]:
+                totals[i] -= v
+                touched.add(i)
+        for slot, item in equipment.items():
+            cached = rows.get(slot)
+            if cached is not None:
+                if cached[0] is item:
+                    continue
+                for i, v in cached[1]:
+                    totals[i] -= v
+                    touched.add(i)
+            row = item_stat_row(item.stats, item.armor)
+            for i, v in row:
+                totals[i] += v
+                touched.add(i)
+            rows[slot] = (item, row)
+        for i in touched:
+            setattr(p, GEAR_STAT_FIELDS[i], totals[i])
+
+    def recalculate_stats(self, dirty: int = STATS_DIRTY_ALL):
         """Recalculate all derived stats from gear + level + buffs.
 
         Call after equip, level-up, or buff change. Uses exact WotLK formulas
         from AzerothCore C++ source (StatSystem.cpp, Player.cpp).
+        ``dirty`` is a STATS_DIRTY_* mask of the inputs that changed; the
+        default recomputes everything.
         """
         p = self.player
         cls = p.class_id
-        self.recalculate_gear_stats()
+        mods = p.talent_mods
+        if dirty & STATS_DIRTY_GEAR:
+            self.recalculate_gear_stats()
 
         # ─── Primary stat totals (base + gear + buffs + talents) ──────
         p.total_strength = class_base_stat(cls, 0, p.level) + p.gear_strength
@@ -568,23 +664,18 @@ class CombatSimulation:
         # PW:Fortitude adds Stamina (DBC: AuraName=29 MOD_STAT, MiscValue=2)
         fort_sta = p.fortitude_stamina_bonus if p.fortitude_remaining > 0 else 0
         # Improved PW:Fortitude: +15/30% Stamina bonus from Fortitude
-        imp_fort_pts = self._get_talent_points("improved_pw_fortitude")
-        if imp_fort_pts > 0 and fort_sta > 0:
-            fort_sta = int(fort_sta * (1.0 + 0.15 * imp_fort_pts))
+        if fort_sta > 0:
+            fort_sta = int(fort_sta * mods.fortitude_mult)
         p.total_stamina = class_base_stat(cls, 2, p.level) + p.gear_stamina + fort_sta
         p.total_intellect = class_base_stat(cls, 3, p.level) + p.gear_intellect
         # Divine Spirit adds Spirit bonus
         ds_spi = p.divine_spirit_bonus if p.divine_spirit_remaining > 0 else 0
         base_spirit = class_base_stat(cls, 4, p.level) + p.gear_spirit + ds_spi
         # Improved Spirit Tap: +5/10% total Spirit (passive)
-        imp_st_pts = self._get_talent_points("improved_spirit_tap")
-        if imp_st_pts > 0:
-            base_spirit = int(base_spirit * (1.0 + 0.05 * imp_st_pts))
+        base_spirit = int(base_spirit * mods.spirit_mult)
         # Spirit Tap proc: +100% Spirit for 15s after kill (at 3/3)
         if p.spirit_tap_remaining > 0:
-            st_pts = self._get_talent_points("spirit_tap")
-            # 3/3 = 100% bonus Spirit
-            base_spirit = int(base_spirit * (1.0 + (st_pts / 3.0)))
+            base_spirit = int(base_spirit * mods.spirit_tap_mult)
         p.total_spirit = base_spirit
 
         # ─── Max HP (preserve ratio) ────────────────────────────────
@@ -606,9 +697,7 @@ class CombatSimulation:
         if p.inner_fire_remaining > 0:
             if_armor = p.inner_fire_armor
             # Improved Inner Fire: +15/30/45% armor from Inner Fire
-            iif_pts = self._get_talent_points("improved_inner_fire")
-            if iif_pts > 0:
-                if_armor = int(if_armor * (1.0 + 0.15 * iif_pts))
+            if_armor = int(if_armor * mods.inner_fire_mult)
             p.total_armor += if_armor
 
         # ─── Attack Power (melee + ranged) ───────────────────────────
@@ -621,9 +710,12 @@ class CombatSimulation:
         inner_fire_sp = p.inner_fire_spellpower if p.inner_fire_remaining > 0 else 0
         p.total_spell_power = p.gear_spell_power + inner_fire_sp
         # Twisted Faith: +4/8/12/16/20% of Spirit as Spell Power
-        tf_pts = self._get_talent_points("twisted_faith")
-        if tf_pts > 0:
-            p.total_spell_power += int(p.total_spirit * 0.04 * tf_pts)
+        if mods.spirit_to_sp > 0:
+            p.total_spell_power += int(p.total_spirit * mods.spirit_to_sp)
+
+        if dirty == STATS_DIRTY_BUFFS:
+            # Buffs only touch primaries, pools, armor and spell power
+            return
 
         # ─── Crit (melee, ranged, spell + Mind Melt for MB/MF) ────────
         p.total_melee_crit = melee_crit_chance(
@@ -644,9 +736,7 @@ class CombatSimulation:
         p.total_hit_ranged = hit_chance_ranged(p.level, p.gear_hit_rating)
         p.total_hit_spell = hit_chance_spell(p.level, p.gear_hit_rating)
         # Shadow Focus: +1/2/3% Shadow spell hit chance
-        sf_pts = self._get_talent_points("shadow_focus")
-        if sf_pts > 0:
-            p.total_hit_spell += sf_pts
+        p.total_hit_spell += mods.shadow_hit
 
         # ─── Dodge (with diminishing returns) ────────────────────────
         p.total_dodge = dodge_chance(
@@ -780,7 +870,7 @@ class CombatSimulation:
         # Equip new item
         p.equipment[slot] = self._make_equipped_item(item_data)
         p.equipped_scores[slot] = item_data.score
-        self.recalculate_stats()
+        self.recalculate_stats(STATS_DIRTY_GEAR)
         return (True, old_item)
 
     def unequip_item(self, slot: int) -> 'EquippedItem | None':
@@ -809,7 +899,7 @@ class CombatSimulation:
             p.free_slots -= 1
             p.inventory.append(self._equipped_to_inventory_item(item))
 
-        self.recalculate_stats()
+        self.recalculate_stats(STATS_DIRTY_GEAR)
         return item
 
     def try_equip_item(self, item_data) -> bool:
@@ -993,22 +1083,31 @@ class CombatSimulation:
 
     # ─── Chunk Management (creature_db mode) ───────────────────────
 
+    def _chunk_key(self) -> tuple:
+        """(map_id, cx, cy) of the chunk the player stands in."""
+        p = self.player
+        cs = self.CHUNK_SIZE
+        cx = int(p.x // cs) if p.x >= 0 else int(p.x // cs) - 1
+        cy = int(p.y // cs) if p.y >= 0 else int(p.y // cs) - 1
+        return (self.map_id, cx, cy)
+
     def _update_chunks(self):
         """Activate/deactivate chunks based on player position.
 
         Checks if the player moved to a new chunk and updates the active
         chunk set accordingly. Requires creature_db to be loaded.
-        """
 
-        p = self.player
-        cs = self.CHUNK_SIZE
-        cx = int(p.x // cs) if p.x >= 0 else int(p.x // cs) - 1
-        cy = int(p.y // cs) if p.y >= 0 else int(p.y // cs) - 1
-        current_chunk = (self.map_id, cx, cy)
+        Deactivated chunks go to an LRU cache (CHUNK_CACHE_SIZE) with their
+        mobs parked in _mob_cache, so re-entering a chunk restores it
+        instead of re-spawning it, and dead mobs keep counting down their
+        respawn timers. self.mobs / self.vendors are patched by delta.
+        """
 
+        current_chunk = self._chunk_key()
         if current_chunk == self._player_chunk:
             return  # player hasn't moved to a new chunk
         self._player_chunk = current_chunk
+        _, cx, cy = current_chunk
 
         # Determine which chunks should be active
         r = self.CHUNK_RADIUS
@@ -1017,28 +1116,80 @@ class CombatSimulation:
             for dy in range(-r, r + 1):
                 needed.add((self.map_id, cx + dx, cy + dy))
 
-        # Deactivate old chunks
-        for key in self._active_chunks - needed:
-            for mob in self._chunk_mobs.pop(key, []):
-                if self.target is mob:
-                    self.target = None
-            self._chunk_vendors.pop(key, None)
+        # Deactivate old chunks -> LRU cache (frees their table slots first)
+        leaving = self._active_chunks - needed
+        if leaving:
+            gone_mobs: set[int] = set()
+            gone_vendors: set[int] = set()
+            for key in sorted(leaving):
+                mobs = self._chunk_mobs.pop(key, [])
+                vendors = self._chunk_vendors.pop(key, [])
+                for mob in mobs:
+                    if self.target is mob:
+                        self.target = None
+                    if mob.in_combat:
+                        self._evade_mob(mob)
+                    gone_mobs.add(mob.uid)
+                gone_vendors.update(v.uid for v in vendors)
+                self.mob_table.transfer(mobs, self._mob_cache)
+                self._chunk_cache[key] = (mobs, vendors, self.tick_count)
+            self.mobs = [m for m in self.mobs if m.uid not in gone_mobs]
+            self.vendors = [v for v in self.vendors if v.uid not in gone_vendors]
+
+        # Activate new chunks (restore from cache when possible)
+        for key in sorted(needed - self._active_chunks):
+            cached = self._chunk_cache.pop(key, None)
+            if cached is None:
+                self._activate_chunk(key)
+            else:
+                self._restore_chunk(key, *cached)
+            self.mobs.extend(self._chunk_mobs[key])
+            self.vendors.extend(self._chunk_vendors[key])
 
-        # Activate new chunks
-        for key in needed - self._active_chunks:
-            self._activate_chunk(key)
+        # Evict least recently deactivated chunks last, so a round trip
+        # never drops the chunks being re-entered
+        while len(self._chunk_cache) > self.CHUNK_CACHE_SIZE:
+            _, (mobs, _, _) = self._chunk_cache.popitem(last=False)
+            self._mob_cache.transfer(mobs, MobTable(capacity=len(mobs) or 1))
 
         self._active_chunks = needed
 
-        # Rebuild mobs list from active chunks (mob objects persist)
-        self.mobs = []
-        for key in self._active_chunks:
-            self.mobs.extend(self._chunk_mobs.get(key, []))
-
-        # Rebuild vendors list from active chunks
-        self.vendors = []
-        for key in self._active_chunks:
-            self.vendors.extend(self._chunk_vendors.get(key, []))
+    def _restore_chunk(self, chunk_key: tuple, mobs: list[Mob],
+                       vendors: list[VendorNPC], left_tick: int):
+        """Bring a cached chunk back, catching up respawn timers."""
+        self._mob_cache.transfer(mobs, self.mob_table)
+        elapsed = self.tick_count - left_tick
+        if elapsed > 0:
+            for mob in mobs:
+                if not mob.alive and mob.respawn_timer > 0:
+                    mob.respawn_timer = max(0, mob.respawn_timer - elapsed)
+                    if mob.respawn_timer <= 0:
+                        self._respawn_mob(mob)
+        self._chunk_mobs[chunk_key] = mobs
+        self._chunk_vendors[chunk_key] = vendors
+
+    def _mob_template(self, tmpl, level: int) -> MobTemplate:
+        """Shared MobTemplate for a creature_db template at ``level``."""
+        key = (tmpl.entry, level)
+        mob_template = self._mob_templates.get(key)
+        if mob_template is None:
+            hp, min_dmg, max_dmg, xp = tmpl.stats(level)
+            mob_template = self._mob_templates[key] = MobTemplate(
+                entry=tmpl.entry,
+                name=tmpl.name,
+                min_level=tmpl.min_level,
+                max_level=tmpl.max_level,
+                base_hp=hp,
+                min_damage=min_dmg,
+                max_damage=max_dmg,
+                attack_speed=tmpl.attack_speed_ticks,
+                detect_range=tmpl.detection_range,
+                min_gold=tmpl.min_gold,
+                max_gold=tmpl.max_gold,
+                xp_reward=xp,
+                loot_id=tmpl.lootid,
+            )
+        return mob_template
 
     def _activate_chunk(self, chunk_key: tuple):
         """Spawn mobs for a newly activated chunk from creature_db."""
@@ -1052,32 +1203,17 @@ class CombatSimulation:
                 continue
 
             level = self.rng.randint(tmpl.min_level, tmpl.max_level)
-            stats = db.get_mob_stats(tmpl, level)
-
-            mob_template = MobTemplate(
-                entry=tmpl.entry,
-                name=tmpl.name,
-                min_level=tmpl.min_level,
-                max_level=tmpl.max_level,
-                base_hp=stats['hp'],
-                min_damage=stats['min_damage'],
-                max_damage=stats['max_damage'],
-                attack_speed=tmpl.attack_speed_ticks,
-                detect_range=tmpl.detection_range,
-                min_gold=tmpl.min_gold,
-                max_gold=tmpl.max_gold,
-                xp_reward=stats['xp'],
-                loot_id=tmpl.lootid,
-            )
+            mob_template = self._mob_template(tmpl, level)
 
             z = self.terrain.get_height(sp.x, sp.y) if self.terrain else sp.z
             mob = Mob(
                 uid=self._new_uid(),
                 template=mob_template,
-                hp=stats['hp'],
-                max_hp=stats['hp'],
+                hp=mob_template.base_hp,
+                max_hp=mob_template.base_hp,
                 level=level,
                 x=sp.x, y=sp.y, z=z,
+                table=self.mob_table,
                 spawn_x=sp.x, spawn_y=sp.y, spawn_z=z,
             )
             chunk_mobs.append(mob)
@@ -1136,7 +1272,7 @@ class CombatSimulation:
         new_y = p.y + math.sin(p.orientation) * self.MOVE_SPEED
 
         if self.terrain:
-            self.terrain.ensure_loaded(new_x, new_y)
+            self.terrain.ensure_loaded(new_x, new_y, p.orientation)
             new_z = self.terrain.get_height(new_x, new_y)
             if not self.terrain.check_walkable(p.x, p.y, p.z, new_x, new_y, new_z):
                 return  # blocked by terrain (AC IsWalkableClimb / slope)
@@ -1186,7 +1322,7 @@ class CombatSimulation:
         new_y = p.y + (dy / dist) * move
 
         if self.terrain:
-            self.terrain.ensure_loaded(new_x, new_y)
+            self.terrain.ensure_loaded(new_x, new_y, math.atan2(dy, dx))
             new_z = self.terrain.get_height(new_x, new_y)
             if not self.terrain.check_walkable(p.x, p.y, p.z, new_x, new_y, new_z):
                 return False
@@ -1202,122 +1338,55 @@ class CombatSimulation:
         """Target the nearest alive, attackable mob in range."""
         if self.player.is_casting:
             return
-        best = None
-        best_dist = self.TARGET_RANGE
-        for mob in self.mobs:
-            if not mob.alive:
-                continue
-            d = self._dist_to_mob(mob)
-            if d < best_dist:
-                best_dist = d
-                best = mob
-        self.target = best
-
-    def do_cast_smite(self) -> bool:
-        """Start casting Smite (best rank for level)."""
-        sid = get_best_rank(FAMILY_SMITE, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_heal(self) -> bool:
-        """Start casting heal (Lesser Heal → Heal → Greater Heal, best rank)."""
-        sid = get_best_rank(FAMILY_HEAL, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_flash_heal(self) -> bool:
-        """Start casting Flash Heal (best rank for level)."""
-        sid = get_best_rank(FAMILY_FLASH_HEAL, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_sw_pain(self) -> bool:
-        """Cast Shadow Word: Pain (best rank for level)."""
-        sid = get_best_rank(FAMILY_SW_PAIN, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_pw_shield(self) -> bool:
-        """Cast Power Word: Shield (best rank for level)."""
-        sid = get_best_rank(FAMILY_PW_SHIELD, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_mind_blast(self) -> bool:
-        """Start casting Mind Blast (best rank for level)."""
-        sid = get_best_rank(FAMILY_MIND_BLAST, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_renew(self) -> bool:
-        """Cast Renew (best rank for level)."""
-        sid = get_best_rank(FAMILY_RENEW, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_holy_fire(self) -> bool:
-        """Start casting Holy Fire (best rank for level)."""
-        sid = get_best_rank(FAMILY_HOLY_FIRE, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_inner_fire(self) -> bool:
-        """Cast Inner Fire (best rank for level)."""
-        sid = get_best_rank(FAMILY_INNER_FIRE, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_fortitude(self) -> bool:
-        """Cast Power Word: Fortitude (best rank for level)."""
-        sid = get_best_rank(FAMILY_FORTITUDE, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_devouring_plague(self) -> bool:
-        """Cast Devouring Plague (best rank for level)."""
-        sid = get_best_rank(FAMILY_DEVOURING_PLAGUE, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_psychic_scream(self) -> bool:
-        """Cast Psychic Scream (best rank for level)."""
-        sid = get_best_rank(FAMILY_PSYCHIC_SCREAM, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_shadow_protection(self) -> bool:
-        """Cast Shadow Protection (best rank for level)."""
-        sid = get_best_rank(FAMILY_SHADOW_PROTECTION, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_divine_spirit(self) -> bool:
-        """Cast Divine Spirit (best rank for level)."""
-        sid = get_best_rank(FAMILY_DIVINE_SPIRIT, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_fear_ward(self) -> bool:
-        """Cast Fear Ward (best rank for level)."""
-        sid = get_best_rank(FAMILY_FEAR_WARD, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_holy_nova(self) -> bool:
-        """Cast Holy Nova (best rank for level). PBAoE, no target needed."""
-        sid = get_best_rank(FAMILY_HOLY_NOVA, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_dispel_magic(self) -> bool:
-        """Cast Dispel Magic (best rank for level)."""
-        sid = get_best_rank(FAMILY_DISPEL_MAGIC, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_mind_flay(self) -> bool:
-        """Cast Mind Flay (channeled, talent-granted). Requires mind_flay talent."""
-        if self._get_talent_points("mind_flay") < 1:
-            return False
-        sid = get_best_rank(FAMILY_MIND_FLAY, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_vampiric_touch(self) -> bool:
-        """Cast Vampiric Touch (talent-granted DoT). Requires vampiric_touch talent."""
-        if self._get_talent_points("vampiric_touch") < 1:
-            return False
-        sid = get_best_rank(FAMILY_VAMPIRIC_TOUCH, self.player.level)
-        return self._start_cast(sid) if sid else False
-
-    def do_cast_dispersion(self) -> bool:
-        """Cast Dispersion (talent-granted defensive CD). Requires dispersion talent."""
-        if self._get_talent_points("dispersion") < 1:
-            return False
-        sid = get_best_rank(FAMILY_DISPERSION, self.player.level)
-        return self._start_cast(sid) if sid else False
+        t = self.mob_table
+        best = t.k_nearest(self.player.x, self.player.y, 1,
+                           max_dist=self.TARGET_RANGE, mask=t.alive)
+        self.target = t.mobs[best[0]] if len(best) else None
+
+    # Spell actions: cast the best known rank of a family
+    do_cast_smite = _cast_action(
+        FAMILY_SMITE, "Start casting Smite (best rank for level).")
+    do_cast_heal = _cast_action(
+        FAMILY_HEAL, "Start casting heal (Lesser Heal → Heal → Greater Heal, best rank).")
+    do_cast_flash_heal = _cast_action(
+        FAMILY_FLASH_HEAL, "Start casting Flash Heal (best rank for level).")
+    do_cast_sw_pain = _cast_action(
+        FAMILY_SW_PAIN, "Cast Shadow Word: Pain (best rank for level).")
+    do_cast_pw_shield = _cast_action(
+        FAMILY_PW_SHIELD, "Cast Power Word: Shield (best rank for level).")
+    do_cast_mind_blast = _cast_action(
+        FAMILY_MIND_BLAST, "Start casting Mind Blast (best rank for level).")
+    do_cast_renew = _cast_action(
+        FAMILY_RENEW, "Cast Renew (best rank for level).")
+    do_cast_holy_fire = _cast_action(
+        FAMILY_HOLY_FIRE, "Start casting Holy Fire (best rank for level).")
+    do_cast_inner_fire = _cast_action(
+        FAMILY_INNER_FIRE, "Cast Inner Fire (best rank for level).")
+    do_cast_fortitude = _cast_action(
+        FAMILY_FORTITUDE, "Cast Power Word: Fortitude (best rank for level).")
+    do_cast_devouring_plague = _cast_action(
+        FAMILY_DEVOURING_PLAGUE, "Cast Devouring Plague (best rank for level).")
+    do_cast_psychic_scream = _cast_action(
+        FAMILY_PSYCHIC_SCREAM, "Cast Psychic Scream (best rank for level).")
+    do_cast_shadow_protection = _cast_action(
+        FAMILY_SHADOW_PROTECTION, "Cast Shadow Protection (best rank for level).")
+    do_cast_divine_spirit = _cast_action(
+        FAMILY_DIVINE_SPIRIT, "Cast Divine Spirit (best rank for level).")
+    do_cast_fear_ward = _cast_action(
+        FAMILY_FEAR_WARD, "Cast Fear Ward (best rank for level).")
+    do_cast_holy_nova = _cast_action(
+        FAMILY_HOLY_NOVA, "Cast Holy Nova (best rank for level). PBAoE, no target needed.")
+    do_cast_dispel_magic = _cast_action(
+        FAMILY_DISPEL_MAGIC, "Cast Dispel Magic (best rank for level).")
+    do_cast_mind_flay = _cast_action(
+        FAMILY_MIND_FLAY, "Cast Mind Flay (channeled, talent-granted). "
+        "Requires mind_flay talent.", talent="mind_flay")
+    do_cast_vampiric_touch = _cast_action(
+        FAMILY_VAMPIRIC_TOUCH, "Cast Vampiric Touch (talent-granted DoT). "
+        "Requires vampiric_touch talent.", talent="vampiric_touch")
+    do_cast_dispersion = _cast_action(
+        FAMILY_DISPERSION, "Cast Dispersion (talent-granted defensive CD). "
+        "Requires dispersion talent.", talent="dispersion")
 
     def do_toggle_shadowform(self) -> bool:
         """Toggle Shadowform on/off. Requires shadowform talent."""
@@ -1331,7 +1400,7 @@ class CombatSimulation:
         else:
             p.shadowform_active = True
         p.gcd_remaining = 3  # GCD
-        self.recalculate_stats()
+        self.recalculate_stats(STATS_DIRTY_BUFFS)
         return True
 
     def do_eat_drink(self) -> bool:
@@ -1364,17 +1433,12 @@ class CombatSimulation:
         tracked in player.loot_failed (quality list) for penalty signals.
         Gold never requires inventory space.
         """
-        best = None
-        best_dist = self.LOOT_RANGE
-        for mob in self.mobs:
-            if mob.alive or mob.looted:
-                continue
-            d = self._dist_to_mob(mob)
-            if d < best_dist:
-                best_dist = d
-                best = mob
-        if best is None:
+        t = self.mob_table
+        corpse = t.k_nearest(self.player.x, self.player.y, 1,
+                             max_dist=self.LOOT_RANGE, mask=~t.alive & ~t.looted)
+        if not len(corpse):
             return False
+        best = t.mobs[corpse[0]]
         best.looted = True
 
         # Gold (always from creature_template min/max gold — separate from item loot)
@@ -1466,148 +1530,97 @@ class CombatSimulation:
         p.recalculate_free_slots()
         return True
 
-    # Offensive spell families (need alive target + range)
-    _OFFENSIVE_FAMILIES = {FAMILY_SMITE, FAMILY_SW_PAIN, FAMILY_MIND_BLAST, FAMILY_HOLY_FIRE,
-                           FAMILY_DEVOURING_PLAGUE, FAMILY_MIND_FLAY, FAMILY_VAMPIRIC_TOUCH}
-    # AoE families: no target needed, hits mobs in range
-    _AOE_FAMILIES = {FAMILY_HOLY_NOVA, FAMILY_PSYCHIC_SCREAM}
-
     def _start_cast(self, spell_id: int) -> bool:
         """Attempt to start casting a spell."""
-        if self.player.is_casting:
+        p = self.player
+        if p.is_casting:
             return False
-        if self.player.gcd_remaining > 0:
+        if p.gcd_remaining > 0:
             return False
 
-        spell = SPELLS.get(spell_id)
-        if spell is None:
+        prog = SPELL_PROGRAMS.get(spell_id)
+        if prog is None:
             return False
+        spell = prog.spell
 
         # Level gate: spell not yet learned
-        if self.player.level < spell.level_req:
+        if p.level < spell.level_req:
             return False
 
         # Mana cost: % of BaseMana (from Spell.dbc ManaCostPercentage)
-        mana_cost = spell_mana_cost(spell_id, self.player.level,
-                                    self.player.class_id)
-        if self.player.mana < mana_cost:
+        mana_cost = spell_mana_cost(spell_id, p.level, p.class_id)
+        if p.mana < mana_cost:
             return False
 
         # Spell-specific cooldown check (use family for shared CDs like Mind Blast)
         family = spell.spell_family
         if spell.cooldown_ticks > 0:
             # Check CD on family (all ranks share cooldown)
-            if self.player.spell_cooldowns.get(family, 0) > 0:
+            if p.spell_cooldowns.get(family, 0) > 0:
                 return False
 
         # Range check for offensive spells (with target requirement)
-        if family in self._OFFENSIVE_FAMILIES:
-            if self.target is None or not self.target.alive:
+        target = self.target
+        if prog.offensive:
+            if target is None or not target.alive:
                 return False
-            if self._dist_to_mob(self.target) > spell.spell_range:
+            if self._dist_to_mob(target) > spell.spell_range:
                 return False
             # LOS check
             if self.terrain:
-                if not self.terrain.check_los(
-                    self.player.x, self.player.y, self.player.z,
-                    self.target.x, self.target.y, self.target.z
-                ):
+                if not self.terrain.check_los(p.x, p.y, p.z,
+                                              target.x, target.y, target.z):
                     return False
 
-        # Shield: check if already shielded or Weakened Soul active
-        if family == FAMILY_PW_SHIELD and (self.player.shield_remaining > 0
-                                           or self.player.shield_cooldown > 0):
-            return False
-
-        # Renew: block if HoT already active
-        if family == FAMILY_RENEW and self.player.hot_remaining > 0:
-            return False
-
-        # Inner Fire: block if already active
-        if family == FAMILY_INNER_FIRE and self.player.inner_fire_remaining > 0:
-            return False
-
-        # Fortitude: block if already active
-        if family == FAMILY_FORTITUDE and self.player.fortitude_remaining > 0:
-            return False
-
-        # Shadow Protection: block if already active
-        if family == FAMILY_SHADOW_PROTECTION and self.player.shadow_prot_remaining > 0:
-            return False
-
-        # Divine Spirit: block if already active
-        if family == FAMILY_DIVINE_SPIRIT and self.player.divine_spirit_remaining > 0:
-            return False
-
-        # Fear Ward: block if already active
-        if family == FAMILY_FEAR_WARD and self.player.fear_ward_remaining > 0:
-            return False
-
-        # Devouring Plague: block if already active on target (one per target)
-        if family == FAMILY_DEVOURING_PLAGUE:
-            if self.target and self.target.dot3_remaining > 0:
-                return False
-
-        # Vampiric Touch: block if already active on target (slot 4)
-        if family == FAMILY_VAMPIRIC_TOUCH:
-            if self.target and self.target.dot4_remaining > 0:
-                return False
-
-        # Dispersion: block if already active
-        if family == FAMILY_DISPERSION:
-            if self.player.dispersion_remaining > 0:
-                return False
-
-        # Mind Flay: block if already channeling
-        if family == FAMILY_MIND_FLAY:
-            if self.player.channel_remaining > 0:
+        # Exclusive auras: already active (or Weakened Soul / channeling)
+        for attr in prog.player_blocks:
+            if getattr(p, attr) > 0:
                 return False
+        if target is not None:
+            for attr in prog.target_blocks:
+                if getattr(target, attr) > 0:
+                    return False
 
         # Spend mana (% of BaseMana)
         # Focused Mind: -5/10/15% mana cost of Mind Blast, Mind Flay, Mind Sear
-        actual_cost = mana_cost
-        if family in (FAMILY_MIND_BLAST, FAMILY_MIND_FLAY):
-            fm_pts = self._get_talent_points("focused_mind")
-            if fm_pts > 0:
-                actual_cost = int(actual_cost * (1.0 - 0.05 * fm_pts))
-        self.player.mana -= actual_cost
+        if prog.cost_talent:
+            mana_cost = int(mana_cost * p.talent_mods.mind_cost_mult)
+        p.mana -= mana_cost
 
         # GCD
-        self.player.gcd_remaining = spell.gcd_ticks
+        p.gcd_remaining = spell.gcd_ticks
 
         # Spell-specific cooldown (keyed by family so all ranks share)
         if spell.cooldown_ticks > 0:
             cd_ticks = spell.cooldown_ticks
             # Improved Mind Blast: -0.5s per rank = -1 tick per rank
-            if family == FAMILY_MIND_BLAST:
-                imb_pts = self._get_talent_points("improved_mind_blast")
-                if imb_pts > 0:
-                    cd_ticks = max(0, cd_ticks - imb_pts)
-            self.player.spell_cooldowns[family] = cd_ticks
+            if prog.cd_talent:
+                cd_ticks = max(0, cd_ticks - p.talent_mods.mind_blast_cd_cut)
+            p.spell_cooldowns[family] = cd_ticks
 
-        if family == FAMILY_MIND_FLAY:
+        if prog.channel:
             # Mind Flay: channeled spell — set up channel state
-            self.player.is_casting = True
-            self.player.cast_remaining = spell.dot_ticks  # channel duration = dot_dur_ticks
-            self.player.cast_spell_id = spell_id
-            self.player.channel_remaining = spell.dot_ticks
-            self.player.channel_spell_id = spell_id
-            self.player.channel_tick_timer = spell.dot_interval  # first tick after 1s
-            self.player.channel_target_uid = self.target.uid if self.target else 0
+            p.is_casting = True
+            p.cast_remaining = spell.dot_ticks  # channel duration = dot_dur_ticks
+            p.cast_spell_id = spell_id
+            p.channel_remaining = spell.dot_ticks
+            p.channel_spell_id = spell_id
+            p.channel_tick_timer = spell.dot_interval  # first tick after 1s
+            p.channel_target_uid = target.uid if target else 0
             # Apply initial hit check for Mind Flay
-            if self.target and self.target.alive:
-                outcome = self._resolve_offensive_spell(self.target.level)
+            if target and target.alive:
+                outcome = self._resolve_offensive_spell(target.level)
                 if outcome == SPELL_MISS:
                     # Cancel channel on miss
-                    self.player.is_casting = False
-                    self.player.cast_remaining = 0
-                    self.player.channel_remaining = 0
+                    p.is_casting = False
+                    p.cast_remaining = 0
+                    p.channel_remaining = 0
                     return True  # mana still spent
         elif spell.cast_ticks > 0:
             # Regular cast time spell
-            self.player.is_casting = True
-            self.player.cast_remaining = spell.cast_ticks
-            self.player.cast_spell_id = spell_id
+            p.is_casting = True
+            p.cast_remaining = spell.cast_ticks
+            p.cast_spell_id = spell_id
         else:
             # Instant cast — apply immediately
             self._apply_spell(spell_id)
@@ -1638,253 +1651,170 @@ class CombatSimulation:
     def _apply_spell(self, spell_id: int):
         """Apply spell effect when cast completes. Generic for any rank.
 
-        Uses spell_family to determine spell type, then applies effects
-        using the rank-specific SpellDef values + SP coefficients.
+        Walks the rank's compiled SpellProgram (see sim.spell_effects),
+        dispatching each step through _EFFECT_HANDLERS by opcode.
         """
-        spell = SPELLS[spell_id]
         sp = self.player.total_spell_power
-        family = spell.spell_family
+        outcome = SPELL_HIT
+        handlers = self._EFFECT_HANDLERS
+        for op, args in SPELL_PROGRAMS[spell_id].effects:
+            outcome = handlers[op](self, args, sp, outcome)
+            if outcome is None:
+                return
 
-        if family == FAMILY_SMITE:
-            # Direct Holy damage offensive spell
-            if self.target and self.target.alive:
-                outcome = self._resolve_offensive_spell(self.target.level)
-                if outcome == SPELL_MISS:
-                    return
-                min_dmg, max_dmg = spell_direct_value(spell_id, sp)
-                dmg = self.rng.randint(min_dmg, max_dmg)
-                if outcome == SPELL_CRIT:
-                    dmg = int(dmg * 1.5)
-                self._damage_mob(self.target, dmg)
-
-        elif family == FAMILY_HEAL or family == FAMILY_FLASH_HEAL:
-            # Direct heal (self-cast, no miss)
-            min_h, max_h = spell_direct_value(spell_id, sp)
-            heal = self.rng.randint(min_h, max_h)
-            if self.rng.random() * 100 < self.player.total_spell_crit:
-                heal = int(heal * 1.5)
-                self.player.spell_crits += 1
-            self.player.hp = min(self.player.max_hp, self.player.hp + heal)
+    # ─── Spell effect handlers ───
+    # (args, spell_power, outcome) -> outcome, or None to stop the program
 
-        elif family == FAMILY_SW_PAIN:
-            # Shadow DoT (miss check on application)
-            if self.target and self.target.alive:
-                outcome = self._resolve_offensive_spell(self.target.level)
-                if outcome == SPELL_MISS:
-                    return
-                dmg_per_tick = spell_dot_per_tick(spell_id, sp)
-                # Apply Shadow damage modifiers to per-tick value
-                mod = self._shadow_damage_mod(self.target)
-                iswp_pts = self._get_talent_points("improved_sw_pain")
-                if iswp_pts > 0:
-                    mod *= 1.0 + 0.03 * iswp_pts
-                dmg_per_tick = int(dmg_per_tick * mod)
-                self.target.dot_remaining = spell.dot_ticks
-                self.target.dot_timer = spell.dot_interval
-                self.target.dot_damage_per_tick = dmg_per_tick
-                # Misery: SW:Pain applies spell hit debuff
-                self._apply_misery(self.target)
-                self._apply_shadow_weaving(self.target)
-
-        elif family == FAMILY_PW_SHIELD:
-            # Absorb shield (no miss on friendly)
-            absorb = spell_shield_absorb(spell_id, sp)
-            self.player.shield_absorb = absorb
-            self.player.shield_remaining = spell.shield_duration
-            self.player.shield_cooldown = 30  # Weakened Soul: 15s = 30 ticks
-
-        elif family == FAMILY_MIND_BLAST:
-            # Shadow direct damage with cooldown
-            if self.target and self.target.alive:
-                outcome = self._resolve_offensive_spell(self.target.level)
-                if outcome == SPELL_MISS:
-                    return
-                min_dmg, max_dmg = spell_direct_value(spell_id, sp)
-                dmg = self.rng.randint(min_dmg, max_dmg)
-                # Mind Melt: +3/6% crit on Mind Blast
-                mm_pts = self._get_talent_points("mind_melt")
-                extra_crit = mm_pts * 3.0 if mm_pts > 0 else 0.0
-                if outcome == SPELL_CRIT or (outcome == SPELL_HIT and extra_crit > 0
-                        and self.rng.random() * 100 < extra_crit):
-                    # Shadow Power: +20/40/60/80/100% crit damage bonus
-                    sp_pts = self._get_talent_points("shadow_power")
-                    crit_mult = 1.5 + 0.1 * sp_pts
-                    dmg = int(dmg * crit_mult)
-                    if outcome != SPELL_CRIT:
-                        self.player.spell_crits += 1
-                self._damage_mob(self.target, dmg, is_shadow=True,
-                                 spell_family=FAMILY_MIND_BLAST)
-
-        elif family == FAMILY_RENEW:
-            # HoT (no miss on friendly)
-            heal_per = spell_hot_per_tick(spell_id, sp)
-            self.player.hot_remaining = spell.hot_ticks
-            self.player.hot_timer = spell.hot_interval
-            self.player.hot_heal_per_tick = heal_per
-
-        elif family == FAMILY_HOLY_FIRE:
-            # Direct damage + DoT (slot 2)
-            if self.target and self.target.alive:
-                outcome = self._resolve_offensive_spell(self.target.level)
-                if outcome == SPELL_MISS:
-                    return
-                min_dmg, max_dmg = spell_direct_value(spell_id, sp)
-                dmg = self.rng.randint(min_dmg, max_dmg)
-                if outcome == SPELL_CRIT:
-                    dmg = int(dmg * 1.5)
-                self._damage_mob(self.target, dmg)
-                # DoT component on slot 2
-                dot_per = spell_dot_per_tick(spell_id, sp)
-                self.target.dot2_remaining = spell.dot_ticks
-                self.target.dot2_timer = spell.dot_interval
-                self.target.dot2_damage_per_tick = dot_per
-
-        elif family == FAMILY_INNER_FIRE:
-            # Armor buff (rank determines armor amount)
-            armor = spell_buff_value(spell_id)
-            self.player.inner_fire_remaining = spell.buff_duration
-            self.player.inner_fire_armor = armor
-            self.player.inner_fire_spellpower = 0  # SP bonus starts at rank 7 (level 70+)
-            self.recalculate_stats()
-
-        elif family == FAMILY_FORTITUDE:
-            # Stamina buff (rank determines stamina amount)
-            sta_bonus = spell_buff_value(spell_id)
-            self.player.fortitude_remaining = spell.buff_duration
-            self.player.fortitude_stamina_bonus = sta_bonus
-            old_hp = self.player.hp
-            self.recalculate_stats()
-            hp_gain = self.player.max_hp - old_hp
-            if hp_gain > 0:
-                self.player.hp = min(self.player.hp + hp_gain, self.player.max_hp)
-
-        elif family == FAMILY_DEVOURING_PLAGUE:
-            # Shadow DoT (slot 3) that heals caster for damage dealt
-            if self.target and self.target.alive:
-                outcome = self._resolve_offensive_spell(self.target.level)
-                if outcome == SPELL_MISS:
-                    return
-                dmg_per_tick = spell_dot_per_tick(spell_id, sp)
-                # Apply Shadow damage modifiers to per-tick
-                mod = self._shadow_damage_mod(self.target)
-                dmg_per_tick = int(dmg_per_tick * mod)
-                self.target.dot3_remaining = spell.dot_ticks
-                self.target.dot3_timer = spell.dot_interval
-                self.target.dot3_damage_per_tick = dmg_per_tick
-                self.target.dot3_heals_caster = True
-                # Improved Devouring Plague: instant damage = 10/20/30% of total DoT
-                idp_pts = self._get_talent_points("improved_devouring_plague")
-                if idp_pts > 0:
-                    total_dot = dmg_per_tick * (spell.dot_ticks // spell.dot_interval)
-                    instant = int(total_dot * 0.1 * idp_pts)
-                    if instant > 0:
-                        self._damage_mob(self.target, instant, is_shadow=True,
-                                         spell_family=FAMILY_DEVOURING_PLAGUE)
-                self._apply_shadow_weaving(self.target)
-
-        elif family == FAMILY_PSYCHIC_SCREAM:
-            # AoE Fear: fears up to 5 mobs within 8 yards for 8 seconds (16 ticks)
-            px, py = self.player.x, self.player.y
-            feared_count = 0
-            for mob in self.mobs:
-                if feared_count >= 5:
-                    break
-                if not mob.alive or not mob.in_combat:
-                    continue
-                dx = mob.x - px
-                dy = mob.y - py
-                dist = math.sqrt(dx * dx + dy * dy)
-                if dist <= spell.spell_range:
-                    mob.feared = True
-                    mob.fear_remaining = 16  # 8 seconds = 16 ticks
-                    # Flee direction: away from player (normalized)
-                    if dist > 0.1:
-                        mob.fear_dx = dx / dist
-                        mob.fear_dy = dy / dist
-                    else:
-                        angle = self.rng.random() * math.pi * 2
-                        mob.fear_dx = math.cos(angle)
-                        mob.fear_dy = math.sin(angle)
-                    feared_count += 1
-
-        elif family == FAMILY_SHADOW_PROTECTION:
-            # Shadow resistance buff
-            val = spell_buff_value(spell_id)
-            self.player.shadow_prot_remaining = spell.buff_duration
-            self.player.shadow_prot_value = val
-
-        elif family == FAMILY_DIVINE_SPIRIT:
-            # Spirit buff (recalculates stats for mana regen)
-            spi_bonus = spell_buff_value(spell_id)
-            self.player.divine_spirit_remaining = spell.buff_duration
-            self.player.divine_spirit_bonus = spi_bonus
-            self.recalculate_stats()
-
-        elif family == FAMILY_FEAR_WARD:
-            # Fear immunity buff (absorbs one fear effect)
-            self.player.fear_ward_remaining = spell.buff_duration
-
-        elif family == FAMILY_HOLY_NOVA:
-            # PBAoE: damage all mobs within 10 yards + heal self
-            px, py = self.player.x, self.player.y
-            min_dmg, max_dmg = spell_direct_value(spell_id, sp)
-            hit_any = False
-            for mob in self.mobs:
-                if not mob.alive:
-                    continue
-                dx = mob.x - px
-                dy = mob.y - py
-                dist = math.sqrt(dx * dx + dy * dy)
-                if dist <= spell.spell_range:
-                    outcome = self._resolve_offensive_spell(mob.level)
-                    if outcome == SPELL_MISS:
-                        continue
-                    dmg = self.rng.randint(min_dmg, max(min_dmg, max_dmg))
-                    if outcome == SPELL_CRIT:
-                        dmg = int(dmg * 1.5)
-                    self._damage_mob(mob, dmg)
-                    hit_any = True
-            # Self-heal component (Holy Nova Heal has separate base values)
-            # Heal base values per rank (from DBC, separate healing spell IDs)
-            _nova_heal_base = {
-                15237: (29, 5), 15430: (54, 7), 15431: (86, 11),
-                27799: (124, 15), 27800: (163, 19), 27801: (220, 25),
-            }
-            hb, hd = _nova_heal_base.get(spell_id, (29, 5))
-            heal = self.rng.randint(hb + 1, hb + hd) + int(sp * SP_COEFF_HOLY_NOVA_HEAL)
-            if self.rng.random() * 100 < self.player.total_spell_crit:
-                heal = int(heal * 1.5)
+    def _fx_target_hit(self, args, sp, outcome):
+        """Offensive hit/crit roll against the live target."""
+        if not (self.target and self.target.alive):
+            return None
+        outcome = self._resolve_offensive_spell(self.target.level)
+        return None if outcome == SPELL_MISS else outcome
+
+    def _fx_school_damage(self, args, sp, outcome):
+        """Direct damage to the target (Smite, Mind Blast, Holy Fire)."""
+        lo, hi, coeff, shadow, family = args
+        sp_bonus = int(sp * coeff)
+        dmg = self.rng.randint(lo + sp_bonus, hi + sp_bonus)
+        if not shadow:
+            if outcome == SPELL_CRIT:
+                dmg = int(dmg * 1.5)
+            self._damage_mob(self.target, dmg)
+            return outcome
+        # Mind Melt: +3/6% crit on Mind Blast
+        mods = self.player.talent_mods
+        extra_crit = mods.mind_crit_bonus
+        if outcome == SPELL_CRIT or (outcome == SPELL_HIT and extra_crit > 0
+                and self.rng.random() * 100 < extra_crit):
+            # Shadow Power: +20/40/60/80/100% crit damage bonus
+            dmg = int(dmg * mods.mind_crit_mult)
+            if outcome != SPELL_CRIT:
                 self.player.spell_crits += 1
-            self.player.hp = min(self.player.max_hp, self.player.hp + heal)
+        self._damage_mob(self.target, dmg, is_shadow=True, spell_family=family)
+        return outcome
 
-        elif family == FAMILY_VAMPIRIC_TOUCH:
-            # Shadow DoT (slot 4) — talent-granted, mana return on ticks
-            if self.target and self.target.alive:
-                outcome = self._resolve_offensive_spell(self.target.level)
-                if outcome == SPELL_MISS:
-                    return
-                dmg_per_tick = spell_dot_per_tick(spell_id, sp)
-                # Apply Shadow damage modifiers to per-tick
-                mod = self._shadow_damage_mod(self.target)
-                dmg_per_tick = int(dmg_per_tick * mod)
-                self.target.dot4_remaining = spell.dot_ticks
-                self.target.dot4_timer = spell.dot_interval
-                self.target.dot4_damage_per_tick = dmg_per_tick
-                # Misery: VT applies spell hit debuff
-                self._apply_misery(self.target)
-                self._apply_shadow_weaving(self.target)
-
-        elif family == FAMILY_DISPERSION:
-            # Defensive CD: -90% damage taken, +6% mana/s for 6s
-            self.player.dispersion_remaining = spell.buff_duration  # 12 ticks = 6s
-            self.player.is_casting = False  # can't cast during Dispersion
-            self.player.gcd_remaining = 0
-
-        elif family == FAMILY_DISPEL_MAGIC:
-            # Remove debuffs from self (in sim: no mob debuffs currently)
-            # Rank 2 can also be used offensively to dispel mob buffs
-            # For now: utility spell, no direct combat effect
-            pass
+    def _fx_heal(self, args, sp, outcome):
+        """Direct self heal (no miss, can crit)."""
+        lo, hi, coeff = args
+        sp_bonus = int(sp * coeff)
+        heal = self.rng.randint(lo + sp_bonus, hi + sp_bonus)
+        if self.rng.random() * 100 < self.player.total_spell_crit:
+            heal = int(heal * 1.5)
+            self.player.spell_crits += 1
+        self.player.hp = min(self.player.max_hp, self.player.hp + heal)
+        return outcome
+
+    def _fx_periodic_damage(self, args, sp, outcome):
+        """DoT into one of the target's slots, with its Shadow talent hooks."""
+        (per_tick, coeff, ticks, interval, slot,
+         shadow, sw_pain, misery, weaving, plague, family) = args
+        mob = self.target
+        dmg_per_tick = per_tick + int(sp * coeff)
+        mods = self.player.talent_mods
+        if shadow:
+            # Apply Shadow damage modifiers to per-tick value
+            mod = self._shadow_damage_mod(mob)
+            if sw_pain:
+                mod *= mods.sw_pain_mod
+            dmg_per_tick = int(dmg_per_tick * mod)
+        setattr(mob, slot[0], ticks)
+        setattr(mob, slot[1], interval)
+        setattr(mob, slot[2], dmg_per_tick)
+        if len(slot) > 3:
+            setattr(mob, slot[3], True)
+        # Improved Devouring Plague: instant damage = 10/20/30% of total DoT
+        if plague and mods.plague_instant_pct > 0:
+            total_dot = dmg_per_tick * (ticks // interval)
+            instant = int(total_dot * mods.plague_instant_pct)
+            if instant > 0:
+                self._damage_mob(mob, instant, is_shadow=True, spell_family=family)
+        if misery:
+            self._apply_misery(mob)
+        if weaving:
+            self._apply_shadow_weaving(mob)
+        return outcome
+
+    def _fx_absorb(self, args, sp, outcome):
+        """Power Word: Shield absorb plus Weakened Soul."""
+        absorb, coeff, duration = args
+        p = self.player
+        p.shield_absorb = absorb + int(sp * coeff)
+        p.shield_remaining = duration
+        p.shield_cooldown = WEAKENED_SOUL_TICKS
+        return outcome
+
+    def _fx_periodic_heal(self, args, sp, outcome):
+        """HoT on the player (Renew)."""
+        per_tick, coeff, ticks, interval = args
+        p = self.player
+        p.hot_remaining = ticks
+        p.hot_timer = interval
+        p.hot_heal_per_tick = per_tick + int(sp * coeff)
+        return outcome
+
+    def _fx_player_aura(self, args, sp, outcome):
+        """Player buff: set its duration/value fields, refresh buff stats."""
+        sets, recalc, keep_hp_gain = args
+        p = self.player
+        for attr, value in sets:
+            setattr(p, attr, value)
+        if recalc:
+            old_hp = p.hp
+            self.recalculate_stats(STATS_DIRTY_BUFFS)
+            # Fortitude: the new max HP is gained as current HP too
+            hp_gain = p.max_hp - old_hp
+            if keep_hp_gain and hp_gain > 0:
+                p.hp = min(p.hp + hp_gain, p.max_hp)
+        return outcome
+
+    def _fx_fear(self, args, sp, outcome):
+        """Fear the nearest in-combat mobs around the player."""
+        max_targets, radius, ticks = args
+        px, py = self.player.x, self.player.y
+        t = self.mob_table
+        for slot in t.k_nearest(px, py, max_targets, max_dist=radius,
+                                mask=t.alive & t.in_combat):
+            mob = t.mobs[slot]
+            dx = mob.x - px
+            dy = mob.y - py
+            dist = math.sqrt(dx * dx + dy * dy)
+            mob.feared = True
+            mob.fear_remaining = ticks
+            # Flee direction: away from player (normalized)
+            if dist > 0.1:
+                mob.fear_dx = dx / dist
+                mob.fear_dy = dy / dist
+            else:
+                angle = self.rng.random() * math.pi * 2
+                mob.fear_dx = math.cos(angle)
+                mob.fear_dy = math.sin(angle)
+        return outcome
+
+    def _fx_aoe_damage(self, args, sp, outcome):
+        """PBAoE damage to every live mob in range (Holy Nova)."""
+        lo, hi, coeff, radius = args
+        sp_bonus = int(sp * coeff)
+        min_dmg, max_dmg = lo + sp_bonus, hi + sp_bonus
+        t = self.mob_table
+        for slot in t.query_radius(self.player.x, self.player.y, radius):
+            mob = t.mobs[slot]
+            if not mob.alive:
+                continue
+            hit = self._resolve_offensive_spell(mob.level)
+            if hit == SPELL_MISS:
+                continue
+            dmg = self.rng.randint(min_dmg, max(min_dmg, max_dmg))
+            if hit == SPELL_CRIT:
+                dmg = int(dmg * 1.5)
+            self._damage_mob(mob, dmg)
+        return outcome
+
+    # Indexed by FX_* opcode
+    _EFFECT_HANDLERS = (
+        _fx_target_hit, _fx_school_damage, _fx_heal, _fx_periodic_damage,
+        _fx_absorb, _fx_periodic_heal, _fx_player_aura, _fx_fear, _fx_aoe_damage,
+    )
 
     def _shadow_damage_mod(self, mob: Mob) -> float:
         """Calculate multiplicative Shadow damage modifier from talents.
@@ -1892,11 +1822,8 @@ class CombatSimulation:
         Combines: Darkness, Shadowform, Shadow Weaving (target debuff),
         Improved SW:Pain (for SW:P only — handled separately).
         """
-        mod = 1.0
         # Darkness: +2/4/6/8/10% Shadow spell damage
-        dark_pts = self._get_talent_points("darkness")
-        if dark_pts > 0:
-            mod *= 1.0 + 0.02 * dark_pts
+        mod = self.player.talent_mods.shadow_damage_mod
         # Shadowform: +15% Shadow damage
         if self.player.shadowform_active:
             mod *= 1.15
@@ -1907,19 +1834,17 @@ class CombatSimulation:
 
     def _apply_shadow_weaving(self, mob: Mob):
         """Apply or refresh Shadow Weaving debuff stack on a mob."""
-        sw_pts = self._get_talent_points("shadow_weaving")
-        if sw_pts <= 0:
-            return
         # 33/66/100% chance to apply per Shadow spell
-        chance = sw_pts / 3.0
+        chance = self.player.talent_mods.weaving_chance
+        if chance <= 0:
+            return
         if self.rng.random() < chance:
             mob.shadow_weaving_stacks = min(5, mob.shadow_weaving_stacks + 1)
             mob.shadow_weaving_timer = 30  # 15s = 30 ticks
 
     def _apply_misery(self, mob: Mob):
         """Apply Misery debuff (spell hit increase) from SW:P, MF, VT."""
-        mis_pts = self._get_talent_points("misery")
-        if mis_pts > 0:
+        if self.player.talent_mods.misery:
             mob.misery_stacks = 1  # binary debuff, value is mis_pts % hit
 
     def _vampiric_embrace_heal(self, shadow_damage: int):
@@ -1927,15 +1852,9 @@ class CombatSimulation:
 
         Improved VE: +33/67% → 20/25%.
         """
-        ve_pts = self._get_talent_points("vampiric_embrace")
-        if ve_pts < 1:
+        pct = self.player.talent_mods.embrace_pct
+        if pct <= 0:
             return
-        pct = 0.15
-        ive_pts = self._get_talent_points("improved_vampiric_embrace")
-        if ive_pts == 1:
-            pct = 0.20
-        elif ive_pts >= 2:
-            pct = 0.25
         heal = int(shadow_damage * pct)
         if heal > 0:
             self.player.hp = min(self.player.max_hp, self.player.hp + heal)
@@ -1950,17 +1869,15 @@ class CombatSimulation:
         """
         # Apply Shadow talent multipliers
         if is_shadow:
+            mods = self.player.talent_mods
             mod = self._shadow_damage_mod(mob)
             # Improved SW:Pain: +3/6% SW:Pain damage
             if spell_family == FAMILY_SW_PAIN:
-                iswp_pts = self._get_talent_points("improved_sw_pain")
-                if iswp_pts > 0:
-                    mod *= 1.0 + 0.03 * iswp_pts
+                mod *= mods.sw_pain_mod
             # Twisted Faith: +2/4/6/8/10% MB/MF damage if target has SW:Pain
             if spell_family in (FAMILY_MIND_BLAST, FAMILY_MIND_FLAY):
-                tf_pts = self._get_talent_points("twisted_faith")
-                if tf_pts > 0 and mob.dot_remaining > 0:
-                    mod *= 1.0 + 0.02 * tf_pts
+                if mob.dot_remaining > 0:
+                    mod *= mods.twisted_faith_mod
             damage = int(damage * mod)
             # Shadow Weaving application
             self._apply_shadow_weaving(mob)
@@ -1980,10 +1897,9 @@ class CombatSimulation:
             mob.respawn_timer = self.RESPAWN_TICKS
             self.kills += 1
             # Spirit Tap proc on kill
-            st_pts = self._get_talent_points("spirit_tap")
-            if st_pts > 0:
+            if self.player.talent_mods.spirit_tap:
                 self.player.spirit_tap_remaining = 30  # 15s = 30 ticks
-                self.recalculate_stats()
+                self.recalculate_stats(STATS_DIRTY_BUFFS)
             # XP reward — AzerothCore formula based on level difference
             xp = base_xp_gain(self.player.level, mob.level)
             self.player.xp_gained += xp
@@ -1997,9 +1913,10 @@ class CombatSimulation:
 
     def _check_combat_end(self):
         """Check if all mobs targeting player are dead."""
-        for mob in self.mobs:
-            if mob.alive and mob.target_player:
-                return
+        t = self.mob_table
+        n = t.n
+        if (t.used[:n] & t.alive[:n] & t.target_player[:n]).any():
+            return
         self.player.in_combat = False
 
     def _check_level_up(self):
@@ -2012,7 +1929,10 @@ class CombatSimulation:
             self._apply_level_stats()
 
     def _get_talent_points(self, talent_name: str) -> int:
-        """Return current points in a talent (0 if not yet trained)."""
+        """Return current points in a talent (0 if not yet trained).
+
+        Used for talent-granted spells; combat effects read player.talent_mods.
+        """
         return self.player.talent_points.get(talent_name, 0)
 
     def _assign_talent_point(self, level: int):
@@ -2025,6 +1945,7 @@ class CombatSimulation:
         max_pts = TALENT_DEFS[talent]["max"]
         if current < max_pts:
             p.talent_points[talent] = current + 1
+            p.talent_mods = TalentMods.from_points(p.talent_points)
         # Auto-activate Shadowform when talented
         if talent == "shadowform" and not p.shadowform_active:
             p.shadowform_active = True
@@ -2034,7 +1955,7 @@ class CombatSimulation:
         p = self.player
         # Assign talent point for this level
         self._assign_talent_point(p.level)
-        self.recalculate_stats()
+        self.recalculate_stats(STATS_DIRTY_LEVEL | STATS_DIRTY_TALENTS)
         # Full heal on level-up (matches WoW behaviour)
         p.hp = p.max_hp
         p.mana = p.max_mana
@@ -2067,20 +1988,18 @@ class CombatSimulation:
                         tick_dmg = spell_dot_per_tick(p.channel_spell_id,
                                                      p.total_spell_power)
                         # Mind Melt: +3/6% crit bonus (applied per tick)
-                        mm_pts = self._get_talent_points("mind_melt")
-                        extra_crit = mm_pts * 3.0 if mm_pts > 0 else 0.0
-                        is_crit = self.rng.random() * 100 < (p.total_spell_crit + extra_crit)
+                        mods = p.talent_mods
+                        is_crit = self.rng.random() * 100 < (p.total_spell_crit
+                                                             + mods.mind_crit_bonus)
                         if is_crit:
-                            sp_pts = self._get_talent_points("shadow_power")
-                            crit_mult = 1.5 + 0.1 * sp_pts
-                            tick_dmg = int(tick_dmg * crit_mult)
+                            tick_dmg = int(tick_dmg * mods.mind_crit_mult)
                             p.spell_crits += 1
                         self._damage_mob(target_mob, tick_dmg, is_shadow=True,
                                          spell_family=FAMILY_MIND_FLAY)
                         # Pain and Suffering: MF has 33/66/100% chance to refresh SWP
-                        ps_pts = self._get_talent_points("pain_and_suffering")
-                        if ps_pts > 0 and target_mob.dot_remaining > 0:
-                            if self.rng.random() < ps_pts / 3.0:
+                        ps_chance = mods.swp_refresh_chance
+                        if ps_chance > 0 and target_mob.dot_remaining > 0:
+                            if self.rng.random() < ps_chance:
                                 target_mob.dot_remaining = 36  # refresh to 18s
                         # Misery from Mind Flay
                         self._apply_misery(target_mob)
@@ -2099,9 +2018,8 @@ class CombatSimulation:
             p.cast_remaining -= 1
             if p.cast_remaining <= 0:
                 p.is_casting = False
-                # Mind Flay ends via channel system, not _apply_spell
-                if p.cast_spell_id and SPELLS.get(p.cast_spell_id, None) \
-                        and SPELLS[p.cast_spell_id].spell_family != FAMILY_MIND_FLAY:
+                # Mind Flay's program is empty: it ends via the channel system
+                if p.cast_spell_id in SPELL_PROGRAMS:
                     self._apply_spell(p.cast_spell_id)
                 p.cast_spell_id = 0
 
@@ -2109,199 +2027,8 @@ class CombatSimulation:
         if p.gcd_remaining > 0:
             p.gcd_remaining -= 1
 
-        # --- Mob AI (inlined distance to avoid method-call overhead) ---
-        px, py = p.x, p.y
-        _sqrt = math.sqrt
-        for mob in self.mobs:
-            if not mob.alive:
-                if mob.respawn_timer > 0:
-                    mob.respawn_timer -= 1
-                    if mob.respawn_timer <= 0:
-                        self._respawn_mob(mob)
-                continue
-
-            # Inline distance (saves 2 method calls per mob)
-            _dx = mob.x - px
-            _dy = mob.y - py
-            dist = _sqrt(_dx * _dx + _dy * _dy)
-
-            if not mob.in_combat:
-                # Aggro check
-                if dist <= mob.template.detect_range:
-                    mob.in_combat = True
-                    mob.target_player = True
-                    p.in_combat = True
-                    if p.is_eating:
-                        p.is_eating = False
-                else:
-                    # Far non-combat mob: only process DoTs then skip
-                    if mob.dot_remaining > 0:
-                        mob.dot_remaining -= 1
-                        mob.dot_timer -= 1
-                        if mob.dot_timer <= 0:
-                            self._damage_mob(mob, mob.dot_damage_per_tick,
-                                             is_shadow=True, spell_family=FAMILY_SW_PAIN)
-                            mob.dot_timer = 6
-                    if mob.dot2_remaining > 0:
-                        mob.dot2_remaining -= 1
-                        mob.dot2_timer -= 1
-                        if mob.dot2_timer <= 0:
-                            self._damage_mob(mob, mob.dot2_damage_per_tick)
-                            mob.dot2_timer = 6
-                    if mob.dot3_remaining > 0:
-                        mob.dot3_remaining -= 1
-                        mob.dot3_timer -= 1
-                        if mob.dot3_timer <= 0:
-                            tick_dmg = mob.dot3_damage_per_tick
-                            self._damage_mob(mob, tick_dmg, is_shadow=True,
-                                             spell_family=FAMILY_DEVOURING_PLAGUE)
-                            if mob.dot3_heals_caster:
-                                p.hp = min(p.max_hp, p.hp + tick_dmg)
-                            mob.dot3_timer = 6
-                    if mob.dot4_remaining > 0:
-                        mob.dot4_remaining -= 1
-                        mob.dot4_timer -= 1
-                        if mob.dot4_timer <= 0:
-                            tick_dmg = mob.dot4_damage_per_tick
-                            self._damage_mob(mob, tick_dmg, is_shadow=True,
-                                             spell_family=FAMILY_VAMPIRIC_TOUCH)
-                            mana_return = int(p.max_mana * 0.02)
-                            p.mana = min(p.max_mana, p.mana + mana_return)
-                            mob.dot4_timer = 6
-                    continue
-
-            if mob.target_player:
-                # Leash check (inlined)
-                sdx = mob.x - mob.spawn_x
-                sdy = mob.y - mob.spawn_y
-                if _sqrt(sdx * sdx + sdy * sdy) > self.MOB_LEASH_RANGE:
-                    self._evade_mob(mob)
-                    continue
-
-                # Fear: mob flees instead of chasing/attacking
-                if mob.feared:
-                    mob.fear_remaining -= 1
-                    if mob.fear_remaining <= 0:
-                        mob.feared = False
-                    else:
-                        # Move in flee direction
-                        move = self.MOB_SPEED
-                        new_mx = mob.x + mob.fear_dx * move
-                        new_my = mob.y + mob.fear_dy * move
-                        if self.terrain:
-                            new_mz = self.terrain.get_height(new_mx, new_my)
-                            if self.terrain.check_walkable(mob.x, mob.y, mob.z, new_mx, new_my, new_mz):
-                                mob.x = new_mx
-                                mob.y = new_my
-                                mob.z = new_mz
-                        else:
-                            mob.x = new_mx
-                            mob.y = new_my
-                    # Skip chase and melee while feared — fall through to DoTs
-                else:
-                    # Chase player (not feared)
-                    if dist > 2.0:
-                        move = min(self.MOB_SPEED, dist - 1.5)
-                        new_mx = mob.x + (-_dx / dist) * move
-                        new_my = mob.y + (-_dy / dist) * move
-                        if self.terrain:
-                            new_mz = self.terrain.get_height(new_mx, new_my)
-                            if self.terrain.check_walkable(mob.x, mob.y, mob.z, new_mx, new_my, new_mz):
-                                mob.x = new_mx
-                                mob.y = new_my
-                                mob.z = new_mz
-                        else:
-                            mob.x = new_mx
-                            mob.y = new_my
-                        # Recompute distance after move
-                        _dx = mob.x - px
-                        _dy = mob.y - py
-                        dist = _sqrt(_dx * _dx + _dy * _dy)
-
-                    # Melee attack (WotLK single-roll attack table)
-                    if dist <= 5.0:
-                        mob.attack_timer -= 1
-                        if mob.attack_timer <= 0:
-                            dmg = self.rng.randint(mob.template.min_damage, mob.template.max_damage)
-                            roll = self.rng.random() * 100.0
-                            outcome = resolve_mob_melee_attack(
-                                attacker_level=mob.level,
-                                defender_level=p.level,
-                                defender_dodge=p.total_dodge,
-                                defender_parry=p.total_parry,
-                                defender_block=p.total_block,
-                                defender_defense_bonus=p.total_defense,
-                                defender_resilience_pct=p.total_resilience,
-                                roll=roll,
-                            )
-                            if outcome == MELEE_MISS:
-                                p.mob_misses += 1
-                            elif outcome == MELEE_DODGE:
-                                p.dodges += 1
-                            elif outcome == MELEE_PARRY:
-                                p.parries += 1
-                            elif outcome == MELEE_BLOCK:
-                                p.blocks += 1
-                                # Block reduces damage by block_value, not a full avoid
-                                dmg = max(0, dmg - p.total_block_value)
-                                self._damage_player(dmg, mob)
-                            elif outcome == MELEE_CRIT:
-                                p.mob_crits += 1
-                                dmg = int(dmg * 2.0)  # mob crit = 200% damage
-                                self._damage_player(dmg, mob)
-                            elif outcome == MELEE_CRUSHING:
-                                p.mob_crushings += 1
-                                dmg = int(dmg * 1.5)  # crushing = 150% damage
-                                self._damage_player(dmg, mob)
-                            else:  # MELEE_NORMAL
-                                self._damage_player(dmg, mob)
-                            mob.attack_timer = mob.template.attack_speed
-                            p.combat_timer = 0
-
-            # DoT processing (slot 1: SW:Pain — Shadow, VE heals)
-            if mob.dot_remaining > 0:
-                mob.dot_remaining -= 1
-                mob.dot_timer -= 1
-                if mob.dot_timer <= 0:
-                    tick_dmg = mob.dot_damage_per_tick
-                    self._damage_mob(mob, tick_dmg, is_shadow=True,
-                                     spell_family=FAMILY_SW_PAIN)
-                    mob.dot_timer = 6
-            # DoT processing (slot 2: Holy Fire)
-            if mob.dot2_remaining > 0:
-                mob.dot2_remaining -= 1
-                mob.dot2_timer -= 1
-                if mob.dot2_timer <= 0:
-                    self._damage_mob(mob, mob.dot2_damage_per_tick)
-                    mob.dot2_timer = 6
-            # DoT processing (slot 3: Devouring Plague — Shadow, heals caster)
-            if mob.dot3_remaining > 0:
-                mob.dot3_remaining -= 1
-                mob.dot3_timer -= 1
-                if mob.dot3_timer <= 0:
-                    tick_dmg = mob.dot3_damage_per_tick
-                    self._damage_mob(mob, tick_dmg, is_shadow=True,
-                                     spell_family=FAMILY_DEVOURING_PLAGUE)
-                    if mob.dot3_heals_caster:
-                        p.hp = min(p.max_hp, p.hp + tick_dmg)
-                    mob.dot3_timer = 6
-            # DoT processing (slot 4: Vampiric Touch — Shadow, mana return)
-            if mob.dot4_remaining > 0:
-                mob.dot4_remaining -= 1
-                mob.dot4_timer -= 1
-                if mob.dot4_timer <= 0:
-                    tick_dmg = mob.dot4_damage_per_tick
-                    self._damage_mob(mob, tick_dmg, is_shadow=True,
-                                     spell_family=FAMILY_VAMPIRIC_TOUCH)
-                    # VT returns 2% of max mana per tick to caster
-                    mana_return = int(p.max_mana * 0.02)
-                    p.mana = min(p.max_mana, p.mana + mana_return)
-                    mob.dot4_timer = 6
-            # Shadow Weaving timer decay
-            if mob.shadow_weaving_timer > 0:
-                mob.shadow_weaving_timer -= 1
-                if mob.shadow_weaving_timer <= 0:
-                    mob.shadow_weaving_stacks = 0
+        # --- Mob AI (masked array ops over the mob table) ---
+        self._tick_mobs()
 
         # --- Shield decay ---
         if p.shield_remaining > 0:
@@ -2333,7 +2060,7 @@ class CombatSimulation:
             if p.inner_fire_remaining <= 0:
                 p.inner_fire_armor = 0
                 p.inner_fire_spellpower = 0
-                self.recalculate_stats()  # armor/SP changed
+                self.recalculate_stats(STATS_DIRTY_BUFFS)  # armor/SP changed
 
         # --- Buff: PW:Fortitude ---
         if p.fortitude_remaining > 0:
@@ -2342,7 +2069,7 @@ class CombatSimulation:
                 # Remove Stamina bonus -> recalculate HP
                 p.fortitude_stamina_bonus = 0
                 p.fortitude_hp_bonus = 0
-                self.recalculate_stats()
+                self.recalculate_stats(STATS_DIRTY_BUFFS)
                 p.hp = min(p.hp, p.max_hp)
 
         # --- Buff: Shadow Protection ---
@@ -2356,7 +2083,7 @@ class CombatSimulation:
             p.divine_spirit_remaining -= 1
             if p.divine_spirit_remaining <= 0:
                 p.divine_spirit_bonus = 0
-                self.recalculate_stats()
+                self.recalculate_stats(STATS_DIRTY_BUFFS)
 
         # --- Buff: Fear Ward ---
         if p.fear_ward_remaining > 0:
@@ -2366,7 +2093,7 @@ class CombatSimulation:
         if p.spirit_tap_remaining > 0:
             p.spirit_tap_remaining -= 1
             if p.spirit_tap_remaining <= 0:
-                self.recalculate_stats()  # Spirit bonus removed
+                self.recalculate_stats(STATS_DIRTY_BUFFS)  # Spirit bonus removed
 
         # --- Dispersion ---
         if p.dispersion_remaining > 0:
@@ -2401,12 +2128,11 @@ class CombatSimulation:
             p.mana_regen_accumulator += spi_regen + mp5_per_tick
         else:
             # Meditation: +17/33/50% of Spirit-based mana regen continues while casting
-            med_pts = self._get_talent_points("meditation")
-            if med_pts > 0:
+            med_pct = p.talent_mods.meditation_pct
+            if med_pct > 0:
                 spi_regen = spirit_mana_regen(
                     p.level, p.total_intellect, p.total_spirit, p.class_id)
-                med_pcts = {1: 0.17, 2: 0.33, 3: 0.50}
-                p.mana_regen_accumulator += spi_regen * med_pcts.get(med_pts, 0.50)
+                p.mana_regen_accumulator += spi_regen * med_pct
             p.mana_regen_accumulator += mp5_per_tick
         # Fallback minimum: 2% of max_mana per tick if spirit regen is too low
         min_regen = p.max_mana * self.MANA_REGEN_PCT_PER_TICK
@@ -2431,6 +2157,432 @@ class CombatSimulation:
                 if p.hp >= p.max_hp and p.mana >= p.max_mana:
                     p.is_eating = False
 
+    # ─── Fast-Forward ─────────────────────────────────────────────
+
+    def quiet_ticks(self, limit: int) -> int:
+        """Number of upcoming ticks (<= limit) in which nothing can happen.
+
+        A quiet tick only counts down timers and regenerates HP/mana: no
+        channel, cast completion, respawn, DoT/HoT tick, aggro, fight or
+        side-effecting buff expiry. 0 means the next tick has an event (or
+        the player left the chunk loaded at the last tick).
+        """
+        p = self.player
+        if limit <= 0 or p.channel_remaining > 0 or p.dispersion_remaining > 0:
+            return 0
+        if self._chunk_key() != self._player_chunk:
+            return 0
+        k = limit
+        if p.is_casting:
+            k = min(k, p.cast_remaining - 1)
+        if p.hot_remaining > 0:
+            k = min(k, p.hot_timer - 1, p.hot_remaining - 1)
+        # Expiries that recalculate stats (and so change regen)
+        for remaining in (p.inner_fire_remaining, p.fortitude_remaining,
+                          p.divine_spirit_remaining, p.spirit_tap_remaining):
+            if remaining > 0:
+                k = min(k, remaining - 1)
+        if k <= 0:
+            return 0
+
+        t = self.mob_table
+        n = t.n
+        if n == 0:
+            return k
+        used = t.used[:n]
+        active = used & t.alive[:n]
+        if (active & t.in_combat[:n]).any():
+            return 0
+        dead = used & ~active & (t.respawn_timer[:n] > 0)
+        if dead.any():
+            k = min(k, int(t.respawn_timer[:n][dead].min()) - 1)
+        if not active.any():
+            return max(k, 0)
+        # Idle mobs and the player stand still, so aggro range is static
+        dx = t.x[:n] - p.x
+        dy = t.y[:n] - p.y
+        if (active & (np.sqrt(dx * dx + dy * dy) <= t.detect_range[:n])).any():
+            return 0
+        dots = active[:, None] & (t.dot_remaining[:n] > 0)
+        if dots.any():
+            k = min(k, int(t.dot_timer[:n][dots].min()) - 1,
+                    int(t.dot_remaining[:n][dots].min()))
+        return max(k, 0)
+
+    def fast_forward(self, max_ticks: int) -> int:
+        """Advance to the next event in one call; return the ticks advanced.
+
+        Quiet ticks (see quiet_ticks) are replayed with a lean loop that
+        only runs regen and eating, then timers are counted down in bulk.
+        Stops after the first tick with an event: a regular tick() when the
+        next tick is not quiet, or a quiet tick in which eating ended or HP
+        or mana reached its cap. The resulting state (RNG included) is the
+        same as calling tick() that many times.
+
+        ff_idle_ticks and ff_eat_missing record, per tick advanced, the
+        player state a caller would have seen after each tick() (used to
+        score a wait step like the ticks it replaces).
+        """
+        self.ff_idle_ticks = 0
+        self.ff_eat_missing = 0.0
+        advanced = 0
+        while advanced < max_ticks:
+            # Position-only updates a quiet tick would run; the player
+            # stands still, so once per window is enough
+            self._update_exploration()
+            self._update_quest_exploration()
+            k = self.quiet_ticks(max_ticks - advanced)
+            if k == 0:
+                self.tick()
+                p = self.player
+                if p.is_eating:
+                    self.ff_eat_missing += ((1.0 - p.hp / max(1, p.max_hp))
+                                            + (1.0 - p.mana / max(1, p.max_mana)))
+                elif not p.is_casting:
+                    self.ff_idle_ticks += 1
+                return advanced + 1
+            done, stopped = self._run_quiet_ticks(k)
+            advanced += done
+            if stopped:
+                break
+        return advanced
+
+    def _run_quiet_ticks(self, k: int) -> tuple[int, bool]:
+        """Replay up to k quiet ticks; (ticks run, stopped on regen event)."""
+        p = self.player
+        ooc = not p.in_combat
+        casting = p.is_casting
+        max_hp, max_mana = p.max_hp, p.max_mana
+
+        # Per-tick mana regen terms, added in the same order as tick()
+        mp5_per_tick = p.gear_mp5 / 5.0 * 0.5
+        med_regen = 0.0
+        if not casting:
+            mana_regen = spirit_mana_regen(
+                p.level, p.total_intellect, p.total_spirit, p.class_id) + mp5_per_tick
+        else:
+            mana_regen = mp5_per_tick
+            med_pct = p.talent_mods.meditation_pct
+            if med_pct > 0:
+                spi_regen = spirit_mana_regen(
+                    p.level, p.total_intellect, p.total_spirit, p.class_id)
+                med_regen = spi_regen * med_pct
+        min_regen = max_mana * self.MANA_REGEN_PCT_PER_TICK
+        eat_hp = max(1, int(max_hp * 0.025))
+        eat_mana = max(1, int(max_mana * 0.025))
+
+        hp_div, mana_div = max(1, max_hp), max(1, max_mana)
+        idle = 0
+        eat_missing = 0.0
+
+        done = 0
+        stopped = False
+        while done < k:
+            done += 1
+            hp0, mana0, eating0 = p.hp, p.mana, p.is_eating
+            p.combat_timer += 1
+            if ooc and p.combat_timer >= self.OOC_DELAY_TICKS:
+                p.ooc_regen_accumulator += self.HP_REGEN_PER_TICK
+                if p.ooc_regen_accumulator >= 1.0:
+                    heal = int(p.ooc_regen_accumulator)
+                    p.hp = min(max_hp, p.hp + heal)
+                    p.ooc_regen_accumulator -= heal
+            if med_regen:
+                p.mana_regen_accumulator += med_regen
+            p.mana_regen_accumulator += mana_regen
+            if not casting and p.mana_regen_accumulator < min_regen:
+                p.mana_regen_accumulator = min_regen
+            if p.mana_regen_accumulator >= 1.0:
+                regen = int(p.mana_regen_accumulator)
+                p.mana = min(max_mana, p.mana + regen)
+                p.mana_regen_accumulator -= regen
+            if eating0:
+                if not ooc:
+                    p.is_eating = False
+                else:
+                    p.hp = min(max_hp, p.hp + eat_hp)
+                    p.mana = min(max_mana, p.mana + eat_mana)
+                    if p.hp >= max_hp and p.mana >= max_mana:
+                        p.is_eating = False
+            if p.is_eating:
+                eat_missing += (1.0 - p.hp / hp_div) + (1.0 - p.mana / mana_div)
+            elif not casting:
+                idle += 1
+            if ((eating0 and not p.is_eating)
+                    or (hp0 < max_hp <= p.hp) or (mana0 < max_mana <= p.mana)):
+                stopped = True
+                break
+        self.ff_idle_ticks += idle
+        self.ff_eat_missing += eat_missing
+
+        # Timers: none of them reaches an event inside the window
+        self.tick_count += done
+        if casting:
+            p.cast_remaining -= done
+        if p.gcd_remaining > 0:
+            p.gcd_remaining = max(0, p.gcd_remaining - done)
+        if p.shield_remaining > 0:
+            p.shield_remaining = max(0, p.shield_remaining - done)
+            if p.shield_remaining == 0:
+                p.shield_absorb = 0
+        if p.shield_cooldown > 0:
+            p.shield_cooldown = max(0, p.shield_cooldown - done)
+        for sid in list(p.spell_cooldowns):
+            p.spell_cooldowns[sid] -= done
+            if p.spell_cooldowns[sid] <= 0:
+                del p.spell_cooldowns[sid]
+        if p.hot_remaining > 0:
+            p.hot_remaining -= done
+            p.hot_timer -= done
+        if p.inner_fire_remaining > 0:
+            p.inner_fire_remaining -= done
+        if p.fortitude_remaining > 0:
+            p.fortitude_remaining -= done
+        if p.shadow_prot_remaining > 0:
+            p.shadow_prot_remaining = max(0, p.shadow_prot_remaining - done)
+            if p.shadow_prot_remaining == 0:
+                p.shadow_prot_value = 0
+        if p.divine_spirit_remaining > 0:
+            p.divine_spirit_remaining -= done
+        if p.fear_ward_remaining > 0:
+            p.fear_ward_remaining = max(0, p.fear_ward_remaining - done)
+        if p.spirit_tap_remaining > 0:
+            p.spirit_tap_remaining -= done
+
+        t = self.mob_table
+        n = t.n
+        if n:
+            used = t.used[:n]
+            active = used & t.alive[:n]
+            dead = used & ~active & (t.respawn_timer[:n] > 0)
+            t.respawn_timer[:n][dead] -= done
+            dots = active[:, None] & (t.dot_remaining[:n] > 0)
+            t.dot_remaining[:n][dots] -= done
+            t.dot_timer[:n][dots] -= done
+        return done, stopped
+
+    def _tick_mobs(self) -> None:
+        """Mob AI for one tick: respawn, aggro, leash, fear, chase, melee, DoTs.
+
+        Runs as masked array operations over the MobTable; only mobs that
+        actually act this tick (respawn, evade, swing, DoT tick) drop into
+        per-mob Python. Respawns, swings and DoT ticks draw from self.rng,
+        so they run last, merged back into mob list order.
+        """
+        t = self.mob_table
+        n = t.n
+        if n == 0:
+            return
+        p = self.player
+        px, py = p.x, p.y
+        used = t.used[:n]
+        active = used & t.alive[:n]   # alive at tick start
+        # (slot, kind, dot slot) of every RNG-drawing action this tick;
+        # kind orders one mob's actions: respawn, melee, then its DoTs
+        acts: list[tuple[int, int, int]] = []
+
+        # Respawn timers (dead mobs only; a respawned mob acts next tick)
+        dead = used & ~active & (t.respawn_timer[:n] > 0)
+        if dead.any():
+            respawn_timer = t.respawn_timer[:n]
+            respawn_timer[dead] -= 1
+            acts.extend((int(slot), 0, 0) for slot in
+                        np.flatnonzero(dead & (respawn_timer <= 0)))
+        if not active.any():
+            self._run_mob_acts(acts)
+            return
+
+        dx = t.x[:n] - px
+        dy = t.y[:n] - py
+        dist = np.sqrt(dx * dx + dy * dy)
+
+        # Aggro check
+        in_combat = t.in_combat[:n]
+        aggro = active & ~in_combat & (dist <= t.detect_range[:n])
+        if aggro.any():
+            in_combat[aggro] = True
+            t.target_player[:n][aggro] = True
+            p.in_combat = True
+            if p.is_eating:
+                p.is_eating = False
+        # Far non-combat mobs only tick their DoTs
+        fighting = active & in_combat
+        ticking = active.copy()
+
+        chasing = fighting & t.target_player[:n]
+        if chasing.any():
+            # Leash check
+            sdx = t.x[:n] - t.spawn_x[:n]
+            sdy = t.y[:n] - t.spawn_y[:n]
+            leash = chasing & (sdx * sdx + sdy * sdy
+                               > self.MOB_LEASH_RANGE * self.MOB_LEASH_RANGE)
+            if leash.any():
+                for slot in np.flatnonzero(leash):
+                    self._evade_mob(t.mobs[slot])
+                chasing &= ~leash
+                fighting &= ~leash
+                ticking &= ~leash
+
+            # Fear: mob flees instead of chasing/attacking
+            feared = chasing & t.feared[:n]
+            if feared.any():
+                fear_remaining = t.fear_remaining[:n]
+                fear_remaining[feared] -= 1
+                ends = feared & (fear_remaining <= 0)
+                t.feared[:n][ends] = False
+                move = self.MOB_SPEED
+                self._move_mobs(feared & ~ends,
+                                t.fear_dx[:n] * move, t.fear_dy[:n] * move)
+
+            # Chase player (not feared)
+            runners = chasing & ~feared
+            step = runners & (dist > 2.0)
+            if step.any():
+                d = np.where(step, dist, 1.0)
+                move = np.minimum(self.MOB_SPEED, d - 1.5)
+                self._move_mobs(step, (-dx / d) * move, (-dy / d) * move)
+                dx = t.x[:n] - px
+                dy = t.y[:n] - py
+                dist = np.sqrt(dx * dx + dy * dy)
+
+            # Melee attack
+            in_reach = runners & (dist <= 5.0)
+            if in_reach.any():
+                attack_timer = t.attack_timer[:n]
+                attack_timer[in_reach] -= 1
+                acts.extend((int(slot), 1, 0) for slot in
+                            np.flatnonzero(in_reach & (attack_timer <= 0)))
+
+        # DoT processing (4 slots, ticks every 6 ticks = 3s)
+        dot_remaining = t.dot_remaining[:n]
+        dots = ticking[:, None] & (dot_remaining > 0)
+        if dots.any():
+            dot_timer = t.dot_timer[:n]
+            dot_remaining[dots] -= 1
+            dot_timer[dots] -= 1
+            fire = dots & (dot_timer <= 0)
+            if fire.any():
+                acts.extend((int(slot), 2, int(k))
+                            for slot, k in zip(*np.nonzero(fire)))
+                dot_timer[fire] = 6
+
+        # Shadow Weaving timer decay
+        sw_timer = t.shadow_weaving_timer[:n]
+        decay = fighting & (sw_timer > 0)
+        if decay.any():
+            sw_timer[decay] -= 1
+            t.shadow_weaving_stacks[:n][decay & (sw_timer <= 0)] = 0
+
+        self._run_mob_acts(acts)
+
+    def _run_mob_acts(self, acts: list[tuple[int, int, int]]) -> None:
+        """Run _tick_mobs' respawns, swings and DoT ticks in mob list order.
+
+        Keeps the RNG draw order of a per-mob loop, so seeded episodes
+        replay the same trajectories.
+        """
+        if not acts:
+            return
+        # One mob's actions are already queued in order; slots are reused,
+        # so several mobs are ordered by their position in self.mobs
+        if len({a[0] for a in acts}) > 1:
+            order = {mob._slot: i for i, mob in enumerate(self.mobs)}
+            acts.sort(key=lambda a: (order[a[0]], a[1], a[2]))
+        mobs = self.mob_table.mobs
+        for slot, kind, k in acts:
+            if kind == 0:
+                self._respawn_mob(mobs[slot])
+            elif kind == 1:
+                self._mob_melee(mobs[slot])
+            else:
+                self._dot_tick(mobs[slot], k)
+
+    def _move_mobs(self, mask: np.ndarray, mdx: np.ndarray, mdy: np.ndarray):
+        """Move masked mobs by (mdx, mdy); with terrain each step is checked."""
+        if not mask.any():
+            return
+        t = self.mob_table
+        n = t.n
+        if not self.terrain:
+            t.x[:n][mask] += mdx[mask]
+            t.y[:n][mask] += mdy[mask]
+            t.mark_moved(np.flatnonzero(mask).tolist())
+            return
+        slots = np.flatnonzero(mask)
+        x, y, z = t.x[slots], t.y[slots], t.z[slots]
+        new_x = x + mdx[slots]
+        new_y = y + mdy[slots]
+        get_height = self.terrain.get_height
+        new_z = np.array([get_height(mx, my)
+                          for mx, my in zip(new_x.tolist(), new_y.tolist())])
+        ok = self.terrain.check_walkable_many(x, y, z, new_x, new_y, new_z)
+        if ok.any():
+            moved = slots[ok]
+            t.x[moved] = new_x[ok]
+            t.y[moved] = new_y[ok]
+            t.z[moved] = new_z[ok]
+            t.mark_moved(moved.tolist())
+
+    def _mob_melee(self, mob: Mob):
+        """Resolve one mob swing (WotLK single-roll attack table)."""
+        p = self.player
+        dmg = self.rng.randint(mob.template.min_damage, mob.template.max_damage)
+        roll = self.rng.random() * 100.0
+        outcome = resolve_mob_melee_attack(
+            attacker_level=mob.level,
+            defender_level=p.level,
+            defender_dodge=p.total_dodge,
+            defender_parry=p.total_parry,
+            defender_block=p.total_block,
+            defender_defense_bonus=p.total_defense,
+            defender_resilience_pct=p.total_resilience,
+            roll=roll,
+        )
+        if outcome == MELEE_MISS:
+            p.mob_misses += 1
+        elif outcome == MELEE_DODGE:
+            p.dodges += 1
+        elif outcome == MELEE_PARRY:
+            p.parries += 1
+        elif outcome == MELEE_BLOCK:
+            p.blocks += 1
+            # Block reduces damage by block_value, not a full avoid
+            dmg = max(0, dmg - p.total_block_value)
+            self._damage_player(dmg, mob)
+        elif outcome == MELEE_CRIT:
+            p.mob_crits += 1
+            dmg = int(dmg * 2.0)  # mob crit = 200% damage
+            self._damage_player(dmg, mob)
+        elif outcome == MELEE_CRUSHING:
+            p.mob_crushings += 1
+            dmg = int(dmg * 1.5)  # crushing = 150% damage
+            self._damage_player(dmg, mob)
+        else:  # MELEE_NORMAL
+            self._damage_player(dmg, mob)
+        mob.attack_timer = mob.template.attack_speed
+        p.combat_timer = 0
+
+    def _dot_tick(self, mob: Mob, k: int):
+        """Deal one periodic tick from DoT slot k of a mob."""
+        p = self.player
+        tick_dmg = int(self.mob_table.dot_damage[mob._slot, k])
+        if k == 0:    # SW:Pain — Shadow, VE heals
+            self._damage_mob(mob, tick_dmg, is_shadow=True,
+                             spell_family=FAMILY_SW_PAIN)
+        elif k == 1:  # Holy Fire
+            self._damage_mob(mob, tick_dmg)
+        elif k == 2:  # Devouring Plague — Shadow, heals caster
+            self._damage_mob(mob, tick_dmg, is_shadow=True,
+                             spell_family=FAMILY_DEVOURING_PLAGUE)
+            if mob.dot3_heals_caster:
+                p.hp = min(p.max_hp, p.hp + tick_dmg)
+        else:         # Vampiric Touch — Shadow, mana return
+            self._damage_mob(mob, tick_dmg, is_shadow=True,
+                             spell_family=FAMILY_VAMPIRIC_TOUCH)
+            # VT returns 2% of max mana per tick to caster
+            mana_return = int(p.max_mana * 0.02)
+            p.mana = min(p.max_mana, p.mana + mana_return)
+
     def _damage_player(self, damage: int, attacker: 'Mob | None' = None):
         """Apply damage to player, considering armor mitigation, talents, and shield.
 
@@ -2537,26 +2689,34 @@ class CombatSimulation:
         px, py = self.player.x, self.player.y
         _sqrt = math.sqrt
         result = []
-        for mob in self.mobs:
-            dx = mob.x - px
-            dy = mob.y - py
-            dsq = dx * dx + dy * dy
-            if dsq <= r_sq:
-                d = _sqrt(dsq)
+        t = self.mob_table
+        slots = t.query_radius(px, py, r)
+        if len(slots):
+            # Gather the in-range rows once, then build dicts from plain lists
+            dx = t.x[slots] - px
+            dy = t.y[slots] - py
+            rows = zip(slots.tolist(), np.sqrt(dx * dx + dy * dy).tolist(),
+                       t.level[slots].tolist(), t.hp[slots].tolist(),
+                       t.max_hp[slots].tolist(), t.alive[slots].tolist(),
+                       t.x[slots].tolist(), t.y[slots].tolist(),
+                       t.z[slots].tolist(), t.target_player[slots].tolist(),
+                       t.looted[slots].tolist())
+            for slot, d, level, hp, max_hp, alive, x, y, z, tp, looted in rows:
+                mob = t.mobs[slot]
                 result.append({
                     "uid": mob.uid,
                     "name": mob.template.name,
-                    "level": mob.level,
-                    "hp": mob.hp,
-                    "max_hp": mob.max_hp,
-                    "alive": mob.alive,
-                    "x": mob.x,
-                    "y": mob.y,
-                    "z": mob.z,
+                    "level": level,
+                    "hp": hp,
+                    "max_hp": max_hp,
+                    "alive": alive,
+                    "x": x,
+                    "y": y,
+                    "z": z,
                     "dist": d,
-                    "target_player": mob.target_player,
-                    "looted": mob.looted,
-                    "attackable": 1 if mob.alive else 0,
+                    "target_player": tp,
+                    "looted": looted,
+                    "attackable": 1 if alive else 0,
                     "vendor": 0,
                 })
         # Include quest NPCs
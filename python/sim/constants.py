@@ -1110,19 +1110,25 @@ for _ranks in SPELL_RANKS.values():
     for _lvl, _sid in _ranks:
         ALL_RANKED_SPELL_IDS.add(_sid)
 
+# family -> best spell_id per player level (index = level, None = not learned)
+_RANK_TABLE_LEVELS = 101
+BEST_RANK_BY_LEVEL = {}
+for _fam, _ranks in SPELL_RANKS.items():
+    _table = [None] * _RANK_TABLE_LEVELS
+    for _lvl, _sid in _ranks:
+        for _l in range(max(_lvl, 0), _RANK_TABLE_LEVELS):
+            _table[_l] = _sid
+    BEST_RANK_BY_LEVEL[_fam] = _table
+
 def get_best_rank(family_id, player_level):
     """Return the highest-rank spell_id available at the given player level.
 
     Returns None if the player hasn't learned any rank yet.
     """
-    ranks = SPELL_RANKS.get(family_id)
-    if not ranks:
+    table = BEST_RANK_BY_LEVEL.get(family_id)
+    if table is None or player_level < 0:
         return None
-    best = None
-    for lvl_req, spell_id in ranks:
-        if player_level >= lvl_req:
-            best = spell_id
-    return best
+    return table[min(player_level, _RANK_TABLE_LEVELS - 1)]
 
 # Spell level requirements from trainer_spell table (all ranks)
 SPELL_LEVEL_REQ = {}
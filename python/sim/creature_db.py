@@ -7,11 +7,20 @@ Usage:
     # db.spatial_index[(map, chunk_x, chunk_y)] -> [SpawnPoint, ...]
     # db.templates[entry] -> CreatureTemplate
     # db.get_mob_stats(template, level) -> {hp, min_damage, max_damage, xp}
+    # template.stats(level) -> (hp, min_damage, max_damage, xp)  (cached tuple)
+
+CSVs are read through sim.csv_cache, so repeated loads map a binary
+columnar cache instead of re-parsing the text.
 """
 
-import csv
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+from sim.csv_cache import StrColumn, load_columns
+from sim.shared_world import (GroupView, RecordView, pack_groups, pack_records,
+                              pack_strings)
 
 CHUNK_SIZE = 100.0  # 100x100 world-units per chunk
 
@@ -54,6 +63,41 @@ def _interpolate(x: int, xs: list, ys: list) -> int:
 _CLASS_HP_MULT = {1: 1.0, 2: 0.75, 8: 0.55}
 _CLASS_DMG_MULT = {1: 1.0, 2: 0.80, 8: 0.65}
 
+# ─── Precompiled Base Tables ─────────────────────────────────────────
+# Dense per-(unit_class, level) rows of (hp, min_damage, max_damage, xp),
+# built once from the anchors above. Levels outside [1, MAX_BASE_LEVEL]
+# clamp like _interpolate does. Unlisted unit classes use multiplier 1.0,
+# i.e. the class-1 row.
+
+MAX_BASE_LEVEL = 83   # last anchor level
+
+
+def _compile_base_rows(unit_class: int) -> tuple[tuple[int, int, int, int], ...]:
+    hp_mult = _CLASS_HP_MULT.get(unit_class, 1.0)
+    dmg_mult = _CLASS_DMG_MULT.get(unit_class, 1.0)
+    rows = []
+    for level in range(MAX_BASE_LEVEL + 1):
+        lvl = max(1, level)
+        hp = max(1, int(_interpolate(lvl, _HP_ANCHORS_X, _HP_ANCHORS_Y) * hp_mult))
+        dmin = max(1, int(_interpolate(lvl, _DMG_MIN_ANCHORS_X, _DMG_MIN_ANCHORS_Y) * dmg_mult))
+        dmax = max(1, int(_interpolate(lvl, _DMG_MAX_ANCHORS_X, _DMG_MAX_ANCHORS_Y) * dmg_mult))
+        xp = _interpolate(lvl, _XP_ANCHORS_X, _XP_ANCHORS_Y)
+        rows.append((hp, dmin, dmax, xp))
+    return tuple(rows)
+
+
+_BASE_ROWS: dict[int, tuple] = {uc: _compile_base_rows(uc) for uc in (1, 2, 8)}
+
+
+def base_stat_row(level: int, unit_class: int = 1) -> tuple[int, int, int, int]:
+    """(hp, min_damage, max_damage, xp) base values before template modifiers."""
+    rows = _BASE_ROWS.get(unit_class) or _BASE_ROWS[1]
+    if level < 1:
+        level = 1
+    elif level > MAX_BASE_LEVEL:
+        level = MAX_BASE_LEVEL
+    return rows[level]
+
 # Faction 35 = friendly to all. Other Alliance-friendly factions:
 FRIENDLY_FACTIONS = frozenset({
     1,    # Human (Player)
@@ -113,6 +157,28 @@ class CreatureTemplate:
     creature_type: int
     flags_extra: int = 0
     lootid: int = 0       # creature_template.lootid → creature_loot_template.Entry
+    # Per-level (hp, min_dmg, max_dmg, xp) for min_level..max_level, compiled on first use
+    _stat_rows: tuple = field(default=(), repr=False, compare=False)
+
+    def stats(self, level: int) -> tuple[int, int, int, int]:
+        """(hp, min_damage, max_damage, xp) at ``level`` with template modifiers."""
+        rows = self._stat_rows
+        if not rows:
+            rows = self._stat_rows = tuple(
+                self._compile_stats(lvl)
+                for lvl in range(self.min_level, max(self.min_level, self.max_level) + 1))
+        i = level - self.min_level
+        if 0 <= i < len(rows):
+            return rows[i]
+        return self._compile_stats(level)
+
+    def _compile_stats(self, level: int) -> tuple[int, int, int, int]:
+        base_hp, base_min, base_max, base_xp = base_stat_row(level, self.unit_class)
+        hp = max(1, int(base_hp * self.health_modifier))
+        min_dmg = max(1, int(base_min * self.damage_modifier))
+        max_dmg = max(min_dmg, int(base_max * self.damage_modifier))
+        xp = max(1, int(base_xp * self.experience_modifier))
+        return hp, min_dmg, max_dmg, xp
 
     @property
     def is_attackable(self) -> bool:
@@ -170,6 +236,45 @@ class SpawnPoint:
 
 # ─── CreatureDB ──────────────────────────────────────────────────────
 
+# Columns read from the CSVs ('i' int, 'f' float, 's' str); see sim.csv_cache
+TEMPLATE_COLUMNS = {
+    'entry': 'i', 'name': 's', 'minlevel': 'i', 'maxlevel': 'i',
+    'faction': 'i', 'npcflag': 'i', 'detection_range': 'f', 'rank': 'i',
+    'BaseAttackTime': 'i', 'mingold': 'i', 'maxgold': 'i',
+    'HealthModifier': 'f', 'DamageModifier': 'f', 'ExperienceModifier': 'f',
+    'unit_class': 'i', 'unit_flags': 'i', 'type': 'i', 'flags_extra': 'i',
+    'lootid': 'i',
+}
+SPAWN_COLUMNS = {
+    'guid': 'i', 'id1': 'i', 'map': 'i', 'position_x': 'f', 'position_y': 'f',
+    'position_z': 'f', 'orientation': 'f', 'npcflag': 'i', 'unit_flags': 'i',
+}
+
+
+# Packed layouts for CreatureDB.to_arrays()/from_arrays()
+_TEMPLATE_FIELDS = tuple(
+    (f.name, np.float64 if f.type is float else np.int64)
+    for f in fields(CreatureTemplate) if f.name not in ('name', '_stat_rows'))
+_SPAWN_FIELDS = tuple(
+    (f.name, np.float64 if f.type is float else np.int64) for f in fields(SpawnPoint))
+
+
+def _chunk_code(key: tuple[int, int, int]) -> int:
+    """Pack a (map, chunk_x, chunk_y) key into one sortable int."""
+    map_id, cx, cy = key
+    return (map_id << 32) | ((cx + 0x8000) << 16) | (cy + 0x8000)
+
+
+def _chunk_key(code: int) -> tuple[int, int, int]:
+    return code >> 32, ((code >> 16) & 0xFFFF) - 0x8000, (code & 0xFFFF) - 0x8000
+
+
+def _column(cols, name: str, default) -> list:
+    """Column as a Python list, or ``default`` per row if the CSV lacks it."""
+    col = cols.get(name)
+    return col.tolist() if col is not None else [default] * cols.rows
+
+
 class CreatureDB:
     """Loads creature data from CSV and builds a spatial index for chunk-based spawning."""
 
@@ -194,102 +299,133 @@ class CreatureDB:
                   f"{len(self.spatial_index)} chunks")
 
     def _load_templates(self, path: str):
-        with open(path, 'r') as f:
-            reader = csv.DictReader(f, delimiter=';', quotechar='"')
-            for row in reader:
-                entry = int(row['entry'])
-                # lootid: use CSV column if present, otherwise default to entry
-                lootid = int(row['lootid']) if 'lootid' in row else entry
-                self.templates[entry] = CreatureTemplate(
-                    entry=entry,
-                    name=row['name'],
-                    min_level=int(row['minlevel']),
-                    max_level=int(row['maxlevel']),
-                    faction=int(row['faction']),
-                    npcflag=int(row['npcflag']),
-                    detection_range=float(row['detection_range']),
-                    rank=int(row['rank']),
-                    base_attack_time=int(row['BaseAttackTime']),
-                    min_gold=int(row['mingold']),
-                    max_gold=int(row['maxgold']),
-                    health_modifier=float(row['HealthModifier']),
-                    damage_modifier=float(row['DamageModifier']),
-                    experience_modifier=float(row['ExperienceModifier']),
-                    unit_class=int(row['unit_class']),
-                    unit_flags=int(row['unit_flags']),
-                    creature_type=int(row['type']),
-                    flags_extra=int(row.get('flags_extra', 0)),
-                    lootid=lootid,
-                )
+        cols = load_columns(path, TEMPLATE_COLUMNS)
+        entries = cols['entry'].tolist()
+        # lootid: use CSV column if present, otherwise default to entry
+        lootids = cols['lootid'].tolist() if 'lootid' in cols else entries
+        # Columns in CreatureTemplate field order
+        for row in zip(entries, cols['name'].tolist(),
+                       cols['minlevel'].tolist(), cols['maxlevel'].tolist(),
+                       cols['faction'].tolist(), cols['npcflag'].tolist(),
+                       cols['detection_range'].tolist(), cols['rank'].tolist(),
+                       cols['BaseAttackTime'].tolist(),
+                       cols['mingold'].tolist(), cols['maxgold'].tolist(),
+                       cols['HealthModifier'].tolist(),
+                       cols['DamageModifier'].tolist(),
+                       cols['ExperienceModifier'].tolist(),
+                       cols['unit_class'].tolist(), cols['unit_flags'].tolist(),
+                       cols['type'].tolist(), _column(cols, 'flags_extra', 0),
+                       lootids):
+            self.templates[row[0]] = CreatureTemplate(*row)
 
     def _load_spawns(self, path: str):
-        with open(path, 'r') as f:
-            reader = csv.DictReader(f, delimiter=';', quotechar='"')
-            for row in reader:
-                entry = int(row['id1'])
-                tmpl = self.templates.get(entry)
-                if tmpl is None:
-                    continue
-
-                map_id = int(row['map'])
-                x = float(row['position_x'])
-                y = float(row['position_y'])
-                z = float(row['position_z'])
-                orientation = float(row['orientation'])
-
-                sp = SpawnPoint(
-                    guid=int(row['guid']),
-                    entry=entry,
-                    map_id=map_id,
-                    x=x, y=y, z=z,
-                    orientation=orientation,
-                )
-
-                chunk_key = (map_id, int(x // CHUNK_SIZE), int(y // CHUNK_SIZE))
-
-                if tmpl.is_vendor:
-                    self.vendor_index.setdefault(chunk_key, []).append(sp)
-                elif tmpl.is_attackable:
-                    # Spawn-level overrides: skip if spawn has NPC flags or non-attackable
-                    spawn_npcflag = int(row.get('npcflag', 0))
-                    spawn_unit_flags = int(row.get('unit_flags', 0))
-                    if spawn_npcflag != 0:
-                        continue
-                    if spawn_unit_flags & UNIT_FLAG_NON_ATTACKABLE:
-                        continue
-                    self.spatial_index.setdefault(chunk_key, []).append(sp)
+        cols = load_columns(path, SPAWN_COLUMNS)
+        if not cols.rows or not self.templates:
+            return
+
+        # Per-spawn template kind: 0 = unknown/ignored, 1 = vendor, 2 = attackable
+        tmpl_entries = np.array(sorted(self.templates), dtype=np.int64)
+        tmpl_kind = np.array([1 if t.is_vendor else 2 if t.is_attackable else 0
+                              for t in (self.templates[e] for e in tmpl_entries.tolist())],
+                             dtype=np.int8)
+        entries = cols['id1']
+        pos = np.minimum(np.searchsorted(tmpl_entries, entries), len(tmpl_entries) - 1)
+        kind = np.where(tmpl_entries[pos] == entries, tmpl_kind[pos], 0)
+
+        # Spawn-level overrides: skip if spawn has NPC flags or non-attackable
+        attackable = kind == 2
+        if 'npcflag' in cols:
+            attackable &= cols['npcflag'] == 0
+        if 'unit_flags' in cols:
+            attackable &= (cols['unit_flags'] & UNIT_FLAG_NON_ATTACKABLE) == 0
+        keep = np.nonzero((kind == 1) | attackable)[0]
+        if not len(keep):
+            return
+
+        xs = cols['position_x'][keep]
+        ys = cols['position_y'][keep]
+        cxs = np.floor_divide(xs, CHUNK_SIZE).astype(np.int64)
+        cys = np.floor_divide(ys, CHUNK_SIZE).astype(np.int64)
+        for guid, entry, map_id, x, y, z, orientation, cx, cy, is_vendor in zip(
+                cols['guid'][keep].tolist(), entries[keep].tolist(),
+                cols['map'][keep].tolist(), xs.tolist(), ys.tolist(),
+                cols['position_z'][keep].tolist(),
+                cols['orientation'][keep].tolist(),
+                cxs.tolist(), cys.tolist(), (kind[keep] == 1).tolist()):
+            sp = SpawnPoint(
+                guid=guid,
+                entry=entry,
+                map_id=map_id,
+                x=x, y=y, z=z,
+                orientation=orientation,
+            )
+            index = self.vendor_index if is_vendor else self.spatial_index
+            index.setdefault((map_id, cx, cy), []).append(sp)
+
+    # ─── Shared Arrays ──────────────────────────────────────────
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Pack templates and spawn indexes into flat arrays (see from_arrays)."""
+        tmpls = [self.templates[e] for e in sorted(self.templates)]
+        arrays = pack_records('tmpl', tmpls, _TEMPLATE_FIELDS)
+        arrays['tmpl.name.offsets'], arrays['tmpl.name.blob'] = pack_strings(
+            [t.name for t in tmpls])
+        for prefix, index in (('spawn', self.spatial_index), ('vendor', self.vendor_index)):
+            arrays.update(pack_groups(
+                prefix, {_chunk_code(k): v for k, v in index.items()}, _SPAWN_FIELDS))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> 'CreatureDB':
+        """CreatureDB view over to_arrays() output (e.g. SharedWorld memory).
+
+        Templates and per-chunk spawn lists are built on first lookup.
+        """
+        db = cls.__new__(cls)
+        db._quiet = True
+        names = StrColumn(arrays['tmpl.name.offsets'], arrays['tmpl.name.blob'])
+        tmpl_cols = [(name, arrays[f'tmpl.{name}']) for name, _ in _TEMPLATE_FIELDS]
+
+        def template(i: int) -> CreatureTemplate:
+            return CreatureTemplate(name=names[i],
+                                    **{name: col[i].item() for name, col in tmpl_cols})
+
+        db.templates = RecordView(arrays['tmpl.entry'], template)
+        db.spatial_index = cls._spawn_view(arrays, 'spawn')
+        db.vendor_index = cls._spawn_view(arrays, 'vendor')
+        return db
+
+    @staticmethod
+    def _spawn_view(arrays: dict[str, np.ndarray], prefix: str) -> GroupView:
+        cols = [arrays[f'{prefix}.{name}'] for name, _ in _SPAWN_FIELDS]
+
+        def spawns(start: int, end: int) -> list[SpawnPoint]:
+            return [SpawnPoint(*row) for row in zip(*(c[start:end].tolist() for c in cols))]
+
+        return GroupView(arrays[f'{prefix}.keys'], arrays[f'{prefix}.starts'], spawns,
+                         encode=_chunk_code, decode=_chunk_key)
 
     # ─── Stat Calculation ────────────────────────────────────────
 
     @staticmethod
     def get_base_hp(level: int, unit_class: int = 1) -> int:
-        base = _interpolate(level, _HP_ANCHORS_X, _HP_ANCHORS_Y)
-        mult = _CLASS_HP_MULT.get(unit_class, 1.0)
-        return max(1, int(base * mult))
+        return base_stat_row(level, unit_class)[0]
 
     @staticmethod
     def get_base_damage(level: int, unit_class: int = 1) -> tuple[int, int]:
-        base_min = _interpolate(level, _DMG_MIN_ANCHORS_X, _DMG_MIN_ANCHORS_Y)
-        base_max = _interpolate(level, _DMG_MAX_ANCHORS_X, _DMG_MAX_ANCHORS_Y)
-        mult = _CLASS_DMG_MULT.get(unit_class, 1.0)
-        return max(1, int(base_min * mult)), max(1, int(base_max * mult))
+        row = base_stat_row(level, unit_class)
+        return row[1], row[2]
 
     @staticmethod
     def get_base_xp(level: int) -> int:
-        return _interpolate(level, _XP_ANCHORS_X, _XP_ANCHORS_Y)
+        return base_stat_row(level)[3]
 
     def get_mob_stats(self, tmpl: CreatureTemplate, level: int) -> dict:
-        """Compute concrete HP, damage, and XP for a mob at a specific level."""
-        base_hp = self.get_base_hp(level, tmpl.unit_class)
-        hp = max(1, int(base_hp * tmpl.health_modifier))
-
-        base_min, base_max = self.get_base_damage(level, tmpl.unit_class)
-        min_dmg = max(1, int(base_min * tmpl.damage_modifier))
-        max_dmg = max(min_dmg, int(base_max * tmpl.damage_modifier))
-
-        base_xp = self.get_base_xp(level)
-        xp = max(1, int(base_xp * tmpl.experience_modifier))
+        """Compute concrete HP, damage, and XP for a mob at a specific level.
 
+        Dict view of ``tmpl.stats(level)``; hot paths use the tuple directly.
+        """
+        hp, min_dmg, max_dmg, xp = tmpl.stats(level)
         return {
             'hp': hp,
             'min_damage': min_dmg,
@@ -0,0 +1,274 @@
+"""
+Versioned binary columnar cache for the AzerothCore CSV exports.
+
+Parsing creature.csv / item_template.csv with csv.DictReader and int()/float()
+per field dominates startup, and every SubprocVecEnv worker repeats it. The
+first load of a CSV writes its requested columns to
+``<data_dir>/.colcache/<name>.cols``; later loads memory-map that file and
+hand out read-only NumPy views, so workers share the page cache instead of
+each parsing its own copy.
+
+A cache is valid when it was written by the same FORMAT_VERSION for the same
+column spec and the CSV still has the recorded (mtime, size). If only the
+mtime changed (checkout, copy) the recorded SHA-1 of the CSV decides, and a
+matching cache is re-stamped instead of rebuilt.
+
+File layout (all offsets 64-byte aligned):
+    MAGIC | u32 version | u32 header_len | JSON header | column blocks
+Numeric columns are raw little-endian int64/float64; string columns are an
+int64 offsets array (rows+1) plus one UTF-8 blob.
+
+Usage:
+    cols = load_columns(path, {'entry': 'i', 'name': 's', 'rate': 'f'})
+    cols['entry']           # np.ndarray (int64, read-only)
+    cols['name'][3]         # str
+    'lootid' in cols        # False if the CSV has no such column
+
+    python -m sim.csv_cache /path/to/data     # compile every known table
+"""
+
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b'ACCOLS\0\0'
+FORMAT_VERSION = 1
+CACHE_DIRNAME = '.colcache'
+
+_ALIGN = 64
+_PREFIX = struct.Struct('<8sII')
+_DTYPES = {'i': np.dtype('<i8'), 'f': np.dtype('<f8')}
+
+
+class StrColumn:
+    """Read-only string column over an offsets array and a UTF-8 blob."""
+
+    __slots__ = ('_offsets', '_blob')
+
+    def __init__(self, offsets: np.ndarray, blob: bytes | memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+    def tolist(self) -> list[str]:
+        blob = bytes(self._blob)
+        bounds = self._offsets.tolist()
+        return [blob[a:b].decode('utf-8') for a, b in zip(bounds, bounds[1:])]
+
+    @classmethod
+    def from_strings(cls, values: list[str]) -> 'StrColumn':
+        encoded = [v.encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, b''.join(encoded))
+
+
+class Columns(dict):
+    """Column name -> array/StrColumn for every requested column in the CSV."""
+
+    def __init__(self, rows: int, data: dict):
+        super().__init__(data)
+        self.rows = rows
+
+
+# ─── Public API ──────────────────────────────────────────────────────
+
+def load_columns(path: str, spec: dict[str, str],
+                 cache_dir: str | None = None) -> Columns:
+    """Load the ``spec`` columns ('i' int, 'f' float, 's' str) of a CSV.
+
+    Columns missing from the CSV header are left out of the result. Falls
+    back to an in-memory parse if the cache directory is not writable.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), CACHE_DIRNAME)
+    cache_path = os.path.join(cache_dir, os.path.basename(path) + '.cols')
+    st = os.stat(path)
+
+    cached = _open_cache(cache_path, spec)
+    if cached is not None:
+        header, cols = cached
+        if header['mtime_ns'] == st.st_mtime_ns and header['size'] == st.st_size:
+            return cols
+        if header['size'] == st.st_size and header['sha1'] == _sha1(path):
+            _try_write(cache_path, spec, cols, st, header['sha1'])
+            return cols
+
+    cols = _parse_csv(path, spec)
+    if _try_write(cache_path, spec, cols, st, _sha1(path)):
+        reopened = _open_cache(cache_path, spec)
+        if reopened is not None:
+            return reopened[1]
+    return cols
+
+
+def compile_data_dir(data_dir: str, quiet: bool = False) -> list[str]:
+    """Build or refresh the caches for every known CSV in ``data_dir``.
+
+    Run once before forking training workers so they all map the same files.
+    """
+    from sim.creature_db import TEMPLATE_COLUMNS, SPAWN_COLUMNS
+    from sim.loot_db import ITEM_COLUMNS, LOOT_COLUMNS
+
+    tables = {
+        'creature_template.csv': TEMPLATE_COLUMNS,
+        'creature.csv': SPAWN_COLUMNS,
+        'item_template.csv': ITEM_COLUMNS,
+        'creature_loot_template.csv': LOOT_COLUMNS,
+        'reference_loot_template.csv': LOOT_COLUMNS,
+    }
+    done = []
+    for name, spec in tables.items():
+        path = os.path.join(data_dir, name)
+        if not os.path.isfile(path):
+            continue
+        cols = load_columns(path, spec)
+        done.append(name)
+        if not quiet:
+            print(f"  [csv_cache] {name}: {cols.rows} rows, "
+                  f"{len(cols)}/{len(spec)} columns")
+    return done
+
+
+# ─── Cache file ──────────────────────────────────────────────────────
+
+def _sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _open_cache(cache_path: str, spec: dict[str, str]):
+    """(header, Columns) of a cache file for ``spec``, or None."""
+    try:
+        with open(cache_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, version, header_len = _PREFIX.unpack_from(mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return None
+        header = json.loads(bytes(mm[_PREFIX.size:_PREFIX.size + header_len]))
+    except (struct.error, ValueError):
+        return None
+    if header.get('spec') != spec:
+        return None
+
+    rows = header['rows']
+    view = memoryview(mm)
+    data = {}
+    for name, kind, offset, extra in header['columns']:
+        if kind == 's':
+            offsets = np.frombuffer(mm, dtype='<i8', count=rows + 1, offset=offset)
+            data[name] = StrColumn(offsets, view[extra:extra + int(offsets[-1])])
+        else:
+            data[name] = np.frombuffer(mm, dtype=_DTYPES[kind], count=rows, offset=offset)
+    return header, Columns(rows, data)
+
+
+def _try_write(cache_path: str, spec: dict[str, str], cols: Columns,
+               st: os.stat_result, sha1: str) -> bool:
+    """Atomically write ``cols`` to ``cache_path``; False if not writable."""
+    blocks: list[bytes] = []
+    layout = []
+    pos = 0
+
+    def place(buf: bytes) -> int:
+        nonlocal pos
+        start = pos
+        blocks.append(buf)
+        pad = -len(buf) % _ALIGN
+        if pad:
+            blocks.append(b'\0' * pad)
+        pos += len(buf) + pad
+        return start
+
+    for name, kind in spec.items():
+        col = cols.get(name)
+        if col is None:
+            continue
+        if kind == 's':
+            off = place(np.ascontiguousarray(col._offsets, dtype='<i8').tobytes())
+            layout.append([name, kind, off, place(bytes(col._blob))])
+        else:
+            buf = np.ascontiguousarray(col, dtype=_DTYPES[kind]).tobytes()
+            layout.append([name, kind, place(buf), 0])
+
+    # Column offsets are relative to the data start, which depends on the
+    # header length; grow the data start until the rebased header fits.
+    base = 0
+    while True:
+        header = {
+            'spec': spec, 'rows': cols.rows,
+            'columns': [[name, kind, off + base, extra + base if kind == 's' else 0]
+                        for name, kind, off, extra in layout],
+            'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha1': sha1,
+        }
+        raw = json.dumps(header).encode()
+        need = _PREFIX.size + len(raw)
+        need += -need % _ALIGN
+        if need <= base:
+            break
+        base = need
+    raw = raw.ljust(base - _PREFIX.size)
+
+    tmp = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(raw)))
+            f.write(raw)
+            for buf in blocks:
+                f.write(buf)
+        os.replace(tmp, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+# ─── CSV parsing ─────────────────────────────────────────────────────
+
+def _parse_csv(path: str, spec: dict[str, str]) -> Columns:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, delimiter=';', quotechar='"')
+        fields = next(reader, [])
+        rows = list(reader)
+    index = {name: i for i, name in enumerate(fields)}
+    data = {}
+    for name, kind in spec.items():
+        i = index.get(name)
+        if i is None:
+            continue
+        values = [row[i] for row in rows]
+        if kind == 's':
+            data[name] = StrColumn.from_strings(values)
+        elif kind == 'i':
+            data[name] = np.array([int(v) for v in values], dtype=_DTYPES['i'])
+        else:
+            data[name] = np.array([float(v) for v in values], dtype=_DTYPES['f'])
+    return Columns(len(rows), data)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python -m sim.csv_cache <data_dir>")
+        sys.exit(1)
+    compile_data_dir(sys.argv[1])
@@ -11,6 +11,10 @@ corrected hardcoded approximations.
 """
 
 import math
+from bisect import bisect_right
+from functools import lru_cache
+
+import numpy as np
 
 import sim.constants as _c
 from sim.constants import (
@@ -160,6 +164,11 @@ def _rating_to_pct(rating, l80_value_or_cr_type, level):
     l80_value = l80_value_or_cr_type
     if not isinstance(l80_value, (int, float)):
         return 0.0
+    return rating / _fallback_rating_per_pct(l80_value, level)
+
+
+def _fallback_rating_per_pct(l80_value: float, level: int) -> float:
+    """Rating per 1% at ``level`` from the L80 anchor and the scaling curve."""
     scale = _RATING_LEVEL_SCALE
     if level <= scale[0][0]:
         factor = scale[0][1]
@@ -172,8 +181,7 @@ def _rating_to_pct(rating, l80_value_or_cr_type, level):
                 t = (level - scale[i][0]) / (scale[i + 1][0] - scale[i][0])
                 factor = scale[i][1] + t * (scale[i + 1][1] - scale[i][1])
                 break
-    rating_per_pct = max(0.01, l80_value * factor)
-    return rating / rating_per_pct
+    return max(0.01, l80_value * factor)
 
 
 # Map L80 anchor floats to CR type enums (for backward compat with old callers)
@@ -729,49 +737,19 @@ def resolve_mob_melee_attack(attacker_level: int, defender_level: int,
     WotLK uses a single roll against cumulative thresholds:
       miss -> dodge -> parry -> block -> crit -> crushing -> normal
 
+    The thresholds come from mob_melee_table (cached per level pair and
+    defender stats); the roll is placed with one bisect.
+
     Args:
         roll: 0-100 uniform random value (for deterministic testing)
 
     Returns one of: MELEE_MISS, MELEE_DODGE, MELEE_PARRY, MELEE_BLOCK,
                     MELEE_CRIT, MELEE_CRUSHING, MELEE_NORMAL
     """
-    miss = mob_melee_miss_chance(attacker_level, defender_level,
-                                defender_defense_bonus)
-    crit = mob_melee_crit_chance(attacker_level, defender_level,
-                                defender_defense_bonus,
-                                defender_resilience_pct)
-    crushing = mob_crushing_chance(attacker_level, defender_level)
-
-    # Cumulative thresholds on a single 0-100 roll
-    threshold = 0.0
-
-    threshold += miss
-    if roll < threshold:
-        return MELEE_MISS
-
-    threshold += defender_dodge
-    if roll < threshold:
-        return MELEE_DODGE
-
-    threshold += defender_parry
-    if roll < threshold:
-        return MELEE_PARRY
-
-    # Block: checked before crit in WotLK (block can't prevent crit,
-    # but in the single-roll table block is checked before crit)
-    threshold += defender_block
-    if roll < threshold:
-        return MELEE_BLOCK
-
-    threshold += crit
-    if roll < threshold:
-        return MELEE_CRIT
-
-    threshold += crushing
-    if roll < threshold:
-        return MELEE_CRUSHING
-
-    return MELEE_NORMAL
+    table = mob_melee_table(attacker_level, defender_level, defender_dodge,
+                            defender_parry, defender_block,
+                            defender_defense_bonus, defender_resilience_pct)
+    return MELEE_OUTCOMES[bisect_right(table, roll)]
 
 
 def resolve_spell_hit(player_level: int, mob_level: int,
@@ -787,9 +765,99 @@ def resolve_spell_hit(player_level: int, mob_level: int,
         roll_hit: 0-100 for miss check
         roll_crit: 0-100 for crit check
     """
-    miss = spell_miss_chance(player_level, mob_level, hit_bonus_pct)
+    miss = _spell_miss_cached(player_level, mob_level, hit_bonus_pct)
     if roll_hit < miss:
         return SPELL_MISS
     if roll_crit < spell_crit_pct:
         return SPELL_CRIT
     return SPELL_HIT
+
+
+# ─── Compiled attack tables ──────────────────────────────────────────
+# The chances above depend only on the level pair and the defender's
+# avoidance/defense/resilience (or the caster's hit bonus), which change
+# on level-up and gear swaps, not per swing. The tables are cached per
+# distinct argument tuple; the batch variants build one row per swing.
+
+# Outcome order of the single-roll table; index = bisect_right(table, roll)
+MELEE_OUTCOMES = (MELEE_MISS, MELEE_DODGE, MELEE_PARRY, MELEE_BLOCK,
+                  MELEE_CRIT, MELEE_CRUSHING, MELEE_NORMAL)
+SPELL_OUTCOMES = (SPELL_MISS, SPELL_HIT, SPELL_CRIT)
+
+_spell_miss_cached = lru_cache(maxsize=4096)(spell_miss_chance)
+
+
+@lru_cache(maxsize=4096)
+def mob_melee_table(attacker_level: int, defender_level: int,
+                    defender_dodge: float, defender_parry: float,
+                    defender_block: float,
+                    defender_defense_bonus: float = 0.0,
+                    defender_resilience_pct: float = 0.0) -> tuple[float, ...]:
+    """Cumulative upper bounds (0-100) of the first six MELEE_OUTCOMES.
+
+    A roll below ``table[i]`` (and not below ``table[i-1]``) is outcome i;
+    rolls past the last bound are MELEE_NORMAL.
+    """
+    miss = mob_melee_miss_chance(attacker_level, defender_level,
+                                 defender_defense_bonus)
+    crit = mob_melee_crit_chance(attacker_level, defender_level,
+                                 defender_defense_bonus,
+                                 defender_resilience_pct)
+    crushing = mob_crushing_chance(attacker_level, defender_level)
+    table = []
+    threshold = 0.0
+    for chance in (miss, defender_dodge, defender_parry, defender_block,
+                   crit, crushing):
+        threshold += chance
+        table.append(threshold)
+    return tuple(table)
+
+
+def mob_melee_tables(attacker_levels, defender_levels,
+                     defender_dodge, defender_parry, defender_block=0.0,
+                     defender_defense_bonus=0.0,
+                     defender_resilience_pct=0.0) -> np.ndarray:
+    """mob_melee_table for arrays of swings: (N, 6) cumulative bounds.
+
+    Arguments broadcast against each other (levels as int arrays, stats
+    as arrays or scalars).
+    """
+    attacker_skill = np.asarray(attacker_levels) * 5
+    defender_skill = np.asarray(defender_levels) * 5 + defender_defense_bonus
+    miss = np.maximum(5.0 + (defender_skill - attacker_skill) * 0.04, 0.0)
+    crit = np.maximum(5.0 + (attacker_skill - defender_skill) * 0.04
+                      - defender_resilience_pct, 0.0)
+    gap = (np.asarray(attacker_levels) * 5) - (np.asarray(defender_levels) * 5)
+    crushing = np.where(gap < 15, 0.0, np.maximum(0.0, (gap - 15) * 2.0))
+    chances = np.broadcast_arrays(miss, defender_dodge, defender_parry,
+                                  defender_block, crit, crushing)
+    return np.cumsum(np.stack(chances, axis=-1).astype(np.float64), axis=-1)
+
+
+def resolve_melee_rolls(tables: np.ndarray, rolls: np.ndarray) -> np.ndarray:
+    """MELEE_OUTCOMES indices (int8) for many 0-100 rolls at once.
+
+    ``tables`` is one (6,) table shared by every roll (searchsorted) or
+    one (N, 6) row per roll.
+    """
+    tables = np.asarray(tables, dtype=np.float64)
+    rolls = np.asarray(rolls, dtype=np.float64)
+    if tables.ndim == 1:
+        return np.searchsorted(tables, rolls, side='right').astype(np.int8)
+    return (rolls[:, None] >= tables).sum(axis=1).astype(np.int8)
+
+
+def spell_miss_chances(player_levels, mob_levels, hit_bonus_pct=0.0) -> np.ndarray:
+    """spell_miss_chance for arrays of (player level, mob level, hit bonus)."""
+    diff = np.asarray(mob_levels) - np.asarray(player_levels)
+    base = np.where(diff <= 0, np.maximum(4.0 + diff, 1.0),
+           np.where(diff == 1, 5.0,
+           np.where(diff == 2, 6.0, 17.0 + (diff - 3) * 11.0)))
+    return np.maximum(base - hit_bonus_pct, 1.0)
+
+
+def resolve_spell_rolls(miss: np.ndarray, crit: np.ndarray,
+                        roll_hit: np.ndarray, roll_crit: np.ndarray) -> np.ndarray:
+    """SPELL_OUTCOMES indices (int8) for many casts: 0 miss, 1 hit, 2 crit."""
+    hit = np.asarray(roll_hit) >= miss
+    return np.where(hit, np.where(np.asarray(roll_crit) < crit, 2, 1), 0).astype(np.int8)
@@ -12,17 +12,44 @@ Implements the full AzerothCore loot group system:
   - chance=0 in grouped entries: equal share of remaining probability
   - References: resolved recursively from reference_loot_template
 
+Each table is compiled on first roll into a CompiledLoot: entries are
+pre-grouped, group weights become alias tables (one draw per pick) and
+references are linked in directly up to MAX_REFERENCE_DEPTH.
+
 Usage:
     loot_db = LootDB("/path/to/data")
     if loot_db.loaded:
         results = loot_db.roll_loot(creature_loot_id, rng)
         # results = [LootResult(item=ItemData(...), count=1), ...]
+        counts = loot_db.roll_loot_batch(creature_loot_id, 100_000, seed)
+        # counts = {item_entry: np.ndarray (per-roll drop counts), ...}
 """
 
-import csv
 import os
 import random
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
+import numpy as np
+
+from sim.csv_cache import StrColumn, load_columns
+from sim.shared_world import (GroupView, RecordView, pack_groups, pack_records,
+                              pack_strings)
+
+# Columns read from the CSVs ('i' int, 'f' float, 's' str); see sim.csv_cache
+ITEM_COLUMNS = {
+    'entry': 'i', 'name': 's', 'Quality': 'i', 'SellPrice': 'i',
+    'InventoryType': 'i', 'ItemLevel': 'i', 'class': 'i', 'subclass': 'i',
+    'armor': 'i', 'dmg_min1': 'f', 'dmg_max1': 'f', 'delay': 'i',
+    'ContainerSlots': 'i', 'BagFamily': 'i',
+    **{f'stat_type{i}': 'i' for i in range(1, 11)},
+    **{f'stat_value{i}': 'i' for i in range(1, 11)},
+}
+LOOT_COLUMNS = {
+    'Entry': 'i', 'Item': 'i', 'Reference': 'i', 'Chance': 'f',
+    'QuestRequired': 'i', 'LootMode': 'i', 'GroupId': 'i',
+    'MinCount': 'i', 'MaxCount': 'i',
+}
 
 
 @dataclass(slots=True)
@@ -65,6 +92,62 @@ class LootResult:
     count: int
 
 
+@dataclass(slots=True)
+class CompiledEntry:
+    """A loot entry resolved at compile time: an item or a linked reference."""
+    item: Optional[ItemData]             # None for references and unknown items
+    min_count: int
+    max_count: int                       # already >= min_count
+    reference: Optional['CompiledLoot'] = None
+    times: int = 1                       # passes over ``reference``
+
+
+@dataclass(slots=True)
+class CompiledGroup:
+    """One GroupId > 0: drops with ``total`` % chance, winner by alias table."""
+    total: float
+    prob: list[float]                    # alias acceptance per column
+    alias: list[int]
+    entries: list[CompiledEntry]
+
+
+@dataclass(slots=True)
+class CompiledLoot:
+    """A loot table ready to roll (see LootDB.compile_loot)."""
+    independent: list[tuple[float, CompiledEntry]] = field(default_factory=list)
+    groups: list[CompiledGroup] = field(default_factory=list)
+
+
+def build_alias(weights: list[float]) -> tuple[list[float], list[int]]:
+    """Vose alias table for ``weights`` (total > 0).
+
+    Column i is taken with probability prob[i], otherwise alias[i].
+    """
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, g = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] -= 1.0 - scaled[s]
+        (small if scaled[g] < 1.0 else large).append(g)
+    return prob, alias
+
+
+# Packed layouts for LootDB.to_arrays()/from_arrays()
+_ITEM_FIELDS = tuple(
+    (f.name, np.float64 if f.type is float else np.int64)
+    for f in fields(ItemData) if f.name not in ('name', 'stats'))
+_LOOT_FIELDS = tuple(
+    (f.name, np.float64 if f.type is float else np.int64) for f in fields(LootEntry))
+_MAX_ITEM_STATS = 10      # stat_type1..10
+
+
 class LootDB:
     """Loads AzerothCore loot tables and item data for realistic item drops.
 
@@ -79,6 +162,8 @@ class LootDB:
         self.creature_loot: dict[int, list[LootEntry]] = {}
         self.reference_loot: dict[int, list[LootEntry]] = {}
         self._quiet = quiet
+        self._compiled: dict[int, Optional[CompiledLoot]] = {}
+        self._compiled_refs: dict[tuple[int, int], CompiledLoot] = {}
 
         item_path = os.path.join(data_dir, 'item_template.csv')
         creature_loot_path = os.path.join(data_dir, 'creature_loot_template.csv')
@@ -106,35 +191,37 @@ class LootDB:
     # ─── CSV Loading ──────────────────────────────────────────────
 
     def _load_items(self, path: str):
-        with open(path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f, delimiter=';', quotechar='"')
-            for row in reader:
-                entry = int(row['entry'])
-                score = self._compute_score(row)
-                stats = self._parse_stats(row)
-                armor = int(row.get('armor', 0))
-                dmg_min = float(row.get('dmg_min1', 0))
-                dmg_max = float(row.get('dmg_max1', 0))
-                delay = int(row.get('delay', 1000))
-                weapon_dps = 0.0
-                if dmg_max > 0 and delay > 0:
-                    weapon_dps = (dmg_min + dmg_max) / 2.0 / (delay / 1000.0)
-                self.items[entry] = ItemData(
-                    entry=entry,
-                    name=row['name'],
-                    quality=int(row.get('Quality', 0)),
-                    sell_price=int(row.get('SellPrice', 0)),
-                    inventory_type=int(row.get('InventoryType', 0)),
-                    item_level=int(row.get('ItemLevel', 0)),
-                    item_class=int(row.get('class', 0)),
-                    item_subclass=int(row.get('subclass', 0)),
-                    score=score,
-                    stats=stats,
-                    armor=armor,
-                    weapon_dps=weapon_dps,
-                    container_slots=int(row.get('ContainerSlots', 0)),
-                    bag_family=int(row.get('BagFamily', 0)),
-                )
+        cols = load_columns(path, ITEM_COLUMNS)
+        names = list(cols)
+        # Rows as dicts of the present columns, so row.get() defaults still apply
+        for values in zip(*(cols[name].tolist() for name in names)):
+            row = dict(zip(names, values))
+            entry = row['entry']
+            score = self._compute_score(row)
+            stats = self._parse_stats(row)
+            armor = int(row.get('armor', 0))
+            dmg_min = float(row.get('dmg_min1', 0))
+            dmg_max = float(row.get('dmg_max1', 0))
+            delay = int(row.get('delay', 1000))
+            weapon_dps = 0.0
+            if dmg_max > 0 and delay > 0:
+                weapon_dps = (dmg_min + dmg_max) / 2.0 / (delay / 1000.0)
+            self.items[entry] = ItemData(
+                entry=entry,
+                name=row['name'],
+                quality=int(row.get('Quality', 0)),
+                sell_price=int(row.get('SellPrice', 0)),
+                inventory_type=int(row.get('InventoryType', 0)),
+                item_level=int(row.get('ItemLevel', 0)),
+                item_class=int(row.get('class', 0)),
+                item_subclass=int(row.get('subclass', 0)),
+                score=score,
+                stats=stats,
+                armor=armor,
+                weapon_dps=weapon_dps,
+                container_slots=int(row.get('ContainerSlots', 0)),
+                bag_family=int(row.get('BagFamily', 0)),
+            )
 
     @staticmethod
     def _parse_stats(row: dict) -> dict:
@@ -181,45 +268,110 @@ class LootDB:
         return (quality * 10) + item_level + armor + dps + (total_stats * 2)
 
     def _load_loot_table(self, path: str, target: dict):
-        with open(path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f, delimiter=';', quotechar='"')
-            for row in reader:
-                entry_id = int(row['Entry'])
-                le = LootEntry(
-                    item=int(row['Item']),
-                    reference=int(row.get('Reference', 0)),
-                    chance=float(row.get('Chance', 0)),
-                    quest_required=int(row.get('QuestRequired', 0)),
-                    loot_mode=int(row.get('LootMode', 1)),
-                    group_id=int(row.get('GroupId', 0)),
-                    min_count=int(row.get('MinCount', 1)),
-                    max_count=int(row.get('MaxCount', 1)),
-                )
-                if entry_id not in target:
-                    target[entry_id] = []
-                target[entry_id].append(le)
+        cols = load_columns(path, LOOT_COLUMNS)
+        n = cols.rows
+
+        def column(name: str, default) -> list:
+            return cols[name].tolist() if name in cols else [default] * n
+
+        for entry_id, item, reference, chance, quest_required, loot_mode, \
+                group_id, min_count, max_count in zip(
+                    cols['Entry'].tolist(), cols['Item'].tolist(),
+                    column('Reference', 0), column('Chance', 0.0),
+                    column('QuestRequired', 0), column('LootMode', 1),
+                    column('GroupId', 0), column('MinCount', 1),
+                    column('MaxCount', 1)):
+            le = LootEntry(
+                item=item,
+                reference=reference,
+                chance=chance,
+                quest_required=quest_required,
+                loot_mode=loot_mode,
+                group_id=group_id,
+                min_count=min_count,
+                max_count=max_count,
+            )
+            if entry_id not in target:
+                target[entry_id] = []
+            target[entry_id].append(le)
+
+    # ─── Shared Arrays ────────────────────────────────────────────
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Pack items and loot tables into flat arrays (see from_arrays)."""
+        items = [self.items[e] for e in sorted(self.items)]
+        arrays = pack_records('item', items, _ITEM_FIELDS)
+        arrays['item.name.offsets'], arrays['item.name.blob'] = pack_strings(
+            [it.name for it in items])
+        # stats dicts as fixed-width (type, value) rows in insertion order
+        stat_types = np.zeros((len(items), _MAX_ITEM_STATS), dtype=np.int64)
+        stat_values = np.zeros((len(items), _MAX_ITEM_STATS), dtype=np.int64)
+        stat_count = np.zeros(len(items), dtype=np.int64)
+        for i, it in enumerate(items):
+            stat_count[i] = len(it.stats)
+            for k, (st, sv) in enumerate(it.stats.items()):
+                stat_types[i, k] = st
+                stat_values[i, k] = sv
+        arrays['item.stat_types'] = stat_types
+        arrays['item.stat_values'] = stat_values
+        arrays['item.stat_count'] = stat_count
+        arrays.update(pack_groups('loot', self.creature_loot, _LOOT_FIELDS))
+        arrays.update(pack_groups('refloot', self.reference_loot, _LOOT_FIELDS))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> 'LootDB':
+        """LootDB view over to_arrays() output (e.g. SharedWorld memory).
+
+        Items and loot tables are built on first lookup.
+        """
+        db = cls.__new__(cls)
+        db._quiet = True
+        db._compiled = {}
+        db._compiled_refs = {}
+        names = StrColumn(arrays['item.name.offsets'], arrays['item.name.blob'])
+        item_cols = [(name, arrays[f'item.{name}']) for name, _ in _ITEM_FIELDS]
+        stat_types = arrays['item.stat_types']
+        stat_values = arrays['item.stat_values']
+        stat_count = arrays['item.stat_count']
+
+        def item(i: int) -> ItemData:
+            n = int(stat_count[i])
+            stats = dict(zip(stat_types[i, :n].tolist(), stat_values[i, :n].tolist()))
+            return ItemData(name=names[i], stats=stats,
+                            **{name: col[i].item() for name, col in item_cols})
+
+        db.items = RecordView(arrays['item.entry'], item)
+        db.creature_loot = cls._loot_view(arrays, 'loot')
+        db.reference_loot = cls._loot_view(arrays, 'refloot')
+        return db
 
-    # ─── Loot Rolling ─────────────────────────────────────────────
+    @staticmethod
+    def _loot_view(arrays: dict[str, np.ndarray], prefix: str) -> GroupView:
+        cols = [arrays[f'{prefix}.{name}'] for name, _ in _LOOT_FIELDS]
 
-    def roll_loot(self, loot_id: int, rng: random.Random) -> list[LootResult]:
-        """Roll the loot table for a creature.
+        def entries(start: int, end: int) -> list[LootEntry]:
+            return [LootEntry(*row) for row in zip(*(c[start:end].tolist() for c in cols))]
 
-        Implements AzerothCore group logic:
-        - Group 0: each entry rolls independently (chance %)
-        - Group N>0: exactly one entry wins per group (weighted selection)
-        - References: resolved recursively from reference_loot_template
-        """
+        return GroupView(arrays[f'{prefix}.keys'], arrays[f'{prefix}.starts'], entries)
+
+    # ─── Compilation ─────────────────────────────────────────────
+
+    def compile_loot(self, loot_id: int) -> Optional[CompiledLoot]:
+        """Compiled creature loot table (cached), or None if it has no entries."""
+        try:
+            return self._compiled[loot_id]
+        except KeyError:
+            pass
         entries = self.creature_loot.get(loot_id)
-        if not entries:
-            return []
-        return self._process_entries(entries, rng, depth=0)
+        table = self._compile(entries, depth=0) if entries else None
+        self._compiled[loot_id] = table
+        return table
 
-    def _process_entries(self, entries: list[LootEntry],
-                         rng: random.Random, depth: int) -> list[LootResult]:
+    def _compile(self, entries: list[LootEntry], depth: int) -> CompiledLoot:
+        table = CompiledLoot()
         if depth > self.MAX_REFERENCE_DEPTH:
-            return []
-
-        results: list[LootResult] = []
+            return table
 
         # Separate by group, skip quest-required items
         groups: dict[int, list[LootEntry]] = {}
@@ -228,71 +380,137 @@ class LootDB:
                 continue
             groups.setdefault(e.group_id, []).append(e)
 
-        # Group 0: independent rolls (each entry has its own chance)
-        for entry in groups.get(0, []):
-            if entry.chance <= 0:
-                # chance=0 in group 0 = guaranteed drop
-                self._resolve_entry(entry, rng, results, depth)
-            elif rng.random() * 100.0 < entry.chance:
-                self._resolve_entry(entry, rng, results, depth)
-
-        # Groups 1+: one winner per group
-        for gid, group_entries in sorted(groups.items()):
-            if gid == 0:
-                continue
+        # Group 0: independent rolls (chance=0 means a guaranteed drop)
+        for e in groups.pop(0, []):
+            table.independent.append((e.chance, self._compile_entry(e, depth)))
 
-            # Build effective chances
-            nonzero = [(e, e.chance) for e in group_entries if e.chance > 0]
+        # Groups 1+: one winner per group; chance=0 entries share what the
+        # others leave of 100% equally
+        for _, group_entries in sorted(groups.items()):
+            nonzero = [e for e in group_entries if e.chance > 0]
             zero_chance = [e for e in group_entries if e.chance <= 0]
-
-            nonzero_total = sum(c for _, c in nonzero)
-
-            # Entries with chance=0 share remaining probability equally
+            effective = [(e, e.chance) for e in nonzero]
             if zero_chance:
-                remaining = max(0.0, 100.0 - nonzero_total)
+                remaining = max(0.0, 100.0 - sum(e.chance for e in nonzero))
                 equal_share = remaining / len(zero_chance) if remaining > 0 else 0.0
-                effective = nonzero + [(e, equal_share) for e in zero_chance]
-            else:
-                effective = nonzero
-
-            total_chance = sum(c for _, c in effective)
-            if total_chance <= 0:
+                effective += [(e, equal_share) for e in zero_chance]
+            total = sum(c for _, c in effective)
+            if total <= 0:
                 continue
+            prob, alias = build_alias([c for _, c in effective])
+            table.groups.append(CompiledGroup(
+                total=total, prob=prob, alias=alias,
+                entries=[self._compile_entry(e, depth) for e, _ in effective]))
+        return table
 
-            # If total < 100, there's a chance nothing drops from this group
-            roll = rng.random() * 100.0
-            if roll >= total_chance:
-                continue
+    def _compile_entry(self, entry: LootEntry, depth: int) -> CompiledEntry:
+        if entry.reference != 0:
+            # MaxCount on a reference = how many times to process it
+            ref_entries = self.reference_loot.get(entry.reference)
+            if not ref_entries:
+                return CompiledEntry(item=None, min_count=0, max_count=0)
+            key = (entry.reference, depth + 1)
+            ref = self._compiled_refs.get(key)
+            if ref is None:
+                ref = self._compiled_refs[key] = self._compile(ref_entries, depth + 1)
+            return CompiledEntry(item=None, min_count=0, max_count=0,
+                                 reference=ref, times=max(1, entry.max_count))
+        return CompiledEntry(item=self.items.get(entry.item),
+                             min_count=entry.min_count,
+                             max_count=max(entry.min_count, entry.max_count))
 
-            # Pick one winner within the group
-            pick = rng.random() * total_chance
-            cumulative = 0.0
-            for entry, chance in effective:
-                cumulative += chance
-                if pick < cumulative:
-                    self._resolve_entry(entry, rng, results, depth)
-                    break
+    # ─── Loot Rolling ─────────────────────────────────────────────
+
+    def roll_loot(self, loot_id: int, rng: random.Random) -> list[LootResult]:
+        """Roll the loot table for a creature.
 
+        Implements AzerothCore group logic:
+        - Group 0: each entry rolls independently (chance %)
+        - Group N>0: exactly one entry wins per group (weighted selection)
+        - References: resolved recursively from reference_loot_template
+        """
+        table = self.compile_loot(loot_id)
+        if table is None:
+            return []
+        results: list[LootResult] = []
+        self._roll(table, rng, results)
         return results
 
-    def _resolve_entry(self, entry: LootEntry, rng: random.Random,
-                       results: list[LootResult], depth: int):
-        """Resolve a loot entry — either a direct item or a reference."""
-        if entry.reference != 0:
-            # Reference: process the referenced template
-            # MaxCount on a reference = how many times to process it
-            ref_entries = self.reference_loot.get(entry.reference, [])
-            if ref_entries:
-                times = max(1, entry.max_count)
-                for _ in range(times):
-                    sub = self._process_entries(ref_entries, rng, depth + 1)
-                    results.extend(sub)
-        else:
-            item = self.items.get(entry.item)
-            if item:
-                count = rng.randint(entry.min_count,
-                                    max(entry.min_count, entry.max_count))
-                results.append(LootResult(item=item, count=count))
+    def _roll(self, table: CompiledLoot, rng: random.Random,
+              results: list[LootResult]):
+        for chance, entry in table.independent:
+            if chance <= 0 or rng.random() * 100.0 < chance:
+                self._resolve(entry, rng, results)
+
+        for group in table.groups:
+            # If total < 100, there's a chance nothing drops from this group
+            if rng.random() * 100.0 >= group.total:
+                continue
+            # Pick one winner: the draw selects a column, its fraction the alias
+            x = rng.random() * len(group.entries)
+            i = int(x)
+            if x - i >= group.prob[i]:
+                i = group.alias[i]
+            self._resolve(group.entries[i], rng, results)
+
+    def _resolve(self, entry: CompiledEntry, rng: random.Random,
+                 results: list[LootResult]):
+        """Emit a direct item or process a reference ``times`` times."""
+        if entry.reference is not None:
+            for _ in range(entry.times):
+                self._roll(entry.reference, rng, results)
+        elif entry.item is not None:
+            count = rng.randint(entry.min_count, entry.max_count)
+            results.append(LootResult(item=entry.item, count=count))
+
+    def roll_loot_batch(self, loot_id: int, n: int,
+                        rng=None) -> dict[int, np.ndarray]:
+        """Roll a creature loot table ``n`` times at once (drop-rate analysis).
+
+        ``rng`` is a numpy Generator or anything np.random.default_rng()
+        accepts. Returns ``item entry -> int64 array of length n`` with the
+        count of that item dropped in each roll; items that never dropped
+        are absent.
+        """
+        rng = np.random.default_rng(rng)
+        counts: dict[int, np.ndarray] = {}
+        table = self.compile_loot(loot_id)
+        if table is not None and n > 0:
+            self._roll_batch(table, np.arange(n), n, rng, counts)
+        return counts
+
+    def _roll_batch(self, table: CompiledLoot, rolls: np.ndarray, n: int,
+                    rng: np.random.Generator, counts: dict[int, np.ndarray]):
+        """Vectorized _roll over the roll indices in ``rolls``."""
+        for chance, entry in table.independent:
+            hit = rolls if chance <= 0 else rolls[rng.random(len(rolls)) * 100.0 < chance]
+            self._resolve_batch(entry, hit, n, rng, counts)
+
+        for group in table.groups:
+            dropped = rolls[rng.random(len(rolls)) * 100.0 < group.total]
+            if not len(dropped):
+                continue
+            x = rng.random(len(dropped)) * len(group.entries)
+            col = x.astype(np.intp)
+            pick = np.where(x - col < np.asarray(group.prob)[col],
+                            col, np.asarray(group.alias)[col])
+            for i, entry in enumerate(group.entries):
+                self._resolve_batch(entry, dropped[pick == i], n, rng, counts)
+
+    def _resolve_batch(self, entry: CompiledEntry, rolls: np.ndarray, n: int,
+                       rng: np.random.Generator, counts: dict[int, np.ndarray]):
+        if not len(rolls):
+            return
+        if entry.reference is not None:
+            for _ in range(entry.times):
+                self._roll_batch(entry.reference, rolls, n, rng, counts)
+        elif entry.item is not None:
+            out = counts.get(entry.item.entry)
+            if out is None:
+                out = counts[entry.item.entry] = np.zeros(n, dtype=np.int64)
+            # Indices in ``rolls`` are unique, so fancy += is safe
+            out[rolls] += rng.integers(entry.min_count, entry.max_count + 1,
+                                       size=len(rolls))
 
     # ─── Utilities ────────────────────────────────────────────────
 
@@ -7,9 +7,27 @@ game data (spell definitions, mob templates, spawn positions, vendor data).
 """
 
 from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from sim.spatial_hash import SpatialHash
+from sim.talent_data import TalentMods
 
 from sim.constants import (
     CLASS_PRIEST, DEFAULT_BACKPACK_SLOTS,
+    ITEM_MOD_MANA, ITEM_MOD_HEALTH, ITEM_MOD_AGILITY, ITEM_MOD_STRENGTH,
+    ITEM_MOD_INTELLECT, ITEM_MOD_SPIRIT, ITEM_MOD_STAMINA,
+    ITEM_MOD_DEFENSE_SKILL_RATING, ITEM_MOD_DODGE_RATING, ITEM_MOD_PARRY_RATING,
+    ITEM_MOD_BLOCK_RATING, ITEM_MOD_HIT_MELEE_RATING, ITEM_MOD_HIT_RANGED_RATING,
+    ITEM_MOD_HIT_SPELL_RATING, ITEM_MOD_CRIT_MELEE_RATING, ITEM_MOD_CRIT_RANGED_RATING,
+    ITEM_MOD_CRIT_SPELL_RATING, ITEM_MOD_HASTE_MELEE_RATING, ITEM_MOD_HASTE_RANGED_RATING,
+    ITEM_MOD_HASTE_SPELL_RATING, ITEM_MOD_HIT_RATING, ITEM_MOD_CRIT_RATING,
+    ITEM_MOD_RESILIENCE_RATING, ITEM_MOD_HASTE_RATING, ITEM_MOD_EXPERTISE_RATING,
+    ITEM_MOD_ATTACK_POWER, ITEM_MOD_RANGED_ATTACK_POWER, ITEM_MOD_SPELL_HEALING_DONE,
+    ITEM_MOD_SPELL_DAMAGE_DONE, ITEM_MOD_MANA_REGENERATION, ITEM_MOD_ARMOR_PENETRATION_RATING,
+    ITEM_MOD_SPELL_POWER, ITEM_MOD_HEALTH_REGEN, ITEM_MOD_BLOCK_VALUE,
+    ITEM_MOD_SPELL_PENETRATION,
     SPELL_LEVEL_REQ, SPELL_MANA_PCT,
     FAMILY_SMITE, FAMILY_HEAL, FAMILY_FLASH_HEAL, FAMILY_SW_PAIN,
     FAMILY_PW_SHIELD, FAMILY_MIND_BLAST, FAMILY_RENEW, FAMILY_HOLY_FIRE,
@@ -470,6 +488,85 @@ VENDOR_DATA = [
 ]
 
 
+# ─── Gear Stat Vectors ────────────────────────────────────────────────
+# Player gear_* fields in vector order. Every equipped item contributes one
+# row (its stats mapped onto these fields, plus armor); Player.gear_totals
+# is the sum of the rows, so equipping or removing an item adds or
+# subtracts one row.
+
+GEAR_STAT_FIELDS = (
+    'gear_strength', 'gear_agility', 'gear_stamina', 'gear_intellect',
+    'gear_spirit', 'gear_armor', 'gear_bonus_hp', 'gear_bonus_mana',
+    'gear_attack_power', 'gear_ranged_ap', 'gear_spell_power',
+    'gear_hit_rating', 'gear_crit_rating', 'gear_haste_rating',
+    'gear_expertise_rating', 'gear_armor_pen_rating', 'gear_spell_pen',
+    'gear_defense_rating', 'gear_dodge_rating', 'gear_parry_rating',
+    'gear_block_rating', 'gear_block_value', 'gear_resilience_rating',
+    'gear_mp5', 'gear_hp5',
+)
+NUM_GEAR_STATS = len(GEAR_STAT_FIELDS)
+_GEAR_ARMOR = GEAR_STAT_FIELDS.index('gear_armor')
+
+# ITEM_MOD_* -> gear field (per-type hit/crit/haste mods fold into the combined rating)
+ITEM_MOD_GEAR_FIELD = {
+    ITEM_MOD_STRENGTH: 'gear_strength',
+    ITEM_MOD_AGILITY: 'gear_agility',
+    ITEM_MOD_STAMINA: 'gear_stamina',
+    ITEM_MOD_INTELLECT: 'gear_intellect',
+    ITEM_MOD_SPIRIT: 'gear_spirit',
+    ITEM_MOD_HEALTH: 'gear_bonus_hp',
+    ITEM_MOD_MANA: 'gear_bonus_mana',
+    ITEM_MOD_ATTACK_POWER: 'gear_attack_power',
+    ITEM_MOD_RANGED_ATTACK_POWER: 'gear_ranged_ap',
+    ITEM_MOD_SPELL_POWER: 'gear_spell_power',
+    ITEM_MOD_SPELL_DAMAGE_DONE: 'gear_spell_power',
+    ITEM_MOD_SPELL_HEALING_DONE: 'gear_spell_power',
+    ITEM_MOD_HIT_RATING: 'gear_hit_rating',
+    ITEM_MOD_HIT_MELEE_RATING: 'gear_hit_rating',
+    ITEM_MOD_HIT_RANGED_RATING: 'gear_hit_rating',
+    ITEM_MOD_HIT_SPELL_RATING: 'gear_hit_rating',
+    ITEM_MOD_CRIT_RATING: 'gear_crit_rating',
+    ITEM_MOD_CRIT_MELEE_RATING: 'gear_crit_rating',
+    ITEM_MOD_CRIT_RANGED_RATING: 'gear_crit_rating',
+    ITEM_MOD_CRIT_SPELL_RATING: 'gear_crit_rating',
+    ITEM_MOD_HASTE_RATING: 'gear_haste_rating',
+    ITEM_MOD_HASTE_MELEE_RATING: 'gear_haste_rating',
+    ITEM_MOD_HASTE_RANGED_RATING: 'gear_haste_rating',
+    ITEM_MOD_HASTE_SPELL_RATING: 'gear_haste_rating',
+    ITEM_MOD_DEFENSE_SKILL_RATING: 'gear_defense_rating',
+    ITEM_MOD_DODGE_RATING: 'gear_dodge_rating',
+    ITEM_MOD_PARRY_RATING: 'gear_parry_rating',
+    ITEM_MOD_BLOCK_RATING: 'gear_block_rating',
+    ITEM_MOD_BLOCK_VALUE: 'gear_block_value',
+    ITEM_MOD_RESILIENCE_RATING: 'gear_resilience_rating',
+    ITEM_MOD_EXPERTISE_RATING: 'gear_expertise_rating',
+    ITEM_MOD_ARMOR_PENETRATION_RATING: 'gear_armor_pen_rating',
+    ITEM_MOD_SPELL_PENETRATION: 'gear_spell_pen',
+    ITEM_MOD_MANA_REGENERATION: 'gear_mp5',
+    ITEM_MOD_HEALTH_REGEN: 'gear_hp5',
+}
+_MOD_INDEX = {mod: GEAR_STAT_FIELDS.index(name) for mod, name in ITEM_MOD_GEAR_FIELD.items()}
+
+
+def item_stat_row(stats: dict, armor: int = 0) -> tuple:
+    """One item's sparse row: ``((field index, value), ...)``, nonzero only."""
+    row = {_GEAR_ARMOR: armor} if armor else {}
+    for mod, value in stats.items():
+        i = _MOD_INDEX.get(mod)
+        if i is not None:
+            row[i] = row.get(i, 0) + value
+    return tuple((i, v) for i, v in sorted(row.items()) if v)
+
+
+def item_stat_matrix(items) -> np.ndarray:
+    """(len(items), NUM_GEAR_STATS) dense rows of items with ``stats``/``armor``."""
+    matrix = np.zeros((len(items), NUM_GEAR_STATS), dtype=np.int64)
+    for k, item in enumerate(items):
+        for i, v in item_stat_row(item.stats, getattr(item, 'armor', 0)):
+            matrix[k, i] = v
+    return matrix
+
+
 # ─── Player State ─────────────────────────────────────────────────────
 
 INVENTORY_SLOTS = DEFAULT_BACKPACK_SLOTS  # starting capacity (16 slots, just the default backpack)
@@ -565,6 +662,10 @@ class Player:
     # Regen from gear
     gear_mp5: int = 0              # ITEM_MOD_MANA_REGENERATION (flat MP5)
     gear_hp5: int = 0              # ITEM_MOD_HEALTH_REGEN (flat HP5)
+    # Sum of the equipped item rows (GEAR_STAT_FIELDS order; mirrored by the
+    # gear_* fields above) and slot -> (item, item_stat_row)
+    gear_totals: list = field(default_factory=lambda: [0] * NUM_GEAR_STATS)
+    gear_rows: dict = field(default_factory=dict)
     # ─── Derived combat stats (cached, recalculated via recalculate_stats) ─
     # Primary stat totals (base + gear)
     total_strength: int = 0
@@ -621,6 +722,7 @@ class Player:
     is_eating: bool = False             # True while eating/drinking (regen 5% HP+Mana/s)
     # ─── Talent System ─────────────────────────────────────────────────
     talent_points: dict = field(default_factory=dict)  # talent_name -> current points
+    talent_mods: TalentMods = field(default_factory=TalentMods)  # compiled talent_points
     # Shadowform state (talent-granted persistent buff)
     shadowform_active: bool = False
     # Spirit Tap proc (after kill)
@@ -646,53 +748,318 @@ class Player:
         self.free_slots = self.total_bag_slots - len(self.inventory)
 
 
+# ─── Mob Table (structure-of-arrays) ──────────────────────────────────
+
+class MobTable:
+    """Structure-of-arrays storage for mob instances.
+
+    Every mob owns one row (slot). Per-mob state lives in parallel NumPy
+    columns so tick(), aggro, leash, chase, DoT ticking and range queries
+    run as masked array operations over all slots instead of Python
+    attribute lookups per mob. Freed slots go on a free list and are
+    reused by the next spawn; columns grow by doubling.
+
+    Only rows [0, n) are ever touched; ``used`` marks occupied slots.
+    ``mobs[slot]`` maps a slot back to its Mob handle (uid, template).
+
+    Occupied slots are also indexed in a SpatialHash for radius and
+    k-nearest queries. Position writes only mark a slot as moved; the
+    grid is brought up to date lazily by the next query. The last query
+    per radius is memoized until the index changes, since the state dict,
+    the observation and the action mask ask the same questions each step.
+    """
+
+    DOT_SLOTS = 4   # SW:Pain, Holy Fire, Devouring Plague, Vampiric Touch
+    GRID_CELL = 40.0  # spatial hash cell size (yards), ~ typical query radius
+
+    FLOAT_COLUMNS = ('x', 'y', 'z', 'spawn_x', 'spawn_y', 'spawn_z',
+                     'fear_dx', 'fear_dy', 'detect_range')
+    INT_COLUMNS = ('hp', 'max_hp', 'level', 'attack_timer', 'respawn_timer',
+                   'fear_remaining', 'shadow_weaving_stacks',
+                   'shadow_weaving_timer', 'misery_stacks')
+    BOOL_COLUMNS = ('used', 'alive', 'in_combat', 'target_player', 'feared',
+                    'looted', 'dot3_heals_caster')
+    DOT_COLUMNS = ('dot_remaining', 'dot_timer', 'dot_damage')
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = 0
+        self.n = 0                      # high-water mark of allocated slots
+        self.free: list[int] = []       # released slots, reused LIFO
+        self.mobs: list = []            # slot -> Mob (None when free)
+        self.grid = SpatialHash(self.GRID_CELL)
+        self._moved: set[int] = set()   # slots whose grid cell may be stale
+        self._version = 0               # bumped whenever the index changes
+        self._last_query: dict = {}     # r -> (px, py, version, slots)
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.float64))
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.int32))
+        for name in self.BOOL_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=bool))
+        for name in self.DOT_COLUMNS:
+            setattr(self, name, np.zeros((0, self.DOT_SLOTS), dtype=np.int32))
+        self._grow(max(1, capacity))
+
+    def __len__(self) -> int:
+        return self.n - len(self.free)
+
+    def _grow(self, capacity: int):
+        for name in self.FLOAT_COLUMNS + self.INT_COLUMNS + self.BOOL_COLUMNS \
+                + self.DOT_COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.capacity] = old
+            setattr(self, name, new)
+        self.mobs.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def alloc(self, mob) -> int:
+        """Claim a zeroed slot for ``mob`` (free list first, then append)."""
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.n == self.capacity:
+                self._grow(self.capacity * 2)
+            slot = self.n
+            self.n += 1
+        self.used[slot] = True
+        self.mobs[slot] = mob
+        self._moved.add(slot)
+        return slot
+
+    def transfer(self, mobs: list, dest: 'MobTable') -> None:
+        """Move the rows of ``mobs`` into ``dest`` and free their slots here.
+
+        Handles are re-pointed at their new rows, so state (HP, respawn
+        timers, DoTs) travels with the mob.
+        """
+        if not mobs:
+            return
+        slots = np.array([m._slot for m in mobs], dtype=np.intp)
+        new_slots = np.array([dest.alloc(m) for m in mobs], dtype=np.intp)
+        for name in self.FLOAT_COLUMNS + self.INT_COLUMNS + self.BOOL_COLUMNS \
+                + self.DOT_COLUMNS:
+            col = getattr(self, name)
+            getattr(dest, name)[new_slots] = col[slots]
+            col[slots] = 0
+        grid = self.grid
+        for mob, slot, new_slot in zip(mobs, slots.tolist(), new_slots.tolist()):
+            mob._table = dest
+            mob._slot = new_slot
+            self.mobs[slot] = None
+            grid.remove(slot)
+            self._moved.discard(slot)
+        self.free.extend(slots.tolist())
+        self._version += 1
+
+    def release(self, mob) -> None:
+        """Return ``mob``'s slot to the free list.
+
+        The handle is moved onto a private single-row table first, so
+        references still held elsewhere keep reading their own state
+        instead of whatever spawns into the slot next.
+        """
+        self.transfer([mob], MobTable(capacity=1))
+
+    def state(self) -> 'MobTableState':
+        """Picklable copy of rows [0, n) and the slot -> (uid, template) map."""
+        n = self.n
+        return MobTableState(
+            n=n, free=list(self.free),
+            columns={name: getattr(self, name)[:n].copy()
+                     for name in self.FLOAT_COLUMNS + self.INT_COLUMNS
+                     + self.BOOL_COLUMNS + self.DOT_COLUMNS},
+            uids=[m.uid if m is not None else -1 for m in self.mobs[:n]],
+            templates=[m.template if m is not None else None for m in self.mobs[:n]])
+
+    @classmethod
+    def from_state(cls, state: 'MobTableState') -> 'MobTable':
+        """Fresh table with new Mob handles for every occupied row of ``state``."""
+        table = cls(capacity=max(1, state.n))
+        table.n = state.n
+        table.free = list(state.free)
+        for name, col in state.columns.items():
+            getattr(table, name)[:state.n] = col
+        mobs = table.mobs
+        for slot, (uid, template) in enumerate(zip(state.uids, state.templates)):
+            if template is None:
+                continue
+            mob = Mob.__new__(Mob)
+            mob.uid = uid
+            mob.template = template
+            mob._table = table
+            mob._slot = slot
+            mobs[slot] = mob
+        table._moved.update(np.flatnonzero(table.used[:state.n]).tolist())
+        return table
+
+    def live_slots(self) -> np.ndarray:
+        """Indices of occupied slots, in slot order."""
+        return np.flatnonzero(self.used[:self.n])
+
+    def dist_sq(self, px: float, py: float) -> np.ndarray:
+        """Squared distance from (px, py) to every slot in [0, n)."""
+        dx = self.x[:self.n] - px
+        dy = self.y[:self.n] - py
+        return dx * dx + dy * dy
+
+    # ─── Spatial queries ─────────────────────────────────────────────
+
+    def mark_moved(self, slots) -> None:
+        """Flag slots whose x/y were written by bulk array code."""
+        self._moved.update(slots)
+
+    def sync_index(self) -> None:
+        """Re-bucket moved slots in the spatial hash."""
+        if self._moved:
+            ids = np.fromiter(self._moved, dtype=np.intp, count=len(self._moved))
+            self._moved.clear()
+            self.grid.update(ids, self.x[ids], self.y[ids])
+            self._version += 1
+
+    def query_radius(self, px: float, py: float, r: float) -> np.ndarray:
+        """Sorted occupied slots within r of (px, py). Treat as read-only."""
+        self.sync_index()
+        last = self._last_query.get(r)
+        if last and last[0] == px and last[1] == py and last[2] == self._version:
+            return last[3]
+        slots = self.grid.query_radius(px, py, r, self.x, self.y)
+        self._last_query[r] = (px, py, self._version, slots)
+        return slots
+
+    def k_nearest(self, px: float, py: float, k: int,
+                  max_dist: float = float('inf'),
+                  mask: np.ndarray | None = None) -> np.ndarray:
+        """Up to k occupied slots nearest to (px, py), closest first.
+
+        ``mask`` (indexed by slot, length >= n) filters candidates, e.g.
+        ``table.alive`` for living mobs only.
+        """
+        self.sync_index()
+        return self.grid.k_nearest(px, py, k, self.x, self.y,
+                                   max_dist=max_dist, mask=mask)
+
+
+@dataclass(slots=True)
+class MobTableState:
+    """Picklable copy of a MobTable (see MobTable.state / from_state)."""
+    n: int
+    free: list
+    columns: dict       # column name -> copy of rows [0, n)
+    uids: list          # slot -> uid (-1 for free slots)
+    templates: list     # slot -> MobTemplate (None for free slots)
+
+
+@dataclass(slots=True)
+class SimSnapshot:
+    """Picklable CombatSimulation state (see CombatSimulation.snapshot).
+
+    Mobs are referenced by uid; templates, items and NPC records are
+    shared read-only objects and are not copied.
+    """
+    player: 'Player'
+    mobs: MobTableState
+    parked: MobTableState           # mobs of cached (inactive) chunks
+    mob_order: list                 # uids of CombatSimulation.mobs
+    target_uid: Optional[int]
+    rng_state: tuple
+    map_id: int
+    tick_count: int
+    damage_dealt: int
+    kills: int
+    next_uid: int
+    visited: tuple                  # (areas, zones, maps) sets
+    new_counts: tuple               # (areas, zones, maps) not yet consumed
+    vendors: list
+    quest_npcs: list
+    player_chunk: Optional[tuple]
+    active_chunks: frozenset
+    chunk_mobs: dict                # chunk -> [uid, ...]
+    chunk_vendors: dict             # chunk -> [VendorNPC, ...]
+    chunk_cache: list               # [(chunk, [uid, ...], vendors, tick), ...] LRU order
+    active_quests: dict             # quest_id -> QuestProgress
+    completed_quests: frozenset
+    quests_completed: int
+
+
+def _mob_column(name: str):
+    def fget(self):
+        return getattr(self._table, name).item(self._slot)
+
+    def fset(self, value):
+        getattr(self._table, name)[self._slot] = value
+    return property(fget, fset)
+
+
+def _mob_position(name: str):
+    def fget(self):
+        return getattr(self._table, name).item(self._slot)
+
+    def fset(self, value):
+        table = self._table
+        getattr(table, name)[self._slot] = value
+        table._moved.add(self._slot)
+    return property(fget, fset)
+
+
+def _mob_dot_column(name: str, k: int):
+    def fget(self):
+        return getattr(self._table, name).item(self._slot, k)
+
+    def fset(self, value):
+        getattr(self._table, name)[self._slot, k] = value
+    return property(fget, fset)
+
+
 # ─── Mob Instance ─────────────────────────────────────────────────────
 
-@dataclass
 class Mob:
-    uid: int
-    template: MobTemplate
-    hp: int
-    max_hp: int
-    level: int
-    x: float
-    y: float
-    z: float = 82.0
-    alive: bool = True
-    in_combat: bool = False
-    target_player: bool = False
-    attack_timer: int = 0       # ticks until next attack
-    respawn_timer: int = 0      # ticks until respawn (0 = alive)
-    # DoT tracking (slot 1: SW:Pain)
-    dot_remaining: int = 0
-    dot_timer: int = 0          # ticks until next dot tick
-    dot_damage_per_tick: int = 0
-    # DoT tracking (slot 2: Holy Fire)
-    dot2_remaining: int = 0
-    dot2_timer: int = 0
-    dot2_damage_per_tick: int = 0
-    # DoT tracking (slot 3: Devouring Plague — also heals caster)
-    dot3_remaining: int = 0
-    dot3_timer: int = 0
-    dot3_damage_per_tick: int = 0
-    dot3_heals_caster: bool = False  # Devouring Plague heals for damage dealt
-    # Fear state (Psychic Scream)
-    feared: bool = False
-    fear_remaining: int = 0  # ticks until fear ends
-    fear_dx: float = 0.0     # fear flee direction X
-    fear_dy: float = 0.0     # fear flee direction Y
-    looted: bool = False
-    spawn_x: float = 0.0
-    spawn_y: float = 0.0
-    spawn_z: float = 82.0
-    # Shadow Weaving debuff stacks (from talent, max 5)
-    shadow_weaving_stacks: int = 0
-    shadow_weaving_timer: int = 0     # ticks until stacks expire
-    # Vampiric Touch DoT (slot 4)
-    dot4_remaining: int = 0
-    dot4_timer: int = 0
-    dot4_damage_per_tick: int = 0
-    # Misery debuff (+spell hit, from talent)
-    misery_stacks: int = 0            # 0 or 1 (debuff active)
+    """A mob instance: uid + template plus a handle onto one MobTable row.
+
+    Field access (mob.hp, mob.dot2_remaining, ...) reads and writes the
+    table columns, so per-mob code and bulk array code see the same
+    state. Without an explicit ``table`` the mob gets a private one.
+    """
+    __slots__ = ('uid', 'template', '_table', '_slot')
+
+    def __init__(self, uid: int, template: MobTemplate, hp: int, max_hp: int,
+                 level: int, x: float, y: float, z: float = 82.0,
+                 table: 'MobTable | None' = None, **fields):
+        self.uid = uid
+        self.template = template
+        self._table = table if table is not None else MobTable(capacity=1)
+        self._slot = self._table.alloc(self)
+        self.hp = hp
+        self.max_hp = max_hp
+        self.level = level
+        self.x = x
+        self.y = y
+        self.z = z
+        self.alive = True
+        self.spawn_z = 82.0
+        self.detect_range = template.detect_range
+        for name, value in fields.items():
+            if not hasattr(Mob, name) or name in Mob.__slots__:
+                raise TypeError(f"Mob() got an unexpected keyword argument '{name}'")
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        return (f"Mob(uid={self.uid}, name={self.template.name!r}, "
+                f"level={self.level}, hp={self.hp}/{self.max_hp}, "
+                f"alive={self.alive}, x={self.x:.1f}, y={self.y:.1f})")
+
+
+for _name in MobTable.FLOAT_COLUMNS + MobTable.INT_COLUMNS + MobTable.BOOL_COLUMNS:
+    if _name in ('x', 'y'):
+        setattr(Mob, _name, _mob_position(_name))
+    elif _name != 'used':
+        setattr(Mob, _name, _mob_column(_name))
+# DoT slots keep their historical field names (slot 1: SW:Pain, 2: Holy Fire,
+# 3: Devouring Plague — also heals caster, 4: Vampiric Touch)
+for _k, _prefix in enumerate(('dot', 'dot2', 'dot3', 'dot4')):
+    setattr(Mob, f'{_prefix}_remaining', _mob_dot_column('dot_remaining', _k))
+    setattr(Mob, f'{_prefix}_timer', _mob_dot_column('dot_timer', _k))
+    setattr(Mob, f'{_prefix}_damage_per_tick', _mob_dot_column('dot_damage', _k))
+del _name, _k, _prefix
 
 
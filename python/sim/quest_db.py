@@ -31,6 +31,8 @@ from dataclasses import dataclass, field
 from enum import IntEnum
 from typing import Optional
 
+from sim.csv_cache import load_columns
+
 
 # ─── QuestXP.dbc ─────────────────────────────────────────────────────
 # DBC format: WDBC header (20 bytes), 100 records × 11 uint32 fields:
@@ -486,31 +488,30 @@ class QuestDB:
         if not needed:
             return
 
+        # Same column specs as CreatureDB, so both map one shared cache file
+        from sim.creature_db import TEMPLATE_COLUMNS, SPAWN_COLUMNS
+
         # Load NPC names from creature_template.csv
         npc_names: dict[int, str] = {}
         tmpl_path = os.path.join(data_dir, 'creature_template.csv')
         if os.path.isfile(tmpl_path):
-            with open(tmpl_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter=';', quotechar='"')
-                for row in reader:
-                    entry = int(row['entry'])
-                    if entry in needed:
-                        npc_names[entry] = row['name']
+            cols = load_columns(tmpl_path, TEMPLATE_COLUMNS)
+            names = cols['name']
+            for i, entry in enumerate(cols['entry'].tolist()):
+                if entry in needed:
+                    npc_names[entry] = names[i]
 
         # Load first spawn position per NPC from creature.csv
         npc_positions: dict[int, tuple] = {}
         spawn_path = os.path.join(data_dir, 'creature.csv')
         if os.path.isfile(spawn_path):
-            with open(spawn_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter=';', quotechar='"')
-                for row in reader:
-                    entry = int(row['id1'])
-                    if entry in needed and entry not in npc_positions:
-                        npc_positions[entry] = (
-                            float(row['position_x']),
-                            float(row['position_y']),
-                            float(row['position_z']),
-                        )
+            cols = load_columns(spawn_path, SPAWN_COLUMNS)
+            for entry, x, y, z in zip(cols['id1'].tolist(),
+                                      cols['position_x'].tolist(),
+                                      cols['position_y'].tolist(),
+                                      cols['position_z'].tolist()):
+                if entry in needed and entry not in npc_positions:
+                    npc_positions[entry] = (x, y, z)
 
         # Create QuestNPCData for each found NPC
         for entry in sorted(needed):
@@ -0,0 +1,310 @@
+"""
+Read-only world data shared across SubprocVecEnv workers.
+
+Each WoWSimEnv used to parse and hold its own CreatureDB, LootDB and
+vmtree (~545K BIH nodes), so RAM scaled with the bot count. SharedWorld
+loads them once in the trainer process and packs the bulk data into one
+multiprocessing.shared_memory block; workers get a small picklable
+WorldHandle and attach to zero-copy read-only NumPy views. Python
+objects (CreatureTemplate, SpawnPoint, ItemData, LootEntry) are built
+lazily per key, only for the chunks and loot tables a worker touches.
+
+Usage:
+    world = SharedWorld.create(data_root, creature_csv_dir)     # trainer
+    env = WoWSimEnv(..., shared_world=world.handle)             # worker
+    ...
+    world.close(); world.unlink()                               # trainer, at exit
+"""
+
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from sim.csv_cache import StrColumn
+
+if TYPE_CHECKING:
+    from sim.creature_db import CreatureDB
+    from sim.loot_db import LootDB
+
+_ALIGN = 64
+
+
+# ─── Shared array block ─────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class ArraysHandle:
+    """Picklable reference to a SharedArrays block."""
+    name: str
+    layout: tuple   # ((key, dtype str, shape, byte offset), ...)
+
+
+class SharedArrays:
+    """Named NumPy arrays packed into one SharedMemory block."""
+
+    def __init__(self, shm: SharedMemory, layout: tuple, owner: bool):
+        self._shm = shm
+        self.layout = layout
+        self.owner = owner
+        self.arrays: dict[str, np.ndarray] = {}
+        for key, dtype, shape, offset in layout:
+            arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            arr.flags.writeable = False
+            self.arrays[key] = arr
+
+    @classmethod
+    def create(cls, arrays: dict[str, np.ndarray]) -> 'SharedArrays':
+        layout = []
+        size = 0
+        for key, arr in arrays.items():
+            size += -size % _ALIGN
+            layout.append((key, arr.dtype.str, arr.shape, size))
+            size += arr.nbytes
+        # Padding keeps zero-length arrays at the end inside the buffer
+        shm = SharedMemory(create=True, size=size + _ALIGN)
+        for (key, dtype, shape, offset), arr in zip(layout, arrays.values()):
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = arr
+        return cls(shm, tuple(layout), owner=True)
+
+    @classmethod
+    def attach(cls, handle: ArraysHandle) -> 'SharedArrays':
+        return cls(SharedMemory(name=handle.name), handle.layout, owner=False)
+
+    @property
+    def handle(self) -> ArraysHandle:
+        return ArraysHandle(self._shm.name, self.layout)
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def close(self) -> None:
+        """Unmap the block. Views still referenced elsewhere keep it mapped."""
+        self.arrays = {}
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        """Free the block (owner only, once every process is done with it)."""
+        if self.owner:
+            self._shm.unlink()
+
+
+# ─── Record packing ─────────────────────────────────────────────────
+
+def pack_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """(offsets, utf-8 blob) arrays for a StrColumn."""
+    col = StrColumn.from_strings(values)
+    return col._offsets, np.frombuffer(col._blob, dtype=np.uint8)
+
+
+def pack_records(prefix: str, objs: list,
+                 fields: tuple[tuple[str, type], ...]) -> dict[str, np.ndarray]:
+    """One ``prefix.field`` array per (attribute, dtype) of ``objs``."""
+    return {f'{prefix}.{name}': np.array([getattr(o, name) for o in objs], dtype=dtype)
+            for name, dtype in fields}
+
+
+def pack_groups(prefix: str, groups: dict[int, list],
+                fields: tuple[tuple[str, type], ...]) -> dict[str, np.ndarray]:
+    """Pack ``int key -> [obj, ...]`` as key-sorted rows plus range starts."""
+    keys = sorted(groups)
+    rows = [obj for key in keys for obj in groups[key]]
+    starts = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(groups[key]) for key in keys], out=starts[1:])
+    arrays = pack_records(prefix, rows, fields)
+    arrays[f'{prefix}.keys'] = np.array(keys, dtype=np.int64)
+    arrays[f'{prefix}.starts'] = starts
+    return arrays
+
+
+class RecordView(Mapping):
+    """Read-only ``int key -> object`` mapping over key-sorted record arrays.
+
+    ``factory(row)`` builds the object for a row on first access; it is
+    cached so repeated lookups return the same instance.
+    """
+
+    def __init__(self, keys: np.ndarray, factory: Callable[[int], Any]):
+        self._keys = keys
+        self._factory = factory
+        self._cache: dict = {}
+
+    def _row(self, key) -> int:
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return -1
+
+    def __getitem__(self, key):
+        obj = self._cache.get(key)
+        if obj is None:
+            i = self._row(key)
+            if i < 0:
+                raise KeyError(key)
+            obj = self._cache[key] = self._factory(i)
+        return obj
+
+    def __contains__(self, key) -> bool:
+        return key in self._cache or self._row(key) >= 0
+
+    def __iter__(self):
+        return iter(self._keys.tolist())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class GroupView(RecordView):
+    """Read-only ``key -> [object, ...]`` mapping over pack_groups arrays.
+
+    ``factory(start, end)`` builds the list for one key's row range.
+    ``encode``/``decode`` translate non-int keys (e.g. chunk tuples).
+    """
+
+    def __init__(self, keys: np.ndarray, starts: np.ndarray,
+                 factory: Callable[[int, int], list],
+                 encode: Optional[Callable] = None,
+                 decode: Optional[Callable] = None):
+        super().__init__(keys, lambda i: factory(int(starts[i]), int(starts[i + 1])))
+        self._encode = encode
+        self._decode = decode
+
+    def __getitem__(self, key):
+        obj = self._cache.get(key)
+        if obj is None:
+            i = self._row(self._encode(key) if self._encode else key)
+            if i < 0:
+                raise KeyError(key)
+            obj = self._cache[key] = self._factory(i)
+        return obj
+
+    def __contains__(self, key) -> bool:
+        return key in self._cache or self._row(
+            self._encode(key) if self._encode else key) >= 0
+
+    def __iter__(self):
+        keys = self._keys.tolist()
+        return iter(map(self._decode, keys) if self._decode else keys)
+
+
+# ─── Shared world ───────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class WorldHandle:
+    """Picklable handle passed to workers (see SharedWorld.attach)."""
+    arrays: ArraysHandle
+    has_creatures: bool = False
+    has_loot: bool = False
+    vmtree_meta: Optional[dict] = None      # map_id, is_tiled, bounds, spawns
+
+
+class SharedWorld:
+    """Static world datasets loaded once and shared by handle."""
+
+    def __init__(self, shared: SharedArrays, handle: WorldHandle):
+        self._shared = shared
+        self._handle = handle
+        self._creature_db: 'CreatureDB | None' = None
+        self._loot_db: 'LootDB | None' = None
+
+    @classmethod
+    def create(cls, data_root: str = None, creature_csv_dir: str = None,
+               quiet: bool = False) -> 'SharedWorld':
+        """Load CreatureDB, LootDB and the map-0 vmtree into shared memory.
+
+        Data sources follow WoWSimEnv: loot tables come from
+        ``creature_csv_dir`` or the parent of ``data_root``.
+        """
+        arrays: dict[str, np.ndarray] = {}
+        has_creatures = has_loot = False
+        vmtree_meta = None
+
+        if creature_csv_dir:
+            from sim.creature_db import CreatureDB
+            arrays.update(CreatureDB(creature_csv_dir, quiet=quiet).to_arrays())
+            has_creatures = True
+
+        loot_dir = creature_csv_dir or (os.path.dirname(data_root) if data_root else None)
+        if loot_dir:
+            from sim.loot_db import LootDB
+            loot_db = LootDB(loot_dir, quiet=quiet)
+            if loot_db.loaded:
+                arrays.update(loot_db.to_arrays())
+                has_loot = True
+
+        if data_root:
+            from sim.terrain import SimTerrain, load_vmtree
+            vtree = load_vmtree(data_root, SimTerrain.MAP_ID)
+            if vtree is not None:
+                arrays['vmtree.nodes'] = np.asarray(vtree.tree_nodes, dtype=np.uint32)
+                arrays['vmtree.objects'] = np.asarray(vtree.object_indices, dtype=np.uint32)
+                vmtree_meta = {
+                    'map_id': vtree.map_id,
+                    'is_tiled': vtree.is_tiled,
+                    'bounds': vtree.bounds,
+                    'spawns': list(vtree.spawns),
+                }
+
+        shared = SharedArrays.create(arrays)
+        handle = WorldHandle(arrays=shared.handle, has_creatures=has_creatures,
+                             has_loot=has_loot, vmtree_meta=vmtree_meta)
+        world = cls(shared, handle)
+        if not quiet:
+            print(f"  [SharedWorld] {shared.nbytes / 2**20:.1f} MB shared "
+                  f"({len(arrays)} arrays): creatures={has_creatures}, "
+                  f"loot={has_loot}, vmtree={vmtree_meta is not None}")
+        return world
+
+    @classmethod
+    def attach(cls, handle: WorldHandle) -> 'SharedWorld':
+        return cls(SharedArrays.attach(handle.arrays), handle)
+
+    @property
+    def handle(self) -> WorldHandle:
+        return self._handle
+
+    @property
+    def creature_db(self) -> 'CreatureDB | None':
+        if self._creature_db is None and self._handle.has_creatures:
+            from sim.creature_db import CreatureDB
+            self._creature_db = CreatureDB.from_arrays(self._shared.arrays)
+        return self._creature_db
+
+    @property
+    def loot_db(self) -> 'LootDB | None':
+        if self._loot_db is None and self._handle.has_loot:
+            from sim.loot_db import LootDB
+            self._loot_db = LootDB.from_arrays(self._shared.arrays)
+        return self._loot_db
+
+    def vmtree(self):
+        """A fresh VMapTree over the shared BIH arrays, or None.
+
+        Each caller gets its own ``spawns`` list (filled per worker as
+        vmtiles are loaded); nodes and object indices are shared.
+        """
+        meta = self._handle.vmtree_meta
+        if meta is None:
+            return None
+        from sim.terrain import VMapTree
+        arrays = self._shared.arrays
+        return VMapTree(
+            map_id=meta['map_id'],
+            is_tiled=meta['is_tiled'],
+            bounds=meta['bounds'],
+            tree_nodes=arrays['vmtree.nodes'],
+            object_indices=arrays['vmtree.objects'],
+            spawns=list(meta['spawns']),
+        )
+
+    def close(self) -> None:
+        self._shared.close()
+
+    def unlink(self) -> None:
+        self._shared.unlink()
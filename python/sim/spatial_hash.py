@@ -0,0 +1,156 @@
+"""
+Uniform-grid spatial hash for 2D point queries.
+
+Buckets integer ids (MobTable slots) into square cells keyed by
+(cx, cy). Updates are incremental — an id only moves between buckets
+when it crosses a cell border — and queries only visit the cells that
+overlap the search circle, so cost scales with local density instead of
+the size of the active chunk window.
+
+Usage:
+    grid = SpatialHash(cell_size=25.0)
+    grid.update(ids, xs, ys)             # insert or move (vectorized)
+    grid.remove(slot)
+    near = grid.query_radius(px, py, r, xs, ys)        # ids within r
+    knn = grid.k_nearest(px, py, 5, xs, ys, max_dist=30.0)
+"""
+
+import math
+
+import numpy as np
+
+# Cell keys pack (cx, cy) into one int: cx * _KEY_STRIDE + cy. Cell
+# coordinates stay well inside +-2^15 for any map (+-17066 yd at 1 yd cells).
+_KEY_STRIDE = 1 << 16
+
+
+class SpatialHash:
+    """Incrementally maintained uniform grid of ids over 2D positions."""
+
+    def __init__(self, cell_size: float = 25.0):
+        self.cell_size = float(cell_size)
+        self._inv = 1.0 / self.cell_size
+        self.cells: dict[int, set[int]] = {}
+        self._cell_of: dict[int, int] = {}      # id -> cell key
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def __contains__(self, ident: int) -> bool:
+        return ident in self._cell_of
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self._cell_of.clear()
+
+    def update(self, ids: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> None:
+        """Insert ids or move them to the cells of (xs, ys).
+
+        ``xs``/``ys`` are aligned with ``ids``. Ids whose cell is unchanged
+        cost one dict lookup.
+        """
+        keys = (np.floor(xs * self._inv).astype(np.int64) * _KEY_STRIDE
+                + np.floor(ys * self._inv).astype(np.int64))
+        cells = self.cells
+        cell_of = self._cell_of
+        for ident, key in zip(ids.tolist(), keys.tolist()):
+            old = cell_of.get(ident)
+            if old == key:
+                continue
+            if old is not None:
+                bucket = cells[old]
+                bucket.discard(ident)
+                if not bucket:
+                    del cells[old]
+            cell_of[ident] = key
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = {ident}
+            else:
+                bucket.add(ident)
+
+    def remove(self, ident: int) -> None:
+        old = self._cell_of.pop(ident, None)
+        if old is None:
+            return
+        bucket = self.cells[old]
+        bucket.discard(ident)
+        if not bucket:
+            del self.cells[old]
+
+    def candidates(self, px: float, py: float, r: float) -> list[int]:
+        """Ids in every cell overlapping the square [px-r, px+r]^2."""
+        inv = self._inv
+        cx0 = math.floor((px - r) * inv)
+        cx1 = math.floor((px + r) * inv)
+        cy0 = math.floor((py - r) * inv)
+        cy1 = math.floor((py + r) * inv)
+        cells = self.cells
+        out: list[int] = []
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Search square covers more cells than exist: walk the buckets
+            for key, bucket in cells.items():
+                cx = (key + (_KEY_STRIDE >> 1)) // _KEY_STRIDE
+                cy = key - cx * _KEY_STRIDE
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    out.extend(bucket)
+            return out
+        for cx in range(cx0, cx1 + 1):
+            base = cx * _KEY_STRIDE
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get(base + cy)
+                if bucket:
+                    out.extend(bucket)
+        return out
+
+    def query_radius(self, px: float, py: float, r: float,
+                     xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Sorted ids within distance r of (px, py).
+
+        ``xs``/``ys`` are position columns indexed by id.
+        """
+        cand = self.candidates(px, py, r)
+        if not cand:
+            return np.zeros(0, dtype=np.intp)
+        ids = np.array(cand, dtype=np.intp)
+        dx = xs[ids] - px
+        dy = ys[ids] - py
+        ids = ids[dx * dx + dy * dy <= r * r]
+        ids.sort()
+        return ids
+
+    def k_nearest(self, px: float, py: float, k: int,
+                  xs: np.ndarray, ys: np.ndarray,
+                  max_dist: float = math.inf,
+                  mask: np.ndarray | None = None) -> np.ndarray:
+        """Up to k ids nearest to (px, py), closest first.
+
+        Only ids with ``mask[id]`` set (if given) and within ``max_dist``
+        qualify. The search ring grows from one cell until k hits are
+        inside it or it covers ``max_dist`` / every occupied cell.
+        """
+        if k <= 0 or not self._cell_of:
+            return np.zeros(0, dtype=np.intp)
+        r = self.cell_size
+        while True:
+            bounded = r >= max_dist
+            if bounded:
+                r = max_dist
+            cand = self.candidates(px, py, r)
+            ids = np.array(cand, dtype=np.intp)
+            if mask is not None and len(ids):
+                ids = ids[mask[ids]]
+            dx = xs[ids] - px
+            dy = ys[ids] - py
+            d_sq = dx * dx + dy * dy
+            complete = len(cand) == len(self._cell_of)
+            limit = max_dist if complete else r
+            inside = d_sq <= limit * limit
+            if bounded or complete or inside.sum() >= k:
+                ids, d_sq = ids[inside], d_sq[inside]
+                if len(ids) > k:
+                    part = np.argpartition(d_sq, k - 1)[:k]
+                    ids, d_sq = ids[part], d_sq[part]
+                order = np.lexsort((ids, d_sq))   # ties -> lower id first
+                return ids[order]
+            r *= 2.0
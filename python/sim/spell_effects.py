@@ -0,0 +1,276 @@
+"""
+Compiled spell effects.
+
+Every rank in SPELLS carries its Spell.dbc numbers (base points, die sides,
+per-tick amounts, amplitudes, durations). FAMILY_EFFECTS declares, once per
+spell family, the DBC effect slots those numbers feed: the SPELL_EFFECT_*
+type, the SPELL_AURA_* type for APPLY_AURA effects, and the sim state the
+aura drives. compile_spell() joins the two into a SpellProgram: cast rules
+(target, exclusivity, channel, talent hooks) plus a flat tuple of
+``(opcode, args)`` steps with the rank's values baked in.
+
+CombatSimulation runs a program by indexing its effect handler table with
+each opcode, so a cast costs one dict lookup and a few handler calls no
+matter how many families or ranks exist. New ranks only need a SPELLS
+entry; new families a FAMILY_EFFECTS entry.
+"""
+
+from dataclasses import dataclass
+
+from sim.constants import (
+    get_sp_coeff, SP_COEFF_HOLY_NOVA_HEAL,
+    FAMILY_SMITE, FAMILY_HEAL, FAMILY_FLASH_HEAL,
+    FAMILY_SW_PAIN, FAMILY_PW_SHIELD, FAMILY_MIND_BLAST,
+    FAMILY_RENEW, FAMILY_HOLY_FIRE, FAMILY_INNER_FIRE, FAMILY_FORTITUDE,
+    FAMILY_DEVOURING_PLAGUE, FAMILY_PSYCHIC_SCREAM, FAMILY_SHADOW_PROTECTION,
+    FAMILY_DIVINE_SPIRIT, FAMILY_FEAR_WARD, FAMILY_HOLY_NOVA, FAMILY_DISPEL_MAGIC,
+    FAMILY_MIND_FLAY, FAMILY_VAMPIRIC_TOUCH, FAMILY_DISPERSION,
+)
+from sim.models import SpellDef, SPELLS
+
+# ─── Spell.dbc effect and aura types (SharedDefines.h) ──────────────
+
+SPELL_EFFECT_SCHOOL_DAMAGE = 2
+SPELL_EFFECT_APPLY_AURA = 6
+SPELL_EFFECT_HEAL = 10
+SPELL_EFFECT_DISPEL = 38
+SPELL_EFFECT_TRIGGER_SPELL = 64
+
+SPELL_AURA_PERIODIC_DAMAGE = 3
+SPELL_AURA_MOD_FEAR = 7
+SPELL_AURA_PERIODIC_HEAL = 8
+SPELL_AURA_MOD_RESISTANCE = 22
+SPELL_AURA_MOD_STAT = 29
+SPELL_AURA_SCHOOL_ABSORB = 69
+SPELL_AURA_MECHANIC_IMMUNITY = 77
+SPELL_AURA_MOD_DAMAGE_PERCENT_TAKEN = 87
+
+# ─── Opcodes ─────────────────────────────────────────────────────────
+# Index into CombatSimulation's effect handler table. Handlers receive
+# (args, spell_power, outcome) and return the outcome, or None to stop.
+
+FX_TARGET_HIT = 0         # live target + hit/crit roll; stop on miss
+FX_SCHOOL_DAMAGE = 1      # (lo, hi, sp_coeff, shadow, family)
+FX_HEAL = 2               # (lo, hi, sp_coeff) self heal, can crit
+FX_PERIODIC_DAMAGE = 3    # (per_tick, sp_coeff, ticks, interval, slot attrs,
+                          #  shadow, sw_pain, misery, weaving, plague, family)
+FX_ABSORB = 4             # (absorb, sp_coeff, duration)
+FX_PERIODIC_HEAL = 5      # (per_tick, sp_coeff, ticks, interval)
+FX_PLAYER_AURA = 6        # (((attr, value), ...), recalc, keep_hp_gain)
+FX_FEAR = 7               # (max_targets, radius, ticks)
+FX_AOE_DAMAGE = 8         # (lo, hi, sp_coeff, radius)
+NUM_OPCODES = 9
+
+# Sim fields of the mob DoT slots: (remaining, timer, damage per tick)
+DOT_SLOTS = {
+    1: ('dot_remaining', 'dot_timer', 'dot_damage_per_tick'),
+    2: ('dot2_remaining', 'dot2_timer', 'dot2_damage_per_tick'),
+    3: ('dot3_remaining', 'dot3_timer', 'dot3_damage_per_tick'),
+    4: ('dot4_remaining', 'dot4_timer', 'dot4_damage_per_tick'),
+}
+
+# Holy Nova's triggered heal spells: (BasePoints, DieSides) per nova rank
+HOLY_NOVA_HEAL_POINTS = {
+    15237: (29, 5), 15430: (54, 7), 15431: (86, 11),
+    27799: (124, 15), 27800: (163, 19), 27801: (220, 25),
+}
+
+FEAR_TARGETS = 5
+FEAR_TICKS = 16            # 8s
+WEAKENED_SOUL_TICKS = 30   # 15s
+
+
+# ─── Family effect declarations ──────────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class Effect:
+    """One DBC effect slot of a spell family and the sim state it drives."""
+    effect: int
+    aura: int = 0
+    opts: tuple = ()           # ((name, value), ...) handler options
+
+    def opt(self, name, default=None):
+        return dict(self.opts).get(name, default)
+
+
+@dataclass(frozen=True, slots=True)
+class Family:
+    """DBC effects of a spell family plus its cast rules."""
+    effects: tuple
+    offensive: bool = False    # needs a live hostile target in range/LOS
+    channel: bool = False      # ticks through the channel system
+    cost_talent: bool = False  # Focused Mind mana cost reduction
+    cd_talent: bool = False    # Improved Mind Blast cooldown reduction
+
+
+def _fx(effect, aura=0, **opts) -> Effect:
+    return Effect(effect, aura, tuple(opts.items()))
+
+
+def _aura(aura, **opts) -> Effect:
+    return _fx(SPELL_EFFECT_APPLY_AURA, aura, **opts)
+
+
+FAMILY_EFFECTS = {
+    FAMILY_SMITE: Family(offensive=True, effects=(
+        _fx(SPELL_EFFECT_SCHOOL_DAMAGE),)),
+    FAMILY_HEAL: Family(effects=(_fx(SPELL_EFFECT_HEAL),)),
+    FAMILY_FLASH_HEAL: Family(effects=(_fx(SPELL_EFFECT_HEAL),)),
+    FAMILY_SW_PAIN: Family(offensive=True, effects=(
+        _aura(SPELL_AURA_PERIODIC_DAMAGE, slot=1, shadow=True, sw_pain=True,
+              misery=True, weaving=True),)),
+    FAMILY_PW_SHIELD: Family(effects=(
+        _aura(SPELL_AURA_SCHOOL_ABSORB, exclusive=True),)),
+    FAMILY_MIND_BLAST: Family(offensive=True, cost_talent=True, cd_talent=True, effects=(
+        _fx(SPELL_EFFECT_SCHOOL_DAMAGE, shadow=True),)),
+    FAMILY_RENEW: Family(effects=(
+        _aura(SPELL_AURA_PERIODIC_HEAL, exclusive=True),)),
+    FAMILY_HOLY_FIRE: Family(offensive=True, effects=(
+        _fx(SPELL_EFFECT_SCHOOL_DAMAGE),
+        _aura(SPELL_AURA_PERIODIC_DAMAGE, slot=2))),
+    FAMILY_INNER_FIRE: Family(effects=(
+        _aura(SPELL_AURA_MOD_RESISTANCE, remaining='inner_fire_remaining',
+              value='inner_fire_armor', inner_fire_spellpower=0, recalc=True,
+              exclusive=True),)),
+    FAMILY_FORTITUDE: Family(effects=(
+        _aura(SPELL_AURA_MOD_STAT, remaining='fortitude_remaining',
+              value='fortitude_stamina_bonus', recalc=True, keep_hp_gain=True,
+              exclusive=True),)),
+    FAMILY_DEVOURING_PLAGUE: Family(offensive=True, effects=(
+        _aura(SPELL_AURA_PERIODIC_DAMAGE, slot=3, shadow=True, heals_caster=True,
+              plague=True, weaving=True, exclusive=True),)),
+    FAMILY_PSYCHIC_SCREAM: Family(effects=(_aura(SPELL_AURA_MOD_FEAR),)),
+    FAMILY_SHADOW_PROTECTION: Family(effects=(
+        _aura(SPELL_AURA_MOD_RESISTANCE, remaining='shadow_prot_remaining',
+              value='shadow_prot_value', exclusive=True),)),
+    FAMILY_DIVINE_SPIRIT: Family(effects=(
+        _aura(SPELL_AURA_MOD_STAT, remaining='divine_spirit_remaining',
+              value='divine_spirit_bonus', recalc=True, exclusive=True),)),
+    FAMILY_FEAR_WARD: Family(effects=(
+        _aura(SPELL_AURA_MECHANIC_IMMUNITY, remaining='fear_ward_remaining',
+              exclusive=True),)),
+    FAMILY_HOLY_NOVA: Family(effects=(
+        _fx(SPELL_EFFECT_SCHOOL_DAMAGE, radius=True),
+        _fx(SPELL_EFFECT_TRIGGER_SPELL, heal_points=HOLY_NOVA_HEAL_POINTS,
+            sp_coeff=SP_COEFF_HOLY_NOVA_HEAL))),
+    # No debuffs are modelled, so dispelling has nothing to remove
+    FAMILY_DISPEL_MAGIC: Family(effects=(_fx(SPELL_EFFECT_DISPEL),)),
+    FAMILY_MIND_FLAY: Family(offensive=True, channel=True, cost_talent=True, effects=(
+        _aura(SPELL_AURA_PERIODIC_DAMAGE, channel=True),)),
+    FAMILY_VAMPIRIC_TOUCH: Family(offensive=True, effects=(
+        _aura(SPELL_AURA_PERIODIC_DAMAGE, slot=4, shadow=True, misery=True,
+              weaving=True, exclusive=True),)),
+    FAMILY_DISPERSION: Family(effects=(
+        _aura(SPELL_AURA_MOD_DAMAGE_PERCENT_TAKEN, remaining='dispersion_remaining',
+              exclusive=True, is_casting=False, gcd_remaining=0),)),
+}
+
+
+# ─── Programs ────────────────────────────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class SpellProgram:
+    """Compiled cast rules and effect steps of one spell rank."""
+    spell: SpellDef
+    effects: tuple             # ((opcode, args), ...)
+    offensive: bool = False
+    channel: bool = False
+    cost_talent: bool = False
+    cd_talent: bool = False
+    player_blocks: tuple = ()  # player fields that must be 0 to cast
+    target_blocks: tuple = ()  # target fields that must be 0 to cast
+
+
+def _direct_range(spell: SpellDef, coeff: float) -> tuple:
+    """(lo, hi, coeff) of BasePoints+1 .. BasePoints+DieSides (+SP)."""
+    if spell.die_sides <= 0:
+        return (0, 0, 0.0)
+    return (spell.base_points + 1, spell.base_points + spell.die_sides, coeff)
+
+
+def compile_spell(spell: SpellDef, family: Family = None) -> SpellProgram:
+    """Compile one rank against its family's effect declarations."""
+    if family is None:
+        family = FAMILY_EFFECTS[spell.spell_family]
+    direct_coeff, tick_coeff = get_sp_coeff(spell.id)
+    steps = [(FX_TARGET_HIT, ())] if family.offensive and not family.channel else []
+    player_blocks = []
+    target_blocks = []
+
+    for fx in family.effects:
+        key = (fx.effect, fx.aura)
+        if key == (SPELL_EFFECT_SCHOOL_DAMAGE, 0):
+            lo, hi, coeff = _direct_range(spell, direct_coeff)
+            if fx.opt('radius'):
+                steps.append((FX_AOE_DAMAGE, (lo, hi, coeff, spell.spell_range)))
+            else:
+                steps.append((FX_SCHOOL_DAMAGE, (lo, hi, coeff, bool(fx.opt('shadow')),
+                                                 spell.spell_family)))
+        elif key == (SPELL_EFFECT_HEAL, 0):
+            steps.append((FX_HEAL, _direct_range(spell, direct_coeff)))
+        elif key == (SPELL_EFFECT_TRIGGER_SPELL, 0):
+            # Triggered self heal (Holy Nova): the heal spell's own points
+            points = fx.opt('heal_points')
+            if spell.id not in points:
+                raise ValueError(f"spell {spell.id}: no triggered heal points")
+            bp, ds = points[spell.id]
+            steps.append((FX_HEAL, (bp + 1, bp + ds, fx.opt('sp_coeff'))))
+        elif key == (SPELL_EFFECT_APPLY_AURA, SPELL_AURA_PERIODIC_DAMAGE):
+            if fx.opt('channel'):
+                player_blocks.append('channel_remaining')
+                continue
+            slot = DOT_SLOTS[fx.opt('slot')]
+            if fx.opt('heals_caster'):
+                slot += (slot[0].replace('remaining', 'heals_caster'),)
+            steps.append((FX_PERIODIC_DAMAGE, (
+                spell.dot_per_tick, tick_coeff, spell.dot_ticks, spell.dot_interval,
+                slot, bool(fx.opt('shadow')), bool(fx.opt('sw_pain')),
+                bool(fx.opt('misery')), bool(fx.opt('weaving')),
+                bool(fx.opt('plague')), spell.spell_family)))
+            if fx.opt('exclusive'):
+                target_blocks.append(slot[0])
+        elif key == (SPELL_EFFECT_APPLY_AURA, SPELL_AURA_SCHOOL_ABSORB):
+            steps.append((FX_ABSORB, (spell.shield_base + spell.shield_die, direct_coeff,
+                                      spell.shield_duration)))
+            if fx.opt('exclusive'):
+                player_blocks += ['shield_remaining', 'shield_cooldown']
+        elif key == (SPELL_EFFECT_APPLY_AURA, SPELL_AURA_PERIODIC_HEAL):
+            steps.append((FX_PERIODIC_HEAL, (spell.hot_per_tick, tick_coeff,
+                                             spell.hot_ticks, spell.hot_interval)))
+            if fx.opt('exclusive'):
+                player_blocks.append('hot_remaining')
+        elif key == (SPELL_EFFECT_APPLY_AURA, SPELL_AURA_MOD_FEAR):
+            steps.append((FX_FEAR, (FEAR_TARGETS, spell.spell_range, FEAR_TICKS)))
+        elif fx.effect == SPELL_EFFECT_APPLY_AURA:
+            # Player buff: duration into `remaining`, BasePoints into `value`
+            opts = dict(fx.opts)
+            sets = [(opts.pop('remaining'), spell.buff_duration)]
+            if 'value' in opts:
+                sets.append((opts.pop('value'), spell.buff_value))
+            recalc = opts.pop('recalc', False)
+            keep_hp_gain = opts.pop('keep_hp_gain', False)
+            if opts.pop('exclusive', False):
+                player_blocks.append(sets[0][0])
+            sets += opts.items()
+            steps.append((FX_PLAYER_AURA, (tuple(sets), recalc, keep_hp_gain)))
+        elif key == (SPELL_EFFECT_DISPEL, 0):
+            pass
+        else:
+            raise ValueError(f"spell {spell.id}: no opcode for DBC effect {key}")
+
+    return SpellProgram(
+        spell=spell, effects=tuple(steps), offensive=family.offensive,
+        channel=family.channel, cost_talent=family.cost_talent,
+        cd_talent=family.cd_talent, player_blocks=tuple(player_blocks),
+        target_blocks=tuple(target_blocks))
+
+
+def compile_spells(spells: dict = None) -> dict[int, SpellProgram]:
+    """spell_id -> SpellProgram for every rank of a declared family."""
+    if spells is None:
+        spells = SPELLS
+    return {sid: compile_spell(spell) for sid, spell in spells.items()
+            if spell.spell_family in FAMILY_EFFECTS}
+
+
+SPELL_PROGRAMS = compile_spells()
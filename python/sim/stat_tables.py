@@ -0,0 +1,271 @@
+"""
+Dense level-indexed lookup tables for the player stat formulas.
+
+formulas.py answers one stat at a time from the DBC/CSV dicts loaded by
+dbc_loader (tuple-keyed lookups plus the hardcoded fallbacks). StatTables
+packs every input of those formulas into NumPy arrays indexed by
+(class_id, level) or (CR type, level) once, so the whole derived-stat
+block of one player or of a batch of players is a handful of array
+operations. Values match the scalar formulas exactly (same operations in
+the same order), including their fallbacks for missing tables.
+
+Usage:
+    tables = StatTables.from_dbc(data_dir)   # or default_stat_tables()
+    block = tables.derive(class_ids, levels, stamina=gear_sta, crit_rating=cr)
+    block['max_hp'], block['spell_crit'], block['dodge']   # aligned arrays
+"""
+
+import numpy as np
+
+import sim.constants as _c
+from sim.constants import (
+    CLASS_PRIEST, CLASS_WARRIOR, CLASS_PALADIN, CLASS_HUNTER, CLASS_ROGUE,
+    CLASS_DEATH_KNIGHT, CLASS_SHAMAN, CLASS_MAGE, CLASS_WARLOCK, CLASS_DRUID,
+    CLASS_POWER_TYPE, POWER_MANA,
+    GT_MELEE_CRIT, GT_SPELL_CRIT, DODGE_BASE, CRIT_TO_DODGE, DR_K,
+    DODGE_CAP, PARRY_CAP, GT_REGEN_MP_PER_SPT, GT_HP_REGEN_PER_SPT,
+    CR_DEFENSE_L80, CR_DODGE_L80, CR_PARRY_L80, CR_BLOCK_L80,
+    CR_HIT_MELEE_L80, CR_HIT_RANGED_L80, CR_HIT_SPELL_L80,
+    CR_CRIT_MELEE_L80, CR_CRIT_RANGED_L80, CR_CRIT_SPELL_L80,
+    CR_HASTE_MELEE_L80, CR_HASTE_RANGED_L80, CR_HASTE_SPELL_L80,
+    CR_EXPERTISE_L80, CR_ARMOR_PENETRATION_L80, CR_RESILIENCE_L80,
+)
+from sim.formulas import _fallback_rating_per_pct, _l80_to_cr_type
+
+NUM_CLASSES = 12            # class_id axis (ids 1-9 and 11; 0 and 10 unused)
+NUM_LEVELS = 101            # level axis 0..100 (0 unused)
+NUM_CR_TYPES = 32           # gtCombatRatings rating types
+
+# Rating anchors the formulas use, by derive() name
+_RATINGS = {
+    'defense': CR_DEFENSE_L80, 'dodge': CR_DODGE_L80, 'parry': CR_PARRY_L80,
+    'block': CR_BLOCK_L80, 'hit_melee': CR_HIT_MELEE_L80,
+    'hit_ranged': CR_HIT_RANGED_L80, 'hit_spell': CR_HIT_SPELL_L80,
+    'crit_melee': CR_CRIT_MELEE_L80, 'crit_ranged': CR_CRIT_RANGED_L80,
+    'crit_spell': CR_CRIT_SPELL_L80, 'haste_melee': CR_HASTE_MELEE_L80,
+    'haste_ranged': CR_HASTE_RANGED_L80, 'haste_spell': CR_HASTE_SPELL_L80,
+    'expertise': CR_EXPERTISE_L80, 'armor_pen': CR_ARMOR_PENETRATION_L80,
+    'resilience': CR_RESILIENCE_L80,
+}
+
+# Melee/ranged AP = level*a + str*b + agi*c + d per class (formulas.*_attack_power)
+_MELEE_AP = {CLASS_WARRIOR: (3.0, 2.0, 0.0, -20.0), CLASS_PALADIN: (3.0, 2.0, 0.0, -20.0),
+             CLASS_DEATH_KNIGHT: (3.0, 2.0, 0.0, -20.0),
+             CLASS_HUNTER: (2.0, 1.0, 1.0, -20.0), CLASS_SHAMAN: (2.0, 1.0, 1.0, -20.0),
+             CLASS_ROGUE: (2.0, 1.0, 1.0, -20.0), CLASS_DRUID: (0.0, 2.0, 0.0, -20.0)}
+_RANGED_AP = {CLASS_HUNTER: (2.0, 0.0, 1.0, -10.0), CLASS_WARRIOR: (1.0, 0.0, 1.0, -10.0),
+              CLASS_ROGUE: (1.0, 0.0, 1.0, -10.0)}
+_CASTER_MELEE_AP = (0.0, 1.0, 0.0, -10.0)
+_OTHER_RANGED_AP = (0.0, 0.0, 1.0, -10.0)
+
+
+def _lerp80(pair, level: int) -> float:
+    t = min((level - 1) / 79.0, 1.0)
+    return pair[0] * (1 - t) + pair[1] * t
+
+
+class StatTables:
+    """Per-(class, level) formula inputs as dense arrays.
+
+    ``tables`` is the dict returned by dbc_loader.load_all_dbc_tables; any
+    table that is None (or missing) uses the same hardcoded fallback as
+    formulas.py.
+    """
+
+    def __init__(self, tables: dict | None = None):
+        tables = tables or {}
+        pcs = tables.get('player_class_stats')
+        gt_cr = tables.get('gt_combat_ratings')
+        melee_crit = tables.get('gt_melee_crit')
+        melee_crit_base = tables.get('gt_melee_crit_base')
+        spell_crit = tables.get('gt_spell_crit')
+        spell_crit_base = tables.get('gt_spell_crit_base')
+        regen_mp = tables.get('gt_regen_mp_per_spt')
+        regen_hp = tables.get('gt_regen_hp_per_spt')
+
+        shape = (NUM_CLASSES, NUM_LEVELS)
+        # (hp, mana, str, agi, sta, int, spi) as in player_class_stats
+        self.base = np.zeros(shape + (7,), dtype=np.int64)
+        self.melee_crit_per_agi = np.zeros(shape)
+        self.spell_crit_per_int = np.zeros(shape)
+        self.regen_mp_per_spt = np.zeros(shape)
+        self.regen_hp_per_spt = np.zeros(shape)
+        self.melee_crit_base = np.zeros(NUM_CLASSES)
+        self.spell_crit_base = np.zeros(NUM_CLASSES)
+        self.has_mana = np.zeros(NUM_CLASSES, dtype=bool)
+        self.crit_to_dodge = np.zeros(NUM_CLASSES)
+        self.dodge_base = np.zeros(NUM_CLASSES)
+        self.dodge_cap = np.zeros(NUM_CLASSES)
+        self.parry_cap = np.zeros(NUM_CLASSES)
+        self.dr_k = np.zeros(NUM_CLASSES)
+        self.melee_ap = np.zeros((NUM_CLASSES, 4))
+        self.ranged_ap = np.zeros((NUM_CLASSES, 4))
+
+        for cls in range(NUM_CLASSES):
+            gt_m = GT_MELEE_CRIT.get(cls, GT_MELEE_CRIT[CLASS_PRIEST])
+            gt_s = GT_SPELL_CRIT.get(cls, GT_SPELL_CRIT[CLASS_PRIEST])
+            base_stats = _c.CLASS_BASE_STATS.get(cls, _c.CLASS_BASE_STATS[CLASS_PRIEST])
+            base_hp_mana = _c.CLASS_BASE_HP_MANA.get(cls, _c.CLASS_BASE_HP_MANA[CLASS_PRIEST])
+            for lvl in range(1, NUM_LEVELS):
+                key = (cls, min(lvl, 80))
+                if pcs is not None and key in pcs:
+                    self.base[cls, lvl] = pcs[key]
+                else:
+                    self.base[cls, lvl] = (
+                        base_hp_mana[0] + (lvl - 1) * _c.CLASS_HP_PER_LEVEL.get(cls, 50),
+                        base_hp_mana[1] + (lvl - 1) * _c.CLASS_MANA_PER_LEVEL.get(cls, 5),
+                        *(b + (lvl - 1) for b in base_stats))
+                val = melee_crit.get(key) if melee_crit is not None else None
+                self.melee_crit_per_agi[cls, lvl] = val if val is not None else _lerp80(gt_m[1:], lvl)
+                val = spell_crit.get(key) if spell_crit is not None else None
+                self.spell_crit_per_int[cls, lvl] = val if val is not None else _lerp80(gt_s[1:], lvl)
+                if regen_mp is not None:
+                    val = regen_mp.get(key)
+                    self.regen_mp_per_spt[cls, lvl] = val if val is not None and val > 0 else 0.0
+                elif cls in GT_REGEN_MP_PER_SPT:
+                    self.regen_mp_per_spt[cls, lvl] = _lerp80(GT_REGEN_MP_PER_SPT[cls], lvl)
+                if regen_hp is not None:
+                    self.regen_hp_per_spt[cls, lvl] = regen_hp.get(key, 0.0)
+                else:
+                    gt = GT_HP_REGEN_PER_SPT.get(cls, (0.0, 0.0))
+                    self.regen_hp_per_spt[cls, lvl] = (
+                        gt if isinstance(gt, (int, float)) else _lerp80(gt, lvl))
+
+            val = melee_crit_base.get(cls) if melee_crit_base is not None else None
+            self.melee_crit_base[cls] = val if val is not None else gt_m[0]
+            val = spell_crit_base.get(cls) if spell_crit_base is not None else None
+            self.spell_crit_base[cls] = val if val is not None else gt_s[0]
+            self.has_mana[cls] = CLASS_POWER_TYPE.get(cls, POWER_MANA) == POWER_MANA
+            self.crit_to_dodge[cls] = CRIT_TO_DODGE.get(cls, CRIT_TO_DODGE[CLASS_PRIEST])
+            self.dodge_base[cls] = DODGE_BASE.get(cls, DODGE_BASE[CLASS_PRIEST])
+            self.dodge_cap[cls] = DODGE_CAP.get(cls, 150.0)
+            self.parry_cap[cls] = PARRY_CAP.get(cls, 0.0)
+            self.dr_k[cls] = DR_K.get(cls, 0.983)
+            caster = cls in (CLASS_MAGE, CLASS_PRIEST, CLASS_WARLOCK)
+            self.melee_ap[cls] = _CASTER_MELEE_AP if caster else _MELEE_AP.get(cls, _CASTER_MELEE_AP)
+            self.ranged_ap[cls] = _RANGED_AP.get(cls, _OTHER_RANGED_AP)
+
+        # Rating needed for 1% per (CR type, level); types without an anchor stay inf
+        self.rating_per_pct = np.full((NUM_CR_TYPES, NUM_LEVELS), np.inf)
+        self._cr = {}
+        for name, l80 in _RATINGS.items():
+            cr = self._cr[name] = _l80_to_cr_type(l80)
+            for lvl in range(1, NUM_LEVELS):
+                val = gt_cr.get((cr, lvl)) if gt_cr is not None else None
+                self.rating_per_pct[cr, lvl] = (
+                    val if val is not None and val > 0 else _fallback_rating_per_pct(l80, lvl))
+
+    @classmethod
+    def from_dbc(cls, data_dir: str) -> 'StatTables':
+        """Load ``data_dir`` with dbc_loader.load_all_dbc_tables and pack it."""
+        from sim.dbc_loader import load_all_dbc_tables
+        return cls(load_all_dbc_tables(data_dir))
+
+    def rating_pct(self, name: str, rating, level) -> np.ndarray:
+        """formulas._rating_to_pct for the ``name`` rating (see _RATINGS)."""
+        rating = np.asarray(rating, dtype=np.float64)
+        pct = rating / self.rating_per_pct[self._cr[name], level]
+        return np.where(rating > 0, pct, 0.0)
+
+    def derive(self, class_id, level, *, strength=0, agility=0, stamina=0,
+               intellect=0, spirit=0, bonus_hp=0, bonus_mana=0,
+               crit_rating=0, haste_rating=0, hit_rating=0, dodge_rating=0,
+               parry_rating=0, block_rating=0, defense_rating=0,
+               expertise_rating=0, arp_rating=0, resilience_rating=0) -> dict:
+        """Derived-stat block for players of ``class_id`` at ``level``.
+
+        Primary stats are bonuses on top of the class/level base (gear,
+        buffs), like the ``bonus_*`` arguments of formulas.py. All
+        arguments broadcast; each value of the result is an array of the
+        broadcast shape (0-d for scalar input).
+        """
+        cls = np.asarray(class_id, dtype=np.int64)
+        lvl = np.asarray(level, dtype=np.int64)
+        base = self.base[cls, lvl]
+        total_str = base[..., 2] + strength
+        total_agi = base[..., 3] + agility
+        total_sta = base[..., 4] + stamina
+        total_int = base[..., 5] + intellect
+        total_spi = base[..., 6] + spirit
+        r = lambda name, rating: self.rating_pct(name, rating, lvl)
+        out = {
+            'strength': total_str, 'agility': total_agi, 'stamina': total_sta,
+            'intellect': total_int, 'spirit': total_spi,
+        }
+
+        # HP / mana (StatSystem.cpp:GetHealthBonusFromStamina / ...FromIntellect)
+        out['max_hp'] = (base[..., 0] + np.minimum(total_sta, 20)
+                         + np.maximum(total_sta - 20, 0) * 10 + bonus_hp)
+        out['max_mana'] = np.where(
+            self.has_mana[cls], base[..., 1] + np.minimum(total_int, 20)
+            + np.maximum(total_int - 20, 0) * 15 + bonus_mana, 0)
+
+        # Crit
+        agi_ratio = self.melee_crit_per_agi[cls, lvl]
+        melee = (self.melee_crit_base[cls] + total_agi * agi_ratio) * 100.0
+        out['melee_crit'] = np.maximum(melee + r('crit_melee', crit_rating), 0.0)
+        out['ranged_crit'] = np.maximum(melee + r('crit_ranged', crit_rating), 0.0)
+        spell = (self.spell_crit_base[cls] + total_int * self.spell_crit_per_int[cls, lvl]) * 100.0
+        out['spell_crit'] = np.maximum(spell + r('crit_spell', crit_rating), 0.0)
+
+        # Haste / hit
+        for kind in ('melee', 'ranged', 'spell'):
+            out[f'{kind}_haste'] = r(f'haste_{kind}', haste_rating)
+            out[f'hit_{kind}'] = r(f'hit_{kind}', hit_rating)
+
+        # Dodge / parry with diminishing returns, block (shield users)
+        defense = r('defense', defense_rating) * 0.04
+        c2d = self.crit_to_dodge[cls]
+        base_agi = base[..., 3]
+        nondim = 100.0 * (self.dodge_base[cls] + base_agi * agi_ratio * c2d)
+        dim = 100.0 * np.maximum(0, total_agi - base_agi) * agi_ratio * c2d
+        dim = dim + r('dodge', dodge_rating) + defense
+        cap, k = self.dodge_cap[cls], self.dr_k[cls]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dr = np.where((cap > 0) & (dim > 0), dim * cap / (dim + cap * k), 0.0)
+        out['dodge'] = np.maximum(nondim + dr, 0.0)
+        cap = self.parry_cap[cls]
+        dim = r('parry', parry_rating) + defense
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dr = np.where(dim > 0, dim * cap / (dim + cap * k), 0.0)
+        out['parry'] = np.where(cap > 0, np.maximum(5.0 + dr, 0.0), 0.0)
+        out['block'] = np.maximum(5.0 + r('block', block_rating) + defense, 0.0)
+
+        # Attack power
+        for name, coef in (('melee_ap', self.melee_ap[cls]), ('ranged_ap', self.ranged_ap[cls])):
+            ap = (lvl * coef[..., 0] + total_str * coef[..., 1]
+                  + total_agi * coef[..., 2] + coef[..., 3])
+            out[name] = np.trunc(ap).astype(np.int64)
+
+        # Other ratings
+        out['defense'] = r('defense', defense_rating)
+        out['expertise'] = r('expertise', expertise_rating) * 0.25
+        out['armor_pen'] = np.minimum(r('armor_pen', arp_rating), 100.0)
+        out['resilience'] = r('resilience', resilience_rating)
+
+        # Spirit regen per 0.5 s tick (OOC mana, HP)
+        out['mana_regen'] = (np.sqrt(np.maximum(total_int, 1)) * total_spi
+                             * self.regen_mp_per_spt[cls, lvl]) * 0.5
+        hp_coeff = self.regen_hp_per_spt[cls, lvl]
+        out['hp_regen'] = np.where(hp_coeff > 0, total_spi * hp_coeff * 0.5, 0.0)
+        return out
+
+
+_default: StatTables | None = None
+
+
+def default_stat_tables() -> StatTables:
+    """StatTables over the tables sim.constants loaded at import (built once)."""
+    global _default
+    if _default is None:
+        _default = StatTables({
+            'player_class_stats': _c.PLAYER_CLASS_LEVEL_STATS,
+            'gt_combat_ratings': _c.GT_COMBAT_RATINGS,
+            'gt_melee_crit': _c.GT_MELEE_CRIT_TABLE,
+            'gt_melee_crit_base': _c.GT_MELEE_CRIT_BASE_TABLE,
+            'gt_spell_crit': _c.GT_SPELL_CRIT_TABLE,
+            'gt_spell_crit_base': _c.GT_SPELL_CRIT_BASE_TABLE,
+            'gt_regen_mp_per_spt': _c.GT_REGEN_MP_PER_SPT_TABLE,
+            'gt_regen_hp_per_spt': _c.GT_REGEN_HP_PER_SPT_TABLE,
+        })
+    return _default
@@ -15,9 +15,11 @@ Key milestones:
   - Level 71+: Discipline talents (Meditation for combat mana regen)
 """
 
+from dataclasses import dataclass
+
 # ─── Talent Definitions ──────────────────────────────────────────────
 # Each talent: (tree, tier, max_points, description)
-# Effects are implemented in combat_sim.py via get_talent_points()
+# Effects are compiled into TalentMods (below) and applied in combat_sim.py
 
 TALENT_DEFS = {
     # === SHADOW TREE ===
@@ -264,3 +266,70 @@ def get_talent_for_level(level: int) -> str | None:
     if idx >= len(SHADOW_PRIEST_BUILD):
         return None
     return SHADOW_PRIEST_BUILD[idx]
+
+
+# ─── Compiled Talent Modifiers ───────────────────────────────────────
+# Numeric form of the talent effects above. CombatSimulation rebuilds the
+# player's TalentMods whenever a point is assigned, so combat code reads
+# plain attributes instead of looking talents up by name.
+
+@dataclass(slots=True)
+class TalentMods:
+    """Per-player talent effects (defaults = no talents)."""
+    # Stats
+    fortitude_mult: float = 1.0       # Improved PW:Fortitude: Stamina from Fortitude
+    spirit_mult: float = 1.0          # Improved Spirit Tap: total Spirit
+    spirit_tap: bool = False          # Spirit Tap: proc on kill
+    spirit_tap_mult: float = 1.0      # Spirit Tap proc: Spirit multiplier
+    inner_fire_mult: float = 1.0      # Improved Inner Fire: armor from Inner Fire
+    spirit_to_sp: float = 0.0         # Twisted Faith: Spirit -> Spell Power fraction
+    shadow_hit: int = 0               # Shadow Focus: +% Shadow spell hit
+    meditation_pct: float = 0.0       # Meditation: Spirit regen kept while casting
+    # Shadow damage
+    shadow_damage_mod: float = 1.0    # Darkness
+    sw_pain_mod: float = 1.0          # Improved SW:Pain
+    twisted_faith_mod: float = 1.0    # Twisted Faith: MB/MF vs. targets with SW:Pain
+    mind_crit_bonus: float = 0.0      # Mind Melt: +crit % on MB/MF
+    mind_crit_mult: float = 1.5       # Shadow Power: MB/MF crit multiplier
+    plague_instant_pct: float = 0.0   # Improved Devouring Plague: instant share of DoT
+    # Procs, debuffs, heals
+    weaving_chance: float = 0.0       # Shadow Weaving: stack chance per Shadow hit
+    misery: bool = False              # Misery: SW:P/MF/VT apply the hit debuff
+    swp_refresh_chance: float = 0.0   # Pain and Suffering: MF refreshes SW:Pain
+    embrace_pct: float = 0.0          # Vampiric Embrace (+Improved): heal share
+    # Costs and cooldowns
+    mind_cost_mult: float = 1.0       # Focused Mind: MB/MF mana cost
+    mind_blast_cd_cut: int = 0        # Improved Mind Blast: cooldown ticks removed
+
+    @classmethod
+    def from_points(cls, points: dict) -> 'TalentMods':
+        """Compile ``talent_name -> points`` into modifiers."""
+        def pts(name: str) -> int:
+            return points.get(name, 0)
+
+        ve_pct = 0.0
+        if pts("vampiric_embrace") >= 1:
+            ve_pct = (0.15, 0.20, 0.25)[min(pts("improved_vampiric_embrace"), 2)]
+        med = pts("meditation")
+        return cls(
+            fortitude_mult=1.0 + 0.15 * pts("improved_pw_fortitude"),
+            spirit_mult=1.0 + 0.05 * pts("improved_spirit_tap"),
+            spirit_tap=pts("spirit_tap") > 0,
+            spirit_tap_mult=1.0 + pts("spirit_tap") / 3.0,   # 3/3 = +100% Spirit
+            inner_fire_mult=1.0 + 0.15 * pts("improved_inner_fire"),
+            spirit_to_sp=0.04 * pts("twisted_faith"),
+            shadow_hit=pts("shadow_focus"),
+            meditation_pct={0: 0.0, 1: 0.17, 2: 0.33}.get(med, 0.50),
+            shadow_damage_mod=1.0 + 0.02 * pts("darkness"),
+            sw_pain_mod=1.0 + 0.03 * pts("improved_sw_pain"),
+            twisted_faith_mod=1.0 + 0.02 * pts("twisted_faith"),
+            mind_crit_bonus=pts("mind_melt") * 3.0,
+            mind_crit_mult=1.5 + 0.1 * pts("shadow_power"),
+            plague_instant_pct=0.1 * pts("improved_devouring_plague"),
+            weaving_chance=pts("shadow_weaving") / 3.0,
+            misery=pts("misery") > 0,
+            swp_refresh_chance=pts("pain_and_suffering") / 3.0,
+            embrace_pct=ve_pct,
+            mind_cost_mult=1.0 - 0.05 * pts("focused_mind"),
+            mind_blast_cd_cut=pts("improved_mind_blast"),
+        )
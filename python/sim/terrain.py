@@ -7,17 +7,34 @@ using the WoW3DEnvironment from test_3d_env.py.
 Tiles are loaded on demand as the player moves across Map 0.
 The vmtree (BIH spatial index) is loaded once at init, map tiles
 and vmtiles are loaded when the player enters a new tile region.
+Given a heading, ensure_loaded() also queues the tiles ahead of the
+player on a small thread pool; decoded tiles are installed on the
+caller's thread once the player's tile window reaches them, so the set
+of resident tiles never depends on worker timing.
+
+Tiles with a baked walkability grid (sim/walk_bake.py, ``<map>.walk``
+next to the .map) answer short moves from their per-cell edge masks;
+moves touching unbaked tiles fall back to the exact checks.
 
 Usage:
     terrain = SimTerrain("/path/to/Data")   # loads vmtree + spawn tiles
     terrain.ensure_loaded(x, y)             # load tiles around position
+    terrain.ensure_loaded(x, y, heading)    # ... and prefetch the tiles ahead
     z = terrain.get_height(-8921, -120)      # terrain height
     los = terrain.check_los(x1,y1,z1, x2,y2,z2)  # line of sight
+    clear = terrain.check_los_many(px,py,pz, mob_xs,mob_ys,mob_zs)  # one-to-many
     ok = terrain.check_walkable(x1,y1,z1, x2,y2,z2)  # walkability
+    oks = terrain.check_walkable_many(x1s,y1s,z1s, x2s,y2s,z2s)  # arrays
 """
 
+import math
 import os
 import sys
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
 
 # Ensure parent dir is on path for test_3d_env import
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,10 +45,46 @@ if PARENT_DIR not in sys.path:
 from test_3d_env import (
     WoW3DEnvironment, Vec3, INVALID_HEIGHT,
     world_to_grid, vmtile_filename, parse_vmtile, parse_vmtree,
-    vmtree_filename, MAX_NUMBER_OF_GRIDS, SpatialLOSChecker,
+    vmtree_filename, MAX_NUMBER_OF_GRIDS, VMapTree,
+    MapTile, map_filename, parse_map_file, get_terrain_height,
+    CENTER_GRID_ID, SIZE_OF_GRIDS,
 )
 
 
+def load_vmtree(data_root: str, map_id: int) -> VMapTree | None:
+    """Parse ``<data_root>/vmaps/<map>.vmtree`` (None if missing)."""
+    path = os.path.join(data_root, "vmaps", vmtree_filename(map_id))
+    return parse_vmtree(path, map_id)
+
+
+@dataclass(slots=True)
+class HeightGrid:
+    """Lazily filled float32 heights of one tile's 0.5-unit cells.
+
+    Covers the cells whose centers lie in ``tile``; 0.0 marks a cell not
+    yet computed. The array comes from np.zeros, so only pages that hold
+    filled cells are backed by memory.
+    """
+    key: tuple              # (tx, ty)
+    tile: MapTile
+    ix0: int                # first cell (floor(x * 2)) covered
+    iy0: int
+    ix1: int                # one past the last
+    iy1: int
+    cells: np.ndarray       # float32 (ix1 - ix0, iy1 - iy0)
+    view: memoryview        # flat float view of cells (fast scalar access)
+
+
+def _cell_span(g: int, quant: float) -> tuple[int, int]:
+    """[first, end) cell indices whose centers fall in grid row/column ``g``."""
+    hi = (CENTER_GRID_ID - g) * SIZE_OF_GRIDS
+    lo = hi - SIZE_OF_GRIDS
+    idx = np.arange(math.floor(lo * quant) - 2, math.floor(hi * quant) + 3)
+    inside = np.flatnonzero(
+        (CENTER_GRID_ID - (idx + 0.5) / quant / SIZE_OF_GRIDS).astype(np.int64) == g)
+    return int(idx[inside[0]]), int(idx[inside[-1]]) + 1
+
+
 class SimTerrain:
     """
     Wraps WoW3DEnvironment for use in CombatSimulation.
@@ -43,92 +96,205 @@ class SimTerrain:
     SPAWN_Y = -120.485
     SPAWN_Z = 82.025
     TILE_RADIUS = 1         # 3x3 grid of tiles around current position
+    MAX_RESIDENT_TILES = 25     # LRU bound on loaded tiles (>= the 3x3 window)
+    PREFETCH_DISTANCE = 250.0   # yd ahead of the player whose tile window is queued
+    PREFETCH_WORKERS = 2        # decode threads; 0 disables prefetching
 
-    def __init__(self, data_root: str, quiet: bool = False):
+    def __init__(self, data_root: str, quiet: bool = False,
+                 vmtree: VMapTree | None = None,
+                 prefetch_workers: int | None = None,
+                 baked_walkability: bool = True):
+        """``vmtree``: preloaded tree (e.g. SharedWorld.vmtree()) instead of
+        parsing the .vmtree file again. ``baked_walkability``: use the
+        tiles' .walk grids where present."""
         self.env = WoW3DEnvironment(data_root)
+        self._vmtree = vmtree
         self._loaded = False
         self._quiet = quiet
-        # Track which tiles we've attempted to load (avoids re-reading missing files)
-        self._attempted_tiles: set = set()
+        # Tiles we've attempted to load (avoids re-reading missing files), in
+        # LRU order: (tx, ty) -> vmtile spawns added for it
+        self._attempted_tiles: OrderedDict[tuple, list] = OrderedDict()
         # Track which tile center the player is on (skip work when unchanged)
         self._current_center: tuple | None = None
-        # Height lookup cache: (ix, iy) -> height, quantized at 0.5 units
-        self._height_cache: dict = {}
+        # Prefetch: (tx, ty) -> Future[(MapTile | None, spawns, walk)], pool made lazily
+        self._prefetch_workers = (self.PREFETCH_WORKERS if prefetch_workers is None
+                                  else prefetch_workers)
+        self._pool: ThreadPoolExecutor | None = None
+        self._pending: dict[tuple, Future] = {}
+        self._lookahead_center: tuple | None = None
+        # Height lookup cache: one HeightGrid of 0.5-unit cells per resident tile
+        self._height_grids: dict[tuple, HeightGrid] = {}
+        self._last_grid: HeightGrid | None = None
         self._height_quant = 2.0  # 1/0.5 = 2.0 (multiply to quantize)
-        # Use spatial LOS checker instead of brute-force
-        self._spatial_los = SpatialLOSChecker(cell_size=100.0)
-        self.env.los_checker = self._spatial_los
+        # Baked walkability: (tx, ty) -> WALK_CELLS^2 edge masks of resident tiles
+        self._baked_walk = baked_walkability
+        self._walk_grids: dict[tuple, bytes] = {}
+        from sim.walk_bake import WALK_CELLS, WALK_DIRS
+        self._walk_cells = WALK_CELLS
+        self._walk_bit = {step: d for d, step in enumerate(WALK_DIRS)}
+        # (di + 1, dj + 1) -> edge bit for vectorized one-cell moves (8: same cell)
+        self._walk_bit_lut = np.full((3, 3), 8, dtype=np.int64)
+        for (di, dj), d in self._walk_bit.items():
+            self._walk_bit_lut[di + 1, dj + 1] = d
         self._load_initial()
 
     def _load_initial(self):
         """Load vmtree once and initial tiles around spawn."""
         # Load vmtree once for the whole map (BIH spatial index for LOS)
-        vtree_path = os.path.join(self.env.vmaps_dir, vmtree_filename(self.MAP_ID))
-        vtree = parse_vmtree(vtree_path, self.MAP_ID)
+        vtree = self._vmtree
+        if vtree is None:
+            vtree = load_vmtree(self.env.data_root, self.MAP_ID)
         if vtree:
             self.env.loaded_vmtrees[self.MAP_ID] = vtree
+            # LOS walks the vmtree BIH; vmtile spawns are added as tiles load
+            self.env.use_bih_los(self.MAP_ID)
             if not self._quiet:
                 print(f"  [TERRAIN] vmtree: {len(vtree.tree_nodes)} BIH nodes")
 
         # Load initial tiles around spawn
         self.ensure_loaded(self.SPAWN_X, self.SPAWN_Y)
 
-        # Build spatial LOS index after initial spawn load
-        if self._spatial_los.spawns and not self._spatial_los._built:
-            self._spatial_los.build_index()
-
         if self._loaded and not self._quiet:
             h = self.get_height(self.SPAWN_X, self.SPAWN_Y)
             print(f"  [TERRAIN] Loaded. Height at spawn: {h:.3f} (expected ~{self.SPAWN_Z:.3f})")
-            print(f"  [TERRAIN] SpatialLOS: {len(self._spatial_los.spawns)} spawns indexed")
+            print(f"  [TERRAIN] LOS: {len(self.env.los_checker.spawns)} spawns loaded")
 
-    def ensure_loaded(self, x: float, y: float):
+    def ensure_loaded(self, x: float, y: float, heading: float | None = None):
         """Ensure map tiles + vmtiles around (x, y) are loaded.
 
         Call this after the player moves. Cheap no-op when the player
-        stays on the same tile (one tuple comparison).
+        stays on the same tile (one tuple comparison). With ``heading``
+        (radians, movement direction) the tile window PREFETCH_DISTANCE
+        ahead is decoded in the background.
         """
+        if heading is not None and self._prefetch_workers > 0:
+            self._prefetch_ahead(x, y, heading)
         gx, gy = world_to_grid(x, y)
         if (gx, gy) == self._current_center:
             return  # still on the same tile — nothing to do
         self._current_center = (gx, gy)
 
-        new_map_tiles = False
         vtree = self.env.loaded_vmtrees.get(self.MAP_ID)
+        resident = self._attempted_tiles
 
-        for dx in range(-self.TILE_RADIUS, self.TILE_RADIUS + 1):
-            for dy in range(-self.TILE_RADIUS, self.TILE_RADIUS + 1):
+        for tx, ty in self._window(gx, gy):
+            if (tx, ty) in resident:
+                resident.move_to_end((tx, ty))
+                continue
+
+            future = self._pending.pop((tx, ty), None)
+            if future is not None:
+                tile, spawns, walk = future.result()
+            else:
+                tile, spawns, walk = self._decode_tile(tx, ty, vtree is not None)
+            if walk is not None:
+                self._walk_grids[(tx, ty)] = walk
+
+            # Map tile (height data + area map); keep one another caller loaded
+            tile = self.env.loaded_tiles.get((self.MAP_ID, tx, ty)) or tile
+            if tile:
+                self.env.loaded_tiles[(self.MAP_ID, tx, ty)] = tile
+                if self.env.terrain_checker is not None:
+                    self.env.terrain_checker.add_tile(tx, ty, tile)
+                elif tile.v9 is not None:
+                    # First heights: build the checker over every loaded tile
+                    self.env.build_terrain_checker(self.MAP_ID)
+                    self._loaded = True
+
+            # Vmtile (VMAP spawns for LOS)
+            if not (vtree and spawns):
+                spawns = []
+            if spawns:
+                vtree.spawns.extend(spawns)
+                self.env.los_checker.add_spawns(spawns)
+            resident[(tx, ty)] = spawns
+
+        # Evict least recently visited tiles (the window was just touched)
+        while len(resident) > max(self.MAX_RESIDENT_TILES, (2 * self.TILE_RADIUS + 1) ** 2):
+            self._evict_tile(*resident.popitem(last=False))
+
+        self._drop_stale_prefetches(gx, gy)
+
+    def _evict_tile(self, key: tuple, spawns: list):
+        """Drop a tile's heights and VMAP spawns; it reloads on the next visit."""
+        self.env.loaded_tiles.pop((self.MAP_ID, *key), None)
+        self._walk_grids.pop(key, None)
+        if self._height_grids.pop(key, None) is self._last_grid:
+            self._last_grid = None
+        if self.env.terrain_checker is not None:
+            self.env.terrain_checker.remove_tile(*key)
+        if spawns:
+            gone = {id(s) for s in spawns}
+            vtree = self.env.loaded_vmtrees[self.MAP_ID]
+            vtree.spawns[:] = [s for s in vtree.spawns if id(s) not in gone]
+            self.env.los_checker.remove_spawns(spawns)
+
+    def _window(self, gx: int, gy: int):
+        """In-bounds tiles of the TILE_RADIUS window around (gx, gy)."""
+        r = self.TILE_RADIUS
+        for dx in range(-r, r + 1):
+            for dy in range(-r, r + 1):
                 tx, ty = gx + dx, gy + dy
-                if not (0 <= tx < MAX_NUMBER_OF_GRIDS and 0 <= ty < MAX_NUMBER_OF_GRIDS):
-                    continue
-                if (tx, ty) in self._attempted_tiles:
-                    continue
-                self._attempted_tiles.add((tx, ty))
-
-                # Map tile (height data + area map)
-                tile = self.env.load_map_tile(self.MAP_ID, tx, ty)
-                if tile and tile.v9 is not None:
-                    new_map_tiles = True
-
-                # Vmtile (VMAP spawns for LOS)
-                if vtree:
-                    vtile_path = os.path.join(
-                        self.env.vmaps_dir, vmtile_filename(self.MAP_ID, tx, ty)
-                    )
-                    spawns = parse_vmtile(vtile_path)
-                    if spawns:
-                        vtree.spawns.extend(spawns)
-                        self.env.los_checker.add_spawns(spawns)
-
-        if new_map_tiles:
-            # Rebuild terrain checker with all loaded tiles
-            self.env.build_terrain_checker(self.MAP_ID)
-            if not self._loaded:
-                self._loaded = True
+                if 0 <= tx < MAX_NUMBER_OF_GRIDS and 0 <= ty < MAX_NUMBER_OF_GRIDS:
+                    yield tx, ty
+
+    def _decode_tile(self, tx: int, ty: int,
+                     with_vmtile: bool) -> tuple[MapTile | None, list, bytes | None]:
+        """Read one tile's .map, .vmtile and .walk; touches no shared state."""
+        path = os.path.join(self.env.maps_dir, map_filename(self.MAP_ID, tx, ty))
+        tile = None
+        if os.path.exists(path):
+            tile = parse_map_file(path, self.MAP_ID, tx, ty, use_mmap=self.env.use_mmap)
+        spawns = []
+        if with_vmtile:
+            spawns = parse_vmtile(os.path.join(
+                self.env.vmaps_dir, vmtile_filename(self.MAP_ID, tx, ty)))
+        walk = None
+        if self._baked_walk and tile is not None:
+            from sim.walk_bake import read_walk_grid, source_stamp, walk_filename
+            walk = read_walk_grid(
+                os.path.join(self.env.maps_dir, walk_filename(self.MAP_ID, tx, ty)),
+                source_stamp(self.env.data_root, self.MAP_ID, tx, ty))
+        return tile, spawns, walk
+
+    # ─── Prefetching ──────────────────────────────────────────────
+
+    def _prefetch_ahead(self, x: float, y: float, heading: float):
+        """Queue the tile window around the point PREFETCH_DISTANCE ahead."""
+        d = self.PREFETCH_DISTANCE
+        ahead = world_to_grid(x + math.cos(heading) * d, y + math.sin(heading) * d)
+        if ahead == self._lookahead_center:
+            return
+        self._lookahead_center = ahead
+        with_vmtile = self.MAP_ID in self.env.loaded_vmtrees
+        for key in self._window(*ahead):
+            if key in self._attempted_tiles or key in self._pending:
+                continue
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self._prefetch_workers,
+                    thread_name_prefix='terrain-prefetch')
+            self._pending[key] = self._pool.submit(self._decode_tile, *key, with_vmtile)
+
+    def _drop_stale_prefetches(self, gx: int, gy: int):
+        """Forget queued tiles the player has turned away from."""
+        reach = self.TILE_RADIUS + 2
+        for key in [k for k in self._pending
+                    if max(abs(k[0] - gx), abs(k[1] - gy)) > reach]:
+            self._pending.pop(key).cancel()
+
+    def close(self):
+        """Stop the prefetch threads (pending decodes are dropped)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._pending.clear()
+        self._lookahead_center = None
 
     def clear_height_cache(self):
-        """Clear the height lookup cache. Call on episode reset to bound memory."""
-        self._height_cache.clear()
+        """Drop all cached heights (grids refill lazily)."""
+        self._height_grids.clear()
+        self._last_grid = None
 
     @property
     def is_loaded(self) -> bool:
@@ -137,32 +303,69 @@ class SimTerrain:
     def get_height(self, x: float, y: float) -> float:
         """Get terrain height at world coordinates (x, y).
 
-        Uses a quantized dict cache (0.5 unit grid) for O(1) repeat lookups.
-        First call per grid cell does triangle interpolation, subsequent calls
-        are a dict lookup (~0.2μs vs ~50μs).
+        Heights are quantized to 0.5-unit cells and taken at the cell
+        center. The first call per cell does the triangle interpolation;
+        later calls index the tile's HeightGrid.
         """
         if not self._loaded:
             return self.SPAWN_Z
-        # Quantize to 0.5-unit grid for cache key
-        key = (int(x * self._height_quant), int(y * self._height_quant))
-        cached = self._height_cache.get(key)
-        if cached is not None:
-            return cached
-        h = self.env.get_height(self.MAP_ID, x, y)
-        if h <= INVALID_HEIGHT + 1:
-            h = self.SPAWN_Z  # fallback for missing data
-        self._height_cache[key] = h
+        q = self._height_quant
+        ix = math.floor(x * q)
+        iy = math.floor(y * q)
+        g = self._last_grid
+        if g is None or not (g.ix0 <= ix < g.ix1 and g.iy0 <= iy < g.iy1):
+            g = self._height_grid((ix + 0.5) / q, (iy + 0.5) / q)
+            if g is None:
+                return self.SPAWN_Z  # no tile data here
+            self._last_grid = g
+        k = (ix - g.ix0) * (g.iy1 - g.iy0) + (iy - g.iy0)
+        h = g.view[k]
+        if h == 0.0:
+            h = get_terrain_height(g.tile, (ix + 0.5) / q, (iy + 0.5) / q)
+            if h <= INVALID_HEIGHT + 1:
+                h = self.SPAWN_Z  # fallback for missing data
+            # A true 0.0 is stored as the smallest float32 so it reads as filled
+            g.view[k] = h if h != 0.0 else 1e-45
+            h = g.view[k]
         return h
 
+    def _height_grid(self, cx: float, cy: float) -> HeightGrid | None:
+        """HeightGrid of the resident tile containing (cx, cy), made on first use."""
+        key = world_to_grid(cx, cy)
+        g = self._height_grids.get(key)
+        if g is None:
+            tile = self.env.loaded_tiles.get((self.MAP_ID, *key))
+            if tile is None:
+                return None
+            ix0, ix1 = _cell_span(key[0], self._height_quant)
+            iy0, iy1 = _cell_span(key[1], self._height_quant)
+            cells = np.zeros((ix1 - ix0, iy1 - iy0), dtype=np.float32)
+            g = self._height_grids[key] = HeightGrid(
+                key=key, tile=tile, ix0=ix0, iy0=iy0, ix1=ix1, iy1=iy1,
+                cells=cells, view=memoryview(cells).cast('B').cast('f'))
+        return g
+
+    _EYE_HEIGHT = 1.7
+
     def check_los(self, x1: float, y1: float, z1: float,
                   x2: float, y2: float, z2: float) -> bool:
         """Check line of sight between two world points. Returns True if clear."""
         if not self._loaded:
             return True
-        p1 = Vec3(x1, y1, z1 + 1.7)  # eye height
-        p2 = Vec3(x2, y2, z2 + 1.7)
-        has_los, _, _ = self.env.check_los(p1, p2)
-        return has_los
+        p1 = Vec3(x1, y1, z1 + self._EYE_HEIGHT)
+        p2 = Vec3(x2, y2, z2 + self._EYE_HEIGHT)
+        return self.env.has_los(p1, p2)
+
+    def check_los_many(self, x1: float, y1: float, z1: float,
+                       xs: np.ndarray, ys: np.ndarray, zs: np.ndarray) -> np.ndarray:
+        """Line of sight from one point to many (e.g. player -> mobs)."""
+        n = len(xs)
+        if not self._loaded:
+            return np.ones(n, dtype=bool)
+        h = self._EYE_HEIGHT
+        starts = np.tile((x1, y1, z1 + h), (n, 1))
+        ends = np.column_stack((xs, ys, np.asarray(zs, dtype=np.float64) + h))
+        return self.env.check_los_many(starts, ends)
 
     # Height offset above ground for movement collision ray.
     # Low enough to catch mountain walls / building walls,
@@ -177,9 +380,20 @@ class SimTerrain:
         1. Terrain slope/step check via heightmap (TerrainPathChecker)
         2. Ground-level VMAP collision check (catches mountain walls,
            buildings, and other solid objects the heightmap alone misses)
+
+        Moves of up to WALK_MAX_CELLS cells over baked tiles read the
+        precomputed edges instead (see _baked_walkable).
         """
         if not self._loaded or self.env.terrain_checker is None:
             return True
+        if self._walk_grids:
+            ok = self._baked_walkable(x1, y1, x2, y2)
+            if ok is not None:
+                return ok
+        return self._exact_walkable(x1, y1, z1, x2, y2, z2)
+
+    def _exact_walkable(self, x1: float, y1: float, z1: float,
+                        x2: float, y2: float, z2: float) -> bool:
         # 1) Terrain slope / step height check
         walkable, _, _ = self.env.check_path(Vec3(x1, y1, z1), Vec3(x2, y2, z2))
         if not walkable:
@@ -187,5 +401,118 @@ class SimTerrain:
         # 2) Ground-level VMAP collision — ray at ankle height
         p1 = Vec3(x1, y1, z1 + self._WALK_LOS_HEIGHT)
         p2 = Vec3(x2, y2, z2 + self._WALK_LOS_HEIGHT)
-        has_los, _, _ = self.env.check_los(p1, p2)
-        return has_los
+        return self.env.has_los(p1, p2)
+
+    # Longer moves over baked tiles go to the exact checks
+    WALK_MAX_CELLS = 8
+
+    def _walk_mask(self, i: int, j: int) -> int | None:
+        """Edge mask of global walk cell (i, j); None if its tile isn't baked."""
+        c = self._walk_cells
+        grid = self._walk_grids.get((i // c, j // c))
+        if grid is None:
+            return None
+        return grid[(i % c) * c + (j % c)]
+
+    def _baked_walkable(self, x1: float, y1: float,
+                        x2: float, y2: float) -> bool | None:
+        """Walkability from the baked edge masks, or None if unknown.
+
+        A move inside one cell is walkable if the cell has any passable
+        edge; longer moves step cell to cell along the line and need the
+        edge for every step. Heights are implied by the bake.
+        """
+        c = self._walk_cells
+        i = math.floor((CENTER_GRID_ID - x1 / SIZE_OF_GRIDS) * c)
+        j = math.floor((CENTER_GRID_ID - y1 / SIZE_OF_GRIDS) * c)
+        di = math.floor((CENTER_GRID_ID - x2 / SIZE_OF_GRIDS) * c) - i
+        dj = math.floor((CENTER_GRID_ID - y2 / SIZE_OF_GRIDS) * c) - j
+        n = max(abs(di), abs(dj))
+        if n > self.WALK_MAX_CELLS:
+            return None
+        mask = self._walk_mask(i, j)
+        if mask is None:
+            return None
+        if n == 0:
+            return mask != 0
+        bit = self._walk_bit
+        i0, j0 = i, j
+        for k in range(1, n + 1):
+            # Nearest cell to the line: the major axis advances every step
+            ni = i0 + (2 * k * di + n) // (2 * n)
+            nj = j0 + (2 * k * dj + n) // (2 * n)
+            if not mask >> bit[(ni - i, nj - j)] & 1:
+                return False
+            i, j = ni, nj
+            if k < n:
+                mask = self._walk_mask(i, j)
+                if mask is None:
+                    return None
+        return True
+
+    # Below this many paths the per-path checks beat the batch overhead
+    _BATCH_MIN_PATHS = 16
+
+    def check_walkable_many(self, x1: np.ndarray, y1: np.ndarray, z1: np.ndarray,
+                            x2: np.ndarray, y2: np.ndarray, z2: np.ndarray) -> np.ndarray:
+        """check_walkable for arrays of paths; returns a bool mask.
+
+        Moves of at most one cell from a baked tile are array lookups in
+        the edge masks. Of the rest, the heightmap checks run as one array
+        pass (TerrainPathChecker.first_blocked_samples) and the VMAP rays
+        of the paths that pass them go to the LOS checker as one batch.
+        """
+        n = len(x1)
+        if not self._loaded or self.env.terrain_checker is None:
+            return np.ones(n, dtype=bool)
+        if not self._walk_grids:
+            return self._exact_walkable_many(x1, y1, z1, x2, y2, z2)
+
+        c = self._walk_cells
+        cell = lambda v: np.floor((CENTER_GRID_ID - np.asarray(v, dtype=np.float64)
+                                   / SIZE_OF_GRIDS) * c).astype(np.int64)
+        i, j = cell(x1), cell(y1)
+        di, dj = cell(x2) - i, cell(y2) - j
+        steps = np.maximum(np.abs(di), np.abs(dj))
+        ok = np.zeros(n, dtype=bool)
+        known = np.zeros(n, dtype=bool)
+        tiles = (i // c) * MAX_NUMBER_OF_GRIDS + j // c
+        short = np.flatnonzero(steps <= 1)
+        for key in np.unique(tiles[short]).tolist():
+            grid = self._walk_grids.get(divmod(key, MAX_NUMBER_OF_GRIDS))
+            if grid is None:
+                continue
+            idx = short[tiles[short] == key]
+            masks = np.frombuffer(grid, dtype=np.uint8)[
+                (i[idx] % c) * c + j[idx] % c].astype(np.int64)
+            bits = self._walk_bit_lut[di[idx] + 1, dj[idx] + 1]
+            ok[idx] = np.where(bits == 8, masks != 0, (masks >> bits) & 1)
+            known[idx] = True
+
+        # Longer moves over baked tiles: per-path cell walk (exact if unknown)
+        cols = (x1, y1, z1, x2, y2, z2)
+        rest = np.flatnonzero(~known & (steps > 1))
+        if len(rest):
+            ok[rest] = [self.check_walkable(*path) for path in zip(
+                *(np.asarray(v, dtype=np.float64)[rest].tolist() for v in cols))]
+            known[rest] = True
+        rest = np.flatnonzero(~known)
+        if len(rest):
+            ok[rest] = self._exact_walkable_many(
+                *(np.asarray(v, dtype=np.float64)[rest] for v in cols))
+        return ok
+
+    def _exact_walkable_many(self, x1: np.ndarray, y1: np.ndarray, z1: np.ndarray,
+                             x2: np.ndarray, y2: np.ndarray, z2: np.ndarray) -> np.ndarray:
+        if len(x1) < self._BATCH_MIN_PATHS:
+            return np.array([self._exact_walkable(*path) for path in zip(
+                *(np.asarray(v, dtype=np.float64).tolist() for v in (x1, y1, z1, x2, y2, z2)))],
+                dtype=bool)
+        ok = self.env.terrain_checker.first_blocked_samples(x1, y1, z1, x2, y2, z2) < 0
+        idx = np.flatnonzero(ok)
+        if len(idx):
+            h = self._WALK_LOS_HEIGHT
+            starts = np.column_stack((x1, y1, np.asarray(z1, dtype=np.float64) + h))
+            ends = np.column_stack((x2, y2, np.asarray(z2, dtype=np.float64) + h))
+            ok[idx] = self.env.check_los_many(starts[idx], ends[idx])
+        return ok
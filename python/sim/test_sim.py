@@ -56,6 +56,13 @@ from sim.combat_sim import (CombatSimulation, SPELLS,
                              SPELL_MISS, SPELL_HIT, SPELL_CRIT,
                              ITEM_MOD_HIT_SPELL_RATING, ITEM_MOD_BLOCK_RATING)
 from sim.wow_sim_env import WoWSimEnv
+import sim.combat_sim as _combat_sim
+
+# Synthetic creature spawns/templates (not AzerothCore exports) for the
+# CombatSimulations built here. They live outside data/, so neither the
+# sim's DB auto-load nor train_sim's data detection can pick them up.
+FIXTURE_DIR = os.path.join(THIS_DIR, 'fixtures')
+_combat_sim.DATA_DIR = FIXTURE_DIR
 
 
 def test_combat_engine():
@@ -3149,6 +3156,2029 @@ def test_talent_system():
     print("  PASSED\n")
 
 
+def test_batch_sim():
+    """Test the vectorized BatchCombatSimulation + BatchWoWSimEnv."""
+    print("=== Test 19: Batched Simulation ===")
+    from sim.batch_sim import BatchCombatSimulation, ACTION_FAMILY
+    from sim.batch_vec_env import BatchWoWSimEnv
+
+    # --- 19a: Initial state matches a fresh CombatSimulation player ---
+    bsim = BatchCombatSimulation(num_envs=8, num_mobs=12, seed=7)
+    assert bsim.hp.shape == (8,) and bsim.mob_hp.shape == (8, 12)
+    assert (bsim.hp == player_max_hp(1)).all()
+    assert (bsim.mana == player_max_mana(1)).all()
+    assert bsim.mob_alive.all()
+    print(f"  19a: 8 worlds x {bsim.num_mobs} mobs, HP={bsim.hp[0]} Mana={bsim.mana[0]} ✓")
+
+    # --- 19b: Movement / turning are per-world ---
+    x0 = bsim.x.copy()
+    actions = np.zeros(8, dtype=np.int64)
+    actions[0] = 1  # move forward in world 0 only
+    bsim.apply_actions(actions)
+    assert abs(math.hypot(bsim.x[0] - x0[0], bsim.y[0] - bsim.start_y) - 3.0) < 1e-6
+    assert (bsim.x[1:] == x0[1:]).all()
+    print(f"  19b: Move forward only affects world 0 ✓")
+
+    # --- 19c: Smite kills a mob, grants XP, mob respawns after RESPAWN_TICKS ---
+    bsim.reset()
+    bsim.x[:] = bsim.spawn_x[0] + 20.0
+    bsim.y[:] = bsim.spawn_y[0]
+    bsim.mob_detect[:] = 0.0            # no aggro, isolate the spell path
+    bsim._pstats['spell_hit'][:] = 100.0  # no misses
+    bsim.target[:] = 0
+    smite = [a for a, f in ACTION_FAMILY.items() if f == 0][0]
+    for _ in range(200):
+        bsim.mana[:] = bsim.max_mana
+        bsim.apply_actions(np.full(8, smite))
+        bsim.tick()
+        if not bsim.mob_alive[:, 0].any():
+            break
+    assert not bsim.mob_alive[:, 0].any(), "Smite should kill mob 0 in every world"
+    assert (bsim.kills >= 1).all() and (bsim.xp > 0).all()
+    for _ in range(bsim.RESPAWN_TICKS):
+        bsim.tick()
+    assert bsim.mob_alive[:, 0].all(), "Mob should respawn after RESPAWN_TICKS"
+    print(f"  19c: Smite kill -> xp={bsim.xp[0]}, respawn after {bsim.RESPAWN_TICKS} ticks ✓")
+
+    # --- 19d: Aggro + melee damages the player, shield absorbs ---
+    bsim2 = BatchCombatSimulation(num_envs=4, num_mobs=4, seed=3)
+    bsim2.x[:] = bsim2.spawn_x[0]
+    bsim2.y[:] = bsim2.spawn_y[0] + 1.0
+    bsim2.shield_absorb[2:] = 10_000
+    bsim2.shield_remaining[2:] = 1_000
+    for _ in range(40):
+        bsim2.tick()
+    assert bsim2.in_combat.all(), "Standing on a spawn should pull aggro"
+    assert (bsim2.hp[:2] < bsim2.max_hp[:2]).all(), "Unshielded worlds take melee damage"
+    assert (bsim2.hp[2:] == bsim2.max_hp[2:]).all(), "Shielded worlds absorb all damage"
+    print(f"  19d: Melee HP={bsim2.hp.tolist()} (worlds 2-3 shielded) ✓")
+
+    # --- 19e: VecEnv API + masks ---
+    env = BatchWoWSimEnv(num_envs=16, num_mobs=12, seed=0)
+    obs = env.reset()
+    assert obs.shape == (16, 52) and obs.dtype == np.float32
+    masks = np.stack(env.env_method("action_masks"))
+    assert masks.shape == (16, 30) and masks[:, 0].all()
+    assert not masks[:, 8].any() and not masks[:, 11].any(), "Sell/quest unsupported"
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        m = env.action_masks()
+        obs, rewards, dones, infos = env.step((rng.random(m.shape) * m).argmax(1))
+        assert obs.shape == (16, 52) and rewards.shape == (16,)
+        for i in np.nonzero(dones)[0]:
+            assert "episode_stats" in infos[i] and "terminal_observation" in infos[i]
+    print(f"  19e: VecEnv 16 worlds x 300 steps, kills={int(env.sim.kills.sum())} ✓")
+
+    print("  PASSED\n")
+
+
+def test_mob_table():
+    """Test the structure-of-arrays MobTable behind CombatSimulation.mobs."""
+    print("=== Test 20: Mob Table (SoA) ===")
+    from sim.models import Mob, MobTable
+
+    sim = CombatSimulation(seed=11)
+    t = sim.mob_table
+    assert len(t) == len(sim.mobs) > 0
+    for mob in sim.mobs:
+        assert mob._table is t and t.mobs[mob._slot] is mob
+    print(f"  20a: {len(t)} mobs share one table (capacity {t.capacity}) ✓")
+
+    # --- 20b: Handle writes land in the columns (incl. legacy DoT names) ---
+    mob = sim.mobs[0]
+    mob.hp = 7
+    mob.dot2_remaining = 4
+    mob.dot3_heals_caster = True
+    assert t.hp[mob._slot] == 7 and t.dot_remaining[mob._slot, 1] == 4
+    assert t.dot3_heals_caster[mob._slot]
+    assert isinstance(mob.hp, int) and isinstance(mob.x, float)
+    print(f"  20b: Mob fields read/write table columns ✓")
+
+    # --- 20c: Idle far mob still ticks its DoT (array path) ---
+    sim = CombatSimulation(seed=11)
+    t = sim.mob_table
+    p = sim.player
+    mob = max(sim.mobs, key=sim._dist_to_mob)
+    assert not mob.in_combat and sim._dist_to_mob(mob) > mob.template.detect_range
+    mob.hp = mob.max_hp = 1000
+    mob.dot_remaining = 12
+    mob.dot_timer = 6
+    mob.dot_damage_per_tick = 10
+    for _ in range(6):
+        sim.tick()
+    assert mob.hp == 990 and mob.dot_remaining == 6, (mob.hp, mob.dot_remaining)
+    print(f"  20c: Far idle mob DoT tick -> HP {mob.hp}/1000 ✓")
+
+    # --- 20d: Leash resets a chasing mob that left its spawn ---
+    mob.in_combat = True
+    mob.target_player = True
+    mob.x = mob.spawn_x + sim.MOB_LEASH_RANGE + 5.0
+    sim.tick()
+    assert not mob.in_combat and mob.hp == mob.max_hp and mob.x == mob.spawn_x
+    print(f"  20d: Leashed mob evades and resets ✓")
+
+    # --- 20e: get_nearby_mobs / do_target_nearest match brute force ---
+    p.x, p.y = sim.mobs[3].x + 4.0, sim.mobs[3].y
+    near = {m["uid"] for m in sim.get_nearby_mobs() if not m.get("vendor")
+            and not m.get("questgiver")}
+    brute = {m.uid for m in sim.mobs if sim._dist_to_mob(m) <= sim.SCAN_RANGE}
+    assert near == brute
+    sim.do_target_nearest()
+    best = min((m for m in sim.mobs if m.alive), key=sim._dist_to_mob)
+    assert sim.target is best
+    print(f"  20e: {len(near)} nearby mobs, nearest target matches brute force ✓")
+
+    # --- 20f: Chunk deactivation frees slots; freed slots are reused ---
+    old = list(sim.mobs)
+    hp_before = old[0].hp
+    n_before = t.n
+    p.x += 1000.0
+    sim.tick()
+    released = sum(1 for m in old if m._table is not t)
+    spawned = sum(1 for m in sim.mobs if m not in old)
+    assert released > 0 and old[0]._table is not t and old[0].hp == hp_before
+    assert len(t) == len(sim.mobs)
+    assert all(t.mobs[m._slot] is m for m in sim.mobs)
+    # Released slots are recycled before the table grows
+    assert t.n == n_before + max(0, spawned - released), (t.n, n_before, spawned, released)
+    print(f"  20f: Chunk swap -> {released} released, {spawned} spawned, "
+          f"high-water {n_before}->{t.n} ✓")
+
+    # --- 20g: Standalone table grows and recycles ---
+    tab = MobTable(capacity=2)
+    tmpl = sim.mobs[0].template if sim.mobs else old[0].template
+    mobs = [Mob(uid=i, template=tmpl, hp=5, max_hp=5, level=1, x=float(i), y=0.0,
+                table=tab) for i in range(5)]
+    assert tab.capacity >= 5 and len(tab) == 5
+    slot = mobs[2]._slot
+    tab.release(mobs[2])
+    again = Mob(uid=9, template=tmpl, hp=5, max_hp=5, level=1, x=9.0, y=0.0, table=tab)
+    assert again._slot == slot and mobs[2].x == 2.0
+    print(f"  20g: Table grows to {tab.capacity}, free slot {slot} reused ✓")
+
+    # --- 20h: Respawns, swings and DoT ticks draw the RNG in list order ---
+    sim = CombatSimulation(seed=11)
+    sim.mobs.reverse()                  # list order no longer follows slots
+    p = sim.player
+    dotted, swinger, dead = sim.mobs[:3]
+    sim._damage_mob(dead, dead.hp + 1)
+    dead.respawn_timer = 1
+    swinger.x, swinger.y = p.x + 1.0, p.y
+    swinger.in_combat = swinger.target_player = True
+    swinger.attack_timer = 1
+    dotted.hp = dotted.max_hp = 1000
+    dotted.dot_remaining, dotted.dot_timer, dotted.dot_damage_per_tick = 12, 1, 10
+    assert dotted._slot > swinger._slot > dead._slot
+    calls = []
+    for name in ('_respawn_mob', '_mob_melee', '_dot_tick'):
+        def logged(mob, *args, _name=name, _fn=getattr(sim, name)):
+            calls.append((_name, mob))
+            return _fn(mob, *args)
+        setattr(sim, name, logged)
+    sim.tick()
+    calls = [c for c in calls if c[1] in (dead, swinger, dotted)]
+    assert calls == [('_dot_tick', dotted), ('_mob_melee', swinger),
+                     ('_respawn_mob', dead)], calls
+    print(f"  20h: per-mob actions run in mob list order ✓")
+
+    print("  PASSED\n")
+
+
+def test_spatial_hash():
+    """Test the SpatialHash index behind MobTable radius/k-nearest queries."""
+    print("=== Test 21: Spatial Hash ===")
+    from sim.spatial_hash import SpatialHash
+
+    # --- 21a: Radius / k-nearest match brute force ---
+    rng = np.random.default_rng(5)
+    xs = rng.uniform(-9200, -8600, 400)
+    ys = rng.uniform(-400, 200, 400)
+    grid = SpatialHash(cell_size=25.0)
+    grid.update(np.arange(400), xs, ys)
+    alive = rng.random(400) < 0.7
+    for _ in range(100):
+        px, py = rng.uniform(-9300, -8500), rng.uniform(-500, 300)
+        r = rng.uniform(1.0, 300.0)
+        d = np.hypot(xs - px, ys - py)
+        assert (grid.query_radius(px, py, r, xs, ys) == np.flatnonzero(d <= r)).all()
+        k = int(rng.integers(1, 6))
+        got = grid.k_nearest(px, py, k, xs, ys, max_dist=r, mask=alive)
+        dm = np.where(alive & (d <= r), d, np.inf)
+        want = np.argsort(dm, kind="stable")[:k]
+        want = want[np.isfinite(dm[want])]
+        assert (got == want).all(), (got, want)
+    print(f"  21a: 100 radius + k-nearest queries match brute force ✓")
+
+    # --- 21b: Index follows moves and removals ---
+    xs2 = xs + 40.0
+    grid.update(np.arange(400), xs2, ys)
+    grid.remove(7)
+    d = np.hypot(xs2 + 8900, ys + 100)
+    want = np.flatnonzero(d <= 120.0)
+    assert (grid.query_radius(-8900, -100, 120.0, xs2, ys) == want[want != 7]).all()
+    print(f"  21b: Incremental move/remove keeps index exact ✓")
+
+    # --- 21c: Sim queries stay exact while mobs chase, die and swap chunks ---
+    sim = CombatSimulation(seed=21)
+    t = sim.mob_table
+    p = sim.player
+    p.hp = p.max_hp = 100000
+
+    def check():
+        near = t.query_radius(p.x, p.y, sim.SCAN_RANGE)
+        brute = [m._slot for m in sim.mobs if sim._dist_to_mob(m) <= sim.SCAN_RANGE]
+        assert sorted(brute) == near.tolist()
+        best = t.k_nearest(p.x, p.y, 1, max_dist=sim.TARGET_RANGE, mask=t.alive)
+        cands = [m for m in sim.mobs if m.alive and sim._dist_to_mob(m) <= sim.TARGET_RANGE]
+        if cands:
+            assert abs(sim._dist_to_mob(t.mobs[best[0]])
+                       - min(map(sim._dist_to_mob, cands))) < 1e-9
+        else:
+            assert len(best) == 0
+
+    mob = sim.mobs[0]
+    p.x, p.y = mob.x + 3.0, mob.y
+    for i in range(120):
+        sim.tick()                       # mobs aggro + chase -> bulk moves
+        check()
+        if i == 40:
+            mob.hp = 1
+            sim._damage_mob(mob, 5)      # death
+        if i == 60:
+            p.x += 450.0                 # chunk swap
+    print(f"  21c: Queries exact across chase/death/chunk swap "
+          f"({len(t.grid)} indexed, {len(t.grid.cells)} cells) ✓")
+
+    # --- 21d: Psychic Scream fears the 5 nearest in-combat mobs ---
+    sim = CombatSimulation(seed=21)
+    p = sim.player
+    p.level = 20
+    p.mana = p.max_mana = 100000
+    t = sim.mob_table
+    for i, m in enumerate(sim.mobs[:8]):
+        m.x, m.y = p.x + 1.0 + 0.5 * i, p.y
+        m.in_combat = m.target_player = True
+    sim._apply_spell(8122)  # Psychic Scream rank 1
+    feared = [m for m in sim.mobs if m.feared]
+    assert set(feared) == set(sim.mobs[:5]), [m.uid for m in feared]
+    print(f"  21d: Psychic Scream feared the 5 nearest ✓")
+
+    print("  PASSED\n")
+
+
+def test_chunk_cache():
+    """Test incremental chunk residency with the LRU of deactivated chunks."""
+    print("=== Test 22: Chunk LRU Cache ===")
+    sim = CombatSimulation(seed=8)
+    p = sim.player
+    home = (p.x, p.y)
+
+    def consistent():
+        want = [m for key in sim._active_chunks for m in sim._chunk_mobs[key]]
+        assert sorted(m.uid for m in sim.mobs) == sorted(m.uid for m in want)
+        assert len(sim.mob_table) == len(sim.mobs)
+        vend = [v for key in sim._active_chunks for v in sim._chunk_vendors[key]]
+        assert sorted(v.uid for v in sim.vendors) == sorted(v.uid for v in vend)
+
+    consistent()
+    # Kill a mob, then walk away so its chunk is deactivated
+    victim = sim.mobs[0]
+    victim.hp = 1
+    sim._damage_mob(victim, 5)
+    assert not victim.alive and victim.respawn_timer == sim.RESPAWN_TICKS
+    victim_uid = victim.uid
+    p.x += 600.0
+    sim.tick()
+    consistent()
+    assert victim not in sim.mobs and victim._table is sim._mob_cache
+    print(f"  22a: Deactivated chunk parked in LRU ({len(sim._chunk_cache)} cached) ✓")
+
+    # --- 22b: Coming back restores the same mobs; respawn timer kept counting ---
+    for _ in range(30):
+        sim.tick()
+    p.x, p.y = home
+    sim.tick()
+    consistent()
+    assert victim in sim.mobs and victim.uid == victim_uid
+    assert victim._table is sim.mob_table
+    assert not victim.alive
+    assert victim.respawn_timer == sim.RESPAWN_TICKS - 32, victim.respawn_timer
+    print(f"  22b: Same mob restored, respawn timer {victim.respawn_timer} "
+          f"(advanced while cached) ✓")
+
+    # --- 22c: Respawn timers that expire while cached respawn on return ---
+    p.x += 600.0
+    sim.tick()
+    sim.tick_count += sim.RESPAWN_TICKS
+    p.x, p.y = home
+    sim.tick()
+    assert victim.alive and victim.hp == victim.max_hp
+    print(f"  22c: Expired timer respawns mob on return ✓")
+
+    # --- 22d: Patrol across a chunk border re-uses cached chunks ---
+    x0 = (p.x // sim.CHUNK_SIZE) * sim.CHUNK_SIZE
+    p.x = x0 - 1.0
+    sim.tick()
+    p.x = x0 + 1.0
+    sim.tick()
+    next_uid = sim._next_uid
+    for i in range(20):
+        p.x = x0 - 1.0 if i % 2 == 0 else x0 + 1.0
+        sim.tick()
+        consistent()
+    assert sim._next_uid == next_uid, "Cached chunks must not be re-spawned"
+    print(f"  22d: 20 border crossings served from cache (no re-spawns) ✓")
+
+    # --- 22e: LRU is bounded ---
+    for step in range(12):
+        p.x += 500.0
+        sim.tick()
+    consistent()
+    assert len(sim._chunk_cache) <= sim.CHUNK_CACHE_SIZE
+    assert len(sim._mob_cache) == sum(len(c[0]) for c in sim._chunk_cache.values())
+    print(f"  22e: Cache bounded at {len(sim._chunk_cache)}/{sim.CHUNK_CACHE_SIZE} chunks ✓")
+
+    print("  PASSED\n")
+
+
+def test_creature_stat_tables():
+    """Test precompiled per-class/level creature stat rows."""
+    print("=== Test 23: Creature Stat Tables ===")
+    from sim.creature_db import (CreatureTemplate, base_stat_row, _interpolate,
+                                 _HP_ANCHORS_X, _HP_ANCHORS_Y, _XP_ANCHORS_X,
+                                 _XP_ANCHORS_Y, MAX_BASE_LEVEL)
+
+    # --- 23a: Base rows match the anchor interpolation ---
+    for lvl in (1, 5, 12, 37, 60, 80):
+        hp, dmin, dmax, xp = base_stat_row(lvl)
+        assert hp == max(1, int(_interpolate(lvl, _HP_ANCHORS_X, _HP_ANCHORS_Y)))
+        assert xp == _interpolate(lvl, _XP_ANCHORS_X, _XP_ANCHORS_Y)
+        assert 1 <= dmin <= dmax
+    assert base_stat_row(0) == base_stat_row(1)
+    assert base_stat_row(200) == base_stat_row(MAX_BASE_LEVEL)
+    assert base_stat_row(10, unit_class=4) == base_stat_row(10, unit_class=1)
+    print("  23a: Base rows match interpolation, clamp out-of-range levels ✓")
+
+    # --- 23b: Template rows apply modifiers and are cached ---
+    tmpl = CreatureTemplate(
+        entry=1, name="Test Boar", min_level=3, max_level=5, faction=7,
+        npcflag=0, detection_range=20.0, rank=0, base_attack_time=2000,
+        min_gold=0, max_gold=0, health_modifier=1.5, damage_modifier=0.5,
+        experience_modifier=2.0, unit_class=1, unit_flags=0, creature_type=1)
+    for lvl in (3, 4, 5):
+        hp, dmin, dmax, xp = tmpl.stats(lvl)
+        base_hp, base_min, base_max, base_xp = base_stat_row(lvl)
+        assert hp == max(1, int(base_hp * 1.5))
+        assert dmin == max(1, int(base_min * 0.5))
+        assert dmax == max(dmin, int(base_max * 0.5))
+        assert xp == max(1, int(base_xp * 2.0))
+    assert len(tmpl._stat_rows) == 3
+    assert tmpl.stats(4) is tmpl.stats(4)
+    assert tmpl.stats(9) == tmpl._compile_stats(9)
+    print(f"  23b: Template rows L3-5 cached, L4 = {tmpl.stats(4)} ✓")
+
+    # --- 23c: Sim shares one MobTemplate per (entry, level) ---
+    sim = CombatSimulation(seed=23)
+    by_key = {}
+    for mob in sim.mobs:
+        key = (mob.template.entry, mob.level)
+        assert by_key.setdefault(key, mob.template) is mob.template
+        assert mob.max_hp == mob.template.base_hp
+    print(f"  23c: {len(sim.mobs)} mobs share {len(by_key)} templates ✓")
+
+    print("  PASSED\n")
+
+
+def test_csv_cache():
+    """Test the binary columnar CSV cache (build, mmap reload, invalidation)."""
+    print("=== Test 24: CSV Column Cache ===")
+    import tempfile
+    from sim.csv_cache import load_columns, CACHE_DIRNAME
+
+    spec = {'entry': 'i', 'name': 's', 'rate': 'f', 'lootid': 'i'}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'things.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('"entry";"name";"rate";"unused"\n')
+            f.write('1;"Kobold ""Tunnel"" Rat";0.5;x\n')
+            f.write('7;"Défias; Bandit";-2.25;y\n')
+        cache = os.path.join(tmp, CACHE_DIRNAME, 'things.csv.cols')
+
+        # --- 24a: First load parses and writes the cache ---
+        cols = load_columns(path, spec)
+        assert os.path.isfile(cache)
+        assert cols.rows == 2 and 'lootid' not in cols and 'unused' not in cols
+        assert cols['entry'].tolist() == [1, 7]
+        assert cols['rate'].tolist() == [0.5, -2.25]
+        assert cols['name'].tolist() == ['Kobold "Tunnel" Rat', 'Défias; Bandit']
+        print(f"  24a: Parsed {cols.rows} rows, missing column omitted ✓")
+
+        # --- 24b: Second load maps the cache read-only ---
+        mtime = os.stat(cache).st_mtime_ns
+        again = load_columns(path, spec)
+        assert os.stat(cache).st_mtime_ns == mtime
+        assert not again['entry'].flags.writeable
+        assert again['name'][1] == 'Défias; Bandit'
+        assert again['rate'].tolist() == cols['rate'].tolist()
+        print("  24b: Reload served from mmap cache ✓")
+
+        # --- 24c: Touching the CSV keeps the cache (hash match) ---
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert load_columns(path, spec)['entry'].tolist() == [1, 7]
+        print("  24c: mtime-only change revalidated by SHA-1 ✓")
+
+        # --- 24d: Content or spec change rebuilds ---
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('9;"Murloc";1.0;z\n')
+        assert load_columns(path, spec)['entry'].tolist() == [1, 7, 9]
+        narrow = load_columns(path, {'entry': 'i'})
+        assert list(narrow) == ['entry'] and narrow.rows == 3
+        print("  24d: Edited CSV and new column spec rebuild the cache ✓")
+
+    print("  PASSED\n")
+
+
+def test_shared_world():
+    """Test SharedArrays handles and DB views over shared world arrays."""
+    print("=== Test 25: Shared World Data ===")
+    import pickle
+    import random
+    import tempfile
+    from sim.shared_world import SharedArrays, SharedWorld
+    from sim.loot_db import LootDB
+
+    # --- 25a: Arrays round-trip through a pickled handle ---
+    src = {'a': np.arange(10, dtype=np.int64),
+           'b': np.linspace(0, 1, 7, dtype=np.float32).reshape(7, 1),
+           'empty': np.zeros(0, dtype=np.uint32)}
+    owner = SharedArrays.create(src)
+    peer = SharedArrays.attach(pickle.loads(pickle.dumps(owner.handle)))
+    for key, arr in src.items():
+        assert peer.arrays[key].dtype == arr.dtype
+        assert np.array_equal(peer.arrays[key], arr)
+        assert not peer.arrays[key].flags.writeable
+    peer.close()
+    owner.close()
+    owner.unlink()
+    print("  25a: SharedArrays attach by handle, read-only views ✓")
+
+    # --- 25b: CreatureDB view matches the loaded DB ---
+    sim = CombatSimulation(seed=25)
+    db = sim.creature_db
+    assert db is not None, "creature CSVs required"
+    view = type(db).from_arrays(db.to_arrays())
+    assert len(view.templates) == len(db.templates)
+    for entry, tmpl in db.templates.items():
+        shared = view.templates[entry]
+        assert shared.name == tmpl.name and shared.stats(tmpl.min_level) == tmpl.stats(tmpl.min_level)
+        assert shared.is_attackable == tmpl.is_attackable
+    assert view.templates[entry] is view.templates[entry]
+    assert dict(view.spatial_index) == dict(db.spatial_index)
+    assert dict(view.vendor_index) == dict(db.vendor_index)
+    assert view.spatial_index.get((0, 99999, 99999), []) == []
+    print(f"  25b: {len(view.templates)} templates, {len(view.spatial_index)} spawn chunks ✓")
+
+    # --- 25c: LootDB view rolls identically ---
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'item_template.csv'), 'w') as f:
+            f.write('entry;name;Quality;SellPrice;InventoryType;ItemLevel;armor;'
+                    'stat_type1;stat_value1;stat_type2;stat_value2\n')
+            f.write('10;"Linen Cloth";1;13;0;5;0;0;0;0;0\n')
+            f.write('11;"Rugged Vest";2;90;5;9;20;7;2;5;1\n')
+        with open(os.path.join(tmp, 'creature_loot_template.csv'), 'w') as f:
+            f.write('Entry;Item;Reference;Chance;GroupId;MinCount;MaxCount\n')
+            f.write('100;10;0;60;0;1;3\n100;11;0;25;1;1;1\n100;10;0;0;1;1;1\n')
+        loot = LootDB(tmp, quiet=True)
+    lview = LootDB.from_arrays(loot.to_arrays())
+    assert lview.loaded and lview.get_item(11) == loot.get_item(11)
+    assert lview.get_item(11).stats == {7: 2, 5: 1}
+    r1, r2 = random.Random(3), random.Random(3)
+    for _ in range(50):
+        a = [(r.item.entry, r.count) for r in loot.roll_loot(100, r1)]
+        b = [(r.item.entry, r.count) for r in lview.roll_loot(100, r2)]
+        assert a == b
+    print("  25c: LootDB view items and rolls match ✓")
+
+    # --- 25d: WoWSimEnv attached to a SharedWorld matches a private load ---
+    from sim.wow_sim_env import WoWSimEnv
+    data_dir = FIXTURE_DIR
+    world = SharedWorld.create(creature_csv_dir=data_dir, quiet=True)
+    try:
+        env_shared = WoWSimEnv(seed=9, creature_csv_dir=data_dir,
+                               shared_world=pickle.loads(pickle.dumps(world.handle)))
+        env_plain = WoWSimEnv(seed=9, creature_csv_dir=data_dir)
+        assert env_shared._creature_db is not None
+        obs_s, _ = env_shared.reset(seed=9)
+        obs_p, _ = env_plain.reset(seed=9)
+        assert np.array_equal(obs_s, obs_p)
+        for step in range(200):
+            action = step % 4
+            obs_s = env_shared.step(action)[0]
+            obs_p = env_plain.step(action)[0]
+            assert np.array_equal(obs_s, obs_p), f"diverged at step {step}"
+    finally:
+        world.close()
+        world.unlink()
+    print("  25d: Shared-world env matches private-load env for 200 steps ✓")
+
+    print("  PASSED\n")
+
+
+def _write_test_map(path: str, kind: str, seed: int = 0):
+    """Write a synthetic v9 .map tile with 'float', 'int16' or 'int8' heights."""
+    import struct
+    rng = np.random.default_rng(seed)
+    v9 = 40.0 + 20.0 * np.add.outer(np.linspace(0, 1, 129), np.linspace(0, 1, 129))
+    v9 += rng.random((129, 129)) * 8.0
+    v9[60:70, :] += 30.0                                    # cliff band
+    v8 = (v9[:-1, :-1] + v9[1:, 1:]) / 2 + rng.random((128, 128))
+    lo = float(min(v9.min(), v8.min()))
+    hi = float(max(v9.max(), v8.max()))
+    if kind == 'float':
+        flags, body = 0, v9.astype('<f4').tobytes() + v8.astype('<f4').tobytes()
+    else:
+        flags, top, dtype = (2, 65535, '<u2') if kind == 'int16' else (4, 255, 'u1')
+        quant = lambda a: np.round((a - lo) / (hi - lo) * top).astype(dtype).tobytes()
+        body = quant(v9) + quant(v8)
+    height = b'MHGT' + struct.pack('<Iff', flags, lo, hi) + body
+    header = (b'MAPS' + struct.pack('<II', 9, 0)
+              + struct.pack('<6I', 0, 0, 44, len(height), 0, 0) + b'\0' * 8)
+    with open(path, 'wb') as f:
+        f.write(header + height)
+
+
+def test_heightmap_arrays():
+    """Test float32 heightmap tiles and batch height lookups."""
+    print("=== Test 26: NumPy Heightmap Tiles ===")
+    import contextlib
+    import io
+    import random
+    import tempfile
+    from test_3d_env import (WoW3DEnvironment, Vec3, INVALID_HEIGHT,
+                             map_filename, parse_map_file)
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'maps'))
+        kinds = {(48, 32): 'float', (48, 31): 'int16', (49, 32): 'int8'}
+        for (gx, gy), kind in kinds.items():
+            _write_test_map(os.path.join(root, 'maps', map_filename(0, gx, gy)),
+                            kind, seed=gx * 100 + gy)
+
+        # --- 26a: Tiles hold flat float32 arrays, mmap or not ---
+        for (gx, gy), kind in kinds.items():
+            path = os.path.join(root, 'maps', map_filename(0, gx, gy))
+            tile = parse_map_file(path, 0, gx, gy)
+            mapped = parse_map_file(path, 0, gx, gy, use_mmap=True)
+            assert tile.v9.dtype == np.float32 and tile.v9.shape == (129 * 129,)
+            assert tile.v8.dtype == np.float32 and tile.v8.shape == (128 * 128,)
+            assert np.array_equal(tile.v9, mapped.v9) and np.array_equal(tile.v8, mapped.v8)
+            if kind == 'float':
+                assert not mapped.v9.flags.writeable, "mmap heights are zero-copy views"
+        print(f"  26a: {len(kinds)} tiles (float/int16/int8) as float32, mmap identical ✓")
+
+        # --- 26b: Batch heights match scalar get_height bit for bit ---
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = WoW3DEnvironment(root, use_mmap=True)
+            for gx, gy in kinds:
+                env.load_map_tile(0, gx, gy)
+            env.build_terrain_checker(0)
+        rng = random.Random(26)
+        xs = np.array([rng.uniform(-9300, -8700) for _ in range(2000)])
+        ys = np.array([rng.uniform(-400, 100) for _ in range(2000)])
+        batch = env.get_heights(0, xs, ys)
+        scalar = [env.get_height(0, x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+        assert batch.tolist() == scalar
+        assert np.array_equal(env.terrain_checker.get_heights(xs, ys), batch)
+        missing = int((batch == INVALID_HEIGHT).sum())
+        assert 0 < missing < len(xs), "sample area should straddle loaded tiles"
+        print(f"  26b: 2000 batch heights == scalar ({missing} without tile) ✓")
+
+        # --- 26c: Long (batched) paths agree with per-sample checks ---
+        tc = env.terrain_checker
+        for _ in range(200):
+            x, y = rng.uniform(-9200, -8800), rng.uniform(-300, 0)
+            start = Vec3(x, y, env.get_height(0, x, y))
+            end = Vec3(x + rng.uniform(-60, 60), y + rng.uniform(-60, 60), 0)
+            ok, reason, _ = tc.check_path_walkable(start, end)
+            num = max(2, int(math.hypot(end.x - start.x, end.y - start.y)
+                             / tc.SAMPLE_DISTANCE))
+            tc.BATCH_MIN_SAMPLES = num + 1
+            ok_s, reason_s, _ = tc.check_path_walkable(start, end)
+            del tc.BATCH_MIN_SAMPLES
+            assert (ok, reason) == (ok_s, reason_s)
+        print("  26c: batched check_path_walkable == per-sample ✓")
+
+    print("  PASSED\n")
+
+
+def test_batch_walkability():
+    """Test vectorized path walkability against the per-sample checks."""
+    print("=== Test 27: Batch Path Walkability ===")
+    import contextlib
+    import io
+    import random
+    import tempfile
+    from sim.terrain import SimTerrain
+    from test_3d_env import Vec3, map_filename
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'maps'))
+        for (gx, gy), kind in {(48, 32): 'float', (48, 31): 'int16',
+                               (47, 32): 'int8'}.items():
+            _write_test_map(os.path.join(root, 'maps', map_filename(0, gx, gy)),
+                            kind, seed=gx * 100 + gy)
+        with contextlib.redirect_stdout(io.StringIO()):
+            terrain = SimTerrain(root, quiet=True)
+        assert terrain.is_loaded
+        tc = terrain.env.terrain_checker
+        rng = random.Random(27)
+
+        # --- 27a: First blocked index matches the per-sample loop ---
+        paths = []
+        for _ in range(400):
+            x, y = rng.uniform(-9200, -8700), rng.uniform(-400, 100)
+            length = rng.choice([0.0, 2.0, 3.0, 12.0, 80.0])
+            a = rng.uniform(-math.pi, math.pi)
+            paths.append((x, y, terrain.get_height(x, y),
+                          x + length * math.cos(a), y + length * math.sin(a),
+                          rng.uniform(0, 150), rng.choice([1.0, 2.03128, 50.0])))
+        cols = np.array(paths).T
+        for h in (1.0, 2.03128, 50.0):
+            sel = cols[6] == h
+            idx = tc.first_blocked_samples(*cols[:6, sel], collision_height=h)
+            for i, (x1, y1, z1, x2, y2, z2, _) in zip(idx.tolist(),
+                                                      np.array(paths)[sel].tolist()):
+                ok, reason, at = tc.check_path_walkable(Vec3(x1, y1, z1), Vec3(x2, y2, z2), h)
+                assert ok == (i < 0), (reason, i)
+                if i >= 0:
+                    num = max(2, int(math.hypot(x2 - x1, y2 - y1) / tc.SAMPLE_DISTANCE))
+                    assert at.x == x1 + (x2 - x1) * ((i + 1) / num)
+        blocked = sum(i >= 0 for i in tc.first_blocked_samples(*cols[:6]).tolist())
+        assert 0 < blocked < len(paths)
+        print(f"  27a: {len(paths)} paths, {blocked} blocked, indices == scalar loop ✓")
+
+        # --- 27b: Long paths take the batch route with the same reasons ---
+        for x1, y1, z1, x2, y2, z2, h in paths[:100]:
+            start, end = Vec3(x1, y1, z1), Vec3(x2, y2, z2)
+            batched = tc.check_path_walkable(start, end, h)
+            tc.BATCH_MIN_SAMPLES = 1 << 30
+            scalar = tc.check_path_walkable(start, end, h)
+            del tc.BATCH_MIN_SAMPLES
+            assert batched[:2] == scalar[:2]
+        print("  27b: check_path_walkable reasons unchanged ✓")
+
+        # --- 27c: SimTerrain.check_walkable_many == check_walkable ---
+        cols = np.array([p[:6] for p in paths]).T
+        many = terrain.check_walkable_many(*cols)
+        single = [terrain.check_walkable(*p[:6]) for p in paths]
+        assert many.tolist() == single
+        few = terrain.check_walkable_many(*cols[:, :5])
+        assert few.tolist() == single[:5]
+        print(f"  27c: {int(many.sum())}/{len(paths)} walkable, batch == per-path ✓")
+
+    print("  PASSED\n")
+
+
+def _build_test_bih(lo: np.ndarray, hi: np.ndarray, leaf_size: int = 4):
+    """Median-split BIH over (N,3) boxes in the AzerothCore node layout.
+
+    Returns (tree, objects) uint32 arrays as stored in a .vmtree; clip
+    planes are rounded outward to float32 like the extractor's.
+    """
+    tree = [0, 0, 0]
+    objects: list[int] = []
+
+    def bits(v):
+        return int(np.float32(v).view(np.uint32))
+
+    def node(idx, at):
+        if len(idx) <= leaf_size:
+            tree[at] = (3 << 30) | len(objects)
+            tree[at + 1] = len(idx)
+            objects.extend(idx.tolist())
+            return
+        axis = int(np.argmax(hi[idx].max(axis=0) - lo[idx].min(axis=0)))
+        order = idx[np.argsort(lo[idx, axis] + hi[idx, axis], kind='stable')]
+        left, right = order[:len(order) // 2], order[len(order) // 2:]
+        clip_left = np.nextafter(np.float32(hi[left, axis].max()), np.float32(np.inf))
+        clip_right = np.nextafter(np.float32(lo[right, axis].min()), np.float32(-np.inf))
+        child = len(tree)
+        tree.extend([0] * 6)
+        tree[at:at + 3] = [(axis << 30) | child, bits(clip_left), bits(clip_right)]
+        node(left, child)
+        node(right, child + 3)
+
+    node(np.arange(len(lo)), 0)
+    return np.array(tree, dtype=np.uint32), np.array(objects, dtype=np.uint32)
+
+
+def test_bih_los():
+    """Test BIH-traversal LOS against the brute-force AABB checker."""
+    print("=== Test 28: BIH Line of Sight ===")
+    import random
+    from test_3d_env import (AABB, BIHLOSChecker, LOSChecker, ModelSpawn, Vec3,
+                             VMapTree, MAP_HALFSIZE, MOD_HAS_BOUND, parse_vmtree,
+                             parse_vmtile)
+
+    # --- 28a: Synthetic tree: same hits as brute force ---
+    rng = np.random.default_rng(28)
+    n = 1500
+    lo = np.column_stack((rng.uniform(0, 800, (n, 2)), rng.uniform(0, 40, n)))
+    lo = lo.astype(np.float32).astype(np.float64)
+    hi = (lo + rng.uniform(1, 10, (n, 3))).astype(np.float32).astype(np.float64)
+    tree, objects = _build_test_bih(lo, hi)
+    spawns = [ModelSpawn(flags=MOD_HAS_BOUND, adt_id=0, spawn_id=i,
+                         position=Vec3(*lo[i]), rotation=Vec3(0, 0, 0), scale=1.0,
+                         bounds=AABB(Vec3(*lo[i]), Vec3(*hi[i])), name='box',
+                         tree_ref=i) for i in range(n)]
+    vtree = VMapTree(map_id=0, is_tiled=True,
+                     bounds=AABB(Vec3(*lo.min(axis=0)), Vec3(*hi.max(axis=0))),
+                     tree_nodes=tree, object_indices=objects, spawns=[])
+    bih = BIHLOSChecker(vtree)
+    bih.add_spawns(spawns[:-1])
+    # One spawn without a tree value is still checked (brute force)
+    stray = spawns[-1]
+    stray.tree_ref = -1
+    bih.add_spawns([stray])
+    brute = LOSChecker()
+    brute.add_spawns(spawns)
+
+    r = random.Random(28)
+    rays = []
+    for _ in range(1000):
+        a = Vec3(r.uniform(-20, 820), r.uniform(-20, 820), r.uniform(0, 60))
+        ang = r.uniform(-math.pi, math.pi)
+        length = r.choice([0.0, 5.0, 30.0, 200.0])
+        rays.append((a, Vec3(a.x + length * math.cos(ang), a.y + length * math.sin(ang),
+                             r.uniform(0, 60))))
+    rays.append((Vec3(stray.bounds.low.x - 5, stray.bounds.low.y, stray.bounds.low.z + 0.5),
+                 Vec3(stray.bounds.high.x + 5, stray.bounds.low.y, stray.bounds.low.z + 0.5)))
+    blocked = 0
+    for a, b in rays:
+        got = bih.is_in_line_of_sight(a, b, use_vmap_coords=True)
+        want = brute.is_in_line_of_sight(a, b, use_vmap_coords=True)
+        assert got[0] == want[0] and abs(got[2] - want[2]) < 1e-9, (a, b, got, want)
+        assert bih.has_los(a, b, use_vmap_coords=True) == want[0]
+        blocked += not want[0]
+    assert not bih.is_in_line_of_sight(*rays[-1], use_vmap_coords=True)[0]
+    assert 0 < blocked < len(rays)
+    print(f"  28a: {len(rays)} rays over {n} boxes, {blocked} blocked == brute force ✓")
+
+    # --- 28b: Batch API matches the single-ray result ---
+    starts = np.array([[a.x, a.y, a.z] for a, _ in rays])
+    ends = np.array([[b.x, b.y, b.z] for _, b in rays])
+    many = bih.has_los_many(starts, ends, use_vmap_coords=True)
+    assert many.tolist() == [bih.has_los(a, b, use_vmap_coords=True) for a, b in rays]
+    to_world = np.array([MAP_HALFSIZE, MAP_HALFSIZE, 0.0]), np.array([-1.0, -1.0, 1.0])
+    world = bih.has_los_many(*(to_world[0] + p * to_world[1] for p in (starts, ends)))
+    assert world.tolist() == many.tolist()
+    print(f"  28b: has_los_many over {len(rays)} rays == per-ray ✓")
+
+    # --- 28c: Real vmtree with its vmtile spawns ---
+    data_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+    vmtree_path = os.path.join(data_dir, '000.vmtree')
+    vmtile_path = os.path.join(data_dir, '000_27_29.vmtile')
+    if os.path.isfile(vmtree_path) and os.path.isfile(vmtile_path):
+        real = parse_vmtree(vmtree_path)
+        tile_spawns = parse_vmtile(vmtile_path)
+        bih = BIHLOSChecker(real)
+        bih.add_spawns(tile_spawns)
+        brute = LOSChecker()
+        brute.add_spawns(tile_spawns)
+        for sp in tile_spawns:
+            c = (sp.bounds.low + sp.bounds.high) * 0.5
+            a, b = c + Vec3(-30, -20, 0), c + Vec3(30, 20, 0)
+            got = bih.is_in_line_of_sight(a, b, use_vmap_coords=True)
+            want = brute.is_in_line_of_sight(a, b, use_vmap_coords=True)
+            assert not got[0] and got[1] is want[1]
+        print(f"  28c: {len(real.tree_nodes)} BIH words, {len(tile_spawns)} vmtile spawns hit ✓")
+    else:
+        print("  28c: SKIP (data/000.vmtree not found)")
+
+    print("  PASSED\n")
+
+
+def _sim_fingerprint(sim):
+    """Comparable snapshot of player, mob table, counters and RNG state."""
+    from dataclasses import asdict
+    t = sim.mob_table
+    n = t.n
+    mobs = {name: getattr(t, name)[:n].tolist()
+            for name in ('alive', 'in_combat', 'hp', 'x', 'y', 'respawn_timer',
+                         'dot_remaining', 'dot_timer')}
+    player = asdict(sim.player)
+    return (player, mobs, sim.tick_count, sim.rng.getstate(),
+            sim.consume_events())
+
+
+def test_fast_forward():
+    """Test event-driven fast-forward against plain ticking."""
+    print("=== Test 29: Fast-Forward ===")
+    from sim.constants import FAMILY_HEAL, FAMILY_PSYCHIC_SCREAM, get_best_rank
+
+    def isolate(sim):
+        # Move every mob out of aggro range so the player idles
+        t = sim.mob_table
+        n = t.n
+        t.x[:n] = t.spawn_x[:n] = sim.player.x + 200.0 + np.arange(n) * 5.0
+        t.y[:n] = t.spawn_y[:n] = sim.player.y
+        t.mark_moved(list(range(n)))
+
+    def eating(sim):
+        isolate(sim)
+        p = sim.player
+        p.hp, p.mana = 5, 3
+        assert sim.do_eat_drink()
+
+    def casting(sim):
+        isolate(sim)
+        sim.player.hp = 20
+        assert sim.do_cast_heal()
+
+    def respawn(sim):
+        isolate(sim)
+        for mob in sim.mobs[:3]:
+            sim._damage_mob(mob, mob.hp + 1)
+        sim.player.in_combat = False
+        sim.player.hp = 1
+
+    def buffs_and_dots(sim):
+        isolate(sim)
+        p = sim.player
+        p.in_combat = False
+        p.fortitude_remaining = 40
+        p.inner_fire_remaining = 25
+        p.shield_remaining, p.shield_absorb, p.shield_cooldown = 9, 50, 14
+        p.spell_cooldowns[FAMILY_PSYCHIC_SCREAM] = 17
+        p.hot_remaining, p.hot_timer, p.hot_heal_per_tick = 30, 6, 7
+        p.hp = 10
+        t = sim.mob_table
+        t.dot_remaining[0, 0], t.dot_timer[0, 0] = 36, 6
+
+    ticks = 300
+    for name, setup in (('eating', eating), ('casting', casting),
+                        ('respawn', respawn), ('buffs/dots', buffs_and_dots)):
+        ref = CombatSimulation(num_mobs=10, seed=29)
+        ff = CombatSimulation(num_mobs=10, seed=29)
+        setup(ref)
+        setup(ff)
+        for _ in range(ticks):
+            ref.tick()
+        calls = 0
+        while ff.tick_count < ref.tick_count:
+            assert ff.fast_forward(ref.tick_count - ff.tick_count) >= 1
+            calls += 1
+        assert _sim_fingerprint(ff) == _sim_fingerprint(ref), name
+        assert calls < ticks // 4, (name, calls)
+        print(f"  29a: {name}: {ticks} ticks in {calls} calls == tick() ✓")
+
+    # --- 29b: Stops at the event: eating ends, cast completes, aggro ---
+    sim = CombatSimulation(num_mobs=10, seed=29)
+    eating(sim)
+    # Mana caps first (event), then eating ends once HP is full too
+    assert sim.fast_forward(1000) < 100 and sim.player.mana == sim.player.max_mana
+    assert sim.player.is_eating
+    assert sim.fast_forward(1000) < 100 and not sim.player.is_eating
+    sim = CombatSimulation(num_mobs=10, seed=29)
+    casting(sim)
+    n = sim.fast_forward(1000)
+    assert not sim.player.is_casting and n == SPELLS[
+        get_best_rank(FAMILY_HEAL, sim.player.level)].cast_ticks
+    sim = CombatSimulation(num_mobs=10, seed=29)
+    isolate(sim)
+    t = sim.mob_table
+    t.x[0] = t.spawn_x[0] = sim.player.x + 3.0
+    t.y[0] = t.spawn_y[0] = sim.player.y
+    t.mark_moved([0])
+    assert sim.quiet_ticks(100) == 0
+    assert sim.fast_forward(100) == 1 and sim.player.in_combat
+    assert sim.fast_forward(100) == 1   # in combat: one tick per call
+    print("  29b: stops on eating end, cast completion and aggro ✓")
+
+    # --- 29c: Random play: every fast_forward matches as many ticks ---
+    import random
+    r = random.Random(29)
+    actions = ('do_noop', 'do_move_forward', 'do_turn_left', 'do_target_nearest',
+               'do_cast_smite', 'do_cast_heal', 'do_cast_renew', 'do_cast_pw_shield',
+               'do_cast_sw_pain', 'do_cast_fortitude', 'do_eat_drink', 'do_loot')
+    ref = CombatSimulation(num_mobs=10, seed=129)
+    ff = CombatSimulation(num_mobs=10, seed=129)
+    for step in range(400):
+        name = r.choice(actions)
+        getattr(ref, name)()
+        getattr(ff, name)()
+        for _ in range(ff.fast_forward(r.choice((1, 8, 40)))):
+            ref.tick()
+        if step % 20 == 0 or ref.player.hp <= 0:
+            assert _sim_fingerprint(ff) == _sim_fingerprint(ref), step
+        if ref.player.hp <= 0:
+            break
+    assert _sim_fingerprint(ff) == _sim_fingerprint(ref)
+    print(f"  29c: random play, {ref.tick_count} ticks == tick() ✓")
+
+    # --- 29d: Env wait macro ---
+    env = WoWSimEnv(num_mobs=10, seed=29, wait_action=True)
+    env.reset()
+    assert env.action_space.n == 31 and env.action_masks().shape == (31,)
+    eating(env.sim)
+    start = env.sim.tick_count
+    env.step(WoWSimEnv.WAIT_ACTION)
+    assert 1 < env.sim.tick_count - start <= WoWSimEnv.WAIT_MAX_TICKS
+    assert WoWSimEnv(num_mobs=5, seed=29).action_space.n == 30
+    print(f"  29d: wait action advanced {env.sim.tick_count - start} ticks in one step ✓")
+
+    # --- 29e: A wait over a meal scores like the noop steps it replaces ---
+    wait_env = WoWSimEnv(num_mobs=10, seed=3, wait_action=True)
+    noop_env = WoWSimEnv(num_mobs=10, seed=3, wait_action=True)
+    wait_env.reset()
+    noop_env.reset()
+    eating(wait_env.sim)
+    eating(noop_env.sim)
+    wait_total = noop_total = 0.0
+    wait_steps = 0
+    while wait_env.sim.player.is_eating:
+        wait_total += wait_env.step(WoWSimEnv.WAIT_ACTION)[1]
+        wait_steps += 1
+    while noop_env.sim.tick_count < wait_env.sim.tick_count:
+        noop_total += noop_env.step(0)[1]
+    assert not noop_env.sim.player.is_eating
+    assert abs(wait_total - noop_total) < 1e-9, (wait_total, noop_total)
+    # Only the tick that ends the meal is idle, for both
+    assert wait_env._idle_steps == noop_env._idle_steps == 1
+    print(f"  29e: {wait_steps} wait steps == {noop_env._step_count} noop steps "
+          f"(reward {wait_total:+.4f}) ✓")
+
+    print("  PASSED\n")
+
+
+def test_direct_obs():
+    """Test the dict-free observation writer against _build_obs."""
+    print("=== Test 30: Direct Observation Writer ===")
+    import random
+    from sim.constants import FAMILY_MIND_BLAST
+
+    # --- 30a: write_obs == _build_obs(get_state_dict()) during play ---
+    env = WoWSimEnv(num_mobs=15, seed=30)
+    obs, _ = env.reset()
+    assert np.array_equal(obs, env._build_obs(env.sim.get_state_dict()))
+    r = random.Random(30)
+    steps = 0
+    for _ in range(600):
+        mask = env.action_masks()
+        obs, _, done, trunc, _ = env.step(r.choice(np.flatnonzero(mask).tolist()))
+        want = env._build_obs(env.sim.get_state_dict())
+        assert obs.dtype == np.float32 and np.array_equal(obs, want), \
+            np.flatnonzero(obs != want)
+        steps += 1
+        if done or trunc:
+            obs, _ = env.reset()
+    print(f"  30a: {steps} steps, write_obs == _build_obs(state dict) ✓")
+
+    # --- 30b: Target/buff/talent dims without the dict ---
+    p = env.sim.player
+    env.sim.do_target_nearest()
+    p.shield_remaining, p.fear_ward_remaining, p.channel_remaining = 5, 5, 3
+    p.spell_cooldowns[FAMILY_MIND_BLAST] = 4
+    if env.sim.target is not None:
+        env.sim.target.dot_remaining = 12
+    out = np.full(52, -7.0, dtype=np.float32)
+    assert env.write_obs(out) is out
+    assert np.array_equal(out, env._build_obs(env.sim.get_state_dict()))
+    assert out[15] == 1.0 and out[20] == 0.0 and out[26] == 1.0 and out[32] == 1.0
+    print("  30b: caller buffer filled, buff/cooldown dims match ✓")
+
+    # --- 30c: Returned obs is a copy; last_state is built on demand ---
+    obs1, *_ = env.step(0)
+    obs2, *_ = env.step(0)
+    assert obs1 is not obs2 and obs1 is not env._obs
+    assert env._last_state is None
+    state = env.last_state
+    assert state['hp'] == p.hp and env.last_state is state
+    env.step(0)
+    assert env._last_state is None
+    print("  30c: fresh obs arrays, lazy last_state ✓")
+
+    # --- 30d: Quest dims ---
+    env_q = WoWSimEnv(num_mobs=5, seed=30, enable_quests=True)
+    obs, _ = env_q.reset()
+    assert np.array_equal(obs, env_q._build_obs(env_q.sim.get_state_dict()))
+    for _ in range(50):
+        obs, *_ = env_q.step(1)
+        assert np.array_equal(obs, env_q._build_obs(env_q.sim.get_state_dict()))
+    print("  30d: quest dims match with quests enabled ✓")
+
+    print("  PASSED\n")
+
+
+def test_cached_action_masks():
+    """Test the per-level spell table and incremental action masks."""
+    print("=== Test 31: Cached Action Masks ===")
+    import random
+    from sim.constants import (FAMILY_MIND_FLAY, FAMILY_SMITE, get_best_rank)
+    from sim.formulas import spell_mana_cost
+    from sim.wow_sim_env import spell_mask_table
+
+    def cold_mask(env):
+        env._mask_key = env._reach_sig = None
+        return env.action_masks()
+
+    # --- 31a: Per-level table: best rank + cost, memoized ---
+    rows = spell_mask_table(20, CLASS_PRIEST)
+    assert spell_mask_table(20, CLASS_PRIEST) is rows
+    smite = next(r for r in rows if r.family_id == FAMILY_SMITE)
+    assert smite.spell_id == get_best_rank(FAMILY_SMITE, 20)
+    assert smite.mana_cost == spell_mana_cost(smite.spell_id, 20, CLASS_PRIEST)
+    assert smite.offensive and smite.action_id == 5
+    assert all(get_best_rank(r.family_id, 1) is not None
+               for r in spell_mask_table(1, CLASS_PRIEST))
+    print(f"  31a: L20 table has {len(rows)} spell rows, Smite rank {smite.spell_id} ✓")
+
+    # --- 31b: Warm cache == cold rebuild during random play ---
+    r = random.Random(31)
+    checked = 0
+    for seed in (31, 32):
+        env = WoWSimEnv(num_mobs=20, seed=seed)
+        env.reset()
+        if seed == 32:
+            p = env.sim.player
+            for lvl in range(2, 45):
+                p.xp = XP_TABLE[lvl]
+                env.sim._check_level_up()
+        for _ in range(1500):
+            mask = env.action_masks()
+            assert np.array_equal(mask, cold_mask(env)), np.flatnonzero(mask != cold_mask(env))
+            checked += 1
+            _, _, done, trunc, _ = env.step(r.choice(np.flatnonzero(mask).tolist()))
+            if done or trunc:
+                env.reset()
+    print(f"  31b: {checked} cached masks == cold rebuild ✓")
+
+    # --- 31c: Dirty inputs: mana, level, talent, target range ---
+    env = WoWSimEnv(num_mobs=5, seed=31)
+    env.reset()
+    sim = env.sim
+    p = sim.player
+    p.gcd_remaining = 0
+    mob = sim.mobs[0]
+    mob.x, mob.y = p.x + 10.0, p.y
+    sim.target = mob
+    assert env.action_masks()[5]
+    p.mana = 0
+    assert not env.action_masks()[5], "Smite needs mana"
+    p.mana = p.max_mana
+    assert env.action_masks()[5]
+    mob.x = p.x + 200.0
+    assert not env.action_masks()[5], "Target moved out of range"
+    mob.x = p.x + 10.0
+    assert env.action_masks()[5]
+    for lvl in range(2, 21):
+        p.xp = XP_TABLE[lvl]
+        sim._check_level_up()
+    p.gcd_remaining = 0
+    p.mana = p.max_mana
+    env.action_masks()
+    assert env._mask_key[0] == 20
+    assert {row.spell_id for row in env._mask_rows if row.family_id == FAMILY_SMITE} \
+        == {get_best_rank(FAMILY_SMITE, 20)}
+    mf_points = p.talent_points.pop("mind_flay", 0)
+    assert not env.action_masks()[26]
+    p.talent_points["mind_flay"] = max(1, mf_points)
+    assert env.action_masks()[26], "Mind Flay unlocked by talent"
+    assert any(row.family_id == FAMILY_MIND_FLAY for row in env._mask_rows)
+    print("  31c: mana, range, level-up and talent changes refresh the mask ✓")
+
+    print("  PASSED\n")
+
+
+def test_snapshot_restore():
+    """Test CombatSimulation.snapshot()/restore() determinism."""
+    print("=== Test 32: Snapshot / Restore ===")
+    import pickle
+    import random
+
+    actions = ('do_noop', 'do_move_forward', 'do_turn_left', 'do_target_nearest',
+               'do_cast_smite', 'do_cast_sw_pain', 'do_cast_heal', 'do_cast_renew',
+               'do_cast_pw_shield', 'do_eat_drink', 'do_loot')
+
+    def play(sim, seed, steps):
+        r = random.Random(seed)
+        for _ in range(steps):
+            getattr(sim, r.choice(actions))()
+            sim.tick()
+        return _sim_fingerprint(sim), sorted(sim._active_chunks), \
+            [m.uid for m in sim.mobs], sim.target.uid if sim.target else None
+
+    # --- 32a: Restoring replays the same future, any number of times ---
+    sim = CombatSimulation(num_mobs=10, seed=32)
+    play(sim, 1, 150)
+    snap = sim.snapshot()
+    first = play(sim, 2, 300)
+    for _ in range(2):
+        sim.restore(snap)
+        assert play(sim, 2, 300) == first
+    print(f"  32a: restore() twice reproduces {sim.tick_count - snap.tick_count} ticks ✓")
+
+    # --- 32b: Branches diverge without touching the snapshot ---
+    sim.restore(snap)
+    branch = play(sim, 3, 300)
+    sim.restore(snap)
+    assert play(sim, 2, 300) == first and branch != first
+    print("  32b: branching rollouts from one snapshot ✓")
+
+    # --- 32c: Pickled snapshot into a fresh simulation ---
+    blob = pickle.dumps(snap)
+    other = CombatSimulation(num_mobs=10, seed=99)
+    other.restore(pickle.loads(blob))
+    assert play(other, 2, 300) == first
+    print(f"  32c: pickled snapshot ({len(blob) / 1024:.0f} KB) restores in a new sim ✓")
+
+    # --- 32d: Chunk residency: parked chunks and their mobs come back ---
+    sim = CombatSimulation(num_mobs=10, seed=32)
+    if sim.creature_db:
+        p = sim.player
+        home = (p.x, p.y)
+        p.x += 3 * sim.CHUNK_SIZE * (sim.CHUNK_RADIUS + 1)
+        sim.tick()
+        assert sim._chunk_cache, "leaving the area parks chunks"
+        snap = sim.snapshot()
+        p.x, p.y = home
+        sim.tick()
+        back = _sim_fingerprint(sim), sorted(sim._active_chunks)
+        sim.restore(snap)
+        assert len(sim._chunk_cache) == len(snap.chunk_cache)
+        sim.player.x, sim.player.y = home
+        sim.tick()
+        assert (_sim_fingerprint(sim), sorted(sim._active_chunks)) == back
+        print(f"  32d: {len(snap.chunk_cache)} parked chunks restored ✓")
+    else:
+        print("  32d: SKIP (no creature DB)")
+
+    print("  PASSED\n")
+
+
+def test_prewarmed_reset():
+    """Test the cached start world used by reset()."""
+    print("=== Test 33: Pre-Warmed Reset ===")
+    import random
+
+    def start_state(sim):
+        return (_sim_fingerprint(sim), sorted(sim._active_chunks),
+                [(m.uid, m.level, m.template.entry, m.max_hp) for m in sim.mobs],
+                [v.uid for v in sim.vendors], set(sim.visited_areas))
+
+    # --- 33a: Restored start world matches a full rebuild, roll for roll ---
+    sim = CombatSimulation(num_mobs=10, seed=33)
+    sim.reset()                                    # builds the template
+    assert sim._reset_template is not None
+    r = random.Random(5)
+    for _ in range(200):
+        getattr(sim, r.choice(('do_move_forward', 'do_turn_left',
+                               'do_target_nearest', 'do_cast_smite')))()
+        sim.tick()
+    rng_state = sim.rng.getstate()
+    sim.reset()
+    fast = start_state(sim)
+    sim._reset_template = None
+    sim.rng.setstate(rng_state)
+    sim.reset()
+    assert start_state(sim) == fast
+    print(f"  33a: cached reset == full rebuild ({len(sim.mobs)} mobs) ✓")
+
+    # --- 33b: Mob levels are re-rolled per episode ---
+    if sim.creature_db and any(m.template.min_level < m.template.max_level
+                               for m in sim.mobs):
+        rolls = set()
+        for seed in range(5):
+            sim.rng.seed(seed)
+            sim.reset()
+            rolls.add(tuple(m.level for m in sim.mobs))
+            for m in sim.mobs:
+                t = m.template
+                assert t.min_level <= m.level <= t.max_level
+                assert m.hp == m.max_hp == t.base_hp
+        assert len(rolls) > 1
+        print(f"  33b: {len(rolls)} distinct level rolls over 5 seeds ✓")
+    else:
+        print("  33b: SKIP (no level ranges in creature DB)")
+
+    # --- 33c: Episode state does not leak into the template ---
+    sim.player.level = 7
+    sim.player.inventory.append('junk')
+    sim.mobs[0].hp = 1
+    sim.reset()
+    assert sim.player.level == 1 and not sim.player.inventory
+    assert sim.mobs[0].hp == sim.mobs[0].max_hp
+    print("  33c: episode mutations do not reach the cached world ✓")
+
+    print("  PASSED\n")
+
+
+def test_compiled_loot():
+    """Test compiled loot tables, alias sampling and batch rolls."""
+    print("=== Test 34: Compiled Loot Tables ===")
+    import random
+    import tempfile
+    from sim.loot_db import LootDB, build_alias
+
+    # --- 34a: Alias tables reproduce the weights exactly ---
+    weights = [1.0, 2.0, 3.0, 0.0, 4.0]
+    prob, alias = build_alias(weights)
+    implied = [0.0] * len(weights)
+    for i, (p, a) in enumerate(zip(prob, alias)):
+        implied[i] += p / len(weights)
+        implied[a] += (1.0 - p) / len(weights)
+    for w, q in zip(weights, implied):
+        assert abs(q - w / sum(weights)) < 1e-12
+    print("  34a: alias table matches weights ✓")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'item_template.csv'), 'w') as f:
+            f.write('entry;name;Quality;SellPrice;InventoryType;ItemLevel\n')
+            for entry, name in ((10, 'Linen Cloth'), (11, 'Rugged Vest'),
+                                (12, 'Short Sword'), (13, 'Minor Potion')):
+                f.write(f'{entry};"{name}";1;10;0;5\n')
+        with open(os.path.join(tmp, 'creature_loot_template.csv'), 'w') as f:
+            f.write('Entry;Item;Reference;Chance;GroupId;MinCount;MaxCount\n')
+            f.write('200;10;0;50;0;1;2\n'                        # 50%, 1-2
+                    '200;11;0;30;1;1;1\n200;12;0;10;1;1;1\n'    # group 1 ...
+                    '200;13;0;0;1;1;1\n'                         # ... 60% share
+                    '200;0;500;100;0;1;2\n'                      # ref 500 x2
+                    '200;12;0;20;2;1;1\n'                        # group 2: 20%
+                    '300;0;600;0;0;1;1\n')                       # circular ref
+        with open(os.path.join(tmp, 'reference_loot_template.csv'), 'w') as f:
+            f.write('Entry;Item;Reference;Chance;GroupId;MinCount;MaxCount\n')
+            f.write('500;13;0;25;0;1;1\n'
+                    '600;10;0;0;0;1;1\n600;0;600;0;0;1;1\n')
+        loot = LootDB(tmp, quiet=True)
+
+    # Expected items per kill of creature 200
+    expected = {10: 0.5 * 1.5, 11: 0.30, 12: 0.10 + 0.20, 13: 0.60 + 2 * 0.25}
+
+    # --- 34b: roll_loot draws from the compiled table ---
+    table = loot.compile_loot(200)
+    assert table is loot.compile_loot(200)
+    assert len(table.independent) == 2 and len(table.groups) == 2
+    assert abs(table.groups[0].total - 100.0) < 1e-9
+    assert loot.compile_loot(12345) is None and loot.roll_loot(12345, random.Random()) == []
+    rng = random.Random(34)
+    n = 20000
+    sums = dict.fromkeys(expected, 0)
+    for _ in range(n):
+        results = loot.roll_loot(200, rng)
+        assert sum(r.item.entry == 11 for r in results) <= 1   # one group-1 winner
+        for r in results:
+            sums[r.item.entry] += r.count
+    for entry, mean in expected.items():
+        assert abs(sums[entry] / n - mean) < 0.03, (entry, sums[entry] / n, mean)
+    print(f"  34b: roll_loot rates match over {n} kills ✓")
+
+    # --- 34c: References honor MaxCount and the depth limit ---
+    depth = LootDB.MAX_REFERENCE_DEPTH
+    assert [(r.item.entry, r.count) for r in loot.roll_loot(300, rng)] == [(10, 1)] * depth
+    print(f"  34c: circular reference stops after {depth} levels ✓")
+
+    # --- 34d: Batch rolls ---
+    n = 200000
+    counts = loot.roll_loot_batch(200, n, 34)
+    assert set(counts) == set(expected)
+    for entry, mean in expected.items():
+        assert counts[entry].shape == (n,)
+        assert abs(counts[entry].mean() - mean) < 0.01, (entry, counts[entry].mean(), mean)
+    assert counts[10].max() == 2 and counts[13].max() == 3
+    both = (counts[11] > 0) & (counts[12] > 0)
+    assert abs(both.mean() - 0.30 * 0.20) < 0.01     # groups roll independently
+    assert np.array_equal(loot.roll_loot_batch(300, 10, 0)[10], np.full(10, depth))
+    assert loot.roll_loot_batch(12345, 10, 0) == {}
+    a = loot.roll_loot_batch(200, 1000, np.random.default_rng(7))
+    b = loot.roll_loot_batch(200, 1000, np.random.default_rng(7))
+    assert all(np.array_equal(a[k], b[k]) for k in a)
+    print(f"  34d: roll_loot_batch rates match over {n} kills ✓")
+
+    print("  PASSED\n")
+
+
+def test_tile_prefetch():
+    """Test background tile prefetching along the movement heading."""
+    print("=== Test 35: Tile Prefetch ===")
+    import contextlib
+    import io
+    import tempfile
+    import threading
+    from sim.terrain import SimTerrain
+    from test_3d_env import map_filename
+
+    def track(terrain):
+        # Record which thread decoded each tile
+        decoded = []
+        inner = terrain._decode_tile
+
+        def decode(tx, ty, with_vmtile):
+            decoded.append(((tx, ty), threading.current_thread().name))
+            return inner(tx, ty, with_vmtile)
+        terrain._decode_tile = decode
+        return decoded
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'maps'))
+        for gx in range(47, 53):
+            for gy in range(31, 34):
+                _write_test_map(os.path.join(root, 'maps', map_filename(0, gx, gy)),
+                                'int16', seed=gx * 100 + gy)
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain = SimTerrain(root, quiet=True, prefetch_workers=0)
+            ahead = SimTerrain(root, quiet=True)
+        decoded = track(ahead)
+
+        # --- 35a: Same tiles and heights as synchronous loading ---
+        x, y = SimTerrain.SPAWN_X, SimTerrain.SPAWN_Y
+        heading = math.pi                       # -x: towards higher grid x
+        crossings = 0
+        for _ in range(100):
+            x += math.cos(heading) * 20.0
+            y += math.sin(heading) * 20.0
+            before = plain._current_center
+            plain.ensure_loaded(x, y)
+            ahead.ensure_loaded(x, y, heading)
+            crossings += plain._current_center != before
+            assert set(ahead.env.loaded_tiles) == set(plain.env.loaded_tiles)
+            assert ahead.get_height(x, y) == plain.get_height(x, y)
+        assert crossings >= 3
+        print(f"  35a: {crossings} tile crossings, resident tiles == synchronous ✓")
+
+        # --- 35b: Tiles ahead were decoded off the caller's thread ---
+        main = threading.current_thread().name
+        assert decoded and all(name != main for _, name in decoded), decoded
+        assert all(name.startswith('terrain-prefetch') for _, name in decoded)
+        print(f"  35b: {len(decoded)} tiles decoded by prefetch workers ✓")
+
+        # --- 35c: Turning around drops queued tiles far behind ---
+        reach = SimTerrain.TILE_RADIUS + 2
+        for _ in range(60):
+            x += 20.0
+            ahead.ensure_loaded(x, y, 0.0)
+        gx, gy = ahead._current_center
+        assert all(max(abs(k[0] - gx), abs(k[1] - gy)) <= reach for k in ahead._pending)
+        ahead.close()
+        assert ahead._pool is None and not ahead._pending
+        ahead.ensure_loaded(x, y)               # still loads synchronously
+        print("  35c: stale prefetches dropped, close() stops workers ✓")
+
+    print("  PASSED\n")
+
+
+def test_tile_eviction():
+    """Test in-place terrain checker updates and LRU tile eviction."""
+    print("=== Test 36: Tile Eviction ===")
+    import contextlib
+    import io
+    import tempfile
+    from sim.terrain import SimTerrain
+    from test_3d_env import (AABB, BIHLOSChecker, ModelSpawn, Vec3, VMapTree,
+                             MOD_HAS_BOUND, map_filename, world_to_grid)
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'maps'))
+        for gx in range(45, 53):
+            for gy in range(30, 35):
+                _write_test_map(os.path.join(root, 'maps', map_filename(0, gx, gy)),
+                                'int8', seed=gx * 100 + gy)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bounded = SimTerrain(root, quiet=True, prefetch_workers=0)
+            full = SimTerrain(root, quiet=True, prefetch_workers=0)
+        bounded.MAX_RESIDENT_TILES = 12
+        full.MAX_RESIDENT_TILES = 1 << 30
+        checker = bounded.env.terrain_checker
+
+        # --- 36a: Memory stays bounded on a long walk; checker updated in place ---
+        rng = np.random.default_rng(36)
+        x, y = SimTerrain.SPAWN_X, SimTerrain.SPAWN_Y
+        peak = 0
+        for step in range(400):
+            a = (step // 40) * 2.4                  # change heading now and then
+            x = min(max(x + math.cos(a) * 25.0, -9800.0), -7300.0)
+            y = min(max(y + math.sin(a) * 25.0, -1300.0), 1300.0)
+            bounded.ensure_loaded(x, y)
+            full.ensure_loaded(x, y)
+            peak = max(peak, len(bounded._attempted_tiles))
+            assert bounded.env.terrain_checker is checker
+            assert set(checker.tiles) == {k[1:] for k in bounded.env.loaded_tiles}
+            # Everything in the player's window matches the never-evicted terrain
+            px, py = x + rng.uniform(-400, 400), y + rng.uniform(-400, 400)
+            if world_to_grid(px, py) in bounded._attempted_tiles:
+                assert bounded.get_height(px, py) == full.get_height(px, py)
+                assert bounded.check_walkable(x, y, bounded.get_height(x, y), px, py, 0.0) \
+                    == full.check_walkable(x, y, full.get_height(x, y), px, py, 0.0)
+        assert peak <= 12 < len(full._attempted_tiles)
+        print(f"  36a: {len(full._attempted_tiles)} tiles visited, "
+              f"at most {peak} resident ✓")
+
+        # --- 36b: Returning to evicted tiles reloads them ---
+        bounded.ensure_loaded(SimTerrain.SPAWN_X, SimTerrain.SPAWN_Y)
+        assert (48, 32) in bounded._attempted_tiles and (0, 48, 32) in bounded.env.loaded_tiles
+        assert bounded.get_height(SimTerrain.SPAWN_X + 3, SimTerrain.SPAWN_Y) \
+            == full.get_height(SimTerrain.SPAWN_X + 3, SimTerrain.SPAWN_Y)
+        print("  36b: revisited tiles reload ✓")
+
+    # --- 36c: VMAP spawns leave the BIH checker with the last tile holding them ---
+    lo, hi = Vec3(10.0, -1.0, -5.0), Vec3(12.0, 1.0, 5.0)
+
+    def spawn(tree_ref):
+        return ModelSpawn(flags=MOD_HAS_BOUND, adt_id=0, spawn_id=1, position=lo,
+                          rotation=Vec3(0, 0, 0), scale=1.0, bounds=AABB(lo, hi),
+                          name='wall', tree_ref=tree_ref)
+    vtree = VMapTree(map_id=0, is_tiled=True, bounds=AABB(lo, hi),
+                     tree_nodes=np.array([3 << 30, 1, 0], dtype=np.uint32),
+                     object_indices=np.array([0], dtype=np.uint32), spawns=[])
+    bih = BIHLOSChecker(vtree)
+    tile_a, tile_b, stray = [spawn(0)], [spawn(0)], [spawn(-1)]
+    for spawns in (tile_a, tile_b, stray):
+        bih.add_spawns(spawns)
+    ray = Vec3(0, 0, 0), Vec3(20, 0, 0)
+    assert not bih.has_los(*ray, use_vmap_coords=True)
+    bih.remove_spawns(tile_a + stray)
+    assert not bih.has_los(*ray, use_vmap_coords=True), "tile B still holds the wall"
+    bih.remove_spawns(tile_b)
+    assert bih.has_los(*ray, use_vmap_coords=True) and not bih.spawns
+    print("  36c: shared VMAP spawns refcounted across tiles ✓")
+
+    print("  PASSED\n")
+
+
+def test_height_grids():
+    """Test the per-tile float32 height grids behind SimTerrain.get_height."""
+    print("=== Test 37: Height Grids ===")
+    import contextlib
+    import io
+    import random
+    import tempfile
+    from sim.terrain import SimTerrain
+    from test_3d_env import map_filename
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'maps'))
+        for gx in range(46, 51):
+            for gy in range(30, 35):
+                _write_test_map(os.path.join(root, 'maps', map_filename(0, gx, gy)),
+                                'float', seed=gx * 100 + gy)
+        with contextlib.redirect_stdout(io.StringIO()):
+            a = SimTerrain(root, quiet=True, prefetch_workers=0)
+            b = SimTerrain(root, quiet=True, prefetch_workers=0)
+        rng = random.Random(37)
+        pts = [(SimTerrain.SPAWN_X + rng.uniform(-700, 700),
+                SimTerrain.SPAWN_Y + rng.uniform(-700, 700)) for _ in range(3000)]
+        # Repeat queries inside the same cells
+        pts += [(math.floor(x * 2) / 2 + 0.49, math.floor(y * 2) / 2 + 0.01)
+                for x, y in pts[:500]]
+
+        # --- 37a: Cell-center heights, independent of query order ---
+        ha = [a.get_height(x, y) for x, y in pts]
+        hb = {p: b.get_height(*p) for p in reversed(pts)}
+        assert ha == [hb[p] for p in pts]
+        for (x, y), h in zip(pts, ha):
+            cx, cy = (math.floor(x * 2) + 0.5) / 2, (math.floor(y * 2) + 0.5) / 2
+            want = a.env.get_height(0, cx, cy)
+            assert h == float(np.float32(want)) or (want < -1e4 and h == SimTerrain.SPAWN_Z)
+        print(f"  37a: {len(pts)} lookups == float32 cell-center heights, order-free ✓")
+
+        # --- 37b: Grids follow the resident tiles ---
+        assert set(a._height_grids) <= set(a._attempted_tiles)
+        g = next(iter(a._height_grids.values()))
+        assert g.cells.dtype == np.float32 and 1066 <= g.cells.shape[0] <= 1068
+        a.MAX_RESIDENT_TILES = 9
+        x, y = SimTerrain.SPAWN_X, SimTerrain.SPAWN_Y
+        for _ in range(60):
+            x -= 25.0
+            a.ensure_loaded(x, y)
+            for _ in range(20):
+                a.get_height(x + rng.uniform(-500, 500), y + rng.uniform(-500, 500))
+            assert set(a._height_grids) <= set(a._attempted_tiles)
+            assert len(a._height_grids) <= 9
+        a.clear_height_cache()
+        assert not a._height_grids and a._last_grid is None
+        print(f"  37b: grids evicted with their tiles (<= 9 of "
+              f"{g.cells.nbytes / 2**20:.1f} MB each) ✓")
+
+    print("  PASSED\n")
+
+
+def test_walk_bake():
+    """Test baked walkability grids and their use in SimTerrain."""
+    print("=== Test 38: Baked Walkability ===")
+    import contextlib
+    import io
+    import random
+    import tempfile
+    from sim.terrain import SimTerrain
+    from sim.walk_bake import (bake_data_root, cell_center, cell_of,
+                               walk_filename, WALK_CELLS, WALK_DIRS)
+    from test_3d_env import map_filename
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'maps'))
+        for gx in range(47, 50):
+            for gy in range(31, 34):
+                _write_test_map(os.path.join(root, 'maps', map_filename(0, gx, gy)),
+                                'float', seed=gx * 100 + gy)
+        with contextlib.redirect_stdout(io.StringIO()):
+            written = bake_data_root(root, [(48, 32)], quiet=True)
+            baked = SimTerrain(root, quiet=True, prefetch_workers=0)
+            exact = SimTerrain(root, quiet=True, prefetch_workers=0,
+                               baked_walkability=False)
+
+        # --- 38a: Bake lands next to the .map and loads with the tile ---
+        assert written == [os.path.join(root, 'maps', walk_filename(0, 48, 32))]
+        assert os.path.basename(written[0]) == '0004832.walk'
+        assert list(baked._walk_grids) == [(48, 32)]
+        assert len(baked._walk_grids[(48, 32)]) == WALK_CELLS ** 2
+        assert not exact._walk_grids
+        print(f"  38a: 0004832.walk ({WALK_CELLS}x{WALK_CELLS} cells) loaded with its tile ✓")
+
+        # --- 38b: Cell-center edges match the exact checks ---
+        rng = random.Random(38)
+        x0, y0 = SimTerrain.SPAWN_X, SimTerrain.SPAWN_Y
+        passable = 0
+        for _ in range(400):
+            i, j = cell_of(x0 + rng.uniform(-200, 200), y0 + rng.uniform(-200, 200))
+            di, dj = rng.choice(WALK_DIRS)
+            (xa, ya), (xb, yb) = cell_center(i, j), cell_center(i + di, j + dj)
+            za, zb = exact.env.get_height(0, xa, ya), exact.env.get_height(0, xb, yb)
+            want = exact.check_walkable(xa, ya, za, xb, yb, zb)
+            assert baked.check_walkable(xa, ya, za, xb, yb, zb) == want
+            passable += want
+        assert 0 < passable < 400
+        print(f"  38b: 400 neighbour edges == exact checks ({passable} passable) ✓")
+
+        # --- 38c: Free moves mostly agree; batch == per-path ---
+        paths = []
+        for _ in range(2000):
+            x, y = x0 + rng.uniform(-200, 200), y0 + rng.uniform(-200, 200)
+            h = rng.uniform(0, 2 * math.pi)
+            d = rng.choice((1.0, 3.0, 7.0))
+            x2, y2 = x + d * math.cos(h), y + d * math.sin(h)
+            paths.append((x, y, exact.get_height(x, y), x2, y2, exact.get_height(x2, y2)))
+        want = [exact.check_walkable(*p) for p in paths]
+        got = [baked.check_walkable(*p) for p in paths]
+        agree = sum(a == b for a, b in zip(got, want)) / len(paths)
+        assert agree > 0.75
+        cols = [np.array(v) for v in zip(*paths)]
+        assert baked.check_walkable_many(*cols).tolist() == got
+        print(f"  38c: random 1-7 yd moves agree {agree:.0%} with exact; batch == per-path ✓")
+
+        # --- 38d: Unbaked tiles and long moves use the exact checks ---
+        x, y = cell_center(47 * WALK_CELLS + 100, 32 * WALK_CELLS + 100)
+        assert baked._baked_walkable(x, y, x + 2.0, y) is None
+        assert baked._baked_walkable(x0, y0, x0 + 50.0, y0) is None
+        for p in [(x, y, 50.0, x + 2.0, y + 1.0, 50.0), (x0, y0, 60.0, x0 + 50, y0, 60.0)]:
+            assert baked.check_walkable(*p) == exact.check_walkable(*p)
+        print("  38d: unbaked tiles / long moves fall back to exact ✓")
+
+        # --- 38e: A changed .map or changed check settings invalidate the bake ---
+        los_height = SimTerrain._WALK_LOS_HEIGHT
+        SimTerrain._WALK_LOS_HEIGHT = los_height + 0.5
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                retuned = SimTerrain(root, quiet=True, prefetch_workers=0)
+            assert not retuned._walk_grids
+        finally:
+            SimTerrain._WALK_LOS_HEIGHT = los_height
+        st = os.stat(os.path.join(root, 'maps', map_filename(0, 48, 32)))
+        os.utime(os.path.join(root, 'maps', map_filename(0, 48, 32)),
+                 ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        with contextlib.redirect_stdout(io.StringIO()):
+            stale = SimTerrain(root, quiet=True, prefetch_workers=0)
+        assert not stale._walk_grids
+        print("  38e: stale .walk (source or settings) ignored ✓")
+
+        # --- 38f: Lookup cost ---
+        step = [p for p in paths if math.hypot(p[3] - p[0], p[4] - p[1]) < 4]
+        timings = {}
+        for name, terrain in (('baked', baked), ('exact', exact)):
+            t0 = time.perf_counter()
+            for p in step:
+                terrain.check_walkable(*p)
+            timings[name] = (time.perf_counter() - t0) / len(step)
+        assert timings['baked'] < timings['exact']
+        print(f"  38f: check_walkable {timings['baked'] * 1e6:.1f} us baked vs "
+              f"{timings['exact'] * 1e6:.1f} us exact ✓")
+
+    print("  PASSED\n")
+
+
+def test_compiled_attack_tables():
+    """Test the cached melee/spell outcome tables and batch resolvers."""
+    print("=== Test 39: Compiled Attack Tables ===")
+    import random
+    from sim.formulas import (mob_melee_table, mob_melee_tables, resolve_melee_rolls,
+                              MELEE_OUTCOMES, SPELL_OUTCOMES, spell_miss_chances,
+                              resolve_spell_rolls)
+
+    def reference_melee(al, dl, dodge, parry, block, defense, res, roll):
+        # Sequential threshold walk (the pre-table implementation)
+        t = 0.0
+        for chance, outcome in ((mob_melee_miss_chance(al, dl, defense), MELEE_MISS),
+                                (dodge, MELEE_DODGE), (parry, MELEE_PARRY),
+                                (block, MELEE_BLOCK),
+                                (mob_melee_crit_chance(al, dl, defense, res), MELEE_CRIT),
+                                (mob_crushing_chance(al, dl), MELEE_CRUSHING)):
+            t += chance
+            if roll < t:
+                return outcome
+        return MELEE_NORMAL
+
+    rng = random.Random(39)
+    swings = []
+    for _ in range(3000):
+        args = (rng.randint(1, 83), rng.randint(1, 80), rng.choice((0.0, 4.5, 11.25)),
+                rng.choice((0.0, 5.0)), rng.choice((0.0, 5.0)),
+                rng.choice((0.0, 7.0)), rng.choice((0.0, 2.5)))
+        table = mob_melee_table(*args)
+        roll = rng.choice((rng.random() * 100.0, rng.choice(table)))  # incl. exact bounds
+        swings.append((args, roll))
+
+    # --- 39a: Bisect over the cached table == sequential walk ---
+    for args, roll in swings:
+        assert resolve_mob_melee_attack(*args, roll=roll) == reference_melee(*args, roll)
+    assert mob_melee_table.cache_info().hits > 0
+    print(f"  39a: {len(swings)} swings (incl. rolls on bounds) == sequential table ✓")
+
+    # --- 39b: Batch resolver == scalar, shared or per-swing tables ---
+    cols = [np.array(v) for v in zip(*(a for a, _ in swings))]
+    rolls = np.array([r for _, r in swings])
+    tables = mob_melee_tables(*cols)
+    assert tables.shape == (len(swings), 6)
+    assert np.array_equal(tables, np.array([mob_melee_table(*a) for a, _ in swings]))
+    got = [MELEE_OUTCOMES[k] for k in resolve_melee_rolls(tables, rolls)]
+    assert got == [resolve_mob_melee_attack(*a, roll=r) for a, r in swings]
+    one = mob_melee_table(60, 60, 5.0, 5.0, 0.0)
+    shared = resolve_melee_rolls(one, rolls)
+    assert [MELEE_OUTCOMES[k] for k in shared] == [
+        resolve_mob_melee_attack(60, 60, 5.0, 5.0, 0.0, roll=r) for r in rolls]
+    print("  39b: resolve_melee_rolls == scalar (per-swing rows and shared table) ✓")
+
+    # --- 39c: Spell miss + two-roll batch == scalar ---
+    casts = [(rng.randint(1, 80), rng.randint(1, 83), rng.choice((0.0, 3.0)),
+              rng.choice((5.0, 20.0)), rng.random() * 100, rng.random() * 100)
+             for _ in range(2000)]
+    pl, ml, hit, crit, rh, rc = (np.array(v) for v in zip(*casts))
+    miss = spell_miss_chances(pl, ml, hit)
+    assert miss.tolist() == [spell_miss_chance(*c[:3]) for c in casts]
+    got = [SPELL_OUTCOMES[k] for k in resolve_spell_rolls(miss, crit, rh, rc)]
+    assert got == [resolve_spell_hit(*c) for c in casts]
+    print("  39c: spell_miss_chances / resolve_spell_rolls == scalar ✓")
+
+    print("  PASSED\n")
+
+
+def test_stat_tables():
+    """Test the dense StatTables against the scalar stat formulas."""
+    print("=== Test 40: Stat Tables ===")
+    import random
+    import sim.constants as C
+    import sim.formulas as F
+    from sim.stat_tables import StatTables, default_stat_tables
+
+    rng = random.Random(40)
+    classes = [1, 2, 3, 4, 5, 6, 7, 8, 9, 11]
+    gear_keys = ('strength', 'agility', 'stamina', 'intellect', 'spirit',
+                 'bonus_hp', 'bonus_mana', 'crit_rating', 'haste_rating',
+                 'hit_rating', 'dodge_rating', 'parry_rating', 'block_rating',
+                 'defense_rating', 'expertise_rating', 'arp_rating', 'resilience_rating')
+
+    def scalar_block(c, l, g):
+        agi = F.class_base_stat(c, 1, l) + g['agility']
+        strength = F.class_base_stat(c, 0, l) + g['strength']
+        return {
+            'max_hp': F.player_max_hp(l, g['stamina'], g['bonus_hp'], c),
+            'max_mana': F.player_max_mana(l, g['intellect'], g['bonus_mana'], c),
+            'melee_crit': F.melee_crit_chance(l, agi, g['crit_rating'], c),
+            'ranged_crit': F.ranged_crit_chance(l, agi, g['crit_rating'], c),
+            'spell_crit': F.spell_crit_chance(l, g['intellect'], g['crit_rating'], c),
+            'melee_haste': F.melee_haste_pct(l, g['haste_rating']),
+            'spell_haste': F.spell_haste_pct(l, g['haste_rating']),
+            'hit_melee': F.hit_chance_melee(l, g['hit_rating']),
+            'hit_spell': F.hit_chance_spell(l, g['hit_rating']),
+            'dodge': F.dodge_chance(l, agi, g['dodge_rating'], g['defense_rating'], c),
+            'parry': F.parry_chance(l, g['parry_rating'], g['defense_rating'], c),
+            'block': F.block_chance(l, g['block_rating'], g['defense_rating']),
+            'melee_ap': F.melee_attack_power(l, strength, agi, c),
+            'ranged_ap': F.ranged_attack_power(l, strength, agi, c),
+            'expertise': F.expertise_pct(l, g['expertise_rating']),
+            'armor_pen': F.armor_penetration_pct(l, g['arp_rating']),
+            'resilience': F.resilience_pct(l, g['resilience_rating']),
+            'mana_regen': F.spirit_mana_regen(l, g['intellect'], g['spirit'], c),
+            'hp_regen': F.spirit_hp_regen(l, F.class_base_stat(c, 4, l) + g['spirit'], c),
+        }
+
+    players = [(rng.choice(classes), rng.randint(1, 80),
+                {k: rng.choice((0, rng.randint(1, 300))) for k in gear_keys})
+               for _ in range(600)]
+
+    def check(tables):
+        cols = {k: np.array([g[k] for _, _, g in players]) for k in gear_keys}
+        batch = tables.derive(np.array([c for c, _, _ in players]),
+                              np.array([l for _, l, _ in players]), **cols)
+        for i, (c, l, g) in enumerate(players):
+            one = tables.derive(c, l, **g)
+            for key, want in scalar_block(c, l, g).items():
+                assert one[key] == want, (key, c, l, one[key], want)
+                assert batch[key][i] == want
+        return len(batch)
+
+    # --- 40a: DBC-backed tables == scalar formulas, one player and batched ---
+    n = check(default_stat_tables())
+    assert default_stat_tables() is default_stat_tables()
+    print(f"  40a: {len(players)} players x {n} stats == formulas (DBC tables) ✓")
+
+    # --- 40b: Missing DBC tables use the same fallbacks ---
+    names = ('PLAYER_CLASS_LEVEL_STATS', 'GT_COMBAT_RATINGS', 'GT_MELEE_CRIT_TABLE',
+             'GT_MELEE_CRIT_BASE_TABLE', 'GT_SPELL_CRIT_TABLE', 'GT_SPELL_CRIT_BASE_TABLE',
+             'GT_REGEN_MP_PER_SPT_TABLE', 'GT_REGEN_HP_PER_SPT_TABLE')
+    saved = {name: getattr(C, name) for name in names}
+    try:
+        for name in names:
+            setattr(C, name, None)
+        check(StatTables())
+    finally:
+        for name, value in saved.items():
+            setattr(C, name, value)
+    print("  40b: fallback tables (no DBC) == formulas ✓")
+
+    print("  PASSED\n")
+
+
+def test_incremental_stats():
+    """Test delta gear sums and dirty-flag stat recomputation."""
+    print("=== Test 41: Incremental Stats ===")
+    import random
+    from sim.combat_sim import (STATS_DIRTY_BUFFS, GEAR_STAT_FIELDS, NUM_GEAR_STATS,
+                                ITEM_MOD_GEAR_FIELD, item_stat_matrix)
+
+    def snapshot(p):
+        return {name: getattr(p, name) for name in dir(p)
+                if name.startswith(('gear_', 'total_', 'max_'))
+                and name not in ('gear_rows', 'gear_totals')}
+
+    def full_rebuild(sim):
+        """Stats from scratch: drop the cached rows and re-sum every item."""
+        p = sim.player
+        p.gear_rows = {}
+        p.gear_totals = [0] * NUM_GEAR_STATS
+        for name in GEAR_STAT_FIELDS:
+            setattr(p, name, 0)
+        sim.recalculate_stats()
+        return snapshot(p)
+
+    rng = random.Random(7)
+    mods = list(ITEM_MOD_GEAR_FIELD)
+    inv_types = [t for t in INVTYPE_TO_SLOTS if t != INVTYPE_BAG]
+
+    def random_item(entry):
+        stats = {m: rng.randint(1, 40) for m in rng.sample(mods, rng.randint(1, 6))}
+        return InventoryItem(entry=entry, name=f"Item {entry}", quality=2,
+                             sell_price=0, score=rng.random() * 50,
+                             inventory_type=rng.choice(inv_types), stats=stats,
+                             armor=rng.randint(0, 300), weapon_dps=0.0)
+
+    # --- 41a: item_stat_matrix rows match the gear field mapping ---
+    items = [random_item(i) for i in range(50)]
+    matrix = item_stat_matrix(items)
+    assert matrix.shape == (50, NUM_GEAR_STATS)
+    for item, row in zip(items, matrix):
+        expected = dict.fromkeys(GEAR_STAT_FIELDS, 0)
+        expected['gear_armor'] = item.armor
+        for mod, value in item.stats.items():
+            expected[ITEM_MOD_GEAR_FIELD[mod]] += value
+        assert row.tolist() == [expected[f] for f in GEAR_STAT_FIELDS]
+    print(f"  41a: item stat matrix {matrix.shape} matches the ITEM_MOD mapping ✓")
+
+    # --- 41b: equip/unequip/direct edits == full rebuild ---
+    sim = CombatSimulation(num_mobs=3, seed=5)
+    p = sim.player
+    p.level = 30
+    sim.recalculate_stats()
+    for step in range(300):
+        r = rng.random()
+        if r < 0.55:
+            sim.equip_item(random_item(1000 + step))
+        elif r < 0.8 and p.equipment:
+            sim.unequip_item(rng.choice(list(p.equipment)))
+        elif p.equipment:
+            # Direct slot replacement, as loot/vendor code and tests do
+            slot = rng.choice(list(p.equipment))
+            p.equipment[slot] = sim._make_equipped_item(random_item(5000 + step))
+            sim.recalculate_stats()
+        if step % 10 == 0:
+            p.free_slots = 16
+            p.inventory.clear()
+        incremental = snapshot(p)
+        assert incremental == full_rebuild(sim), f"step {step}: incremental != rebuild"
+    print(f"  41b: 300 random equip/unequip/replace steps == full rebuild ✓")
+
+    # --- 41c: buff-only recalculation == full recalculation ---
+    p.fortitude_remaining = 10
+    p.fortitude_stamina_bonus = 25
+    p.inner_fire_remaining = 10
+    p.inner_fire_armor = 300
+    p.divine_spirit_remaining = 10
+    p.divine_spirit_bonus = 20
+    sim.recalculate_stats(STATS_DIRTY_BUFFS)
+    buffed = snapshot(p)
+    assert buffed == full_rebuild(sim)
+    p.fortitude_remaining = p.inner_fire_remaining = p.divine_spirit_remaining = 0
+    sim.recalculate_stats(STATS_DIRTY_BUFFS)
+    assert snapshot(p) == full_rebuild(sim)
+    print(f"  41c: buff-only recalc == full recalc (max_hp {buffed['max_hp']}) ✓")
+
+    print("  PASSED\n")
+
+
+def test_talent_mods():
+    """Test compiled TalentMods against the talent build."""
+    print("=== Test 42: Compiled Talent Modifiers ===")
+    from sim.talent_data import TalentMods, TALENT_DEFS, get_talent_for_level
+
+    # --- 42a: no talents = neutral modifiers ---
+    sim = CombatSimulation(num_mobs=3, seed=11)
+    p = sim.player
+    assert p.talent_mods == TalentMods() == TalentMods.from_points({})
+    assert p.talent_mods.shadow_damage_mod == 1.0 and p.talent_mods.mind_crit_mult == 1.5
+    print("  42a: level 1 player has neutral TalentMods ✓")
+
+    # --- 42b: rebuilt on every talent point, equal to a fresh compile ---
+    for lvl in range(2, 81):
+        p.xp = XP_TABLE[lvl]
+        sim._check_level_up()
+        assert p.talent_mods == TalentMods.from_points(p.talent_points), f"L{lvl}"
+    assert sum(p.talent_points.values()) == 71
+    for name, pts in p.talent_points.items():
+        assert pts <= TALENT_DEFS[name]["max"]
+    print(f"  42b: L2-80 level-ups keep talent_mods == from_points(talent_points) ✓")
+
+    # --- 42c: full build values ---
+    m = p.talent_mods
+    assert abs(m.shadow_damage_mod - 1.10) < 1e-12        # Darkness 5/5
+    assert abs(m.mind_crit_mult - 2.0) < 1e-12            # Shadow Power 5/5
+    assert m.mind_crit_bonus == 3.0 * p.talent_points.get("mind_melt", 0)
+    assert m.embrace_pct == 0.25                          # VE + Improved VE 2/2
+    assert m.meditation_pct == 0.50                       # Meditation 3/3
+    assert m.swp_refresh_chance == p.talent_points.get("pain_and_suffering", 0) / 3.0
+    assert m.misery and m.spirit_tap
+    assert m.mind_blast_cd_cut == p.talent_points.get("improved_mind_blast", 0)
+    print(f"  42c: L80 build: shadow x{m.shadow_damage_mod:.2f}, crit x{m.mind_crit_mult:.1f}, "
+          f"VE {m.embrace_pct:.0%}, meditation {m.meditation_pct:.0%} ✓")
+
+    # --- 42d: snapshots carry the compiled modifiers ---
+    snap = sim.snapshot()
+    fresh = CombatSimulation(num_mobs=3, seed=11)
+    fresh.restore(snap)
+    assert fresh.player.talent_mods == m
+    assert fresh.player.talent_mods is not m
+    print("  42d: snapshot/restore copies talent_mods ✓")
+
+    # --- 42e: per-level talent assignment for a partial build ---
+    points = {}
+    for lvl in range(10, 41):
+        name = get_talent_for_level(lvl)
+        points[name] = min(points.get(name, 0) + 1, TALENT_DEFS[name]["max"])
+    sim2 = CombatSimulation(num_mobs=3, seed=12)
+    sim2.player.xp = XP_TABLE[40]
+    sim2._check_level_up()
+    assert sim2.player.talent_points == points
+    assert sim2.player.talent_mods == TalentMods.from_points(points)
+    print(f"  42e: L40 partial build ({sum(points.values())} points) compiles identically ✓")
+
+    print("  PASSED\n")
+
+
+def test_spell_programs():
+    """Test compiled spell effect programs and the opcode dispatch."""
+    print("=== Test 43: Compiled Spell Programs ===")
+    from sim.spell_effects import (
+        SPELL_PROGRAMS, NUM_OPCODES, FAMILY_EFFECTS, Family, compile_spell, _fx,
+        FX_SCHOOL_DAMAGE, FX_HEAL, FX_AOE_DAMAGE, FX_PERIODIC_DAMAGE,
+        FX_PERIODIC_HEAL, FX_ABSORB, FX_PLAYER_AURA,
+    )
+    from sim.constants import (ALL_RANKED_SPELL_IDS, SPELL_RANKS, BEST_RANK_BY_LEVEL,
+                               get_best_rank, FAMILY_HOLY_NOVA, FAMILY_PW_SHIELD)
+    from sim.formulas import (spell_direct_value, spell_dot_per_tick,
+                              spell_hot_per_tick, spell_shield_absorb)
+
+    # --- 43a: every trainable rank compiles to valid opcodes ---
+    assert ALL_RANKED_SPELL_IDS <= set(SPELL_PROGRAMS)
+    assert set(SPELL_RANKS) == set(FAMILY_EFFECTS)
+    for sid, prog in SPELL_PROGRAMS.items():
+        assert prog.spell is SPELLS[sid]
+        assert all(0 <= op < NUM_OPCODES for op, _ in prog.effects), sid
+    print(f"  43a: {len(SPELL_PROGRAMS)} ranks of {len(FAMILY_EFFECTS)} families compiled ✓")
+
+    # --- 43b: baked values reproduce the per-cast formulas ---
+    checked = 0
+    for sid, prog in SPELL_PROGRAMS.items():
+        for sp in (0, 137, 1000):
+            for op, args in prog.effects:
+                if op in (FX_SCHOOL_DAMAGE, FX_AOE_DAMAGE) or (
+                        op == FX_HEAL and prog.spell.spell_family != FAMILY_HOLY_NOVA):
+                    lo, hi, coeff = args[:3]
+                    if coeff or lo:
+                        bonus = int(sp * coeff)
+                        assert (lo + bonus, hi + bonus) == spell_direct_value(sid, sp), sid
+                elif op == FX_PERIODIC_DAMAGE:
+                    assert args[0] + int(sp * args[1]) == spell_dot_per_tick(sid, sp), sid
+                elif op == FX_PERIODIC_HEAL:
+                    assert args[0] + int(sp * args[1]) == spell_hot_per_tick(sid, sp), sid
+                elif op == FX_ABSORB:
+                    assert args[0] + int(sp * args[1]) == spell_shield_absorb(sid, sp), sid
+                elif op == FX_PLAYER_AURA:
+                    assert args[0][0][1] == prog.spell.buff_duration, sid
+                checked += 1
+    print(f"  43b: {checked} baked effect/SP checks match spell_*_value formulas ✓")
+
+    # --- 43c: ranks share their family's program shape ---
+    for fam, ranks in SPELL_RANKS.items():
+        shapes = {tuple(op for op, _ in SPELL_PROGRAMS[sid].effects) for _, sid in ranks}
+        assert len(shapes) == 1, fam
+        for lvl in range(0, 101):
+            assert BEST_RANK_BY_LEVEL[fam][lvl] == get_best_rank(fam, lvl)
+    try:
+        compile_spell(SPELLS[585], Family(effects=(_fx(99),)))
+        assert False, "unknown DBC effect should not compile"
+    except ValueError:
+        pass
+    print("  43c: one opcode sequence per family, unknown effects rejected ✓")
+
+    # --- 43d: casts run through the programs ---
+    sim = CombatSimulation(num_mobs=3, seed=43)
+    p = sim.player
+    assert not sim.do_cast_dispersion()          # talent not learned
+    p.xp = XP_TABLE[20]
+    sim._check_level_up()
+    p.mana = p.max_mana
+    assert sim.do_cast_pw_shield()
+    assert p.shield_absorb == spell_shield_absorb(get_best_rank(FAMILY_PW_SHIELD, 20),
+                                                  p.total_spell_power)
+    assert p.shield_cooldown == 30
+    p.gcd_remaining = 0
+    assert not sim.do_cast_pw_shield()           # shield / Weakened Soul active
+    p.hp = p.max_hp
+    assert sim.do_cast_fortitude()
+    assert p.fortitude_remaining > 0 and p.fortitude_stamina_bonus > 0
+    assert p.hp == p.max_hp                      # Fortitude HP gain kept
+    p.gcd_remaining = 0
+    assert not sim.do_cast_fortitude()
+    print("  43d: shield/fortitude casts apply and block via programs ✓")
+
+    # --- 43e: scripted rotation replays the pre-program cast code ---
+    import hashlib
+
+    def rotation_fingerprint(level):
+        sim = CombatSimulation(num_mobs=5, seed=level)
+        p = sim.player
+        p.xp = XP_TABLE[level]
+        sim._check_level_up()
+        t = sim.mob_table
+        n = t.n
+        # One target in casting range, everything else out of aggro range
+        t.x[:n] = t.spawn_x[:n] = p.x + 200.0 + np.arange(n) * 5.0
+        t.y[:n] = t.spawn_y[:n] = p.y
+        target = sim.mobs[0]
+        target.x = target.spawn_x = p.x + 20.0
+        target.y = target.spawn_y = p.y
+        target.hp = target.max_hp = 100 + 60 * level
+        t.mark_moved(list(range(n)))
+        casts = ('do_cast_inner_fire', 'do_cast_fortitude', 'do_cast_pw_shield',
+                 'do_cast_sw_pain', 'do_cast_devouring_plague', 'do_cast_vampiric_touch',
+                 'do_cast_holy_fire', 'do_cast_mind_blast', 'do_cast_smite',
+                 'do_cast_mind_flay', 'do_cast_renew', 'do_cast_flash_heal',
+                 'do_cast_heal', 'do_cast_holy_nova', 'do_cast_divine_spirit')
+        trace = []
+        for i in range(600):
+            if i % 100 == 0:
+                p.mana = p.max_mana
+            if i % 40 == 20:
+                p.hp = p.max_hp // 2
+            if sim.target is None or not sim.target.alive:
+                sim.do_target_nearest()
+            getattr(sim, casts[i % len(casts)])()
+            sim.tick()
+            mob = sim.target
+            trace.append((p.hp, p.mana, p.shield_absorb, p.hot_remaining,
+                          p.inner_fire_remaining, p.fortitude_remaining,
+                          p.divine_spirit_remaining, sim.damage_dealt, sim.kills,
+                          mob.uid if mob else 0, mob.hp if mob else 0,
+                          mob.dot_remaining if mob else 0))
+        return hashlib.md5(repr(trace).encode()).hexdigest()[:16]
+
+    # Recorded with the per-family _apply_spell/_start_cast code
+    expected = {1: 'c39302abe05449a6', 10: '36cf74eea42278fe', 20: '1c924a3e3c5c1c2c',
+                40: 'd77d7a5666673c5b', 60: '86784fe2db30d623', 80: '0e82fdb6a9bc174b'}
+    for level, digest in expected.items():
+        assert rotation_fingerprint(level) == digest, level
+    print(f"  43e: {len(expected)} levels x 600-tick rotation match pre-program trace ✓")
+
+    print("  PASSED\n")
+
+
 if __name__ == "__main__":
     print("WoW Combat Simulation — Validation Tests\n")
     test_combat_engine()
@@ -3168,4 +5198,29 @@ if __name__ == "__main__":
     test_eat_drink()
     test_spell_learning()
     test_talent_system()
+    test_batch_sim()
+    test_mob_table()
+    test_spatial_hash()
+    test_chunk_cache()
+    test_creature_stat_tables()
+    test_csv_cache()
+    test_shared_world()
+    test_heightmap_arrays()
+    test_batch_walkability()
+    test_bih_los()
+    test_fast_forward()
+    test_direct_obs()
+    test_cached_action_masks()
+    test_snapshot_restore()
+    test_prewarmed_reset()
+    test_compiled_loot()
+    test_tile_prefetch()
+    test_tile_eviction()
+    test_height_grids()
+    test_walk_bake()
+    test_compiled_attack_tables()
+    test_stat_tables()
+    test_incremental_stats()
+    test_talent_mods()
+    test_spell_programs()
     print("=== ALL TESTS PASSED ===")
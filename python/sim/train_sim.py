@@ -4,6 +4,7 @@ PPO Training on WoW Combat Simulation — runs ~1000x faster than real server.
 Usage:
     python -m sim.train_sim                    # default: 5 bots, 100k steps
     python -m sim.train_sim --bots 10 --steps 500000
+    python -m sim.train_sim --batched --bots 256   # vectorized core loop, one process
 
 The trained model is compatible with wow_env.py (same obs/action space).
 Transfer: load the saved model in run_model.py or auto_grind.py.
@@ -201,12 +202,13 @@ class GameplayMetricsCallback(BaseCallback):
 
 def make_env(bot_name: str, seed: int, data_root: str = None,
              creature_csv_dir: str = None, log_dir: str = None,
-             log_interval: int = 1, enable_quests: bool = False):
+             log_interval: int = 1, enable_quests: bool = False,
+             shared_world=None):
     def _init():
         env = WoWSimEnv(bot_name=bot_name, seed=seed, data_root=data_root,
                         creature_csv_dir=creature_csv_dir,
                         log_dir=log_dir, log_interval=log_interval,
-                        enable_quests=enable_quests)
+                        enable_quests=enable_quests, shared_world=shared_world)
         return ActionMasker(env, _mask_fn)
     return _init
 
@@ -237,6 +239,12 @@ def main():
                         help="Enable quest system (default: on)")
     parser.add_argument("--no-quests", action="store_true",
                         help="Disable quest system")
+    parser.add_argument("--batched", action="store_true",
+                        help="Use BatchWoWSimEnv: all bots in one vectorized process "
+                             "(core grind loop only — no terrain/quests/gear)")
+    parser.add_argument("--shared-world", action="store_true",
+                        help="Load creature/loot data and the vmtree once into shared "
+                             "memory and let all bot processes attach to it")
     args = parser.parse_args()
 
     models_dir = os.path.join(PARENT_DIR, "models", "PPO")
@@ -262,16 +270,33 @@ def main():
         print(f">>> Quest system enabled: Northshire quests with kill/collect/explore objectives <<<")
 
     start_method = "fork" if sys.platform != "win32" else "spawn"
+    world = None
 
     try:
-        env = SubprocVecEnv(
-            [make_env(name, seed=i * 1000, data_root=data_root,
-                      creature_csv_dir=creature_csv_dir,
-                      log_dir=vis_log_dir, log_interval=vis_log_interval,
-                      enable_quests=enable_quests)
-             for i, name in enumerate(bot_names)],
-            start_method=start_method,
-        )
+        if args.batched:
+            from sim.batch_vec_env import BatchWoWSimEnv
+            from sim.creature_db import CreatureDB
+            print(f">>> Batched env: {args.bots} worlds in one process <<<")
+            creature_db = CreatureDB(creature_csv_dir) if creature_csv_dir else None
+            env = BatchWoWSimEnv(num_envs=args.bots, seed=0, creature_db=creature_db)
+        else:
+            if creature_csv_dir:
+                # Build the binary CSV caches once; every worker then maps them
+                from sim.csv_cache import compile_data_dir
+                compile_data_dir(creature_csv_dir)
+            if args.shared_world:
+                from sim.shared_world import SharedWorld
+                print(">>> Shared world: static data loaded once for all bots <<<")
+                world = SharedWorld.create(data_root, creature_csv_dir)
+            env = SubprocVecEnv(
+                [make_env(name, seed=i * 1000, data_root=data_root,
+                          creature_csv_dir=creature_csv_dir,
+                          log_dir=vis_log_dir, log_interval=vis_log_interval,
+                          enable_quests=enable_quests,
+                          shared_world=world.handle if world else None)
+                 for i, name in enumerate(bot_names)],
+                start_method=start_method,
+            )
     except Exception as e:
         print(f"ENV INIT ERROR: {e}")
         traceback.print_exc()
@@ -345,6 +370,9 @@ def main():
             env.close()
         except Exception:
             pass
+        if world is not None:
+            world.close()
+            world.unlink()
 
     print("Done.")
 
@@ -0,0 +1,192 @@
+"""
+Offline walkability grids for SimTerrain.
+
+check_walkable samples the heightmap (slope and step rules) and casts an
+ankle-height VMAP ray on every move. This tool runs those same checks once
+per tile, between the center of every cell of a WALK_CELLS x WALK_CELLS
+grid and its 8 neighbours, and stores the passable edges as one uint8
+bitmask per cell (bit d = WALK_DIRS[d]) in ``<data_root>/maps/<map>.walk``
+next to the tile's .map. SimTerrain loads the file with the tile and
+answers short moves with a few bit tests.
+
+A bake is valid while the tile's .map and .vmtile keep the recorded
+(size, mtime) and the walkability rules it was baked with (bake_params)
+are unchanged. Edges along a tile border also depend on the neighbouring
+tiles, so re-bake a region after changing its data.
+
+File layout:
+    MAGIC | u32 version | u32 cells | 5 x i64 source stamp | uint8[cells * cells]
+The stamp is (map size, map mtime_ns, vmtile size, vmtile mtime_ns,
+params digest), -1 for a missing file. Rows are the tile's x cells,
+columns its y cells.
+
+Usage:
+    python -m sim.walk_bake /path/to/Data                # every map 0 tile
+    python -m sim.walk_bake /path/to/Data 48,32 48,31    # selected tiles
+"""
+
+import math
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from sim.terrain import SimTerrain, map_filename, vmtile_filename, \
+    CENTER_GRID_ID, SIZE_OF_GRIDS, INVALID_HEIGHT
+from test_3d_env import TerrainPathChecker
+
+MAGIC = b'ACWALK\0\0'
+FORMAT_VERSION = 2
+WALK_CELLS = 256                     # per tile axis: 533.33 / 256 = 2.08 yd
+
+# (di, dj) cell steps of edge bit d; i runs along world_to_grid's x axis
+WALK_DIRS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+
+_HEADER = struct.Struct('<8sII5q')
+
+
+def walk_filename(map_id: int, tx: int, ty: int) -> str:
+    """``0004832.walk`` for tile (48, 32), next to ``0004832.map``."""
+    return os.path.splitext(map_filename(map_id, tx, ty))[0] + '.walk'
+
+
+def cell_of(x: float, y: float) -> tuple[int, int]:
+    """Global walk cell (i, j) of a world point; tile = (i, j) // WALK_CELLS."""
+    return (math.floor((CENTER_GRID_ID - x / SIZE_OF_GRIDS) * WALK_CELLS),
+            math.floor((CENTER_GRID_ID - y / SIZE_OF_GRIDS) * WALK_CELLS))
+
+
+def cell_center(i, j):
+    """World (x, y) of the center of global walk cell (i, j); arrays work too."""
+    return ((CENTER_GRID_ID - (i + 0.5) / WALK_CELLS) * SIZE_OF_GRIDS,
+            (CENTER_GRID_ID - (j + 0.5) / WALK_CELLS) * SIZE_OF_GRIDS)
+
+
+def bake_params() -> tuple:
+    """Grid and walkability-check settings a bake was computed with."""
+    return (WALK_CELLS, WALK_DIRS, SimTerrain._WALK_LOS_HEIGHT,
+            TerrainPathChecker.MAX_WALKABLE_SLOPE,
+            TerrainPathChecker.DEFAULT_COLLISION_HEIGHT,
+            TerrainPathChecker.SAMPLE_DISTANCE)
+
+
+def source_stamp(data_root: str, map_id: int, tx: int, ty: int) -> tuple:
+    """(size, mtime_ns) of the tile's .map and .vmtile, -1 where missing,
+    plus a digest of bake_params()."""
+    stamp = []
+    for path in (os.path.join(data_root, 'maps', map_filename(map_id, tx, ty)),
+                 os.path.join(data_root, 'vmaps', vmtile_filename(map_id, tx, ty))):
+        try:
+            st = os.stat(path)
+            stamp += [st.st_size, st.st_mtime_ns]
+        except OSError:
+            stamp += [-1, -1]
+    stamp.append(zlib.crc32(repr(bake_params()).encode()))
+    return tuple(stamp)
+
+
+# ─── Cache file ──────────────────────────────────────────────────────
+
+def read_walk_grid(path: str, stamp: tuple) -> bytes | None:
+    """The cells * cells edge masks of a .walk file, or None if stale/invalid."""
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        magic, version, cells, *recorded = _HEADER.unpack_from(raw, 0)
+    except (OSError, struct.error):
+        return None
+    if (magic != MAGIC or version != FORMAT_VERSION or cells != WALK_CELLS
+            or tuple(recorded) != tuple(stamp)
+            or len(raw) != _HEADER.size + cells * cells):
+        return None
+    return raw[_HEADER.size:]
+
+
+def write_walk_grid(path: str, grid: np.ndarray, stamp: tuple) -> None:
+    """Atomically write a (WALK_CELLS, WALK_CELLS) uint8 grid."""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, WALK_CELLS, *stamp))
+            f.write(np.ascontiguousarray(grid, dtype=np.uint8).tobytes())
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# ─── Baking ──────────────────────────────────────────────────────────
+
+def bake_tile(terrain: SimTerrain, tx: int, ty: int) -> np.ndarray:
+    """Edge masks of tile (tx, ty) from ``terrain``'s exact walkability checks.
+
+    ``terrain`` must not answer from baked grids itself. Cells without
+    height data have no edges.
+    """
+    c = WALK_CELLS
+    i0, j0 = tx * c, ty * c
+    terrain.ensure_loaded((CENTER_GRID_ID - tx - 0.5) * SIZE_OF_GRIDS,
+                          (CENTER_GRID_ID - ty - 0.5) * SIZE_OF_GRIDS)
+
+    ii, jj = np.meshgrid(np.arange(i0, i0 + c), np.arange(j0, j0 + c), indexing='ij')
+    ii, jj = ii.ravel(), jj.ravel()
+    x1, y1 = cell_center(ii, jj)
+    z1 = terrain.env.get_heights(terrain.MAP_ID, x1, y1)
+    valid = z1 > INVALID_HEIGHT + 1
+
+    grid = np.zeros(c * c, dtype=np.uint8)
+    if not valid.any():
+        return grid.reshape(c, c)
+    for d, (di, dj) in enumerate(WALK_DIRS):
+        x2, y2 = cell_center(ii + di, jj + dj)
+        z2 = terrain.env.get_heights(terrain.MAP_ID, x2, y2)
+        ok = valid & (z2 > INVALID_HEIGHT + 1)
+        idx = np.flatnonzero(ok)
+        ok[idx] = terrain.check_walkable_many(x1[idx], y1[idx], z1[idx],
+                                              x2[idx], y2[idx], z2[idx])
+        grid |= ok.astype(np.uint8) << d
+    return grid.reshape(c, c)
+
+
+def bake_data_root(data_root: str, tiles: list[tuple[int, int]] | None = None,
+                   quiet: bool = False) -> list[str]:
+    """Bake ``tiles`` (default: every map 0 .map tile) and write their .walk files."""
+    map_id = SimTerrain.MAP_ID
+    maps_dir = os.path.join(data_root, 'maps')
+    if tiles is None:
+        pattern = re.compile(rf'{map_id:03d}(\d\d)(\d\d)\.map$')
+        tiles = sorted((int(m.group(1)), int(m.group(2)))
+                       for m in map(pattern.match, sorted(os.listdir(maps_dir))) if m)
+    terrain = SimTerrain(data_root, quiet=True, prefetch_workers=0,
+                         baked_walkability=False)
+    written = []
+    try:
+        for tx, ty in tiles:
+            t0 = time.perf_counter()
+            grid = bake_tile(terrain, tx, ty)
+            path = os.path.join(maps_dir, walk_filename(map_id, tx, ty))
+            write_walk_grid(path, grid, source_stamp(data_root, map_id, tx, ty))
+            written.append(path)
+            if not quiet:
+                edges = int(np.unpackbits(grid).sum())
+                print(f"  [walk_bake] {os.path.basename(path)}: "
+                      f"{edges / (8 * grid.size):.0%} of edges passable "
+                      f"({time.perf_counter() - t0:.1f}s)")
+    finally:
+        terrain.close()
+    return written
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python -m sim.walk_bake <data_root> [tx,ty ...]")
+        sys.exit(1)
+    selected = [tuple(int(v) for v in arg.split(',')) for arg in sys.argv[2:]]
+    bake_data_root(sys.argv[1], selected or None)
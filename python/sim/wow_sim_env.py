@@ -23,6 +23,7 @@ The bot must navigate using move_forward + turn to reach NPCs.
 Usage:
     env = WoWSimEnv()                        # single bot (no quests)
     env = WoWSimEnv(enable_quests=True)      # with quest system
+    env = WoWSimEnv(shared_world=handle)     # attach to SharedWorld data
     obs, info = env.reset()
     obs, reward, done, trunc, info = env.step(action)
 
@@ -36,7 +37,8 @@ import numpy as np
 import math
 import os
 import random
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
 
 from sim.combat_sim import CombatSimulation, SPELLS
 from sim.formulas import spell_mana_cost
@@ -50,6 +52,66 @@ from sim.constants import (
     FAMILY_MIND_FLAY, FAMILY_VAMPIRIC_TOUCH, FAMILY_DISPERSION,
 )
 
+if TYPE_CHECKING:
+    from sim.shared_world import WorldHandle
+
+
+# Talent that must be learned before a spell family can be cast
+_TALENT_GATED = {
+    FAMILY_MIND_FLAY: "mind_flay",
+    FAMILY_VAMPIRIC_TOUCH: "vampiric_touch",
+    FAMILY_DISPERSION: "dispersion",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class SpellMaskRow:
+    """Per-level facts the action mask needs about one spell action."""
+    action_id: int
+    family_id: int
+    spell_id: int           # best rank at the level
+    mana_cost: int
+    spell_range: float
+    has_cooldown: bool
+    offensive: bool
+    aoe: bool
+    talent: Optional[str]   # gating talent, if any
+
+
+_SPELL_MASK_TABLES: dict[tuple[int, int], tuple[SpellMaskRow, ...]] = {}
+
+
+def spell_mask_table(level: int, class_id: int) -> tuple[SpellMaskRow, ...]:
+    """Rows for every spell action learned at ``level`` (memoized per level)."""
+    table = _SPELL_MASK_TABLES.get((level, class_id))
+    if table is None:
+        rows = []
+        for family_id, action_id in WoWSimEnv._FAMILY_ACTION.items():
+            spell_id = get_best_rank(family_id, level)
+            if spell_id is None:
+                continue
+            spell = SPELLS[spell_id]
+            rows.append(SpellMaskRow(
+                action_id=action_id, family_id=family_id, spell_id=spell_id,
+                mana_cost=spell_mana_cost(spell_id, level, class_id),
+                spell_range=spell.spell_range,
+                has_cooldown=spell.cooldown_ticks > 0,
+                offensive=family_id in WoWSimEnv._OFFENSIVE_FAMILIES,
+                aoe=family_id in WoWSimEnv._AOE_FAMILIES,
+                talent=_TALENT_GATED.get(family_id)))
+        table = _SPELL_MASK_TABLES[(level, class_id)] = tuple(rows)
+    return table
+
+
+def _rel_angle(dx: float, dy: float, orientation: float) -> float:
+    """Angle of (dx, dy) relative to ``orientation``, wrapped to [-pi, pi]."""
+    rel = math.atan2(dy, dx) - orientation
+    while rel > math.pi:
+        rel -= 2 * math.pi
+    while rel < -math.pi:
+        rel += 2 * math.pi
+    return rel
+
 # Reward per successfully looted item, indexed by WoW item quality
 QUALITY_LOOT_REWARD = {
     0: 0.1,   # Poor (grey)
@@ -74,7 +136,8 @@ class WoWSimEnv(gym.Env):
     Simulated WoW environment with optional quest system.
 
     Observation Space: Box(52,) — 29 base + 10 stat + 3 vendor + 4 talent + 6 quest dims
-    Action Space: Discrete(30)
+    Action Space: Discrete(30); Discrete(31) with wait_action=True, where
+      action 30 waits until the next sim event (CombatSimulation.fast_forward)
 
     Stat dimensions (indices 33-42):
       [33] spell_power/200, [34] spell_crit/50, [35] spell_haste/50,
@@ -91,10 +154,14 @@ class WoWSimEnv(gym.Env):
     def __init__(self, bot_name: str = "SimBot", num_mobs: int = None,
                  seed: int = None, data_root: str = None,
                  creature_csv_dir: str = None, log_dir: str = None,
-                 log_interval: int = 1, enable_quests: bool = False):
+                 log_interval: int = 1, enable_quests: bool = False,
+                 shared_world: 'WorldHandle | None' = None,
+                 wait_action: bool = False):
         super().__init__()
 
-        self.action_space = spaces.Discrete(30)
+        # Optional macro action 30: wait until the next sim event
+        self._wait_action = wait_action
+        self.action_space = spaces.Discrete(31 if wait_action else 30)
         self.observation_space = spaces.Box(
             low=-1.0, high=float('inf'), shape=(52,), dtype=np.float32
         )
@@ -112,12 +179,19 @@ class WoWSimEnv(gym.Env):
             self._logger = SimEpisodeLogger(log_dir, bot_name,
                                             record_interval=log_interval)
 
+        # Static world data shared with other workers (see sim.shared_world)
+        self._shared_world = None
+        if shared_world is not None:
+            from sim.shared_world import SharedWorld
+            self._shared_world = SharedWorld.attach(shared_world)
+
         # Load 3D terrain + area lookup if data_root provided
         self._terrain = None
         self._env3d = None
         if data_root:
             from sim.terrain import SimTerrain
-            self._terrain = SimTerrain(data_root, quiet=True)
+            vmtree = self._shared_world.vmtree() if self._shared_world else None
+            self._terrain = SimTerrain(data_root, quiet=True, vmtree=vmtree)
             # Reuse the WoW3DEnvironment already loaded by SimTerrain
             # (avoids loading 545K BIH-nodes + 27K VMAP spawns a second time)
             try:
@@ -130,14 +204,18 @@ class WoWSimEnv(gym.Env):
 
         # Load creature DB from CSVs if provided
         self._creature_db = None
-        if creature_csv_dir:
+        if self._shared_world and self._shared_world.creature_db:
+            self._creature_db = self._shared_world.creature_db
+        elif creature_csv_dir:
             from sim.creature_db import CreatureDB
             self._creature_db = CreatureDB(creature_csv_dir, quiet=True)
 
         # Load loot tables (auto-discover from creature_csv_dir or data/)
         self._loot_db = None
         loot_dir = creature_csv_dir or (os.path.dirname(data_root) if data_root else None)
-        if loot_dir:
+        if self._shared_world and self._shared_world.loot_db:
+            self._loot_db = self._shared_world.loot_db
+        elif loot_dir:
             from sim.loot_db import LootDB
             loot_db = LootDB(loot_dir, quiet=True)
             if loot_db.loaded:
@@ -157,7 +235,14 @@ class WoWSimEnv(gym.Env):
                                     creature_db=self._creature_db,
                                     loot_db=self._loot_db,
                                     quest_db=self._quest_db)
-        self.last_state = None
+        self._last_state = None
+        self._mask_key = None             # (level, class, gating talents) of _mask_rows
+        self._mask_rows: tuple = ()       # spell_mask_table rows usable at that key
+        self._mask_mana = None            # mana _mask_affordable was filtered at
+        self._mask_affordable: tuple = ()
+        self._reach_sig = None            # target/player positions of _reach
+        self._reach = (0.0, True)         # (distance, LOS) to the target
+        self._obs = np.zeros(self.observation_space.shape, dtype=np.float32)
         self._step_count = 0
         # No step limit — episode runs until death (bot should level as far as possible)
         self._ep_reward = 0.0
@@ -181,6 +266,9 @@ class WoWSimEnv(gym.Env):
         self._idle_steps = 0              # noop-without-casting steps (idle time tracking)
         self._prev_vendor_dist = None     # vendor approach shaping state
 
+    WAIT_ACTION = 30          # macro action id (wait_action=True only)
+    WAIT_MAX_TICKS = 60       # a wait step advances at most 30 s
+
     # Family ID -> action ID mapping for mask building
     _FAMILY_ACTION = {
         FAMILY_SMITE: 5,                # Smite
@@ -204,6 +292,7 @@ class WoWSimEnv(gym.Env):
         FAMILY_VAMPIRIC_TOUCH: 27,      # Vampiric Touch (talent-granted)
         FAMILY_DISPERSION: 28,          # Dispersion (talent-granted)
     }
+    _SPELL_ACTIONS = np.array(sorted(_FAMILY_ACTION.values()))
     _OFFENSIVE_FAMILIES = {FAMILY_SMITE, FAMILY_SW_PAIN, FAMILY_MIND_BLAST, FAMILY_HOLY_FIRE,
                            FAMILY_DEVOURING_PLAGUE, FAMILY_MIND_FLAY, FAMILY_VAMPIRIC_TOUCH}
     _AOE_FAMILIES = {FAMILY_HOLY_NOVA, FAMILY_PSYCHIC_SCREAM}
@@ -244,6 +333,8 @@ class WoWSimEnv(gym.Env):
         if p.is_casting:
             mask[:] = False
             mask[0] = True  # noop
+            if self._wait_action:
+                mask[self.WAIT_ACTION] = True
             return mask
 
         # ── While eating: ONLY noop is valid (regen ticks automatically) ──
@@ -251,6 +342,8 @@ class WoWSimEnv(gym.Env):
         if p.is_eating:
             mask[:] = False
             mask[0] = True  # noop (continue eating)
+            if self._wait_action:
+                mask[self.WAIT_ACTION] = True
             return mask
 
         in_combat = p.in_combat
@@ -261,113 +354,113 @@ class WoWSimEnv(gym.Env):
         # (already True)
 
         # ── Target nearest (4): need alive mobs in range ──
-        has_targetable = any(
-            m.alive and self.sim._dist_to_mob(m) <= self.sim.TARGET_RANGE
-            for m in self.sim.mobs
-        )
+        mobs = self.sim.mob_table
+        has_targetable = bool(mobs.alive[
+            mobs.query_radius(p.x, p.y, self.sim.TARGET_RANGE)].any())
         if not has_targetable:
             mask[4] = False
 
-        # ── Spell masks (5,6,9,10,12,13,14,15,16,18) ──
-        gcd_blocked = p.gcd_remaining > 0
-        for family_id, action_id in self._FAMILY_ACTION.items():
-            # Get best rank for current level
-            spell_id = get_best_rank(family_id, p.level)
-            if spell_id is None:
-                mask[action_id] = False
-                continue
-
-            spell = SPELLS[spell_id]
-
-            # GCD blocks all spells
-            if gcd_blocked:
-                mask[action_id] = False
-                continue
-
-            # Mana check (% of BaseMana from Spell.dbc)
-            cost = spell_mana_cost(spell_id, p.level, p.class_id)
-            if p.mana < cost:
-                mask[action_id] = False
-                continue
+        # ── Spell masks (5,6,9,10,12-16,18-28) ──
+        # Rows come from the per-level spell table (rebuilt on level-up or
+        # talent change); affordability is only re-filtered when mana changes.
+        mask[self._SPELL_ACTIONS] = False
+        talents = p.talent_points
+        key = (p.level, p.class_id, talents.get("mind_flay", 0),
+               talents.get("vampiric_touch", 0), talents.get("dispersion", 0))
+        if key != self._mask_key:
+            self._mask_key = key
+            self._mask_rows = tuple(
+                row for row in spell_mask_table(p.level, p.class_id)
+                if row.talent is None or talents.get(row.talent, 0) >= 1)
+            self._mask_mana = None
+        if p.gcd_remaining > 0:
+            return self._finish_masks(mask, p, in_combat)   # GCD blocks all spells
+        if p.mana != self._mask_mana:
+            self._mask_mana = p.mana
+            self._mask_affordable = tuple(
+                row for row in self._mask_rows if p.mana >= row.mana_cost)
+
+        cooldowns = p.spell_cooldowns
+        target_dist = None
+        aoe_hits: dict[float, bool] = {}
+        for row in self._mask_affordable:
+            family_id = row.family_id
 
             # Spell-specific cooldown (keyed by family)
-            if spell.cooldown_ticks > 0 and p.spell_cooldowns.get(family_id, 0) > 0:
-                mask[action_id] = False
+            if row.has_cooldown and cooldowns.get(family_id, 0) > 0:
                 continue
 
-            # Offensive spells: need alive target in range
-            if family_id in self._OFFENSIVE_FAMILIES:
+            # Offensive spells: need alive target in range and in LOS
+            if row.offensive:
                 if not target_alive:
-                    mask[action_id] = False
                     continue
-                if self.sim._dist_to_mob(target) > spell.spell_range:
-                    mask[action_id] = False
+                if target_dist is None:
+                    target_dist, target_los = self._target_reach(p, target)
+                if target_dist > row.spell_range or not target_los:
                     continue
-                # LOS check
-                if self.sim.terrain:
-                    if not self.sim.terrain.check_los(
-                        p.x, p.y, p.z, target.x, target.y, target.z
-                    ):
-                        mask[action_id] = False
-                        continue
 
             # AoE spells: need at least one alive mob in range (no target required)
-            if family_id in self._AOE_FAMILIES:
-                has_aoe_target = any(
-                    m.alive and m.in_combat
-                    and math.sqrt((m.x - p.x)**2 + (m.y - p.y)**2) <= spell.spell_range
-                    for m in self.sim.mobs
-                )
-                if not has_aoe_target:
-                    mask[action_id] = False
+            if row.aoe:
+                hit = aoe_hits.get(row.spell_range)
+                if hit is None:
+                    in_aoe = mobs.query_radius(p.x, p.y, row.spell_range)
+                    hit = aoe_hits[row.spell_range] = bool(
+                        (mobs.alive[in_aoe] & mobs.in_combat[in_aoe]).any())
+                if not hit:
                     continue
 
-            # Talent-gated spells: mask if talent not learned
-            if family_id == FAMILY_MIND_FLAY and self.sim._get_talent_points("mind_flay") < 1:
-                mask[action_id] = False
-                continue
-            elif family_id == FAMILY_VAMPIRIC_TOUCH and self.sim._get_talent_points("vampiric_touch") < 1:
-                mask[action_id] = False
-                continue
-            elif family_id == FAMILY_DISPERSION and self.sim._get_talent_points("dispersion") < 1:
-                mask[action_id] = False
-                continue
-
             # Buff/debuff duplication checks (game mechanic — can't double-apply)
             if family_id == FAMILY_PW_SHIELD and (p.shield_remaining > 0 or p.shield_cooldown > 0):
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_SW_PAIN and target is not None and target.dot_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_RENEW and p.hot_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_INNER_FIRE and p.inner_fire_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_FORTITUDE and p.fortitude_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_DEVOURING_PLAGUE and target is not None and target.dot3_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_SHADOW_PROTECTION and p.shadow_prot_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_DIVINE_SPIRIT and p.divine_spirit_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_FEAR_WARD and p.fear_ward_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_VAMPIRIC_TOUCH and target is not None and target.dot4_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_MIND_FLAY and p.channel_remaining > 0:
-                mask[action_id] = False
+                continue
             elif family_id == FAMILY_DISPERSION and p.dispersion_remaining > 0:
-                mask[action_id] = False
+                continue
+            mask[row.action_id] = True
+
+        return self._finish_masks(mask, p, in_combat)
+
+    def _target_reach(self, p, target) -> tuple[float, bool]:
+        """(distance, LOS) to the target, cached until either of them moves."""
+        sig = (target.uid, target.x, target.y, target.z, p.x, p.y, p.z)
+        if sig != self._reach_sig:
+            los = True
+            if self.sim.terrain:
+                los = self.sim.terrain.check_los(
+                    p.x, p.y, p.z, target.x, target.y, target.z)
+            self._reach_sig = sig
+            self._reach = (self.sim._dist_to_mob(target), los)
+        return self._reach
+
+    def _finish_masks(self, mask: np.ndarray, p, in_combat: bool) -> np.ndarray:
+        """Non-spell masks: loot, sell, quest, eat/drink, Shadowform."""
+        mobs = self.sim.mob_table
 
         # ── Loot (7): need dead unlootable mob in range AND not in combat ──
         # Key design: in combat → loot masked → bot fights first, loots later
         has_lootable = False
         if not in_combat:
-            for mob in self.sim.mobs:
-                if not mob.alive and not mob.looted:
-                    if self.sim._dist_to_mob(mob) <= self.sim.LOOT_RANGE:
-                        has_lootable = True
-                        break
+            in_loot = mobs.query_radius(p.x, p.y, self.sim.LOOT_RANGE)
+            has_lootable = bool(
+                (~mobs.alive[in_loot] & ~mobs.looted[in_loot]).any())
         if not has_lootable:
             mask[7] = False
 
@@ -411,6 +504,11 @@ class WoWSimEnv(gym.Env):
 
         return mask
 
+    def close(self):
+        if self._terrain is not None:
+            self._terrain.close()
+        super().close()
+
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         if seed is not None:
@@ -442,8 +540,8 @@ class WoWSimEnv(gym.Env):
         self._prev_vendor_dist = None
         self._prev_sim_kills = 0            # track sim.kills for event logging
         self._prev_target_dist = None       # for approach shaping
-        self.last_state = self.sim.get_state_dict()
-        obs = self._build_obs(self.last_state)
+        self._last_state = None
+        obs = self.write_obs().copy()
 
         # Log initial state
         self._logged_mob_positions = set()
@@ -535,7 +633,14 @@ class WoWSimEnv(gym.Env):
             self.sim.do_toggle_shadowform()
 
         # ─── Advance Simulation ───────────────────────────────────
-        self.sim.tick()
+        # Wait macro: skip idle ticks (eating, long casts, respawns) in
+        # one step; it stops on the first tick with an event
+        ticks = 1
+        waited = action == self.WAIT_ACTION and self._wait_action
+        if waited:
+            ticks = self.sim.fast_forward(self.WAIT_MAX_TICKS)
+        else:
+            self.sim.tick()
 
         # Record newly loaded chunk mobs for the visualizer
         if self._logger and self.sim.creature_db:
@@ -557,41 +662,52 @@ class WoWSimEnv(gym.Env):
 
         # ─── Consume Events ───────────────────────────────────────
         events = self.sim.consume_events()
-        state = self.sim.get_state_dict()
+        target = self.sim.target
 
         # ─── Compute Rewards (sparse design — only real outcomes) ────
         reward = 0.0
 
-        t_exists = 1.0 if state.get('target_status') == 'alive' else 0.0
-        is_casting_now = state.get('casting') == 'true'
+        t_exists = 1.0 if target is not None and target.alive else 0.0
+        is_casting_now = p.is_casting
         hp_pct = self.sim.player.hp / max(1, self.sim.player.max_hp)
         mana_pct = self.sim.player.mana / max(1, self.sim.player.max_mana)
 
         # Current target tracking
         curr_target_hp = 0
         if t_exists > 0.5:
-            curr_target_hp = state.get('target_hp', 0)
+            curr_target_hp = target.hp
 
         # 1. Step-Penalty (time pressure — forces the bot to act)
         #    Reduced from 0.001 to 0.0005: longer episodes (better survival)
         #    were being punished more than short ones, causing reward decline
         #    despite improving gameplay metrics.
-        reward -= 0.0005
+        reward -= 0.0005 * ticks
 
         # 2. Idle-Penalty (Noop without casting/eating = wasted time)
         #    Increased from 0.005 to 0.01 to reduce ~60% idle ratio.
         #    Eating counts as productive (regenerating), so not penalized.
-        is_eating_now = state.get('is_eating') == 'true'
-        if executed_action == 0 and not is_casting_now and not is_eating_now:
-            reward -= 0.01
+        #    A wait step is scored per tick it advanced, exactly like the
+        #    noops it replaces: eating ticks are productive, only the ticks
+        #    that ended neither casting nor eating count as idle.
+        is_eating_now = p.is_eating
+        if waited:
+            idle_ticks = self.sim.ff_idle_ticks
+            eat_missing = self.sim.ff_eat_missing
+        else:
+            idle_ticks = int(executed_action == 0
+                             and not is_casting_now and not is_eating_now)
+            eat_missing = 0.0
+            if is_eating_now:
+                eat_missing = (1.0 - hp_pct) + (1.0 - mana_pct)  # 0-2 range
+        if idle_ticks:
+            reward -= 0.01 * idle_ticks
             self._idle_steps += 1
 
         # 2b. Eat/Drink shaping — small reward for eating when low on HP/Mana
         #     Encourages using eat/drink instead of idle-waiting for regen.
         #     Only rewards while actively eating and not yet full.
-        if is_eating_now:
-            missing = (1.0 - hp_pct) + (1.0 - mana_pct)  # 0-2 range
-            reward += 0.003 * missing  # up to +0.006/tick when both bars empty
+        if eat_missing:
+            reward += 0.003 * eat_missing  # up to +0.006/tick when both bars empty
 
         # 3. Damage-Reward (gradient toward kills — can't be faked)
         if (t_exists > 0.5
@@ -681,7 +797,7 @@ class WoWSimEnv(gym.Env):
         #     Only active when inventory ≥60% full and not in combat.
         #     Scales with fullness so nearly-full inventory creates stronger pull.
         p = self.sim.player
-        free = state.get('free_slots', p.total_bag_slots)
+        free = p.free_slots
         total = max(p.total_bag_slots, 1)
         inv_fullness = 1.0 - (free / total)  # 0.0 = empty, 1.0 = full
         if inv_fullness >= 0.6 and not p.in_combat:
@@ -761,8 +877,8 @@ class WoWSimEnv(gym.Env):
         self._ep_loot += copper
 
         # Build obs
-        obs = self._build_obs(state)
-        self.last_state = state
+        obs = self.write_obs().copy()
+        self._last_state = None
 
         info = {}
         if terminated or truncated:
@@ -799,8 +915,103 @@ class WoWSimEnv(gym.Env):
 
         return obs, reward, terminated, truncated, info
 
+    @property
+    def last_state(self) -> Optional[dict]:
+        """WoWEnv-format state dict after the last reset/step.
+
+        Built on demand: observations are written straight from the sim
+        (write_obs), the dict is only kept for WoWEnv parity and debugging.
+        """
+        if self._last_state is None:
+            self._last_state = self.sim.get_state_dict()
+        return self._last_state
+
+    @last_state.setter
+    def last_state(self, state: Optional[dict]):
+        self._last_state = state
+
+    def write_obs(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write the 52-dim observation straight from Player/Mob fields.
+
+        Same layout and values as _build_obs(sim.get_state_dict()) without
+        building the dict. Fills ``out`` (default: the env's own buffer,
+        overwritten on every call) and returns it.
+        """
+        if out is None:
+            out = self._obs
+        sim = self.sim
+        p = sim.player
+        x, y, o = p.x, p.y, p.orientation
+        target = sim.target
+        alive = target is not None and target.alive
+
+        out[0] = p.hp / max(1, p.max_hp)
+        out[1] = p.mana / max(1, p.max_mana)
+        if alive:
+            dx = target.x - x
+            dy = target.y - y
+            out[2] = target.hp / 100.0
+            out[3] = 1.0
+            out[5] = min(math.sqrt(dx * dx + dy * dy), 40.0) / 40.0
+            out[6] = _rel_angle(dx, dy, o) / math.pi
+        else:
+            out[2] = out[3] = out[5] = out[6] = 0.0
+        out[4] = p.in_combat
+        out[7] = p.is_casting
+        out[9] = p.free_slots / 20.0
+        out[8], out[10], out[11], out[12] = self._compute_nearby_mob_features(x, y, o)
+
+        out[13] = target.level / 10.0 if target is not None else 0.0
+        out[14] = p.level / 10.0
+        out[15] = p.shield_remaining > 0
+        out[16] = target is not None and target.dot_remaining > 0
+        out[17] = p.hot_remaining > 0
+        out[18] = p.inner_fire_remaining > 0
+        out[19] = p.fortitude_remaining > 0
+        cooldowns = p.spell_cooldowns
+        out[20] = cooldowns.get(FAMILY_MIND_BLAST, 0) <= 0
+        out[21] = target is not None and target.dot2_remaining > 0
+        out[22] = p.is_eating
+        out[23] = alive and target.dot3_remaining > 0
+        out[24] = p.shadow_prot_remaining > 0
+        out[25] = p.divine_spirit_remaining > 0
+        out[26] = p.fear_ward_remaining > 0
+        out[27] = cooldowns.get(FAMILY_PSYCHIC_SCREAM, 0) <= 0
+        mobs = sim.mob_table
+        out[28] = int(np.count_nonzero(
+            mobs.used[:mobs.n] & mobs.alive[:mobs.n] & mobs.feared[:mobs.n])) / 5.0
+
+        out[29] = target is not None and target.dot4_remaining > 0
+        out[30] = p.shadowform_active
+        out[31] = p.dispersion_remaining > 0
+        out[32] = p.channel_remaining > 0
+
+        out[33] = p.total_spell_power / 200.0
+        out[34] = p.total_spell_crit / 50.0
+        out[35] = p.total_spell_haste / 50.0
+        out[36] = p.total_armor / 2000.0
+        out[37] = p.total_attack_power / 500.0
+        out[38] = p.total_melee_crit / 50.0
+        out[39] = p.total_dodge / 50.0
+        out[40] = p.total_hit_spell / 50.0
+        out[41] = p.total_expertise / 50.0
+        out[42] = p.total_armor_pen / 100.0
+
+        out[43:46] = self._compute_vendor_obs(x, y, o)
+        if self._quest_db:
+            out[46:52] = self._compute_quest_obs(
+                x, y, o, len(sim.active_quests) > 0,
+                sim._get_quest_progress_ratio(), sim.quests_completed)
+        else:
+            out[46:52] = 0.0
+        return out
+
     def _build_obs(self, data: dict) -> np.ndarray:
-        """Build observation vector — 29 base + 10 stat + 3 vendor + 4 talent + 6 quest = 52 total."""
+        """Build observation vector from a state dict (WoWEnv parity path).
+
+        29 base + 10 stat + 3 vendor + 4 talent + 6 quest = 52 total.
+        step()/reset() use write_obs, which produces the same values.
+        """
         max_hp = max(1, data['max_hp'])
         hp_pct = data['hp'] / max_hp
         mana_pct = data['power'] / max(1, data['max_power'])
@@ -813,13 +1024,7 @@ class WoWSimEnv(gym.Env):
             dy = data['ty'] - data['y']
             dist = math.sqrt(dx * dx + dy * dy)
             dist_norm = min(dist, 40.0) / 40.0
-            target_angle = math.atan2(dy, dx)
-            rel = target_angle - data['o']
-            while rel > math.pi:
-                rel -= 2 * math.pi
-            while rel < -math.pi:
-                rel += 2 * math.pi
-            angle_norm = rel / math.pi
+            angle_norm = _rel_angle(dx, dy, data['o']) / math.pi
 
         is_casting = 1.0 if data.get('casting') == 'true' else 0.0
         in_combat = 1.0 if data.get('combat') == 'true' else 0.0
@@ -827,7 +1032,7 @@ class WoWSimEnv(gym.Env):
 
         # Nearby mob features
         mob_count, closest_mob_dist, closest_mob_angle, num_attackers = \
-            self._compute_nearby_mob_features(data)
+            self._compute_nearby_mob_features(data['x'], data['y'], data['o'])
 
         target_level = data.get('target_level', 0) / 10.0
         player_level = data.get('level', 1) / 10.0
@@ -846,7 +1051,9 @@ class WoWSimEnv(gym.Env):
         has_divine_spirit = 1.0 if data.get('has_divine_spirit') == 'true' else 0.0
         has_fear_ward = 1.0 if data.get('has_fear_ward') == 'true' else 0.0
         psychic_scream_ready = 1.0 if data.get('psychic_scream_ready') == 'true' else 0.0
-        num_feared = sum(1 for m in self.sim.mobs if m.alive and m.feared) / 5.0
+        mobs = self.sim.mob_table
+        num_feared = int(np.count_nonzero(
+            mobs.used[:mobs.n] & mobs.alive[:mobs.n] & mobs.feared[:mobs.n])) / 5.0
 
         # Talent-related obs (dims 29-32)
         target_has_vt = 1.0 if data.get('target_has_vampiric_touch') == 'true' else 0.0
@@ -867,10 +1074,12 @@ class WoWSimEnv(gym.Env):
         stat_arp = data.get('armor_pen', 0) / 100.0            # ArP% / 100
 
         # Vendor observations (dims 43-45) — nearest vendor info for navigation
-        vendor_obs = self._compute_vendor_obs(data)
+        vendor_obs = self._compute_vendor_obs(data['x'], data['y'], data['o'])
 
         # Quest observations (dims 46-51) — always present, zero when quests disabled
-        quest_obs = self._compute_quest_obs(data)
+        quest_obs = self._compute_quest_obs(
+            data['x'], data['y'], data['o'], data.get('quest_active', False),
+            data.get('quest_progress', 0.0), data.get('quests_completed_total', 0))
 
         return np.array([
             hp_pct, mana_pct, t_hp, t_exists, in_combat,
@@ -892,7 +1101,7 @@ class WoWSimEnv(gym.Env):
             *quest_obs,
         ], dtype=np.float32)
 
-    def _compute_vendor_obs(self, data: dict):
+    def _compute_vendor_obs(self, x: float, y: float, o: float):
         """Compute vendor observation features (3 dimensions).
 
         [43] vendor_nearby           (0/1, vendor exists in world)
@@ -903,21 +1112,16 @@ class WoWSimEnv(gym.Env):
         if vendor is None:
             return (0.0, 0.0, 0.0)
 
-        dx = vendor.x - data['x']
-        dy = vendor.y - data['y']
+        dx = vendor.x - x
+        dy = vendor.y - y
         dist = math.sqrt(dx * dx + dy * dy)
         vendor_dist = min(dist, 40.0) / 40.0
-        vendor_angle_abs = math.atan2(dy, dx)
-        rel = vendor_angle_abs - data['o']
-        while rel > math.pi:
-            rel -= 2 * math.pi
-        while rel < -math.pi:
-            rel += 2 * math.pi
-        vendor_angle = rel / math.pi
+        vendor_angle = _rel_angle(dx, dy, o) / math.pi
 
         return (1.0, vendor_dist, vendor_angle)
 
-    def _compute_quest_obs(self, data: dict):
+    def _compute_quest_obs(self, x: float, y: float, o: float, quest_active: bool,
+                           quest_progress: float, quests_completed: int):
         """Compute quest observation features (6 dimensions).
 
         [46] has_active_quest        (0/1)
@@ -930,9 +1134,9 @@ class WoWSimEnv(gym.Env):
         if not self._quest_db:
             return (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
 
-        has_active = 1.0 if data.get('quest_active', False) else 0.0
-        progress = float(data.get('quest_progress', 0.0))
-        quests_done = data.get('quests_completed_total', 0) / 10.0
+        has_active = 1.0 if quest_active else 0.0
+        progress = float(quest_progress)
+        quests_done = quests_completed / 10.0
 
         # Find the most relevant quest NPC (turn-in > accept)
         qnpc, qtype = self.sim.get_best_quest_npc()
@@ -941,52 +1145,38 @@ class WoWSimEnv(gym.Env):
         qnpc_angle = 0.0
         if qnpc:
             qnpc_nearby = 1.0
-            dx = qnpc.x - data['x']
-            dy = qnpc.y - data['y']
+            dx = qnpc.x - x
+            dy = qnpc.y - y
             dist = math.sqrt(dx * dx + dy * dy)
             qnpc_dist = min(dist, 40.0) / 40.0
-            npc_angle = math.atan2(dy, dx)
-            rel = npc_angle - data['o']
-            while rel > math.pi:
-                rel -= 2 * math.pi
-            while rel < -math.pi:
-                rel += 2 * math.pi
-            qnpc_angle = rel / math.pi
+            qnpc_angle = _rel_angle(dx, dy, o) / math.pi
 
         return (has_active, progress, qnpc_nearby, qnpc_dist, qnpc_angle,
                 quests_done)
 
-    def _compute_nearby_mob_features(self, data: dict):
-        """Compute observation features from nearby_mobs — matches wow_env.py."""
-        nearby_mobs = data.get('nearby_mobs', [])
-        me_x, me_y = data['x'], data['y']
-        orientation = data['o']
+    def _compute_nearby_mob_features(self, me_x: float, me_y: float, orientation: float):
+        """Compute observation features from nearby mobs — matches wow_env.py.
+
+        Reads the sim's spatial index directly (same scan radius as the
+        state dict's nearby_mobs) instead of walking the dict list.
+        """
+        mobs = self.sim.mob_table
 
-        num_alive = 0
-        num_attackers = 0
+        slots = mobs.query_radius(me_x, me_y, self.sim.SCAN_RANGE)
+        slots = slots[mobs.alive[slots] & (mobs.hp[slots] > 0)]
+        num_alive = len(slots)
+        num_attackers = int(np.count_nonzero(mobs.target_player[slots]))
         closest_dist = 40.0
         closest_angle = 0.0
 
-        for mob in nearby_mobs:
-            if mob['hp'] <= 0:
-                continue
-            if mob.get('attackable', 0) == 0:
-                continue
-            num_alive += 1
-            if mob.get('target', '0') != '0':
-                num_attackers += 1
-            dx = mob['x'] - me_x
-            dy = mob['y'] - me_y
-            dist = math.sqrt(dx * dx + dy * dy)
-            if dist < closest_dist:
-                closest_dist = dist
-                mob_angle = math.atan2(dy, dx)
-                rel = mob_angle - orientation
-                while rel > math.pi:
-                    rel -= 2 * math.pi
-                while rel < -math.pi:
-                    rel += 2 * math.pi
-                closest_angle = rel
+        if num_alive:
+            dx = mobs.x[slots] - me_x
+            dy = mobs.y[slots] - me_y
+            dist = np.sqrt(dx * dx + dy * dy)
+            i = int(np.argmin(dist))
+            if dist[i] < closest_dist:
+                closest_dist = float(dist[i])
+                closest_angle = _rel_angle(float(dx[i]), float(dy[i]), orientation)
 
         return (
             min(num_alive, 10) / 10.0,
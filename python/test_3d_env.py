@@ -17,6 +17,7 @@ Nutzung:
 
 import struct
 import math
+import mmap
 import os
 import sys
 import argparse
@@ -165,12 +166,12 @@ class MapTile:
     area_flags: int = 0
     grid_area: int = 0
     area_map: Optional[list] = None  # 16x16 uint16
-    # Height
+    # Height (float32, flach: v9[x*129+y], v8[x*128+y]; ggf. read-only mmap)
     height_flags: int = 0
     grid_height: float = 0.0
     grid_max_height: float = 0.0
-    v9: Optional[list] = None  # 129x129 heights (grid vertices)
-    v8: Optional[list] = None  # 128x128 heights (grid cell centers)
+    v9: Optional[np.ndarray] = None  # 129x129 heights (grid vertices)
+    v8: Optional[np.ndarray] = None  # 128x128 heights (grid cell centers)
     # Liquid
     liquid_flags: int = 0
     liquid_level: float = 0.0
@@ -179,6 +180,16 @@ class MapTile:
     liquid_width: int = 0
     liquid_height: int = 0
     liquid_map: Optional[list] = None
+    # memoryviews auf v9/v8: Skalar-Index liefert Python-float (~Listen-Tempo)
+    _v9_view: Optional[memoryview] = field(default=None, repr=False, compare=False)
+    _v8_view: Optional[memoryview] = field(default=None, repr=False, compare=False)
+
+    def set_heights(self, v9: np.ndarray, v8: np.ndarray):
+        """Setzt die Höhen-Arrays (float32, flach) samt Skalar-Views."""
+        self.v9 = v9
+        self.v8 = v8
+        self._v9_view = memoryview(v9)
+        self._v8_view = memoryview(v8)
 
 
 @dataclass
@@ -197,8 +208,8 @@ class VMapTree:
     map_id: int
     is_tiled: bool
     bounds: AABB
-    tree_nodes: list       # Raw uint32 nodes
-    object_indices: list   # Indices in die Spawn-Liste
+    tree_nodes: np.ndarray      # Raw uint32 nodes (BIH::tree)
+    object_indices: np.ndarray  # uint32 Tree-Values je Leaf (BIH::objects)
     spawns: list           # ModelSpawn-Objekte (aus vmtree GOBJ + vmtiles)
 
 
@@ -351,16 +362,24 @@ def parse_area_table_dbc(filepath: str) -> dict:
 
 # ─────────────────────────── MAP Parser ──────────────────────────
 
-def parse_map_file(filepath: str, map_id: int = 0, tile_x: int = 0, tile_y: int = 0) -> Optional[MapTile]:
+def parse_map_file(filepath: str, map_id: int = 0, tile_x: int = 0, tile_y: int = 0,
+                   use_mmap: bool = False) -> Optional[MapTile]:
     """
     Liest eine .map Datei und extrahiert Terrain-Höhen, Area-IDs und Liquid-Daten.
+
+    Höhen landen als float32-Arrays im Tile. Mit use_mmap=True werden
+    float-Höhen direkt aus der gemappten Datei gelesen (zero-copy,
+    read-only); int8/int16-Höhen werden in beiden Fällen dekodiert.
     """
     if not os.path.exists(filepath):
         print(f"  [MAP] Datei nicht gefunden: {filepath}")
         return None
 
     with open(filepath, 'rb') as f:
-        data = f.read()
+        if use_mmap and os.path.getsize(filepath) > 0:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
 
     if len(data) < 44:
         print(f"  [MAP] Datei zu klein ({len(data)} bytes): {filepath}")
@@ -408,33 +427,25 @@ def parse_map_file(filepath: str, map_id: int = 0, tile_x: int = 0, tile_y: int
 
             if not (tile.height_flags & MAP_HEIGHT_NO_HEIGHT):
                 hpos = pos + 16
-                if tile.height_flags & MAP_HEIGHT_AS_INT8:
-                    # uint8 quantized: 129*129 + 128*128 bytes
-                    v9_count = 129 * 129
-                    v8_count = 128 * 128
-                    v9_raw = struct.unpack(f'<{v9_count}B', data[hpos:hpos+v9_count])
-                    hpos += v9_count
-                    v8_raw = struct.unpack(f'<{v8_count}B', data[hpos:hpos+v8_count])
-                    multiplier = (tile.grid_max_height - tile.grid_height) / 255.0
-                    tile.v9 = [v * multiplier + tile.grid_height for v in v9_raw]
-                    tile.v8 = [v * multiplier + tile.grid_height for v in v8_raw]
-                elif tile.height_flags & MAP_HEIGHT_AS_INT16:
-                    # uint16 quantized: 129*129*2 + 128*128*2 bytes
-                    v9_count = 129 * 129
-                    v8_count = 128 * 128
-                    v9_raw = struct.unpack(f'<{v9_count}H', data[hpos:hpos+v9_count*2])
-                    hpos += v9_count * 2
-                    v8_raw = struct.unpack(f'<{v8_count}H', data[hpos:hpos+v8_count*2])
-                    multiplier = (tile.grid_max_height - tile.grid_height) / 65535.0
-                    tile.v9 = [v * multiplier + tile.grid_height for v in v9_raw]
-                    tile.v8 = [v * multiplier + tile.grid_height for v in v8_raw]
+                v9_count = 129 * 129
+                v8_count = 128 * 128
+                if tile.height_flags & (MAP_HEIGHT_AS_INT8 | MAP_HEIGHT_AS_INT16):
+                    # uint8/uint16 quantized: v * multiplier + gridHeight
+                    if tile.height_flags & MAP_HEIGHT_AS_INT8:
+                        raw_type, levels = np.uint8, 255.0
+                    else:
+                        raw_type, levels = np.dtype('<u2'), 65535.0
+                    raw = np.frombuffer(data, dtype=raw_type, count=v9_count + v8_count,
+                                        offset=hpos)
+                    multiplier = (tile.grid_max_height - tile.grid_height) / levels
+                    heights = (raw * multiplier + tile.grid_height).astype(np.float32)
+                    tile.set_heights(heights[:v9_count], heights[v9_count:])
                 else:
                     # Float heights: 129*129*4 + 128*128*4 bytes
-                    v9_count = 129 * 129
-                    v8_count = 128 * 128
-                    tile.v9 = list(struct.unpack(f'<{v9_count}f', data[hpos:hpos+v9_count*4]))
-                    hpos += v9_count * 4
-                    tile.v8 = list(struct.unpack(f'<{v8_count}f', data[hpos:hpos+v8_count*4]))
+                    tile.set_heights(
+                        np.frombuffer(data, dtype='<f4', count=v9_count, offset=hpos),
+                        np.frombuffer(data, dtype='<f4', count=v8_count,
+                                      offset=hpos + v9_count * 4))
 
     # ── LIQUID Section ──
     if liquid_size > 0:
@@ -466,8 +477,8 @@ def get_terrain_height(tile: MapTile, world_x: float, world_y: float) -> float:
 
     Optimiert: Inline array access statt Closures (spart ~2μs/Aufruf).
     """
-    _v9 = tile.v9
-    _v8 = tile.v8
+    _v9 = tile._v9_view
+    _v8 = tile._v8_view
     if _v9 is None or _v8 is None:
         return tile.grid_height
 
@@ -520,6 +531,80 @@ def get_terrain_height(tile: MapTile, world_x: float, world_y: float) -> float:
     return a * x + b * y + c
 
 
+_V9_CORNERS = np.array([0, 129, 1, 130])[:, None]
+
+
+def get_terrain_heights(tile: MapTile, world_x: np.ndarray, world_y: np.ndarray) -> np.ndarray:
+    """
+    Vektorisierte get_terrain_height für viele Punkte im selben Tile.
+
+    Gleiche Triangle-Interpolation und Rechenreihenfolge wie die Skalar-
+    Version (float64), daher bitgleiche Ergebnisse.
+    """
+    world_x = np.asarray(world_x, dtype=np.float64)
+    world_y = np.asarray(world_y, dtype=np.float64)
+    return _interpolate_heights(tile, CENTER_GRID_ID - world_x / SIZE_OF_GRIDS,
+                                CENTER_GRID_ID - world_y / SIZE_OF_GRIDS)
+
+
+def _interpolate_heights(tile: MapTile, grid_x: np.ndarray, grid_y: np.ndarray) -> np.ndarray:
+    """Triangle-Interpolation für Grid-Koordinaten (CENTER_GRID_ID - world/SIZE)."""
+    if tile.v9 is None or tile.v8 is None:
+        return np.full(grid_x.shape, tile.grid_height, dtype=np.float64)
+
+    shape = grid_x.shape
+    x = MAP_RESOLUTION * grid_x.ravel()
+    y = MAP_RESOLUTION * grid_y.ravel()
+    x_int = x.astype(np.int64)      # int() schneidet wie astype Richtung 0 ab
+    y_int = y.astype(np.int64)
+    x = x - x_int
+    y = y - y_int
+    x_int &= MAP_RESOLUTION - 1
+    y_int &= MAP_RESOLUTION - 1
+
+    # h1..h4: Ecken der Zelle (V9), h5: Mittelpunkt (V8)
+    i9 = x_int * 129 + y_int
+    h1, h2, h3, h4 = tile.v9[i9 + _V9_CORNERS].astype(np.float64)
+    h5 = 2.0 * tile.v8[x_int * 128 + y_int].astype(np.float64)
+
+    # Dreieck-Auswahl wie in get_terrain_height (1/2 oben, 3/4 unten)
+    upper = x + y < 1
+    left = x > y
+    a = np.where(upper, np.where(left, h2 - h1, h5 - h1 - h3),
+                 np.where(left, h2 + h4 - h5, h4 - h3))
+    b = np.where(upper, np.where(left, h5 - h1 - h2, h3 - h1),
+                 np.where(left, h4 - h2, h3 + h4 - h5))
+    c = np.where(upper, h1, h5 - h4)
+    return (a * x + b * y + c).reshape(shape)
+
+
+def _heights_from_tiles(tile_for, world_x: np.ndarray, world_y: np.ndarray) -> np.ndarray:
+    """Batch-Höhen über mehrere Tiles; tile_for(gx, gy) -> MapTile | None.
+
+    Punkte ohne geladenes Tile bekommen INVALID_HEIGHT.
+    """
+    grid_x = CENTER_GRID_ID - np.asarray(world_x, dtype=np.float64) / SIZE_OF_GRIDS
+    grid_y = CENTER_GRID_ID - np.asarray(world_y, dtype=np.float64) / SIZE_OF_GRIDS
+    if not grid_x.size:
+        return np.full(grid_x.shape, INVALID_HEIGHT, dtype=np.float64)
+    gx = grid_x.astype(np.int64)
+    gy = grid_y.astype(np.int64)
+    keys = gx * (1 << 20) + gy
+    first = keys.flat[0]
+    if (keys == first).all():
+        tile = tile_for(int(gx.flat[0]), int(gy.flat[0]))
+        if tile is None:
+            return np.full(grid_x.shape, INVALID_HEIGHT, dtype=np.float64)
+        return _interpolate_heights(tile, grid_x, grid_y)
+    out = np.full(grid_x.shape, INVALID_HEIGHT, dtype=np.float64)
+    for key in np.unique(keys).tolist():
+        sel = keys == key
+        tile = tile_for(int(gx[sel].flat[0]), int(gy[sel].flat[0]))
+        if tile is not None:
+            out[sel] = _interpolate_heights(tile, grid_x[sel], grid_y[sel])
+    return out
+
+
 # ─────────────────────────── VMAP Parser ─────────────────────────
 
 def parse_vmtree(filepath: str, map_id: int = 0) -> Optional[VMapTree]:
@@ -553,12 +638,11 @@ def parse_vmtree(filepath: str, map_id: int = 0) -> Optional[VMapTree]:
 
         # BIH tree nodes
         tree_size = struct.unpack('<I', f.read(4))[0]
-        tree_data = f.read(tree_size * 4)
-        tree_nodes = list(struct.unpack(f'<{tree_size}I', tree_data))
+        tree_nodes = np.frombuffer(f.read(tree_size * 4), dtype='<u4')
 
         # Object indices
         obj_count = struct.unpack('<I', f.read(4))[0]
-        object_indices = list(struct.unpack(f'<{obj_count}I', f.read(obj_count * 4)))
+        object_indices = np.frombuffer(f.read(obj_count * 4), dtype='<u4')
 
         vtree = VMapTree(
             map_id=map_id,
@@ -753,6 +837,11 @@ class LOSChecker:
             if s.bounds is not None:
                 self.spawns.append(s)
 
+    def remove_spawns(self, spawns: list):
+        """Entfernt zuvor hinzugefügte Spawns (Identität, z.B. beim Tile-Evict)."""
+        gone = {id(s) for s in spawns}
+        self.spawns = [s for s in self.spawns if id(s) not in gone]
+
     def is_in_line_of_sight(self, pos1: Vec3, pos2: Vec3, use_vmap_coords: bool = False) -> tuple:
         """
         Prüft Line of Sight zwischen zwei Weltkoordinaten-Punkten.
@@ -844,6 +933,7 @@ class TerrainPathChecker:
     DEFAULT_COLLISION_HEIGHT = 2.03128
 
     SAMPLE_DISTANCE = 1.0      # Units — Abtastabstand auf dem Pfad
+    BATCH_MIN_SAMPLES = 64     # Ab hier lohnt der Batch den NumPy-Overhead
 
     def __init__(self, tiles: dict):
         """
@@ -851,6 +941,14 @@ class TerrainPathChecker:
         """
         self.tiles = tiles
 
+    def add_tile(self, tile_x: int, tile_y: int, tile: MapTile):
+        """Nimmt ein nachgeladenes Tile auf (statt den Checker neu zu bauen)."""
+        self.tiles[(tile_x, tile_y)] = tile
+
+    def remove_tile(self, tile_x: int, tile_y: int) -> Optional[MapTile]:
+        """Entfernt ein Tile; Pfade darüber gelten danach als no_terrain_data."""
+        return self.tiles.pop((tile_x, tile_y), None)
+
     def get_height(self, world_x: float, world_y: float) -> float:
         """Höhe an Weltkoordinaten. Findet automatisch das richtige Tile."""
         gx, gy = world_to_grid(world_x, world_y)
@@ -859,6 +957,11 @@ class TerrainPathChecker:
             return INVALID_HEIGHT
         return get_terrain_height(tile, world_x, world_y)
 
+    def get_heights(self, world_x: np.ndarray, world_y: np.ndarray) -> np.ndarray:
+        """Batch-Variante von get_height (INVALID_HEIGHT ohne Tile)."""
+        return _heights_from_tiles(lambda gx, gy: self.tiles.get((gx, gy)),
+                                   world_x, world_y)
+
     @staticmethod
     def _get_slope_angle_abs(x1, y1, z1, x2, y2, z2):
         """AzerothCore Geometry.h: getSlopeAngleAbs — returns radians."""
@@ -881,6 +984,104 @@ class TerrainPathChecker:
         climbable_height = collision_height - (collision_height * (slope_deg / 100.0))
         return diff_height <= climbable_height
 
+    def _iter_samples(self, x0: float, y0: float, dx: float, dy: float,
+                      num_samples: int):
+        """(x, y, z) der Pfad-Samples einzeln (kurze Pfade, Early-Exit)."""
+        for i in range(1, num_samples + 1):
+            t = i / num_samples
+            x = x0 + dx * t
+            y = y0 + dy * t
+            yield x, y, self.get_height(x, y)
+
+    def _sample_failure(self, prev_x, prev_y, prev_z, x, y, z,
+                        step_dist_2d, collision_height) -> Optional[tuple]:
+        """Prüft ein Pfad-Segment; (False, reason, blocked_at) oder None."""
+        if z <= INVALID_HEIGHT + 1:
+            return (False, "no_terrain_data", Vec3(x, y, 0))
+
+        dz = abs(z - prev_z)
+
+        # 1) Navmesh slope filter (rcClearUnwalkableTriangles)
+        if step_dist_2d > 0.01:
+            slope_deg = math.degrees(math.atan2(dz, step_dist_2d))
+            if slope_deg > self.MAX_WALKABLE_SLOPE:
+                return (False, f"slope_too_steep ({slope_deg:.1f}°)",
+                        Vec3(x, y, z))
+
+        # 2) IsWalkableClimb (PathGenerator.cpp)
+        if not self._is_walkable_climb(
+                prev_x, prev_y, prev_z, x, y, z, collision_height):
+            slope_deg = math.degrees(
+                self._get_slope_angle_abs(prev_x, prev_y, prev_z, x, y, z))
+            return (False,
+                    f"climb_too_steep ({slope_deg:.1f}°, dh={dz:.2f})",
+                    Vec3(x, y, z))
+        return None
+
+    def first_blocked_samples(self, x1, y1, z1, x2, y2, z2,
+                              collision_height: float = None) -> np.ndarray:
+        """
+        Vektorisierte Begehbarkeit für viele Pfade (x1,y1,z1) → (x2,y2,z2).
+
+        Berechnet Sample-Höhen, Slope-Filter und IsWalkableClimb-Limits
+        aller Pfade als Arrays (gleiche Checks wie check_path_walkable).
+
+        Returns: int64-Array mit dem Index des ersten blockierten Samples
+        je Pfad (0-basiert, Sample i liegt bei t=(i+1)/num_samples),
+        -1 wenn der Pfad frei ist.
+        """
+        if collision_height is None:
+            collision_height = self.DEFAULT_COLLISION_HEIGHT
+        x1, y1, z1, x2, y2, z2 = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(v, dtype=np.float64))
+              for v in (x1, y1, z1, x2, y2, z2)))
+
+        dx = x2 - x1
+        dy = y2 - y1
+        dist_2d = np.sqrt(dx * dx + dy * dy)
+        out = np.full(dist_2d.shape, -1, dtype=np.int64)
+        live = dist_2d >= 0.01                  # sonst "same_position"
+        if not live.any():
+            return out
+
+        num_samples = np.maximum(2, (dist_2d / self.SAMPLE_DISTANCE).astype(np.int64))
+        i = np.arange(1, int(num_samples[live].max()) + 1)
+        valid = (i <= num_samples[:, None]) & live[:, None]
+
+        # Sample-Matrix (Pfad × Sample), Vorgänger = vorheriges Sample/Start
+        t = i / num_samples[:, None]
+        xs = x1[:, None] + dx[:, None] * t
+        ys = y1[:, None] + dy[:, None] * t
+        zs = self.get_heights(xs, ys)       # Padding hinter dem Pfadende wird maskiert
+        prev_x = np.concatenate((x1[:, None], xs[:, :-1]), axis=1)
+        prev_y = np.concatenate((y1[:, None], ys[:, :-1]), axis=1)
+        prev_z = np.concatenate((z1[:, None], zs[:, :-1]), axis=1)
+
+        step_dist_2d = (dist_2d / num_samples)[:, None]
+        dz = np.abs(zs - prev_z)
+        blocked = zs <= INVALID_HEIGHT + 1
+
+        # 1) Navmesh slope filter
+        steep = np.degrees(np.arctan2(dz, step_dist_2d)) > self.MAX_WALKABLE_SLOPE
+        blocked |= steep & (step_dist_2d > 0.01)
+
+        # 2) IsWalkableClimb: climbable = h - h * slope_deg / 100
+        floor_dist = np.sqrt((xs - prev_x) ** 2 + (ys - prev_y) ** 2)
+        slope = np.where(floor_dist < 1e-6, 0.0, np.arctan2(dz, floor_dist))
+        climbable = collision_height - collision_height * (np.degrees(slope) / 100.0)
+        blocked |= ~(dz <= climbable)
+
+        blocked &= valid
+        hit = blocked.any(axis=1)
+        out[hit] = blocked[hit].argmax(axis=1)
+        return out
+
+    def first_blocked_index(self, start: Vec3, end: Vec3,
+                            collision_height: float = None) -> int:
+        """Index des ersten blockierten Samples auf start→end, -1 wenn frei."""
+        return int(self.first_blocked_samples(
+            start.x, start.y, start.z, end.x, end.y, end.z, collision_height)[0])
+
     def check_path_walkable(self, start: Vec3, end: Vec3,
                             collision_height: float = None) -> tuple:
         """
@@ -903,38 +1104,35 @@ class TerrainPathChecker:
             return (True, "same_position", None)
 
         num_samples = max(2, int(dist_2d / self.SAMPLE_DISTANCE))
+        step_dist_2d = dist_2d / num_samples
+
+        # Lange Pfade: Checks vektorisiert, nur das blockierte Segment skalar
+        if num_samples >= self.BATCH_MIN_SAMPLES:
+            idx = self.first_blocked_index(start, end, collision_height)
+            if idx < 0:
+                return (True, "path_clear", None)
+            if idx == 0:
+                prev = (start.x, start.y, start.z)
+            else:
+                t = idx / num_samples
+                px, py = start.x + dx * t, start.y + dy * t
+                prev = (px, py, self.get_height(px, py))
+            t = (idx + 1) / num_samples
+            x, y = start.x + dx * t, start.y + dy * t
+            failure = self._sample_failure(*prev, x, y, self.get_height(x, y),
+                                           step_dist_2d, collision_height)
+            if failure is not None:
+                return failure
+            # Grenzfall (Rundung numpy vs. math): Skalar-Loop entscheidet
+
         prev_x = start.x
         prev_y = start.y
         prev_z = start.z
-
-        for i in range(1, num_samples + 1):
-            t = i / num_samples
-            x = start.x + dx * t
-            y = start.y + dy * t
-            z = self.get_height(x, y)
-
-            if z <= INVALID_HEIGHT + 1:
-                return (False, "no_terrain_data", Vec3(x, y, 0))
-
-            step_dist_2d = dist_2d / num_samples
-            dz = abs(z - prev_z)
-
-            # 1) Navmesh slope filter (rcClearUnwalkableTriangles)
-            if step_dist_2d > 0.01:
-                slope_deg = math.degrees(math.atan2(dz, step_dist_2d))
-                if slope_deg > self.MAX_WALKABLE_SLOPE:
-                    return (False, f"slope_too_steep ({slope_deg:.1f}°)",
-                            Vec3(x, y, z))
-
-            # 2) IsWalkableClimb (PathGenerator.cpp)
-            if not self._is_walkable_climb(
-                    prev_x, prev_y, prev_z, x, y, z, collision_height):
-                slope_deg = math.degrees(
-                    self._get_slope_angle_abs(prev_x, prev_y, prev_z, x, y, z))
-                return (False,
-                        f"climb_too_steep ({slope_deg:.1f}°, dh={dz:.2f})",
-                        Vec3(x, y, z))
-
+        for x, y, z in self._iter_samples(start.x, start.y, dx, dy, num_samples):
+            failure = self._sample_failure(prev_x, prev_y, prev_z, x, y, z,
+                                           step_dist_2d, collision_height)
+            if failure is not None:
+                return failure
             prev_x = x
             prev_y = y
             prev_z = z
@@ -1163,6 +1361,317 @@ class SpatialLOSChecker:
         return result
 
 
+class BIHLOSChecker(LOSChecker):
+    """
+    LOS über den BIH-Baum der .vmtree — Traversierung wie AzerothCore
+    BIH::intersectRay (Stack, Front/Back-Child nach Vorzeichen der Richtung).
+
+    Knoten und Leaf-Objekte bleiben flache uint32-Arrays (auch Shared
+    Memory); gelesen wird über memoryviews, die Python-ints/-floats
+    liefern. Leaf-Einträge sind Tree-Values (= ModelSpawn.tree_ref); nur
+    geladene Spawns (vmtiles) werden per AABB getestet, wie iTreeValues
+    ohne Model in StaticMapTree. Spawns ohne tree_ref werden zusätzlich
+    brute-force geprüft.
+
+    Usage:
+        checker = BIHLOSChecker(vtree)
+        checker.add_spawns(parse_vmtile(path))
+        has_los, hit, dist = checker.is_in_line_of_sight(pos1, pos2)
+        clear = checker.has_los_many(starts, ends)   # (N,3) -> bool[N]
+    """
+
+    MAX_STACK_SIZE = 64         # BoundingIntervalHierarchy.h
+    _FUZZY_EPS = 1e-5           # G3D::fuzzyNe(dir, 0)
+
+    def __init__(self, vtree: VMapTree):
+        super().__init__()
+        self.bounds = vtree.bounds
+        self.tree = np.asarray(vtree.tree_nodes, dtype=np.uint32)
+        self.objects = np.asarray(vtree.object_indices, dtype=np.uint32)
+        self._nodes = memoryview(self.tree).cast('B').cast('I')
+        self._clips = memoryview(self.tree.view(np.float32)).cast('B').cast('f')
+        self._values = memoryview(self.objects).cast('B').cast('I')
+        self._boxes: dict = {}      # tree_ref -> (lo, hi, ModelSpawn)
+        self._box_refs: dict = {}   # tree_ref -> Anzahl geladener Spawns (vmtiles überlappen)
+        self._untreed: list = []    # Spawns ohne gültige tree_ref
+        # Hülle aller geladenen Spawn-Bounds: Strahlen außerhalb sind frei
+        self._hull_lo = [math.inf] * 3
+        self._hull_hi = [-math.inf] * 3
+        self._built = True          # API-kompatibel mit SpatialLOSChecker
+        self.add_spawns(vtree.spawns)
+
+    def add_spawns(self, spawns: list):
+        """Registriert geladene Spawns (nur mit Bounding Box) für ihre Tree-Values."""
+        n_values = len(self.objects)
+        for s in spawns:
+            if s.bounds is None:
+                continue
+            self.spawns.append(s)
+            lo, hi = s.bounds.low, s.bounds.high
+            for axis, (l, h) in enumerate(((lo.x, hi.x), (lo.y, hi.y), (lo.z, hi.z))):
+                self._hull_lo[axis] = min(self._hull_lo[axis], l)
+                self._hull_hi[axis] = max(self._hull_hi[axis], h)
+            if 0 <= s.tree_ref < n_values:
+                self._boxes[s.tree_ref] = ((lo.x, lo.y, lo.z), (hi.x, hi.y, hi.z), s)
+                self._box_refs[s.tree_ref] = self._box_refs.get(s.tree_ref, 0) + 1
+            else:
+                self._untreed.append(s)
+
+    def remove_spawns(self, spawns: list):
+        """Entfernt Spawns wieder; eine Tree-Value bleibt, solange ein anderes
+        geladenes vmtile denselben Spawn enthält. Die Hülle schrumpft nicht
+        (nur konservativer Early-Out)."""
+        n_values = len(self.objects)
+        gone = set()
+        for s in spawns:
+            if s.bounds is None:
+                continue
+            gone.add(id(s))
+            if 0 <= s.tree_ref < n_values:
+                refs = self._box_refs.get(s.tree_ref, 0) - 1
+                if refs > 0:
+                    self._box_refs[s.tree_ref] = refs
+                else:
+                    self._box_refs.pop(s.tree_ref, None)
+                    self._boxes.pop(s.tree_ref, None)
+        if gone:
+            self.spawns = [s for s in self.spawns if id(s) not in gone]
+            self._untreed = [s for s in self._untreed if id(s) not in gone]
+
+    def build_index(self):
+        """Kein Index nötig — der BIH-Baum kommt aus der .vmtree."""
+
+    @staticmethod
+    def _slab_inv(d: float) -> float:
+        # Gleiche Konvention wie LOSChecker/AABB.intersects_ray
+        return 1.0 / d if abs(d) > 1e-30 else 1e30
+
+    def _intersect(self, ox, oy, oz, dx, dy, dz, max_dist: float,
+                   stop_at_first: bool) -> tuple:
+        """
+        BIH::intersectRay für einen normierten Strahl in VMAP-Koordinaten.
+
+        Returns: (spawn | None, Trefferdistanz); mit stop_at_first der
+        erste gefundene Treffer, sonst der nächste.
+        """
+        org = (ox, oy, oz)
+        dirs = (dx, dy, dz)
+        hull_lo = self._hull_lo
+        hull_hi = self._hull_hi
+        for axis in range(3):
+            end = org[axis] + dirs[axis] * max_dist
+            if (min(org[axis], end) > hull_hi[axis]
+                    or max(org[axis], end) < hull_lo[axis]):
+                return None, max_dist       # Segment verfehlt alle geladenen Spawns
+        inv = tuple(1.0 / d if d != 0.0 else math.copysign(math.inf, d) for d in dirs)
+        six, siy, siz = (self._slab_inv(d) for d in dirs)
+        hit_spawn = None
+
+        # Strahl gegen die Baum-Bounds clippen
+        interval_min = -1.0
+        interval_max = -1.0
+        lo, hi = self.bounds.low, self.bounds.high
+        for o, d, i, l, h in zip(org, dirs, inv, (lo.x, lo.y, lo.z), (hi.x, hi.y, hi.z)):
+            if abs(d) > self._FUZZY_EPS:
+                t1 = (l - o) * i
+                t2 = (h - o) * i
+                if t1 > t2:
+                    t1, t2 = t2, t1
+                if t1 > interval_min:
+                    interval_min = t1
+                if t2 < interval_max or interval_max < 0.0:
+                    interval_max = t2
+                if interval_max <= 0 or interval_min >= max_dist:
+                    return self._finish_untreed(None, org, six, siy, siz,
+                                                max_dist, stop_at_first)
+        if interval_min > interval_max:
+            return self._finish_untreed(None, org, six, siy, siz,
+                                        max_dist, stop_at_first)
+        interval_min = max(interval_min, 0.0)
+        interval_max = min(interval_max, max_dist)
+
+        # Front/Back-Offsets aus dem Vorzeichen-Bit der Richtung
+        front = [1 if math.copysign(1.0, d) < 0 else 0 for d in dirs]
+        off_front = [f + 1 for f in front]
+        off_back = [(f ^ 1) + 1 for f in front]
+        off_front3 = [f * 3 for f in front]
+        off_back3 = [(f ^ 1) * 3 for f in front]
+
+        nodes = self._nodes
+        clips = self._clips
+        values = self._values
+        boxes = self._boxes
+        stack = []
+        node = 0
+
+        while True:
+            while True:
+                tn = nodes[node]
+                axis = tn >> 30
+                offset = tn & 0x1FFFFFFF
+                if not tn & 0x20000000:
+                    if axis < 3:
+                        # Innerer Knoten
+                        o = org[axis]
+                        i = inv[axis]
+                        tf = (clips[node + off_front[axis]] - o) * i
+                        tb = (clips[node + off_back[axis]] - o) * i
+                        if tf < interval_min and tb > interval_max:
+                            break                   # Strahl zwischen den Clips
+                        back = offset + off_back3[axis]
+                        node = back
+                        if tf < interval_min:       # nur Far-Child
+                            if tb >= interval_min:
+                                interval_min = tb
+                            continue
+                        node = offset + off_front3[axis]
+                        if tb > interval_max:       # nur Near-Child
+                            if tf <= interval_max:
+                                interval_max = tf
+                            continue
+                        # Beide Children: Back auf den Stack
+                        stack.append((back, tb if tb >= interval_min else interval_min,
+                                      interval_max))
+                        if tf <= interval_max:
+                            interval_max = tf
+                        continue
+                    # Leaf: Objekte testen
+                    for value in values[offset:offset + nodes[node + 1]]:
+                        box = boxes.get(value)
+                        if box is None:
+                            continue
+                        t = _ray_box_enter(org, six, siy, siz, box[0], box[1], max_dist)
+                        if 0.0 <= t < max_dist:
+                            max_dist = t
+                            hit_spawn = box[2]
+                            if stop_at_first:
+                                return hit_spawn, t
+                    break
+                # BVH2-Knoten
+                if axis > 2:
+                    return self._finish_untreed(hit_spawn, org, six, siy, siz,
+                                                max_dist, stop_at_first)
+                o = org[axis]
+                i = inv[axis]
+                tf = (clips[node + off_front[axis]] - o) * i
+                tb = (clips[node + off_back[axis]] - o) * i
+                node = offset
+                if tf >= interval_min:
+                    interval_min = tf
+                if tb <= interval_max:
+                    interval_max = tb
+                if interval_min > interval_max:
+                    break
+
+            # Nächsten Knoten vom Stack holen
+            while True:
+                if not stack:
+                    return self._finish_untreed(hit_spawn, org, six, siy, siz,
+                                                max_dist, stop_at_first)
+                node, interval_min, far = stack.pop()
+                if max_dist < interval_min:
+                    continue
+                interval_max = far
+                break
+
+    def _finish_untreed(self, hit_spawn, org, six, siy, siz, max_dist, stop_at_first):
+        """Spawns ohne Tree-Value brute-force nachtesten."""
+        for s in self._untreed:
+            lo, hi = s.bounds.low, s.bounds.high
+            t = _ray_box_enter(org, six, siy, siz, (lo.x, lo.y, lo.z),
+                               (hi.x, hi.y, hi.z), max_dist)
+            if 0.0 <= t < max_dist:
+                max_dist = t
+                hit_spawn = s
+                if stop_at_first:
+                    break
+        return hit_spawn, max_dist
+
+    def _ray(self, pos1: Vec3, pos2: Vec3, use_vmap_coords: bool):
+        """(Ursprung, normierte Richtung, Länge) in VMAP-Koordinaten."""
+        if not use_vmap_coords:
+            pos1 = world_to_vmap(pos1.x, pos1.y, pos1.z)
+            pos2 = world_to_vmap(pos2.x, pos2.y, pos2.z)
+        direction = pos2 - pos1
+        return pos1, direction.normalized(), direction.length()
+
+    def is_in_line_of_sight(self, pos1: Vec3, pos2: Vec3,
+                            use_vmap_coords: bool = False) -> tuple:
+        """
+        LOS-Check per BIH-Traversierung. Kompatibel mit LOSChecker-API
+        (liefert den nächsten Treffer).
+        Returns: (has_los, hit_object, hit_distance)
+        """
+        p1, d, max_dist = self._ray(pos1, pos2, use_vmap_coords)
+        if max_dist < 1e-10:
+            return (True, None, 0.0)
+        hit_spawn, dist = self._intersect(p1.x, p1.y, p1.z, d.x, d.y, d.z,
+                                          max_dist, stop_at_first=False)
+        if hit_spawn is not None:
+            return (False, hit_spawn, dist)
+        return (True, None, max_dist)
+
+    def has_los(self, pos1: Vec3, pos2: Vec3, use_vmap_coords: bool = False) -> bool:
+        """Nur das LOS-Flag — bricht beim ersten Treffer ab (stopAtFirst)."""
+        p1, d, max_dist = self._ray(pos1, pos2, use_vmap_coords)
+        if max_dist < 1e-10:
+            return True
+        return self._intersect(p1.x, p1.y, p1.z, d.x, d.y, d.z,
+                               max_dist, stop_at_first=True)[0] is None
+
+    def has_los_many(self, starts: np.ndarray, ends: np.ndarray,
+                     use_vmap_coords: bool = False) -> np.ndarray:
+        """
+        LOS für viele Strahlen starts[i] → ends[i] ((N,3)-Arrays).
+
+        Koordinaten-Umrechnung, Normierung und der Hüllen-Test gegen alle
+        geladenen Spawns laufen als Array-Operationen; nur Strahlen, die
+        die Hülle berühren, werden traversiert.
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        if not use_vmap_coords:
+            starts = np.column_stack((MAP_HALFSIZE - starts[:, 0],
+                                      MAP_HALFSIZE - starts[:, 1], starts[:, 2]))
+            ends = np.column_stack((MAP_HALFSIZE - ends[:, 0],
+                                    MAP_HALFSIZE - ends[:, 1], ends[:, 2]))
+        delta = ends - starts
+        length = np.sqrt((delta * delta).sum(axis=1))
+        clear = np.ones(len(starts), dtype=bool)
+
+        # Nur Segmente, die die Hülle der geladenen Spawns berühren
+        todo = ((length >= 1e-10)
+                & (np.minimum(starts, ends) <= self._hull_hi).all(axis=1)
+                & (np.maximum(starts, ends) >= self._hull_lo).all(axis=1))
+        idx = np.flatnonzero(todo)
+        direction = delta[idx] / length[idx, None]
+        for i, (ox, oy, oz), (dx, dy, dz), dist in zip(
+                idx.tolist(), starts[idx].tolist(), direction.tolist(),
+                length[idx].tolist()):
+            clear[i] = self._intersect(ox, oy, oz, dx, dy, dz, dist, True)[0] is None
+        return clear
+
+
+def _ray_box_enter(org: tuple, six: float, siy: float, siz: float,
+                   lo: tuple, hi: tuple, max_dist: float) -> float:
+    """Slab-Test wie AABB.intersects_ray; Eintrittsdistanz oder -1.0."""
+    t_min = 0.0
+    t_max = max_dist
+    for o, inv_d, l, h in ((org[0], six, lo[0], hi[0]), (org[1], siy, lo[1], hi[1]),
+                           (org[2], siz, lo[2], hi[2])):
+        t1 = (l - o) * inv_d
+        t2 = (h - o) * inv_d
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > t_min:
+            t_min = t1
+        if t2 < t_max:
+            t_max = t2
+        if t_min > t_max:
+            return -1.0
+    return t_min
+
+
 # ─────────────────── Komplett-Environment ────────────────────────
 
 class WoW3DEnvironment:
@@ -1171,8 +1680,9 @@ class WoW3DEnvironment:
     Kann Terrain-Höhen, LOS und Pathing-Checks durchführen.
     """
 
-    def __init__(self, data_root: str):
+    def __init__(self, data_root: str, use_mmap: bool = False):
         self.data_root = data_root
+        self.use_mmap = use_mmap              # .map-Höhen per mmap lesen
         self.maps_dir = os.path.join(data_root, "maps")
         self.vmaps_dir = os.path.join(data_root, "vmaps")
         self.mmaps_dir = os.path.join(data_root, "mmaps")
@@ -1193,7 +1703,7 @@ class WoW3DEnvironment:
 
         fname = map_filename(map_id, tile_x, tile_y)
         filepath = os.path.join(self.maps_dir, fname)
-        tile = parse_map_file(filepath, map_id, tile_x, tile_y)
+        tile = parse_map_file(filepath, map_id, tile_x, tile_y, use_mmap=self.use_mmap)
         if tile:
             self.loaded_tiles[key] = tile
         return tile
@@ -1277,10 +1787,39 @@ class WoW3DEnvironment:
             return INVALID_HEIGHT
         return get_terrain_height(tile, x, y)
 
+    def get_heights(self, map_id: int, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Terrain-Höhen für viele Weltpunkte (INVALID_HEIGHT ohne Tile)."""
+        tiles = self.loaded_tiles
+        return _heights_from_tiles(lambda gx, gy: tiles.get((map_id, gx, gy)), xs, ys)
+
     def check_los(self, pos1: Vec3, pos2: Vec3) -> tuple:
         """Prüft Line of Sight zwischen zwei Weltpunkten."""
         return self.los_checker.is_in_line_of_sight(pos1, pos2)
 
+    def has_los(self, pos1: Vec3, pos2: Vec3) -> bool:
+        """Nur das LOS-Flag (BIH: Abbruch beim ersten Treffer)."""
+        checker = self.los_checker
+        if isinstance(checker, BIHLOSChecker):
+            return checker.has_los(pos1, pos2)
+        return checker.is_in_line_of_sight(pos1, pos2)[0]
+
+    def check_los_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """LOS-Flags für viele Strahlen starts[i] → ends[i] ((N,3) Weltkoordinaten)."""
+        checker = self.los_checker
+        if isinstance(checker, BIHLOSChecker):
+            return checker.has_los_many(starts, ends)
+        return np.array([checker.is_in_line_of_sight(Vec3(*a), Vec3(*b))[0]
+                         for a, b in zip(np.asarray(starts).tolist(),
+                                         np.asarray(ends).tolist())], dtype=bool)
+
+    def use_bih_los(self, map_id: int) -> Optional[BIHLOSChecker]:
+        """Ersetzt den LOS-Checker durch BIH-Traversierung über die geladene vmtree."""
+        vtree = self.loaded_vmtrees.get(map_id)
+        if vtree is None:
+            return None
+        self.los_checker = BIHLOSChecker(vtree)
+        return self.los_checker
+
     def get_nearby_obstacles(self, pos: Vec3, radius: float) -> list:
         """Findet Hindernisse im Umkreis (Weltkoordinaten)."""
         return self.los_checker.get_blocking_objects_in_radius(pos, radius)
@@ -1410,15 +1949,12 @@ class WoW3DEnvironment:
         ny = int((y_max - y_min) / resolution) + 1
         grid = np.full((nx, ny), default_z, dtype=np.float32)
 
-        filled = 0
-        for ix in range(nx):
-            wx = x_min + ix * resolution
-            for iy in range(ny):
-                wy = y_min + iy * resolution
-                h = self.get_height(map_id, wx, wy)
-                if h != INVALID_HEIGHT:
-                    grid[ix, iy] = h
-                    filled += 1
+        wx = x_min + np.arange(nx) * resolution
+        wy = y_min + np.arange(ny) * resolution
+        heights = self.get_heights(map_id, *np.meshgrid(wx, wy, indexing='ij'))
+        valid = heights != INVALID_HEIGHT
+        grid[valid] = heights[valid]
+        filled = int(valid.sum())
 
         cache = HeightCache(grid, x_min, y_min, resolution, default_z)
         total = nx * ny
@@ -1468,7 +2004,7 @@ def test_with_sample_data(data_dir: str):
         else:
             print(f"      -> Height data: v9={len(tile.v9)} vertices, v8={len(tile.v8)} cells")
             heights = tile.v9
-            print(f"      -> Height range: {min(heights):.2f} — {max(heights):.2f}")
+            print(f"      -> Height range: {heights.min():.2f} — {heights.max():.2f}")
         if tile.liquid_level != 0 or tile.liquid_width > 0:
             print(f"      Liquid: flags=0x{tile.liquid_flags:02x}, level={tile.liquid_level}, "
                   f"size={tile.liquid_width}x{tile.liquid_height}")